@@ -0,0 +1,231 @@
+"""
+Cache of parsed article text, separate from the quiz cache.
+Holds what the scraper extracts from a page (cleaned text, title, section
+headings), keyed by canonical title and revision ID, so regenerating a
+quiz for the same revision with other options or another model does not
+download and parse the page again. A size-bounded LRU in memory is backed
+by an optional size-bounded directory shared by all workers on the host.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ArticleCacheConfig:
+    # Total size of the articles kept in memory per worker; 0 disables the memory tier
+    MEMORY_MAX_BYTES = int(os.getenv("ARTICLE_CACHE_MEMORY_MAX_BYTES", str(64 * 1024 * 1024)))
+    # Directory of the shared on-disk tier; empty disables it
+    DIR = os.getenv("ARTICLE_CACHE_DIR", "./.article_cache")
+    # Compressed size of the on-disk tier; least recently used files are removed past it
+    DISK_MAX_BYTES = int(os.getenv("ARTICLE_CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024)))
+    # Eviction removes files until the tier is this fraction of DISK_MAX_BYTES
+    DISK_LOW_WATERMARK = 0.9
+
+
+# Bump when the extraction or cleaning output changes, to retire old entries
+PARSER_VERSION = 1
+
+# Counters for the /metrics endpoint
+article_cache_metrics = {
+    "memory_hits": 0,
+    "disk_hits": 0,
+    "misses": 0,
+    "writes": 0,
+    "memory_evictions": 0,
+    "disk_evictions": 0,
+}
+
+
+def article_cache_key(variant: str, title: str, revision_id: int) -> str:
+    """
+    Cache key of one revision of an article.
+
+    Args:
+        variant (str): How the article was fetched and parsed (e.g. "html:streaming"),
+            as each way produces different text
+        title (str): Canonical page title; underscores and spaces are equivalent
+        revision_id (int): MediaWiki revision ID
+
+    Returns:
+        str: Key for `ArticleCache.get` / `put`
+    """
+    return f"v{PARSER_VERSION}|{variant}|{title.replace('_', ' ')}|{revision_id}"
+
+
+def _entry_size(entry: dict) -> int:
+    """Approximate in-memory size of an entry: the length of its strings."""
+    return sum(
+        len(value) if isinstance(value, str) else sum(len(item) for item in value)
+        for value in entry.values()
+    )
+
+
+class ArticleCache:
+    """
+    Two-tier cache of parsed articles: an in-process LRU bounded by
+    `memory_max_bytes`, and gzip-compressed JSON files under `root`
+    bounded by `disk_max_bytes`.
+
+    Disk files are touched on every hit, so eviction by modification time
+    removes the least recently used ones. Each worker tracks the tier size
+    from its own writes and rescans the directory when that passes the
+    limit, which also accounts for files written by other workers.
+
+    Args:
+        memory_max_bytes (int): Memory tier size; 0 disables it
+        root (str, optional): Directory of the disk tier; None disables it
+        disk_max_bytes (int): Disk tier size
+    """
+
+    def __init__(self, memory_max_bytes: int, root: Optional[str] = None, disk_max_bytes: int = 0):
+        self.memory_max_bytes = memory_max_bytes
+        self.root = Path(root) if root else None
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._sizes = {}
+        self._memory_bytes = 0
+        self._disk_bytes: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> Path:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self.root / digest[:2] / f"{digest}.json.gz"
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Look up an article, promoting a disk hit into memory.
+
+        Returns:
+            Optional[dict]: The stored entry, or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                article_cache_metrics["memory_hits"] += 1
+                return entry
+        entry = self._read(key)
+        if entry is None:
+            article_cache_metrics["misses"] += 1
+            return None
+        article_cache_metrics["disk_hits"] += 1
+        self._remember(key, entry)
+        return entry
+
+    def put(self, key: str, entry: dict) -> None:
+        """
+        Store an article in both tiers.
+
+        Args:
+            key (str): From `article_cache_key`
+            entry (dict): JSON-serializable article fields
+        """
+        self._remember(key, entry)
+        self._write(key, entry)
+        article_cache_metrics["writes"] += 1
+
+    def _remember(self, key: str, entry: dict) -> None:
+        size = _entry_size(entry)
+        if size > self.memory_max_bytes:
+            return
+        with self._lock:
+            self._memory_bytes -= self._sizes.pop(key, 0)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._sizes[key] = size
+            self._memory_bytes += size
+            while self._memory_bytes > self.memory_max_bytes:
+                evicted, _ = self._entries.popitem(last=False)
+                self._memory_bytes -= self._sizes.pop(evicted)
+                article_cache_metrics["memory_evictions"] += 1
+
+    def _read(self, key: str) -> Optional[dict]:
+        if self.root is None:
+            return None
+        path = self._path(key)
+        try:
+            entry = json.loads(gzip.decompress(path.read_bytes()))
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.pop("key", None) == key else None
+
+    def _write(self, key: str, entry: dict) -> None:
+        if self.root is None:
+            return
+        path = self._path(key)
+        data = gzip.compress(json.dumps({"key": key, **entry}, ensure_ascii=False).encode("utf-8"), compresslevel=6)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as tmp_file:
+                    tmp_file.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"Could not write article cache entry {key}: {str(e)}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += len(data)
+            if self._disk_bytes is None or self._disk_bytes > self.disk_max_bytes:
+                self._disk_bytes = self._evict_files()
+
+    def _evict_files(self) -> int:
+        """Remove least recently used files until the tier fits; returns its size."""
+        files = []
+        for path in self.root.glob("*/*.json.gz"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # Removed by another worker
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        if total <= self.disk_max_bytes:
+            return total
+
+        target = self.disk_max_bytes * ArticleCacheConfig.DISK_LOW_WATERMARK
+        for _, size, path in sorted(files, key=lambda file: file[0]):
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                article_cache_metrics["disk_evictions"] += 1
+            except OSError:
+                pass
+            total -= size
+        logger.info(f"Article cache trimmed to {total} bytes on disk")
+        return total
+
+    def memory_usage(self) -> dict:
+        """Entries and bytes in the memory tier."""
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._memory_bytes}
+
+
+_article_cache: Optional[ArticleCache] = None
+
+
+def get_article_cache() -> Optional[ArticleCache]:
+    """The configured article cache, or None when both tiers are disabled."""
+    global _article_cache
+    root = ArticleCacheConfig.DIR or None
+    if not ArticleCacheConfig.MEMORY_MAX_BYTES and not root:
+        return None
+    if _article_cache is None or _article_cache.root != (Path(root) if root else None):
+        _article_cache = ArticleCache(ArticleCacheConfig.MEMORY_MAX_BYTES, root, ArticleCacheConfig.DISK_MAX_BYTES)
+    return _article_cache
@@ -0,0 +1,274 @@
+"""
+Section-aware selection of article text for the LLM prompt.
+Splits cleaned article text at the section headings found by the scraper,
+estimates tokens per section and, when the whole article does not fit the
+token budget, condenses every section to its share of the budget by keeping
+its most informative sentences. Long articles are covered end to end
+instead of being cut off after the introduction, at the same prompt size.
+"""
+
+import math
+import os
+import re
+from typing import List, NamedTuple, Optional, Sequence
+
+
+class ChunkerConfig:
+    # Prompt budget for article text; 2000 tokens is about the 8000 characters
+    # the prompt used to be truncated to
+    TOKEN_BUDGET = int(os.getenv("ARTICLE_TOKEN_BUDGET", "2000"))
+    # Rough characters per token for English prose with Llama-family tokenizers
+    CHARS_PER_TOKEN = float(os.getenv("ARTICLE_CHARS_PER_TOKEN", "4"))
+    # Bump when the selection changes, so cached quizzes are regenerated
+    VERSION = "1"
+
+
+# Words ending in "." that do not end a sentence
+ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "ft", "vs", "etc", "cf", "al",
+    "e.g", "i.e", "c", "ca", "approx", "no", "nos", "vol", "vols", "fig", "figs", "p", "pp",
+    "ed", "eds", "inc", "ltd", "co", "corp", "bros", "gen", "col", "lt", "capt", "sgt", "gov",
+    "sen", "rep", "rev", "hon", "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept",
+    "oct", "nov", "dec", "u.s", "u.k", "u.n", "a.d", "b.c", "ph.d",
+}
+
+# Sentence-ending punctuation, optional closing quotes/brackets, then whitespace
+SENTENCE_END_PATTERN = re.compile(r"[.!?][\"'”’)\]]*\s+")
+
+
+class ArticleChunk(NamedTuple):
+    heading: str  # "" for the introduction
+    text: str
+    tokens: int
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of text without a tokenizer.
+
+    Args:
+        text (str): Any text
+
+    Returns:
+        int: Approximate number of tokens
+    """
+    return math.ceil(len(text) / ChunkerConfig.CHARS_PER_TOKEN)
+
+
+def _is_abbreviation(text: str, end: int) -> bool:
+    """Whether the "." at text[end] ends an abbreviation or an initial, not a sentence."""
+    start = text.rfind(" ", 0, end) + 1
+    word = text[start:end].lstrip("(\"'“‘").lower()
+    if len(word) == 1 and word.isalpha():
+        return True  # Initials: "J. R. R. Tolkien"
+    return word in ABBREVIATIONS
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Split prose into sentences.
+
+    Unlike splitting on ".", keeps decimals ("3.14"), abbreviations
+    ("e.g.", "Dr.", "U.S.") and initials inside their sentence.
+
+    Args:
+        text (str): Prose with whitespace already collapsed
+
+    Returns:
+        List[str]: Sentences with their punctuation, in order
+    """
+    sentences = []
+    start = 0
+    for match in SENTENCE_END_PATTERN.finditer(text):
+        following = text[match.end():match.end() + 1]
+        # A new sentence starts with a capital, a digit or an opening quote/bracket
+        if not following or not (following.isupper() or following.isdigit() or following in "\"'(“‘["):
+            continue
+        if text[match.start()] == "." and _is_abbreviation(text, match.start()):
+            continue
+        sentence = text[start:match.end()].strip()
+        if sentence:
+            sentences.append(sentence)
+        start = match.end()
+    tail = text[start:].strip()
+    if tail:
+        sentences.append(tail)
+    return sentences
+
+
+def _at_sentence_start(text: str, index: int, previous_heading_end: int) -> bool:
+    if index == 0 or index == previous_heading_end + 1:
+        return True  # Start of text, or directly after the previous heading
+    before = text[:index].rstrip()
+    return len(before) < index and before[-1:] in ".!?:\"')”’]"
+
+
+def _find_heading(text: str, heading: str, cursor: int, previous_heading_end: int) -> Optional[int]:
+    """Position of a heading in the flattened text, where it starts a new block."""
+    index = text.find(heading, cursor)
+    while index != -1:
+        end = index + len(heading)
+        if (end == len(text) or text[end] == " ") and _at_sentence_start(text, index, previous_heading_end):
+            return index
+        index = text.find(heading, index + 1)
+    return None
+
+
+def split_sections(text: str, headings: Sequence[str]) -> List[ArticleChunk]:
+    """
+    Split cleaned article text at its section headings.
+
+    Headings are matched in order where they start a block of text (after
+    a sentence end or another heading); headings that cannot be placed are
+    skipped and their text stays with the previous section. A heading with
+    no text of its own (e.g. a section that only holds subsections) is
+    joined to the next one: "Early life: Family".
+
+    Args:
+        text (str): Cleaned article text (whitespace collapsed)
+        headings (Sequence[str]): Section headings in document order
+
+    Returns:
+        List[ArticleChunk]: Introduction (heading "") then one chunk per section
+    """
+    boundaries = []
+    cursor = 0
+    previous_heading_end = -2
+    for heading in headings:
+        heading = heading.strip()
+        if not heading:
+            continue
+        index = _find_heading(text, heading, cursor, previous_heading_end)
+        if index is None:
+            continue
+        boundaries.append((index, heading))
+        cursor = previous_heading_end = index + len(heading)
+
+    chunks = []
+    intro_end = boundaries[0][0] if boundaries else len(text)
+    intro = text[:intro_end].strip()
+    if intro:
+        chunks.append(ArticleChunk("", intro, estimate_tokens(intro)))
+
+    pending_heading = ""
+    for position, (index, heading) in enumerate(boundaries):
+        end = boundaries[position + 1][0] if position + 1 < len(boundaries) else len(text)
+        body = text[index + len(heading):end].strip()
+        heading = f"{pending_heading}: {heading}" if pending_heading else heading
+        if not body:
+            pending_heading = heading
+            continue
+        pending_heading = ""
+        chunks.append(ArticleChunk(heading, body, estimate_tokens(body)))
+    return chunks
+
+
+def _chunk_overhead(chunk: ArticleChunk) -> int:
+    return estimate_tokens(f"## {chunk.heading}\n\n\n") if chunk.heading else 1
+
+
+def _information_score(sentence: str) -> float:
+    """Density of names, dates and figures, the material quiz questions are made of."""
+    words = sentence.split()
+    facts = sum(
+        1 for position, word in enumerate(words)
+        if any(character.isdigit() for character in word) or (position > 0 and word[:1].isupper())
+    )
+    return facts / math.sqrt(len(words) or 1)
+
+
+def condense(chunk: ArticleChunk, token_budget: int) -> Optional[ArticleChunk]:
+    """
+    Shorten a chunk to a token budget by extractive summarization: the
+    lead sentence plus the most fact-dense others, kept in article order.
+
+    Args:
+        chunk (ArticleChunk): Section to shorten
+        token_budget (int): Tokens the section may use
+
+    Returns:
+        Optional[ArticleChunk]: The shortened chunk, or None if not even part of a sentence fits
+    """
+    if chunk.tokens <= token_budget:
+        return chunk
+    sentences = split_sentences(chunk.text)
+    ranked = sorted(
+        range(len(sentences)),
+        key=lambda position: (position != 0, -_information_score(sentences[position]))
+    )
+    chosen = []
+    used = 0
+    for position in ranked:
+        cost = estimate_tokens(sentences[position]) + 1
+        if used + cost <= token_budget:
+            chosen.append(position)
+            used += cost
+
+    if chosen:
+        text = " ".join(sentences[position] for position in sorted(chosen))
+    else:
+        # Even the lead sentence is too long: keep its first words
+        max_chars = int(token_budget * ChunkerConfig.CHARS_PER_TOKEN) - 1
+        text = sentences[0][:max_chars].rsplit(" ", 1)[0] + "…" if max_chars > 20 else ""
+    if not text:
+        return None
+    return ArticleChunk(chunk.heading, text, estimate_tokens(text))
+
+
+def fit_to_budget(chunks: Sequence[ArticleChunk], token_budget: int) -> List[ArticleChunk]:
+    """
+    Select and condense chunks so that, rendered, they fit the token budget.
+
+    Every section gets an equal share of the budget; sections shorter than
+    their share are kept whole and pass the rest on to longer ones
+    (max-min fair allocation), as does whatever a condensed section leaves
+    unused. If there are so many sections that the
+    headings alone would take over a quarter of the budget, the shortest
+    sections are left out.
+
+    Args:
+        chunks (Sequence[ArticleChunk]): Output of `split_sections`
+        token_budget (int): Tokens available for article text
+
+    Returns:
+        List[ArticleChunk]: Chunks to render, in article order
+    """
+    chunks = list(chunks)
+    if sum(chunk.tokens + _chunk_overhead(chunk) for chunk in chunks) <= token_budget:
+        return chunks
+
+    while len(chunks) > 1 and sum(_chunk_overhead(chunk) for chunk in chunks) > token_budget // 4:
+        shortest = min(range(len(chunks)), key=lambda position: (chunks[position].tokens, -position))
+        del chunks[shortest]
+
+    # Smallest sections first, so what they do not use goes to the larger ones
+    remaining = token_budget - sum(_chunk_overhead(chunk) for chunk in chunks)
+    condensed = [None] * len(chunks)
+    by_size = sorted(range(len(chunks)), key=lambda position: chunks[position].tokens)
+    for rank, position in enumerate(by_size):
+        share = remaining // (len(by_size) - rank)
+        condensed[position] = condense(chunks[position], share)
+        if condensed[position] is not None:
+            remaining -= condensed[position].tokens
+    return [chunk for chunk in condensed if chunk is not None]
+
+
+def render_chunks(chunks: Sequence[ArticleChunk]) -> str:
+    """Prompt text for chunks: the introduction, then "## Heading" blocks."""
+    return "\n\n".join(f"## {chunk.heading}\n{chunk.text}" if chunk.heading else chunk.text for chunk in chunks)
+
+
+def build_article_context(text: str, headings: Sequence[str], token_budget: Optional[int] = None) -> str:
+    """
+    Article text for the quiz prompt, covering every section within the budget.
+
+    Args:
+        text (str): Cleaned article text
+        headings (Sequence[str]): Section headings in document order
+        token_budget (int, optional): Overrides ARTICLE_TOKEN_BUDGET
+
+    Returns:
+        str: Sectioned (and, for long articles, condensed) article text
+    """
+    budget = ChunkerConfig.TOKEN_BUDGET if token_budget is None else token_budget
+    return render_chunks(fit_to_budget(split_sections(text, headings), budget))
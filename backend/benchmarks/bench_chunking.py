@@ -0,0 +1,121 @@
+"""
+Benchmark the prompt content of long articles: the old 8000-character cut
+against section-aware chunking.
+
+For each article reports the tokens sent to the LLM and the coverage of
+the article: the share of sections with at least one sentence in the
+prompt, and the share of the article's tokens that made it in. Uses the
+stored raw HTML of quizzes when there is any (DATABASE_URL and the content
+store), plus synthetic articles of increasing length.
+
+Usage:
+    cd backend
+    python benchmarks/bench_chunking.py [--limit 10] [--budget 2000]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from sqlalchemy import or_  # noqa: E402
+
+from article_chunker import build_article_context, estimate_tokens, split_sections, split_sentences  # noqa: E402
+from content_store import load_scraped_content  # noqa: E402
+from database import SessionLocal, Quiz  # noqa: E402
+from scraper import parse_article  # noqa: E402
+
+LEGACY_LIMIT_CHARS = 8000
+
+NAMES = ["Charles Babbage", "Ada Lovelace", "Alan Turing", "John von Neumann", "Grace Hopper", "Konrad Zuse"]
+PLACES = ["London", "Cambridge", "Princeton", "Berlin", "Manchester", "Paris"]
+WORDS = "the machine design engine memory program during later work early paper report team built first".split()
+
+
+def synthetic_article(sections: int, sentences_per_section: int, seed: int):
+    """Cleaned text and headings of a made-up article with factual sentences."""
+    rng = random.Random(seed)
+
+    def sentence():
+        filler = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 16)))
+        return f"In {rng.randint(1800, 2000)} {rng.choice(NAMES)} described {filler} in {rng.choice(PLACES)}."
+
+    headings = [f"Topic {n} of the history" for n in range(sections)]
+    parts = [sentence() for _ in range(5)]
+    for heading in headings:
+        parts.append(heading)
+        parts.extend(sentence() for _ in range(sentences_per_section))
+    return " ".join(parts), headings
+
+
+def stored_articles(limit: int) -> list:
+    """(name, cleaned text, headings) of stored pages, if any."""
+    articles = []
+    try:
+        with SessionLocal() as db:
+            quizzes = db.query(Quiz).filter(
+                or_(Quiz.scraped_content.isnot(None), Quiz.scraped_content_ref.isnot(None))
+            ).order_by(Quiz.id.desc()).limit(limit).all()
+            for quiz in quizzes:
+                html = load_scraped_content(quiz)
+                if html and "<" in html:
+                    article = parse_article(quiz.url, html.encode("utf-8"), html)
+                    articles.append((quiz.title, article.cleaned_content, article.sections))
+    except Exception as e:
+        print(f"(no stored pages: {type(e).__name__})")
+    return articles
+
+
+def coverage(text: str, headings, prompt: str):
+    """(share of sections represented, share of article tokens included)."""
+    chunks = split_sections(text, headings)
+    covered_sections = covered_tokens = total_tokens = 0
+    for chunk in chunks:
+        included = False
+        for sentence in split_sentences(chunk.text):
+            tokens = estimate_tokens(sentence)
+            total_tokens += tokens
+            if sentence in prompt:
+                covered_tokens += tokens
+                included = True
+        covered_sections += included
+    return covered_sections / max(len(chunks), 1), covered_tokens / max(total_tokens, 1), len(chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--budget", type=int, default=2000)
+    args = parser.parse_args()
+
+    articles = stored_articles(args.limit)
+    for sections, per_section in ((8, 15), (15, 30), (25, 50), (40, 80)):
+        text, headings = synthetic_article(sections, per_section, seed=sections)
+        articles.append((f"synthetic {sections}x{per_section}", text, headings))
+
+    print(
+        f"{'article':<24} {'tokens':>7} {'sect':>5} | {'cut: sent':>9} {'sections':>8} {'text':>6} "
+        f"| {'chunked: sent':>13} {'sections':>8} {'text':>6} {'ms':>6}"
+    )
+    for name, text, headings in articles:
+        legacy_prompt = text[:LEGACY_LIMIT_CHARS] + "..." if len(text) > LEGACY_LIMIT_CHARS else text
+        legacy_sections, legacy_text, section_count = coverage(text, headings, legacy_prompt)
+
+        started = time.perf_counter()
+        prompt = build_article_context(text, headings, args.budget)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        chunked_sections, chunked_text, _ = coverage(text, headings, prompt)
+
+        print(
+            f"{name[:24]:<24} {estimate_tokens(text):>7} {section_count:>5} | "
+            f"{estimate_tokens(legacy_prompt):>9} {legacy_sections:>8.0%} {legacy_text:>6.0%} | "
+            f"{estimate_tokens(prompt):>13} {chunked_sections:>8.0%} {chunked_text:>6.0%} {elapsed_ms:>6.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Multi-process SQLite write contention benchmark.
+
+Starts several worker processes (like gunicorn workers) that insert quizzes
+one transaction at a time while reader processes page through history, and
+compares the previous engine settings (rollback journal, synchronous=FULL)
+with the tuned ones (WAL, synchronous=NORMAL, busy_timeout, mmap).
+Reports write throughput, read throughput and "database is locked" errors.
+
+Usage:
+    cd backend
+    python benchmarks/bench_db_contention.py [--writers 4] [--readers 2] [--seconds 5]
+"""
+
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+PROFILES = {
+    "previous": {
+        "SQLITE_JOURNAL_MODE": "DELETE",
+        "SQLITE_SYNCHRONOUS": "FULL",
+        "SQLITE_BUSY_TIMEOUT_MS": "5000",  # sqlite3 module default
+        "SQLITE_MMAP_SIZE": "0",
+        "SQLITE_CACHE_SIZE": "-2000",
+    },
+    "tuned": {},
+}
+
+
+def worker(role: str, database_url: str, profile: dict, seconds: float, start, results) -> None:
+    # Runs in a fresh (spawned) interpreter, so database.py picks up these settings
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.update(profile)
+    from sqlalchemy.exc import OperationalError
+
+    from database import SessionLocal, Quiz, init_db
+    from history_query import query_history
+
+    if role == "init":
+        init_db()
+        return
+
+    # Start all workers together once every process has finished importing
+    start.wait()
+    deadline = time.time() + seconds
+    done = errors = 0
+    while time.time() < deadline:
+        try:
+            with SessionLocal() as db:
+                if role == "writer":
+                    db.add(Quiz(
+                        url=f"https://en.wikipedia.org/wiki/Contention_{os.getpid()}_{done}",
+                        title=f"Contention {done}",
+                        full_quiz_data="{}",
+                    ))
+                    db.commit()
+                else:
+                    query_history(db, limit=50)
+            done += 1
+        except OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            errors += 1
+    results.put((role, done, errors))
+
+
+def run_profile(name: str, writers: int, readers: int, seconds: float) -> dict:
+    directory = tempfile.mkdtemp(prefix="bench_contention_")
+    database_url = f"sqlite:///{directory}/contention.db"
+    profile = PROFILES[name]
+    context = multiprocessing.get_context("spawn")
+    try:
+        init = context.Process(target=worker, args=("init", database_url, profile, 0, None, None))
+        init.start()
+        init.join()
+
+        results = context.Queue()
+        roles = ["writer"] * writers + ["reader"] * readers
+        start = context.Barrier(len(roles))
+        processes = [
+            context.Process(target=worker, args=(role, database_url, profile, seconds, start, results))
+            for role in roles
+        ]
+        for process in processes:
+            process.start()
+        totals = {"writer": [0, 0], "reader": [0, 0]}
+        for _ in processes:
+            role, done, errors = results.get()
+            totals[role][0] += done
+            totals[role][1] += errors
+        for process in processes:
+            process.join()
+        return totals
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--profile", choices=sorted(PROFILES), action="append")
+    args = parser.parse_args()
+
+    print(f"{args.writers} writers, {args.readers} readers, {args.seconds:.0f}s per profile")
+    print(f"{'profile':<10} {'writes':>10} {'locked':>8} {'reads':>10} {'locked':>8}")
+    for name in args.profile or ["previous", "tuned"]:
+        totals = run_profile(name, args.writers, args.readers, args.seconds)
+        print(
+            f"{name:<10} {totals['writer'][0]:>10} {totals['writer'][1]:>8} "
+            f"{totals['reader'][0]:>10} {totals['reader'][1]:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
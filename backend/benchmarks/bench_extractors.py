@@ -0,0 +1,102 @@
+"""
+Benchmark the BeautifulSoup and streaming article extractors.
+
+Runs both backends over the stored raw HTML of quizzes (the database
+pointed to by DATABASE_URL, and the content store), checks they produce identical
+text, and reports per-page parse time. With no stored pages, a synthetic
+long article is built from the test fixture.
+
+Usage:
+    cd backend
+    python benchmarks/bench_extractors.py [--limit 20] [--repeat 5]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+from bs4 import BeautifulSoup
+
+from sqlalchemy import or_
+
+from content_store import load_scraped_content
+from database import SessionLocal, Quiz
+from html_extractor import extract_article
+from scraper import clean_article_text, extract_content, extract_title
+
+FIXTURE = backend_dir / "tests" / "fixtures" / "wikipedia_article.html"
+
+
+def load_pages(limit: int) -> list:
+    """Stored page HTML, or a synthetic ~1MB article if the table is empty."""
+    try:
+        with SessionLocal() as db:
+            quizzes = db.query(Quiz).filter(
+                or_(Quiz.scraped_content.isnot(None), Quiz.scraped_content_ref.isnot(None))
+            ).limit(limit).all()
+            pages = [(quiz.title, load_scraped_content(quiz)) for quiz in quizzes]
+        pages = [(title, html) for title, html in pages if html]
+    except Exception as e:
+        print(f"Could not read stored pages ({e}); using synthetic article")
+        pages = []
+
+    if not pages:
+        html = FIXTURE.read_text(encoding="utf-8")
+        start = html.index("<h2>")
+        end = html.index('<h2><span class="mw-headline" id="References">')
+        body = html[start:end]
+        pages = [("Synthetic long article", html[:start] + body * 60 + html[end:])]
+    return pages
+
+
+def bs4_backend(html: str):
+    soup = BeautifulSoup(html.encode("utf-8"), "html.parser")
+    return extract_title(soup), extract_content(soup)
+
+
+def streaming_backend(html: str):
+    title, text = extract_article(html)
+    return title, clean_article_text(text)
+
+
+def time_backend(backend, html: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        backend(html)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=20, help="Maximum stored pages to benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per page (median is reported)")
+    args = parser.parse_args()
+
+    pages = load_pages(args.limit)
+    print(f"{'page':40} {'KB':>8} {'bs4 ms':>9} {'stream ms':>10} {'speedup':>8}")
+    totals = {"bs4": 0.0, "streaming": 0.0}
+    for title, html in pages:
+        if bs4_backend(html) != streaming_backend(html):
+            print(f"MISMATCH: {title}")
+            sys.exit(1)
+        bs4_time = time_backend(bs4_backend, html, args.repeat)
+        streaming_time = time_backend(streaming_backend, html, args.repeat)
+        totals["bs4"] += bs4_time
+        totals["streaming"] += streaming_time
+        print(f"{title[:40]:40} {len(html) / 1024:8.0f} {bs4_time * 1000:9.1f} "
+              f"{streaming_time * 1000:10.1f} {bs4_time / streaming_time:7.1f}x")
+
+    print(f"\n{len(pages)} page(s), identical output; total bs4 {totals['bs4'] * 1000:.1f} ms, "
+          f"streaming {totals['streaming'] * 1000:.1f} ms "
+          f"({totals['bs4'] / totals['streaming']:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
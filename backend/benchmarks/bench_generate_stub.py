@@ -0,0 +1,148 @@
+"""
+Load-test POST /generate_quiz end to end, offline.
+
+Runs the full app in-process (httpx ASGI transport) against the stub LLM
+provider and a local MediaWiki API server that answers every title with
+the recorded Alan Turing article, so no API quota or network is used.
+Every request asks for a different article, so each one scrapes, calls
+the (stub) LLM and stores a quiz. Reports throughput and latency
+percentiles at each concurrency level.
+
+Usage:
+    cd backend
+    python benchmarks/bench_generate_stub.py [--requests 200] [--concurrency 1 8 32]
+        [--latency-ms 800] [--jitter-ms 200] [--error-rates "429=0.02,500=0.01"]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+ARTICLE_FIXTURE = backend_dir / "tests" / "fixtures" / "mediawiki" / "Alan_Turing.json"
+
+# Must be set before the app modules read their configuration
+_work_dir = tempfile.mkdtemp(prefix="bench_generate_stub_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_work_dir}/bench.db"
+os.environ["CONTENT_STORE_ROOT"] = f"{_work_dir}/content_store"
+os.environ["SCRAPER_HTTP_CACHE_DIR"] = ""
+os.environ["SCRAPER_FETCH_MODE"] = "api"
+os.environ["LLM_PROVIDER"] = "stub"
+
+
+class MediaWikiHandler(BaseHTTPRequestHandler):
+    """Answers every query with the fixture article, renamed to the requested title."""
+
+    def do_GET(self):
+        params = {key: values[0] for key, values in parse_qs(urlsplit(self.path).query).items()}
+        data = json.loads(ARTICLE_FIXTURE.read_text(encoding="utf-8"))
+        page = data["query"]["pages"][0]
+        page["title"] = params.get("titles", page["title"])
+        if "extracts" not in params.get("prop", ""):
+            page.pop("extract", None)
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+async def load_test(client: httpx.AsyncClient, run: int, count: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], {}
+
+    async def one(index: int):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post(
+                "/generate_quiz",
+                json={"url": f"https://en.wikipedia.org/wiki/Bench_{run}_{index}"}
+            )
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one(index) for index in range(count)])
+    elapsed = time.perf_counter() - started
+    return {
+        "rate": count / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "statuses": statuses,
+    }
+
+
+async def run(count: int, levels):
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        return [(level, await load_test(client, run, count, level)) for run, level in enumerate(levels)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--latency-ms", type=float, default=800)
+    parser.add_argument("--jitter-ms", type=float, default=200)
+    parser.add_argument("--error-rates", default="")
+    args = parser.parse_args()
+
+    os.environ["LLM_STUB_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["LLM_STUB_LATENCY_JITTER_MS"] = str(args.jitter_ms)
+    os.environ["LLM_STUB_ERROR_RATES"] = args.error_rates
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MediaWikiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["WIKIPEDIA_API_URL"] = f"http://127.0.0.1:{server.server_address[1]}/w/api.php"
+
+    from database import engine, init_db
+    init_db()
+    try:
+        results = asyncio.run(run(args.requests, args.concurrency))
+    finally:
+        server.shutdown()
+        engine.dispose()
+
+    print(f"stub LLM latency {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, errors: {args.error_rates or 'none'}")
+    print(f"{'concurrency':>11} {'req/s':>8} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7}  statuses")
+    for level, result in results:
+        print(
+            f"{level:>11} {result['rate']:>8.1f} {result['p50']:>7.2f} {result['p95']:>7.2f} "
+            f"{result['p99']:>7.2f}  {result['statuses']}"
+        )
+
+
+if __name__ == "__main__":
+    # Per-request INFO logging would dominate the timings
+    logging.disable(logging.WARNING)
+    try:
+        main()
+    finally:
+        shutil.rmtree(_work_dir, ignore_errors=True)
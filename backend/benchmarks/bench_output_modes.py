@@ -0,0 +1,195 @@
+"""
+Compare the quiz output modes (QUIZ_OUTPUT_MODE): format described in the
+prompt, provider JSON mode, and schema-constrained JSON.
+
+Reports, per mode:
+- prompt tokens of the generation request for the test fixture articles,
+  counting the schema sent in response_format, as providers bill it as input;
+- generation through the stub LLM provider (`generate_quiz_async`, so
+  request building, the provider call, parsing, repair and validation):
+  latency percentiles and how many responses parsed cleanly, needed
+  repair or failed. The stub answers in the shape each mode gets from a
+  real provider: bare JSON in the JSON modes, a markdown fence otherwise;
+- the recorded quiz outputs in sample_data replayed through
+  `finalize_quiz_response` in that same shape: parse time and failures.
+
+The stub's latency does not depend on the prompt (--latency-ms sets it,
+default 0, so the timings are the application's own overhead); with a
+real provider each mode also saves the prefill time of the prompt tokens
+it drops.
+
+Usage:
+    cd backend
+    python benchmarks/bench_output_modes.py [--runs 20] [--latency-ms 0] [--jitter-ms 0]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+# Must be set before the app modules read their configuration
+os.environ["LLM_PROVIDER"] = "stub"
+os.environ["LLM_RESPONSE_CACHE_DIR"] = ""
+
+from article_chunker import build_article_context, estimate_tokens  # noqa: E402
+from llm_providers import LLMProviderConfig  # noqa: E402
+from llm_quiz_generator import (  # noqa: E402
+    QuizGenerationConfig,
+    QuizGenerationError,
+    build_completion_request,
+    finalize_quiz_response,
+    generate_quiz_async,
+)
+from models import QuizOptions  # noqa: E402
+from quiz_repair import repair_metrics  # noqa: E402
+from scraper import parse_article  # noqa: E402
+from structured_output import OUTPUT_MODES  # noqa: E402
+
+FIXTURES_DIR = backend_dir / "tests" / "fixtures"
+SAMPLE_DATA_DIR = backend_dir.parent / "sample_data"
+QUIZ_FIELDS = ("title", "summary", "key_entities", "sections", "quiz", "related_topics")
+
+
+def fixture_articles():
+    """(name, prompt content) of the test fixture articles."""
+    page = json.loads((FIXTURES_DIR / "mediawiki" / "Alan_Turing.json").read_text(encoding="utf-8"))["query"]["pages"][0]
+    html = (FIXTURES_DIR / "wikipedia_article.html").read_text(encoding="utf-8")
+    article = parse_article("https://en.wikipedia.org/wiki/Fixture", html.encode("utf-8"), html)
+    return [
+        ("Alan Turing extract", build_article_context(page["extract"], [])),
+        ("wikipedia_article.html", build_article_context(article.cleaned_content, article.sections)),
+    ]
+
+
+def request_tokens(request: dict) -> int:
+    text = "".join(message["content"] for message in request["messages"])
+    if request.get("response_format"):
+        text += json.dumps(request["response_format"])
+    return estimate_tokens(text)
+
+
+def recorded_outputs():
+    """Recorded quiz outputs, reduced to the fields the LLM generates."""
+    outputs = []
+    for path in sorted(SAMPLE_DATA_DIR.glob("sample_output_*.json")):
+        data = json.loads(path.read_text(encoding="utf-8"))
+        outputs.append({key: data[key] for key in QUIZ_FIELDS if key in data})
+    return outputs
+
+
+def as_returned(data: dict, mode: str) -> str:
+    """A completion as a provider returns it in an output mode."""
+    text = json.dumps(data, indent=2)
+    return text if mode != "prompt" else f"```json\n{text}\n```"
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+async def generate_with_stub(articles, runs: int) -> dict:
+    """Latency and parse outcomes of `generate_quiz_async` per mode."""
+    # Create the shared LLM client outside the timings
+    await generate_quiz_async(*reversed(articles[0]))
+    results = {}
+    for mode in OUTPUT_MODES:
+        QuizGenerationConfig.OUTPUT_MODE = mode
+        before = dict(repair_metrics)
+        latencies, failures = [], 0
+        for _ in range(runs):
+            for name, content in articles:
+                started = time.perf_counter()
+                try:
+                    await generate_quiz_async(content, name)
+                except QuizGenerationError:
+                    failures += 1
+                latencies.append(time.perf_counter() - started)
+        results[mode] = {
+            "calls": len(latencies),
+            "p50": statistics.median(latencies),
+            "p95": percentile(latencies, 0.95),
+            "clean": repair_metrics["clean"] - before["clean"],
+            "repaired": repair_metrics["repaired"] - before["repaired"],
+            "failed": failures,
+        }
+    return results
+
+
+async def replay_recorded(outputs, runs: int) -> dict:
+    """Parse time and failures of the recorded outputs per mode."""
+    results = {}
+    for mode in OUTPUT_MODES:
+        QuizGenerationConfig.OUTPUT_MODE = mode
+        timings, failures = [], 0
+        for _ in range(runs):
+            for data in outputs:
+                options = QuizOptions(question_count=len(data["quiz"]))
+                text = as_returned(data, mode)
+                started = time.perf_counter()
+                try:
+                    await finalize_quiz_response(text, "", data["title"], options)
+                except ValueError:
+                    failures += 1
+                timings.append(time.perf_counter() - started)
+        results[mode] = {"parses": len(timings), "mean": statistics.mean(timings), "failed": failures}
+    return results
+
+
+async def run(articles, outputs, runs: int):
+    return await generate_with_stub(articles, runs), await replay_recorded(outputs, runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    args = parser.parse_args()
+    LLMProviderConfig.STUB_LATENCY_MS = args.latency_ms
+    LLMProviderConfig.STUB_LATENCY_JITTER_MS = args.jitter_ms
+
+    articles = fixture_articles()
+    print("Prompt tokens (estimated, including response_format)")
+    print(f"{'article':<24}" + "".join(f"{mode:>13}" for mode in OUTPUT_MODES))
+    for name, content in articles:
+        counts = []
+        for mode in OUTPUT_MODES:
+            QuizGenerationConfig.OUTPUT_MODE = mode
+            counts.append(request_tokens(build_completion_request(content)))
+        print(f"{name:<24}" + "".join(f"{count:>13}" for count in counts))
+        instructions = [count - estimate_tokens(content) for count in counts]
+        print(f"{'  without the article':<24}" + "".join(f"{count:>13}" for count in instructions))
+
+    outputs = recorded_outputs()
+    generated, replayed = asyncio.run(run(articles, outputs, args.runs))
+
+    print(f"\nGeneration through the stub provider (latency {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms)")
+    print(f"{'mode':<13} {'calls':>6} {'p50 ms':>8} {'p95 ms':>8} {'clean':>6} {'repaired':>9} {'failed':>7}")
+    for mode, result in generated.items():
+        print(
+            f"{mode:<13} {result['calls']:>6} {result['p50'] * 1e3:>8.2f} {result['p95'] * 1e3:>8.2f} "
+            f"{result['clean']:>6} {result['repaired']:>9} {result['failed']:>7}"
+        )
+
+    print(f"\nRecorded outputs ({len(outputs)}) replayed through finalize_quiz_response")
+    print(f"{'mode':<13} {'parses':>6} {'us/parse':>9} {'failure rate':>13}")
+    for mode, result in replayed.items():
+        print(
+            f"{mode:<13} {result['parses']:>6} {result['mean'] * 1e6:>9.0f} "
+            f"{result['failed'] / result['parses']:>13.0%}"
+        )
+
+
+if __name__ == "__main__":
+    logging.disable(logging.WARNING)
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark GET /quiz/{id}: the previous validated implementation against
+the fast path.
+
+Seeds a throwaway SQLite database with one pipeline-generated quiz, then
+serves it in-process through httpx's ASGI transport (no sockets, so the
+endpoint cost dominates):
+  - validated: the previous endpoint, mounted under /legacy: load the row
+    and its child rows, build and validate a QuizDetailResponse, and let
+    FastAPI encode it again
+  - fast: the current /quiz/{id}: one narrow query, the stored JSON
+    encoded straight to bytes by FastJSONResponse
+Both bodies are checked to be identical before timing.
+
+Usage:
+    cd backend
+    python benchmarks/bench_quiz_detail.py [--requests 2000] [--questions 10]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import Depends
+from sqlalchemy.orm import Session
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+# Must be set before database.py creates the engine
+_db_dir = tempfile.mkdtemp(prefix="bench_quiz_detail_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/bench_quiz_detail.db"
+
+from database import SessionLocal, Quiz, engine, get_db, init_db  # noqa: E402
+from fast_json import ORJSON_AVAILABLE  # noqa: E402
+from main import app  # noqa: E402
+from models import QuizDetailResponse  # noqa: E402
+from quiz_records import apply_quiz_data, load_quiz_data, quiz_data_options  # noqa: E402
+
+
+@app.get("/legacy/quiz/{quiz_id}", response_model=QuizDetailResponse, include_in_schema=False)
+def legacy_quiz_detail(quiz_id: int, db: Session = Depends(get_db)):
+    """The previous /quiz/{id} implementation."""
+    quiz = db.query(Quiz).options(*quiz_data_options()).filter(Quiz.id == quiz_id).first()
+    quiz_data = load_quiz_data(quiz)
+    return QuizDetailResponse(
+        id=quiz.id,
+        url=quiz.url,
+        title=quiz.title,
+        date_generated=quiz.date_generated,
+        summary=quiz_data.get("summary"),
+        key_entities=quiz_data.get("key_entities"),
+        sections=quiz_data.get("sections"),
+        quiz=quiz_data.get("quiz", []),
+        related_topics=quiz_data.get("related_topics")
+    )
+
+
+def synthetic_quiz(question_count: int) -> dict:
+    return {
+        "title": "Analytical Engine",
+        "summary": "A proposed mechanical general-purpose computer designed by Charles Babbage. " * 3,
+        "key_entities": {
+            "people": ["Charles Babbage", "Ada Lovelace"],
+            "organizations": ["Royal Society"],
+            "locations": ["London"],
+        },
+        "sections": ["Design", "Construction", "Instruction set", "Influence", "Legacy"],
+        "quiz": [
+            {
+                "question": f"Question {n} about the Analytical Engine?",
+                "options": ["Option A", "Option B", "Option C", "Option D"],
+                "answer": "Option A",
+                "difficulty": ("easy", "medium", "hard")[n % 3],
+                "explanation": "Because the article says so, in the section about its design. " * 2,
+            }
+            for n in range(question_count)
+        ],
+        "related_topics": ["Difference engine", "Turing completeness", "History of computing"],
+    }
+
+
+def seed(question_count: int) -> int:
+    """Store one quiz the way the pipeline does."""
+    quiz_data = synthetic_quiz(question_count)
+    with SessionLocal() as db:
+        quiz = Quiz(
+            url="https://en.wikipedia.org/wiki/Article_1",
+            title=quiz_data["title"],
+            generation_config="benchmark",
+        )
+        apply_quiz_data(quiz, quiz_data)
+        db.add(quiz)
+        db.commit()
+        return quiz.id
+
+
+async def requests_per_second(client: httpx.AsyncClient, path: str, count: int, rounds: int = 3) -> float:
+    rates = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for _ in range(count):
+            await client.get(path)
+        rates.append(count / (time.perf_counter() - started))
+    return statistics.median(rates)
+
+
+async def run(quiz_id: int, count: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        fast_body = (await client.get(f"/quiz/{quiz_id}")).content
+        validated_body = (await client.get(f"/legacy/quiz/{quiz_id}")).content
+        assert fast_body == validated_body, "fast path output differs from the validated response"
+
+        validated = await requests_per_second(client, f"/legacy/quiz/{quiz_id}", count)
+        fast = await requests_per_second(client, f"/quiz/{quiz_id}", count)
+    return len(fast_body), validated, fast
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--questions", type=int, default=10)
+    args = parser.parse_args()
+
+    init_db()
+    body_size, validated, fast = asyncio.run(run(seed(args.questions), args.requests))
+
+    print(f"{body_size} byte body, orjson {'installed' if ORJSON_AVAILABLE else 'not installed'}")
+    print(f"{'path':<10} {'req/s':>10}")
+    print(f"{'validated':<10} {validated:>10.0f}")
+    print(f"{'fast':<10} {fast:>10.0f}")
+    print(f"/quiz/{{id}} speedup: {fast / validated:.2f}x")
+
+
+if __name__ == "__main__":
+    # Per-request INFO logging would dominate the timings
+    logging.disable(logging.INFO)
+    try:
+        main()
+    finally:
+        engine.dispose()
+        shutil.rmtree(_db_dir, ignore_errors=True)
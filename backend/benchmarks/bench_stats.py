@@ -0,0 +1,157 @@
+"""
+Benchmark /stats: the old full-table scan against the counters table.
+
+Seeds a throwaway SQLite database with synthetic quizzes (and their
+normalized questions), then times:
+  - legacy: load every Quiz row and json.loads each full_quiz_data blob
+  - rebuild: one-off `rebuild_quiz_stats` (what an upgrade runs once)
+  - counters: `get_stats`, what /stats now does per request
+
+Usage:
+    cd backend
+    python benchmarks/bench_stats.py [--rows 100000] [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+backend_dir = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(backend_dir))
+
+# Must be set before database.py creates the engine
+_db_dir = tempfile.mkdtemp(prefix="bench_stats_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/bench_stats.db"
+
+from database import SessionLocal, Quiz, Question, engine, init_db  # noqa: E402
+from quiz_stats import get_stats, rebuild_quiz_stats  # noqa: E402
+
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+
+def synthetic_quiz(index: int, question_count: int) -> dict:
+    return {
+        "title": f"Article {index}",
+        "summary": "A synthetic article summary. " * 3,
+        "key_entities": {"people": ["Ada Lovelace"], "organizations": ["Royal Society"], "locations": ["London"]},
+        "sections": ["History", "Design", "Legacy"],
+        "quiz": [
+            {
+                "question": f"Question {n} about article {index}?",
+                "options": ["Option A", "Option B", "Option C", "Option D"],
+                "answer": "Option A",
+                "difficulty": DIFFICULTIES[n % 3],
+                "explanation": "Because the article says so. " * 2,
+            }
+            for n in range(question_count)
+        ],
+        "related_topics": ["Topic one", "Topic two"],
+    }
+
+
+def seed(rows: int, batch_size: int = 5000) -> None:
+    """Insert `rows` quizzes and their questions with bulk inserts."""
+    rng = random.Random(42)
+    start = datetime.utcnow() - timedelta(days=365)
+    quiz_id = 0
+    with engine.begin() as conn:
+        while quiz_id < rows:
+            quizzes, questions = [], []
+            for _ in range(min(batch_size, rows - quiz_id)):
+                quiz_id += 1
+                question_count = rng.randint(5, 10)
+                data = synthetic_quiz(quiz_id, question_count)
+                quizzes.append({
+                    "id": quiz_id,
+                    "url": f"https://en.wikipedia.org/wiki/Article_{quiz_id}",
+                    "title": data["title"],
+                    "date_generated": start + timedelta(seconds=quiz_id * 300),
+                    "full_quiz_data": json.dumps(data),
+                    "summary": data["summary"],
+                    "question_count": question_count,
+                    "quiz_data_version": 1,
+                })
+                questions.extend(
+                    {
+                        "quiz_id": quiz_id,
+                        "position": position,
+                        "question": question["question"],
+                        "options": json.dumps(question["options"]),
+                        "answer": question["answer"],
+                        "difficulty": question["difficulty"],
+                        "explanation": question["explanation"],
+                    }
+                    for position, question in enumerate(data["quiz"])
+                )
+            conn.execute(Quiz.__table__.insert(), quizzes)
+            conn.execute(Question.__table__.insert(), questions)
+
+
+def legacy_stats(db) -> dict:
+    """The previous /stats implementation."""
+    total_quizzes = db.query(Quiz).count()
+    first_quiz = db.query(Quiz).order_by(Quiz.date_generated).first()
+    last_quiz = db.query(Quiz).order_by(Quiz.date_generated.desc()).first()
+    total_questions = 0
+    for quiz in db.query(Quiz).all():
+        total_questions += len(json.loads(quiz.full_quiz_data).get("quiz", []))
+    return {
+        "total_quizzes": total_quizzes,
+        "total_questions": total_questions,
+        "first_quiz_date": first_quiz.date_generated,
+        "last_quiz_date": last_quiz.date_generated,
+    }
+
+
+def timed(fn, repeat: int):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        with SessionLocal() as db:
+            started = time.perf_counter()
+            result = fn(db)
+            timings.append(time.perf_counter() - started)
+    return result, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    init_db()
+    print(f"Seeding {args.rows} quizzes into {os.environ['DATABASE_URL']} ...")
+    started = time.perf_counter()
+    seed(args.rows)
+    print(f"  seeded in {time.perf_counter() - started:.1f}s")
+
+    legacy, legacy_times = timed(legacy_stats, max(1, args.repeat // 2))
+    _, rebuild_times = timed(rebuild_quiz_stats, 1)
+    counters, counter_times = timed(get_stats, args.repeat)
+
+    assert legacy["total_quizzes"] == counters["total_quizzes"]
+    assert legacy["total_questions"] == counters["total_questions"]
+    assert legacy["first_quiz_date"] == counters["first_quiz_date"]
+    assert legacy["last_quiz_date"] == counters["last_quiz_date"]
+
+    print(f"{'method':<10} {'median ms':>12} {'max ms':>12}")
+    for name, timings in (("legacy", legacy_times), ("rebuild", rebuild_times), ("counters", counter_times)):
+        print(f"{name:<10} {statistics.median(timings) * 1000:>12.2f} {max(timings) * 1000:>12.2f}")
+    print(f"/stats speedup: {statistics.median(legacy_times) / statistics.median(counter_times):.0f}x")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        engine.dispose()
+        shutil.rmtree(_db_dir, ignore_errors=True)
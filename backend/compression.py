@@ -0,0 +1,163 @@
+"""
+Response compression middleware.
+Compresses complete JSON and text responses with brotli or gzip, whichever
+the client prefers (brotli on ties). Streaming responses (server-sent
+events, NDJSON batches) are passed through untouched so each event is
+delivered as soon as it is written.
+
+A compressed response gets the encoding appended to its ETag, as the bytes
+differ from the identity representation. A 304 carries the validator the
+client's copy was sent with, so it matches the 200 it revalidates.
+"""
+
+import gzip
+import os
+from typing import List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from http_caching import matching_validator
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+
+class CompressionConfig:
+    # Bodies smaller than this are sent as is; compression would not pay off
+    MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+    GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    # 4-5 compresses better than gzip -6 at similar speed; 11 is far too slow per request
+    BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+STREAMING_TYPES = ("text/event-stream", "application/x-ndjson")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick "br" or "gzip" from an Accept-Encoding header.
+
+    Args:
+        accept_encoding (str): Request header value
+
+    Returns:
+        Optional[str]: Encoding to use, or None for identity
+    """
+    offered: List[Tuple[float, str]] = []
+    wildcard = None
+    for part in accept_encoding.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if token == "*":
+            wildcard = quality
+        elif token in ("br", "gzip"):
+            offered.append((quality, token))
+
+    listed = {token for _, token in offered}
+    if wildcard is not None:
+        offered.extend((wildcard, token) for token in ("br", "gzip") if token not in listed)
+    if not BROTLI_AVAILABLE:
+        offered = [(quality, token) for quality, token in offered if token != "br"]
+    offered = [item for item in offered if item[0] > 0]
+    if not offered:
+        return None
+    # Highest quality wins; "br" sorts before "gzip" on ties
+    return max(offered, key=lambda item: (item[0], item[1] == "br"))[1]
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=CompressionConfig.BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=CompressionConfig.GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing buffered responses; see module docstring."""
+
+    def __init__(self, app: ASGIApp, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = CompressionConfig.MINIMUM_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_headers = Headers(scope=scope)
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+        responder = _CompressingResponder(
+            send, encoding, self.minimum_size, request_headers.get("if-none-match")
+        )
+        await self.app(scope, receive, responder)
+
+
+class _CompressingResponder:
+    def __init__(self, send: Send, encoding: Optional[str], minimum_size: int, if_none_match: Optional[str] = None):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.if_none_match = if_none_match
+        self.start_message: Optional[Message] = None
+        self.passthrough = False
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            if message["status"] == 304:
+                self._echo_validator(message)
+                self.passthrough = True
+                await self.send(message)
+                return
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        content_type = headers.get("content-type", "").lower()
+        compressible = content_type.startswith(COMPRESSIBLE_TYPES) and not content_type.startswith(STREAMING_TYPES)
+        if compressible:
+            headers.add_vary_header("Accept-Encoding")
+
+        body = message.get("body", b"")
+        if (
+            message.get("more_body", False)
+            or not compressible
+            or self.encoding is None
+            or "content-encoding" in headers
+            or len(body) < self.minimum_size
+        ):
+            # Streaming, already encoded, not worth it, or the client wants identity
+            self.passthrough = True
+            await self.send(self.start_message)
+            await self.send(message)
+            return
+
+        compressed = compress(body, self.encoding)
+        headers["Content-Encoding"] = self.encoding
+        headers["Content-Length"] = str(len(compressed))
+        etag = headers.get("etag")
+        if etag and etag.endswith('"'):
+            # The compressed bytes are a different representation
+            headers["ETag"] = f'{etag[:-1]}-{self.encoding}"'
+        await self.send(self.start_message)
+        await self.send({"type": "http.response.body", "body": compressed})
+
+    def _echo_validator(self, message: Message) -> None:
+        """Give a 304 the ETag, compression suffix included, of the copy being revalidated."""
+        headers = MutableHeaders(raw=message["headers"])
+        headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        validator = matching_validator(self.if_none_match, etag) if etag else None
+        if validator:
+            headers["ETag"] = validator
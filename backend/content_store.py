@@ -0,0 +1,153 @@
+"""
+Content-addressed blob storage for scraped article HTML.
+Keeps large, rarely read page HTML out of the quizzes table. Blobs are
+named by the SHA-256 of their content, so re-scraping an unchanged article
+stores nothing new, and are compressed with zstd (gzip if the zstandard
+package is not installed).
+"""
+
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+
+class ContentStoreConfig:
+    # "local" stores blobs under ROOT; "database" keeps HTML in Quiz.scraped_content as before
+    BACKEND = os.getenv("CONTENT_STORE_BACKEND", "local")
+    ROOT = os.getenv("CONTENT_STORE_ROOT", "./.content_store")
+    COMPRESSION = os.getenv("CONTENT_STORE_COMPRESSION", "zstd" if ZSTD_AVAILABLE else "gzip")
+    ZSTD_LEVEL = int(os.getenv("CONTENT_STORE_ZSTD_LEVEL", "10"))
+
+
+REF_PREFIX = "sha256:"
+
+# File suffix -> (compress, decompress)
+_CODECS = {
+    ".gz": (lambda data: gzip.compress(data, compresslevel=6), gzip.decompress),
+}
+if ZSTD_AVAILABLE:
+    _CODECS[".zst"] = (
+        lambda data: zstandard.ZstdCompressor(level=ContentStoreConfig.ZSTD_LEVEL).compress(data),
+        lambda data: zstandard.ZstdDecompressor().decompress(data),
+    )
+
+
+class StoredContent(NamedTuple):
+    ref: str
+    size: int
+    stored_size: int
+    deduplicated: bool
+
+
+class LocalContentStore:
+    """
+    Content store on the local filesystem.
+
+    Layout: <root>/<first 2 hex chars>/<sha256 hex><.zst|.gz>
+    """
+
+    def __init__(self, root: str, compression: str = "gzip"):
+        self.root = Path(root)
+        self.suffix = ".zst" if compression == "zstd" and ZSTD_AVAILABLE else ".gz"
+
+    def _find(self, digest: str) -> Optional[Path]:
+        directory = self.root / digest[:2]
+        for suffix in _CODECS:
+            path = directory / f"{digest}{suffix}"
+            if path.exists():
+                return path
+        return None
+
+    def put(self, data: bytes) -> StoredContent:
+        """
+        Store a blob unless identical content is already stored.
+
+        Args:
+            data (bytes): Uncompressed content
+
+        Returns:
+            StoredContent: Reference to save in the database, plus sizes
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        ref = REF_PREFIX + digest
+        existing = self._find(digest)
+        if existing is not None:
+            return StoredContent(ref, len(data), existing.stat().st_size, True)
+
+        compress, _ = _CODECS[self.suffix]
+        compressed = compress(data)
+        path = self.root / digest[:2] / f"{digest}{self.suffix}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write(path, compressed)
+        return StoredContent(ref, len(data), len(compressed), False)
+
+    def get(self, ref: str) -> bytes:
+        """
+        Load a blob by reference.
+
+        Raises:
+            KeyError: If no blob exists for the reference
+        """
+        if not ref.startswith(REF_PREFIX):
+            raise KeyError(ref)
+        path = self._find(ref[len(REF_PREFIX):])
+        if path is None:
+            raise KeyError(ref)
+        _, decompress = _CODECS[path.suffix]
+        return decompress(path.read_bytes())
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+_content_store: Optional[LocalContentStore] = None
+
+
+def get_content_store() -> Optional[LocalContentStore]:
+    """The configured content store, or None when HTML stays in the database."""
+    global _content_store
+    if ContentStoreConfig.BACKEND != "local":
+        return None
+    if _content_store is None:
+        _content_store = LocalContentStore(ContentStoreConfig.ROOT, ContentStoreConfig.COMPRESSION)
+    return _content_store
+
+
+def load_scraped_content(quiz) -> Optional[str]:
+    """
+    Raw scraped HTML of a quiz, from the content store or the legacy column.
+
+    Args:
+        quiz (Quiz): Quiz row
+
+    Returns:
+        Optional[str]: Page HTML, or None if it was not stored or the blob is missing
+    """
+    if quiz.scraped_content_ref:
+        store = get_content_store() or LocalContentStore(ContentStoreConfig.ROOT)
+        try:
+            return store.get(quiz.scraped_content_ref).decode("utf-8")
+        except KeyError:
+            logger.warning(f"Missing content blob {quiz.scraped_content_ref} for quiz {quiz.id}")
+            return None
+    return quiz.scraped_content
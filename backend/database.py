@@ -3,13 +3,17 @@ Database configuration and models using SQLAlchemy.
 Supports both PostgreSQL and MySQL databases.
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime
+from sqlalchemy import (
+    inspect, text, Column, Integer, String, Text, DateTime, Boolean, Index, ForeignKey
+)
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
 import os
 from dotenv import load_dotenv
 
+from db_engine import create_db_engine
+
 # Load environment variables
 load_dotenv()
 
@@ -19,11 +23,8 @@ DATABASE_URL = os.getenv(
     "sqlite:///./quiz_history.db"  # Fallback to SQLite for development
 )
 
-# Create engine
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+# Create engine (pool sizing and SQLite pragmas are configured in db_engine.py)
+engine = create_db_engine(DATABASE_URL)
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -41,10 +42,35 @@ class Quiz(Base):
         url: Wikipedia article URL
         title: Article title extracted from the page
         date_generated: Timestamp when the quiz was generated
-        scraped_content: Raw HTML/text content scraped from Wikipedia (Bonus feature)
-        full_quiz_data: Complete quiz data as JSON string (serialized with json.dumps())
+        scraped_content: Raw HTML/text content scraped from Wikipedia (Bonus feature);
+            NULL once the HTML lives in the content store
+        full_quiz_data: Complete quiz data as JSON string. For normalized rows a
+            serving copy rendered from the child rows by quiz_records.apply_quiz_data;
+            for rows not yet backfilled, the only copy
+        normalized_url: Canonical form of the article URL used for cache lookups
+        content_hash: SHA-256 of the cleaned article text the quiz was generated from
+        generation_config: Fingerprint of the model/temperature/prompt used
+        cache_key: Hash of (normalized_url, content_hash, generation_config)
+        last_validated_at: When the cached quiz was last confirmed against the live article
+        revision_id: Wikipedia revision the quiz was generated from, if known
+        scraped_content_ref: Content store reference ("sha256:...") of the raw HTML
+        summary: Article summary from the quiz data
+        question_count: Number of questions, stored at insert time for /stats
+        quiz_data_version: Set once the quiz data is stored in the normalized
+            tables (questions, entities, sections, related_topics); NULL for
+            rows not yet backfilled, which are read from full_quiz_data
     """
     __tablename__ = "quizzes"
+    __table_args__ = (
+        # Newest-first history pages and their keyset cursors
+        Index("ix_quizzes_date_id", "date_generated", "id"),
+        # History prefix filters on PostgreSQL, whose plain indexes follow the
+        # database collation and cannot serve LIKE 'prefix%' outside the C locale
+        Index("ix_quizzes_title_pattern", "title", postgresql_ops={"title": "text_pattern_ops"})
+        .ddl_if(dialect="postgresql"),
+        Index("ix_quizzes_url_pattern", "url", postgresql_ops={"url": "text_pattern_ops"})
+        .ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     url = Column(String(500), unique=False, index=True)
@@ -52,6 +78,208 @@ class Quiz(Base):
     date_generated = Column(DateTime, default=datetime.utcnow, index=True)
     scraped_content = Column(Text, nullable=True)  # Bonus: store raw scraped content
     full_quiz_data = Column(Text, nullable=False)  # JSON string of quiz data
+    normalized_url = Column(String(500), nullable=True, index=True)
+    content_hash = Column(String(64), nullable=True)
+    generation_config = Column(String(64), nullable=True)
+    cache_key = Column(String(64), nullable=True, index=True)
+    last_validated_at = Column(DateTime, nullable=True)
+    revision_id = Column(Integer, nullable=True)
+    scraped_content_ref = Column(String(80), nullable=True)
+    summary = Column(Text, nullable=True)
+    question_count = Column(Integer, nullable=True)
+    quiz_data_version = Column(Integer, nullable=True)
+
+    questions = relationship(
+        "Question", order_by="Question.position", cascade="all, delete-orphan"
+    )
+    entities = relationship(
+        "Entity", order_by="Entity.position", cascade="all, delete-orphan"
+    )
+    sections = relationship(
+        "Section", order_by="Section.position", cascade="all, delete-orphan"
+    )
+    related_topics = relationship(
+        "RelatedTopic", order_by="RelatedTopic.position", cascade="all, delete-orphan"
+    )
+
+
+class Question(Base):
+    """
+    One quiz question.
+    
+    Attributes:
+        quiz_id: Owning quiz
+        position: Order within the quiz
+        question: Question text
+        options: JSON list of the four answer options
+        answer: Correct option text
+        difficulty: 'easy', 'medium' or 'hard'
+        explanation: Why the answer is correct
+    """
+    __tablename__ = "questions"
+    __table_args__ = (
+        Index("ix_questions_quiz_position", "quiz_id", "position"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=False)
+    question = Column(Text, nullable=False)
+    options = Column(Text, nullable=False)
+    answer = Column(Text, nullable=False)
+    difficulty = Column(String(16), nullable=False, index=True)
+    explanation = Column(Text, nullable=False)
+
+
+class Entity(Base):
+    """
+    A person, organization or location mentioned in a quiz's article.
+    
+    Attributes:
+        quiz_id: Owning quiz
+        kind: 'people', 'organizations' or 'locations' (the key_entities key)
+        position: Order within its kind
+        name: Entity name
+    """
+    __tablename__ = "entities"
+    __table_args__ = (
+        Index("ix_entities_quiz_kind", "quiz_id", "kind", "position"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(16), nullable=False)
+    position = Column(Integer, nullable=False)
+    name = Column(String(500), nullable=False, index=True)
+
+
+class Section(Base):
+    """
+    A main section/topic of a quiz's article.
+    
+    Attributes:
+        quiz_id: Owning quiz
+        position: Order within the quiz
+        name: Section name
+    """
+    __tablename__ = "sections"
+    __table_args__ = (
+        Index("ix_sections_quiz_position", "quiz_id", "position"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=False)
+    name = Column(String(500), nullable=False)
+
+
+class RelatedTopic(Base):
+    """
+    A related Wikipedia topic suggested for further reading.
+    
+    Attributes:
+        quiz_id: Owning quiz
+        position: Order within the quiz
+        name: Topic name
+    """
+    __tablename__ = "related_topics"
+    __table_args__ = (
+        Index("ix_related_topics_quiz_position", "quiz_id", "position"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), nullable=False)
+    position = Column(Integer, nullable=False)
+    name = Column(String(500), nullable=False, index=True)
+
+
+class QuizStatsCounter(Base):
+    """
+    Incrementally maintained aggregates behind /stats, updated in the same
+    transaction that inserts a quiz.
+    
+    Attributes:
+        scope: "total", "day" or "difficulty"
+        bucket: "" for total, the date (YYYY-MM-DD) for day, the level for difficulty
+        quizzes: Quizzes counted in this bucket (unused for difficulty)
+        questions: Questions counted in this bucket
+        first_generated / last_generated: Date range of the counted quizzes
+    """
+    __tablename__ = "quiz_stats"
+
+    scope = Column(String(16), primary_key=True)
+    bucket = Column(String(32), primary_key=True)
+    quizzes = Column(Integer, nullable=False, default=0)
+    questions = Column(Integer, nullable=False, default=0)
+    first_generated = Column(DateTime, nullable=True)
+    last_generated = Column(DateTime, nullable=True)
+
+
+class GenerationLock(Base):
+    """
+    Cross-worker single-flight lock for quiz generation.
+    A row exists while some worker is generating the quiz for `key`.
+    
+    Attributes:
+        key: Hash of the normalized URL and generation config
+        owner: Random token identifying the holder
+        acquired_at: When the lock was taken
+        expires_at: After this the lock is considered abandoned
+    """
+    __tablename__ = "generation_locks"
+
+    key = Column(String(64), primary_key=True)
+    owner = Column(String(32), nullable=False)
+    acquired_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class GenerationJob(Base):
+    """
+    Queued quiz generation, processed by the background worker pool.
+    The table doubles as the queue: workers claim the highest-priority
+    runnable row by flipping its status from "queued" to "running".
+    
+    Attributes:
+        id: Job ID returned to the client
+        url: Wikipedia article URL
+        force_refresh: Skip the quiz cache
+        priority: Higher runs first
+        quiz_options: QuizOptions of the request as JSON, or null for the defaults
+        status: "queued", "running", "succeeded" or "failed"
+        attempts: Number of times a worker has started the job
+        max_attempts: Give up after this many attempts
+        next_run_at: Earliest time the job may be (re)started, pushed back on retry
+        lease_expires_at: Renewed while the job runs; a running job past it is assumed
+            abandoned and re-queued, or failed if it has no attempts left
+        worker_id: Worker currently or last running the job
+        quiz_id: Generated (or cached) quiz once succeeded
+        cache_status: "hit", "miss" or "coalesced" once succeeded
+        error: Last error message
+        created_at / started_at / finished_at: Lifecycle timestamps
+    """
+    __tablename__ = "generation_jobs"
+    __table_args__ = (
+        Index("ix_generation_jobs_claim", "status", "priority", "next_run_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    url = Column(String(500), nullable=False)
+    force_refresh = Column(Boolean, nullable=False, default=False)
+    priority = Column(Integer, nullable=False, default=0)
+    quiz_options = Column(Text, nullable=True)
+    status = Column(String(16), nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    next_run_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    lease_expires_at = Column(DateTime, nullable=True)
+    worker_id = Column(String(32), nullable=True)
+    quiz_id = Column(Integer, nullable=True)
+    cache_status = Column(String(16), nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
 
 
 def get_db():
@@ -72,6 +300,35 @@ def init_db():
     Call this function once during application startup.
     """
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+
+
+def _add_missing_columns():
+    """
+    Add columns and indexes that were introduced after a table was first
+    created. `create_all` only creates missing tables, so databases created
+    by older versions of the app would otherwise lack new columns.
+    """
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        missing = [column for column in table.columns if column.name not in existing]
+        if not missing:
+            continue
+
+        with engine.begin() as conn:
+            for column in missing:
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+    # Indexes on new columns, and new indexes on existing columns
+    for table in Base.metadata.sorted_tables:
+        existing_indexes = {index["name"] for index in inspect(engine).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=engine)
 
 
 if __name__ == "__main__":
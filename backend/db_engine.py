@@ -0,0 +1,180 @@
+"""
+SQLAlchemy engine factory with tuned connection pooling.
+Pool sizing, pre-ping and recycling for PostgreSQL/MySQL; WAL mode, a busy
+timeout and memory-mapped I/O for SQLite so several worker processes can
+write without "database is locked" errors. The pool records checkout, wait
+and exhaustion counters for the /metrics endpoint.
+"""
+
+import logging
+import os
+import time
+from typing import Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseConfig:
+    # Client/server databases (and file-based SQLite, which also uses a QueuePool)
+    POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+    MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+    # Recycle before typical server-side idle timeouts (MySQL wait_timeout, proxies)
+    POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+    POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() not in ("0", "false", "no")
+    # Compiled SQL statements cached per engine, so repeated queries skip compilation
+    QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", "1000"))
+
+    SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    # Negative values are KiB, as in PRAGMA cache_size
+    SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that counts checkouts and measures time spent waiting for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = {
+            "checkouts": 0,
+            "connects": 0,
+            "invalidations": 0,
+            "exhausted": 0,
+            "timeouts": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        }
+
+    def _do_get(self):
+        # All pooled connections and all overflow slots are in use: this checkout will wait
+        if 0 <= self._max_overflow <= self._overflow and self._pool.empty():
+            self.metrics["exhausted"] += 1
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics["timeouts"] += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            self.metrics["checkouts"] += 1
+            self.metrics["wait_seconds_total"] += waited
+            if waited > self.metrics["wait_seconds_max"]:
+                self.metrics["wait_seconds_max"] = waited
+
+
+def create_db_engine(
+    database_url: str,
+    pool_size: Optional[int] = None,
+    max_overflow: Optional[int] = None,
+    pool_timeout: Optional[float] = None
+) -> Engine:
+    """
+    Create an engine configured for the database backend in the URL.
+
+    Args:
+        database_url (str): SQLAlchemy database URL
+        pool_size (int, optional): Overrides DB_POOL_SIZE
+        max_overflow (int, optional): Overrides DB_MAX_OVERFLOW
+        pool_timeout (float, optional): Overrides DB_POOL_TIMEOUT_SECONDS
+
+    Returns:
+        Engine: Configured engine
+    """
+    url = make_url(database_url)
+    pool_options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": DatabaseConfig.POOL_SIZE if pool_size is None else pool_size,
+        "max_overflow": DatabaseConfig.MAX_OVERFLOW if max_overflow is None else max_overflow,
+        "pool_timeout": DatabaseConfig.POOL_TIMEOUT_SECONDS if pool_timeout is None else pool_timeout,
+        "pool_pre_ping": DatabaseConfig.POOL_PRE_PING,
+    }
+
+    if url.get_backend_name() != "sqlite":
+        engine = create_engine(
+            database_url,
+            pool_recycle=DatabaseConfig.POOL_RECYCLE_SECONDS,
+            query_cache_size=DatabaseConfig.QUERY_CACHE_SIZE,
+            **pool_options
+        )
+        _count_connections(engine)
+        return engine
+
+    connect_args = {
+        "check_same_thread": False,
+        # sqlite3's own wait for locks, in seconds; busy_timeout below covers raw connections too
+        "timeout": DatabaseConfig.SQLITE_BUSY_TIMEOUT_MS / 1000,
+    }
+    if url.database in (None, "", ":memory:"):
+        # One shared in-memory database; pooling options do not apply
+        return create_engine(database_url, connect_args=connect_args)
+
+    engine = create_engine(
+        database_url,
+        connect_args=connect_args,
+        query_cache_size=DatabaseConfig.QUERY_CACHE_SIZE,
+        **pool_options
+    )
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute(f"PRAGMA journal_mode={DatabaseConfig.SQLITE_JOURNAL_MODE}")
+            cursor.execute(f"PRAGMA synchronous={DatabaseConfig.SQLITE_SYNCHRONOUS}")
+            cursor.execute(f"PRAGMA busy_timeout={DatabaseConfig.SQLITE_BUSY_TIMEOUT_MS}")
+            cursor.execute(f"PRAGMA mmap_size={DatabaseConfig.SQLITE_MMAP_SIZE}")
+            cursor.execute(f"PRAGMA cache_size={DatabaseConfig.SQLITE_CACHE_SIZE}")
+            cursor.execute("PRAGMA foreign_keys=ON")
+        finally:
+            cursor.close()
+
+    _count_connections(engine)
+    return engine
+
+
+def _count_connections(engine: Engine) -> None:
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics = getattr(engine.pool, "metrics", None)
+        if metrics is not None:
+            metrics["connects"] += 1
+
+    @event.listens_for(engine, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics = getattr(engine.pool, "metrics", None)
+        if metrics is not None:
+            metrics["invalidations"] += 1
+
+
+def engine_metrics(engine: Engine) -> dict:
+    """
+    Pool status and counters for the /metrics endpoint.
+
+    Args:
+        engine (Engine): Engine created by `create_db_engine`
+
+    Returns:
+        dict: Pool size/usage plus checkout, wait and exhaustion counters
+    """
+    pool = engine.pool
+    metrics = dict(getattr(pool, "metrics", {}))
+    if isinstance(pool, QueuePool):
+        metrics.update({
+            "pool_size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "idle": pool.checkedin(),
+        })
+    if metrics.get("checkouts"):
+        metrics["wait_seconds_avg"] = metrics["wait_seconds_total"] / metrics["checkouts"]
+    metrics["dialect"] = engine.dialect.name
+    return metrics
@@ -0,0 +1,73 @@
+"""
+Fast JSON responses for read-heavy endpoints.
+Encodes with orjson when it is installed (it produces bytes directly and is
+several times faster than the stdlib encoder), otherwise with json using
+the same compact, non-ASCII-escaping output as FastAPI's JSONResponse, so
+responses are byte-for-byte the same either way.
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _default(value: Any) -> str:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Serialize plain Python data (dicts, lists, str, numbers, datetimes) to JSON.
+
+    Args:
+        content: Data to encode; no Pydantic models
+
+    Returns:
+        bytes: Compact UTF-8 JSON
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+        default=_default
+    ).encode("utf-8")
+
+
+def loads(data):
+    """
+    Parse JSON text or bytes.
+
+    Args:
+        data (str | bytes): JSON document
+
+    Returns:
+        Parsed value
+    """
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSON response that skips FastAPI's response-model validation and
+    jsonable_encoder pass. Accepts plain data or already-encoded bytes.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
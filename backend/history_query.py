@@ -0,0 +1,121 @@
+"""
+Keyset (cursor) pagination for the quiz history.
+Pages are ordered newest first by (date_generated, id) and continue from an
+opaque cursor naming the last row seen, so every page is an index range
+scan no matter how deep it is. Only the columns the history list shows
+are loaded. Title and URL prefix filters are index range scans too; on
+PostgreSQL they go through the text_pattern_ops indexes (see `_starts_with`).
+"""
+
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, desc, tuple_
+from sqlalchemy.orm import Session
+
+from database import Quiz
+
+
+def encode_cursor(date_generated: datetime, quiz_id: int) -> str:
+    """
+    Build the cursor that continues after a history row.
+
+    Args:
+        date_generated (datetime): The row's date_generated
+        quiz_id (int): The row's id
+
+    Returns:
+        str: URL-safe opaque token
+    """
+    raw = f"{date_generated.isoformat()}|{quiz_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Parse a cursor produced by `encode_cursor`.
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8")
+        date_part, id_part = raw.split("|")
+        return datetime.fromisoformat(date_part), int(id_part)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _prefix_upper_bound(prefix: str) -> str:
+    """Smallest string greater than every string starting with `prefix`."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _starts_with(db: Session, column, prefix: str):
+    """
+    Prefix filter that can use an index.
+
+    On SQLite and MySQL this is a range (`>= prefix AND < next prefix`),
+    an index range scan; SQLite compares byte-wise, while MySQL's default
+    collations make the match case-insensitive. PostgreSQL orders text by
+    the database collation, under which that range is not the set of
+    strings starting with the prefix unless the collation is C, so it uses
+    LIKE 'prefix%', served by the text_pattern_ops indexes on quizzes.title
+    and quizzes.url.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return column.startswith(prefix, autoescape=True)
+    return and_(column >= prefix, column < _prefix_upper_bound(prefix))
+
+
+def query_history(
+    db: Session,
+    limit: int,
+    offset: int = 0,
+    after: Optional[str] = None,
+    title_prefix: Optional[str] = None,
+    url_prefix: Optional[str] = None
+) -> Tuple[List, Optional[str]]:
+    """
+    Fetch one page of quiz history.
+
+    Prefix filters use the title and url indexes and are case-sensitive
+    except under a case-insensitive MySQL collation (see `_starts_with`).
+
+    Args:
+        db (Session): Database session
+        limit (int): Page size
+        offset (int): Rows to skip (kept for existing clients; prefer `after`)
+        after (str, optional): Cursor from the previous page
+        title_prefix (str, optional): Only titles starting with this
+        url_prefix (str, optional): Only URLs starting with this
+
+    Returns:
+        Tuple[List, Optional[str]]: (rows with id, url, title, date_generated;
+            cursor for the next page or None on the last page)
+
+    Raises:
+        ValueError: If `after` is not a valid cursor
+    """
+    query = db.query(Quiz.id, Quiz.url, Quiz.title, Quiz.date_generated)
+
+    if after:
+        after_date, after_id = decode_cursor(after)
+        query = query.filter(tuple_(Quiz.date_generated, Quiz.id) < (after_date, after_id))
+    if title_prefix:
+        query = query.filter(_starts_with(db, Quiz.title, title_prefix))
+    if url_prefix:
+        query = query.filter(_starts_with(db, Quiz.url, url_prefix))
+
+    query = query.order_by(desc(Quiz.date_generated), desc(Quiz.id))
+    if offset:
+        query = query.offset(offset)
+    rows = query.limit(limit).all()
+
+    next_cursor = None
+    if len(rows) == limit and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor(last.date_generated, last.id)
+    return rows, next_cursor
@@ -0,0 +1,314 @@
+"""
+Single-pass streaming extraction of Wikipedia article text.
+An alternative backend to the BeautifulSoup extraction in scraper.py: it
+walks the HTML once, dropping unwanted subtrees (scripts, tables,
+references, navboxes, ...) as it goes, without building or copying a DOM.
+Output is identical to `scraper.extract_title` / `scraper.extract_content`.
+"""
+
+from html.parser import HTMLParser
+from typing import List, Optional, Tuple
+
+from bs4.dammit import EntitySubstitution
+
+# Tags html.parser never sends an end tag for (same list BeautifulSoup uses)
+VOID_ELEMENTS = {
+    "area", "base", "basefont", "bgsound", "br", "col", "command", "embed",
+    "frame", "hr", "image", "img", "input", "isindex", "keygen", "link",
+    "menuitem", "meta", "nextid", "param", "source", "spacer", "track", "wbr",
+}
+
+# Text nested anywhere inside these is not article text (BeautifulSoup gives it
+# a special string type that get_text() skips)
+NON_TEXT_CONTAINERS = {"rt", "rp", "style", "script", "template"}
+
+# Subtrees removed from the article body: tag name -> required class (None = any)
+DROPPED_ELEMENTS = {
+    "script": [None],
+    "style": [None],
+    "noscript": [None],
+    "table": [None],
+    "div": ["reflist", "navbox", "infobox", "toc", "mw-editsection"],
+    "sup": ["reference"],
+    "span": ["mw-editsection"],
+}
+
+CONTENT_DIV_ID = "mw-content-text"
+
+# Section headings, collected like `scraper.extract_sections`
+SECTION_HEADING_TAGS = {"h2", "h3"}
+MAX_SECTION_HEADINGS = 15
+NON_SECTION_HEADINGS = {"Contents", "See also", "References", "External links"}
+
+
+def _has_class(attrs: dict, class_name: str) -> bool:
+    value = attrs.get("class")
+    if value is None:
+        return False
+    return value == class_name or class_name in value.split()
+
+
+def _is_dropped(tag: str, attrs: dict) -> bool:
+    for class_name in DROPPED_ELEMENTS.get(tag, ()):
+        if class_name is None or _has_class(attrs, class_name):
+            return True
+    return False
+
+
+class _OpenElement:
+    __slots__ = ("name", "dropped", "regions", "is_container", "opens_region")
+
+    def __init__(self, name: str, dropped: bool, regions: Tuple[str, ...], is_container: bool):
+        self.name = name
+        self.dropped = dropped
+        # Regions (body / content / title) that were already open when this
+        # element started, i.e. the regions this element is a descendant of
+        self.regions = regions
+        self.is_container = is_container
+        # Region this element is the root of, if any
+        self.opens_region: Optional[str] = None
+
+
+class StreamingArticleExtractor(HTMLParser):
+    """
+    Collects the article title and body text in one pass over the HTML.
+
+    Mirrors how BeautifulSoup's html.parser tree builder nests elements
+    (void elements, unmatched end tags, character references), so the
+    text matches the DOM-based extraction exactly.
+
+    Usage:
+        extractor = StreamingArticleExtractor()
+        extractor.feed(html)
+        extractor.close()
+        title, text = extractor.title, extractor.text
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self._stack: List[_OpenElement] = []
+        self._open_counts = {}
+        self._already_closed_void: List[str] = []
+        self._data: List[str] = []
+
+        # Per region: is it open now, has it been seen, dropped ancestors inside it
+        self._open_regions = {"body": False, "content": False, "title": False}
+        self._seen_regions = {"body": False, "content": False, "title": False}
+        self._drop_depth = {"body": 0, "content": 0, "title": 0}
+        self._container_depth = 0
+
+        self._body_strings: List[str] = []
+        self._content_strings: List[str] = []
+        self._title_strings: List[str] = []
+        self._og_title: Optional[str] = None
+
+        # Heading being collected, and an edit-section link inside it
+        self._headings_seen = 0
+        self._heading: Optional[_OpenElement] = None
+        self._heading_edit_link: Optional[_OpenElement] = None
+        self._heading_strings: List[str] = []
+        self._sections: List[str] = []
+
+    # -- results ---------------------------------------------------------
+
+    @property
+    def title(self) -> str:
+        if self._seen_regions["title"]:
+            return "".join(self._title_strings)
+        if self._og_title is not None:
+            return self._og_title
+        return "Unknown Title"
+
+    @property
+    def sections(self) -> List[str]:
+        """Section headings (h2/h3) in document order."""
+        return list(self._sections)
+
+    @property
+    def text(self) -> str:
+        """Body text joined like get_text(separator=" ", strip=True)."""
+        if self._seen_regions["content"]:
+            return " ".join(self._content_strings)
+        if self._seen_regions["body"]:
+            return " ".join(self._body_strings)
+        return ""
+
+    # -- tree building ---------------------------------------------------
+
+    def _flush(self, include_in_containers: bool = False) -> None:
+        if not self._data:
+            return
+        string = "".join(self._data).strip()
+        self._data = []
+        if not string or (self._container_depth and not include_in_containers):
+            return
+        if self._heading is not None and self._heading_edit_link is None:
+            self._heading_strings.append(string)
+        for region, strings in (
+            ("body", self._body_strings),
+            ("content", self._content_strings),
+            ("title", self._title_strings),
+        ):
+            # Drops apply to body text only, not the title (extracted from the original DOM)
+            if self._open_regions[region] and (region == "title" or not self._drop_depth[region]):
+                strings.append(string)
+
+    def _push(self, tag: str, attrs: dict) -> None:
+        regions = tuple(region for region, is_open in self._open_regions.items() if is_open)
+        dropped = _is_dropped(tag, attrs)
+        if dropped:
+            for region in regions:
+                self._drop_depth[region] += 1
+        is_container = tag in NON_TEXT_CONTAINERS
+        if is_container:
+            self._container_depth += 1
+
+        element = _OpenElement(tag, dropped, regions, is_container)
+        self._stack.append(element)
+        self._open_counts[tag] = self._open_counts.get(tag, 0) + 1
+
+        if tag in SECTION_HEADING_TAGS and self._heading is None and self._headings_seen < MAX_SECTION_HEADINGS:
+            self._headings_seen += 1
+            self._heading = element
+            self._heading_strings = []
+        elif self._heading is not None and self._heading_edit_link is None \
+                and tag == "span" and _has_class(attrs, "mw-editsection"):
+            self._heading_edit_link = element
+
+        # The first <body>, first content div and first h1.firstHeading open a region
+        region = None
+        if tag == "body":
+            region = "body"
+        elif tag == "div" and attrs.get("id") == CONTENT_DIV_ID:
+            region = "content"
+        elif tag == "h1" and _has_class(attrs, "firstHeading"):
+            region = "title"
+        if region and not self._seen_regions[region]:
+            self._seen_regions[region] = True
+            self._open_regions[region] = True
+            self._stack[-1].opens_region = region
+
+    def _pop(self) -> None:
+        element = self._stack.pop()
+        self._open_counts[element.name] -= 1
+        if element.dropped:
+            for region in element.regions:
+                self._drop_depth[region] -= 1
+        if element.is_container:
+            self._container_depth -= 1
+        if element.opens_region:
+            self._open_regions[element.opens_region] = False
+        if element is self._heading_edit_link:
+            self._heading_edit_link = None
+        elif element is self._heading:
+            self._heading = None
+            heading = "".join(self._heading_strings)
+            if heading and heading not in NON_SECTION_HEADINGS:
+                self._sections.append(heading)
+
+    def _pop_to(self, tag: str) -> None:
+        while self._stack and self._open_counts.get(tag):
+            name = self._stack[-1].name
+            self._pop()
+            if name == tag:
+                break
+
+    # -- HTMLParser callbacks ----------------------------------------------
+
+    def handle_starttag(self, tag, attrs, handle_void=True):
+        self._flush()
+        attr_dict = {}
+        for key, value in attrs:
+            attr_dict[key] = "" if value is None else value
+
+        if tag == "meta" and self._og_title is None and attr_dict.get("property") == "og:title":
+            self._og_title = attr_dict.get("content", "Unknown")
+
+        self._push(tag, attr_dict)
+        if handle_void and tag in VOID_ELEMENTS:
+            self.handle_endtag(tag, check_already_closed=False)
+            self._already_closed_void.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, handle_void=False)
+        self.handle_endtag(tag)
+
+    def handle_endtag(self, tag, check_already_closed=True):
+        if check_already_closed and tag in self._already_closed_void:
+            self._already_closed_void.remove(tag)
+            return
+        self._flush()
+        self._pop_to(tag)
+
+    def handle_data(self, data):
+        self._data.append(data)
+
+    def handle_charref(self, name):
+        if name[:1] in ("x", "X"):
+            codepoint = int(name[1:], 16)
+        else:
+            codepoint = int(name)
+
+        data = None
+        if codepoint < 256:
+            # Numeric references below 256 are often really windows-1252
+            try:
+                data = bytes([codepoint]).decode("windows-1252")
+            except UnicodeDecodeError:
+                pass
+        if not data:
+            try:
+                data = chr(codepoint)
+            except (ValueError, OverflowError):
+                pass
+        self.handle_data(data or "\N{REPLACEMENT CHARACTER}")
+
+    def handle_entityref(self, name):
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self.handle_data(character if character is not None else f"&{name}")
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def unknown_decl(self, data):
+        self._flush()
+        if data.upper().startswith("CDATA["):
+            # CDATA sections count as text even inside script-like containers
+            self._data.append(data[len("CDATA["):])
+            self._flush(include_in_containers=True)
+
+
+def extract_article(html: str) -> Tuple[str, str]:
+    """
+    Extract the title and raw body text of a Wikipedia page in one pass.
+
+    Args:
+        html (str): Page HTML
+
+    Returns:
+        Tuple[str, str]: (title, body text before boilerplate cleanup)
+    """
+    return extract_article_with_sections(html)[:2]
+
+
+def extract_article_with_sections(html: str) -> Tuple[str, str, List[str]]:
+    """
+    Like `extract_article`, also returning the section headings.
+
+    Returns:
+        Tuple[str, str, List[str]]: (title, body text, section headings)
+    """
+    extractor = StreamingArticleExtractor()
+    extractor.feed(html)
+    extractor.close()
+    extractor._flush()
+    # Headings left open at the end of the document still count
+    while extractor._stack:
+        extractor._pop()
+    return extractor.title, extractor.text, extractor.sections
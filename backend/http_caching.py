@@ -0,0 +1,150 @@
+"""
+HTTP caching for read endpoints.
+Builds strong ETags and Cache-Control headers and answers conditional
+requests (If-None-Match) with 304 Not Modified, so browsers and the CDN
+can keep quiz pages, which never change once written, and briefly reuse
+the history list and statistics.
+"""
+
+import hashlib
+import os
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+
+from fast_json import FastJSONResponse, dumps
+
+
+class HttpCacheConfig:
+    # Quizzes are immutable, so their responses can be cached for a year
+    QUIZ_MAX_AGE_SECONDS = int(os.getenv("HTTP_CACHE_QUIZ_MAX_AGE_SECONDS", str(365 * 24 * 3600)))
+    HISTORY_MAX_AGE_SECONDS = int(os.getenv("HTTP_CACHE_HISTORY_MAX_AGE_SECONDS", "30"))
+    STATS_MAX_AGE_SECONDS = int(os.getenv("HTTP_CACHE_STATS_MAX_AGE_SECONDS", "60"))
+
+
+# Suffixes the compression middleware appends to an ETag it compresses
+ENCODING_ETAG_SUFFIXES = ("-gzip", "-br")
+
+
+def quiz_etag(quiz_id: int, content_hash: Optional[str]) -> Optional[str]:
+    """
+    Strong ETag for a quiz, known before its body is loaded.
+
+    Args:
+        quiz_id (int): Quiz ID
+        content_hash (str, optional): Hash of the article text the quiz was generated from
+
+    Returns:
+        Optional[str]: Quoted ETag, or None for legacy rows without a content hash
+    """
+    if not content_hash:
+        return None
+    return f'"quiz-{quiz_id}-{content_hash[:16]}"'
+
+
+def body_etag(body: bytes) -> str:
+    """Strong ETag from the response body itself."""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def immutable_cache_control() -> str:
+    return f"public, max-age={HttpCacheConfig.QUIZ_MAX_AGE_SECONDS}, immutable"
+
+
+def short_cache_control(max_age: int) -> str:
+    return f"public, max-age={max_age}"
+
+
+def _opaque_tag(etag: str) -> str:
+    """ETag without the weak prefix or a compression suffix, for comparison."""
+    tag = etag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    for suffix in ENCODING_ETAG_SUFFIXES:
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)]
+    return tag
+
+
+def matching_validator(if_none_match: Optional[str], etag: str) -> Optional[str]:
+    """
+    The entry of an If-None-Match header that matches an ETag, as the
+    client sent it (e.g. with the compression suffix of the copy it holds).
+
+    Args:
+        if_none_match (str, optional): Request header value
+        etag (str): Current ETag of the resource
+
+    Returns:
+        Optional[str]: The matching entry, or None
+    """
+    if not if_none_match:
+        return None
+    current = _opaque_tag(etag)
+    for candidate in if_none_match.split(","):
+        if candidate.strip() != "*" and _opaque_tag(candidate) == current:
+            return candidate.strip()
+    return None
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header matches an ETag (weak comparison, as
+    RFC 9110 requires for If-None-Match).
+
+    Args:
+        if_none_match (str, optional): Request header value
+        etag (str): Current ETag of the resource
+
+    Returns:
+        bool: True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return matching_validator(if_none_match, etag) is not None
+
+
+def not_modified(request: Request, etag: Optional[str]) -> bool:
+    """Whether the request's If-None-Match matches `etag`."""
+    return etag is not None and etag_matches(request.headers.get("if-none-match"), etag)
+
+
+def not_modified_response(etag: str, cache_control: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Empty 304 carrying the headers a 200 would have had."""
+    return Response(
+        status_code=304,
+        headers={"ETag": etag, "Cache-Control": cache_control, **(headers or {})}
+    )
+
+
+def cached_json_response(
+    request: Request,
+    content: Any,
+    cache_control: str,
+    etag: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    """
+    JSON response with validators, or 304 if the client's copy is current.
+
+    Args:
+        request (Request): Incoming request (for If-None-Match)
+        content: Plain data or already-encoded JSON bytes
+        cache_control (str): Cache-Control header value
+        etag (str, optional): ETag to use; defaults to a hash of the body
+        headers (dict, optional): Extra headers, sent on both 200 and 304
+
+    Returns:
+        Response: 200 with the body, or an empty 304
+    """
+    body = content if isinstance(content, bytes) else dumps(content)
+    etag = etag or body_etag(body)
+    if not_modified(request, etag):
+        return not_modified_response(etag, cache_control, headers)
+    return FastJSONResponse(
+        body,
+        headers={"ETag": etag, "Cache-Control": cache_control, **(headers or {})}
+    )
@@ -0,0 +1,334 @@
+"""
+Shared, pooled HTTP clients for fetching Wikipedia pages.
+Connections are kept alive and reused across requests, responses are
+negotiated with gzip/brotli compression, and pages are revalidated with
+conditional requests (ETag / Last-Modified) against a local store, so an
+unchanged article costs a 304 instead of a full download. The store is
+bounded in size, dropping the least recently used pages first.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli  # noqa: F401  (enables "br" decoding in httpx and urllib3)
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+
+class HttpClientConfig:
+    POOL_SIZE = int(os.getenv("SCRAPER_POOL_SIZE", "20"))
+    KEEPALIVE_SECONDS = float(os.getenv("SCRAPER_KEEPALIVE_SECONDS", "60"))
+    TIMEOUT_SECONDS = float(os.getenv("SCRAPER_TIMEOUT_SECONDS", "10"))
+    # Directory holding validators and bodies for conditional requests; empty disables
+    CACHE_DIR = os.getenv("SCRAPER_HTTP_CACHE_DIR", "./.http_cache")
+    # Size of that directory; least recently used entries are removed past it
+    CACHE_MAX_BYTES = int(os.getenv("SCRAPER_HTTP_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+    # Eviction removes entries until the store is this fraction of CACHE_MAX_BYTES
+    CACHE_LOW_WATERMARK = 0.9
+
+
+# Headers to mimic a browser request
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Accept-Encoding": "br, gzip, deflate" if BROTLI_AVAILABLE else "gzip, deflate",
+}
+
+# Counters for the /metrics endpoint
+http_metrics = {"requests": 0, "not_modified": 0, "content_bytes": 0, "cache_evictions": 0}
+
+
+class FetchResult(NamedTuple):
+    content: bytes
+    text: str
+    headers: dict
+    not_modified: bool
+
+
+class ConditionalCache:
+    """
+    Local filesystem store of the last response for each URL.
+
+    Each entry is a JSON metadata file (validators, encoding) next to a
+    gzip-compressed body, named by the SHA-256 of the URL. Metadata files
+    are touched on every hit, and the store is trimmed to `max_bytes` by
+    removing the entries least recently used, as in `ArticleCache`.
+
+    Args:
+        root (str): Directory of the store
+        max_bytes (int, optional): Size of the store; defaults to SCRAPER_HTTP_CACHE_MAX_BYTES
+    """
+
+    def __init__(self, root: str, max_bytes: Optional[int] = None):
+        self.root = Path(root)
+        self.max_bytes = HttpClientConfig.CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _paths(self, url: str):
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        directory = self.root / digest[:2]
+        return directory / f"{digest}.json", directory / f"{digest}.body.gz"
+
+    def get(self, url: str) -> Optional[dict]:
+        """
+        Load the stored entry for a URL.
+
+        Returns:
+            Optional[dict]: {"etag", "last_modified", "encoding", "headers", "content"} or None
+        """
+        meta_path, body_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text())
+            meta["content"] = gzip.decompress(body_path.read_bytes())
+            os.utime(meta_path)
+            return meta
+        except (OSError, ValueError):
+            return None
+
+    def put(self, url: str, response_headers: dict, encoding: Optional[str], content: bytes) -> None:
+        """
+        Store a 200 response if it carries a validator.
+
+        Args:
+            url (str): Requested URL
+            response_headers (dict): Response headers
+            encoding (str, optional): Text encoding of the body
+            content (bytes): Decoded (uncompressed) response body
+        """
+        headers = {key.lower(): value for key, value in response_headers.items()}
+        etag = headers.get("etag")
+        last_modified = headers.get("last-modified")
+        if not etag and not last_modified:
+            return
+
+        meta_path, body_path = self._paths(url)
+        body = gzip.compress(content, compresslevel=6)
+        meta = json.dumps({
+            "etag": etag,
+            "last_modified": last_modified,
+            "encoding": encoding,
+            "headers": {key: headers[key] for key in ("content-type",) if key in headers},
+        }).encode("utf-8")
+        try:
+            meta_path.parent.mkdir(parents=True, exist_ok=True)
+            _atomic_write(body_path, body)
+            _atomic_write(meta_path, meta)
+        except OSError as e:
+            logger.warning(f"Could not store conditional cache entry for {url}: {e}")
+            return
+
+        with self._lock:
+            if self._size is not None:
+                self._size += len(body) + len(meta)
+            if self._size is None or self._size > self.max_bytes:
+                self._size = self._evict()
+
+    def _evict(self) -> int:
+        """Remove least recently used entries until the store fits; returns its size."""
+        entries = {}
+        for path in self.root.glob("*/*"):
+            if path.name.startswith(".tmp-"):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # Removed by another worker
+            digest = path.name.split(".")[0]
+            mtime, size, paths = entries.get(digest, (0.0, 0, []))
+            entries[digest] = (max(mtime, stat.st_mtime), size + stat.st_size, paths + [path])
+        total = sum(size for _, size, _ in entries.values())
+        if total <= self.max_bytes:
+            return total
+
+        target = self.max_bytes * HttpClientConfig.CACHE_LOW_WATERMARK
+        for _, size, paths in sorted(entries.values(), key=lambda entry: entry[0]):
+            if total <= target:
+                break
+            for path in paths:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            http_metrics["cache_evictions"] += 1
+            total -= size
+        logger.info(f"Conditional request cache trimmed to {total} bytes")
+        return total
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as tmp_file:
+            tmp_file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def conditional_headers(entry: Optional[dict]) -> dict:
+    """Build If-None-Match / If-Modified-Since headers from a stored entry."""
+    if not entry:
+        return {}
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def _cached_result(entry: dict) -> FetchResult:
+    content = entry["content"]
+    return FetchResult(
+        content=content,
+        text=content.decode(entry.get("encoding") or "utf-8", errors="replace"),
+        headers=entry.get("headers", {}),
+        not_modified=True,
+    )
+
+
+_conditional_cache = ConditionalCache(HttpClientConfig.CACHE_DIR) if HttpClientConfig.CACHE_DIR else None
+_sync_session: Optional[requests.Session] = None
+_async_client: Optional[httpx.AsyncClient] = None
+_async_client_loop: Optional[asyncio.AbstractEventLoop] = None
+# Close tasks of replaced clients, referenced until they finish
+_closing_tasks = set()
+
+
+def get_session() -> requests.Session:
+    """Shared requests session with a connection pool sized by SCRAPER_POOL_SIZE."""
+    global _sync_session
+    if _sync_session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HttpClientConfig.POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(HEADERS)
+        _sync_session = session
+    return _sync_session
+
+
+def _retire_client(client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop) -> None:
+    """
+    Close a client that is no longer shared, on the event loop its
+    connections belong to. A client whose loop has already been closed
+    cannot be closed any more and is dropped.
+    """
+    try:
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
+    if loop is running_loop:
+        task = loop.create_task(client.aclose())
+        _closing_tasks.add(task)
+        task.add_done_callback(_closing_tasks.discard)
+    elif loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+    else:
+        logger.debug("Dropped an HTTP client whose event loop is closed")
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Shared httpx client for the running event loop.
+    Connections are bound to a loop, so a new client is made if the loop
+    changes, and the previous one is closed.
+    """
+    global _async_client, _async_client_loop
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        if _async_client is not None:
+            _retire_client(_async_client, _async_client_loop)
+        _async_client = httpx.AsyncClient(
+            headers=HEADERS,
+            timeout=HttpClientConfig.TIMEOUT_SECONDS,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=HttpClientConfig.POOL_SIZE,
+                max_keepalive_connections=HttpClientConfig.POOL_SIZE,
+                keepalive_expiry=HttpClientConfig.KEEPALIVE_SECONDS,
+            ),
+        )
+        _async_client_loop = loop
+    return _async_client
+
+
+async def close_http_clients() -> None:
+    """Close pooled connections. Called on application shutdown."""
+    global _sync_session, _async_client, _async_client_loop
+    if _async_client is not None:
+        client, loop = _async_client, _async_client_loop
+        _async_client = None
+        _async_client_loop = None
+        if loop is asyncio.get_running_loop():
+            await client.aclose()
+        else:
+            _retire_client(client, loop)
+    if _sync_session is not None:
+        _sync_session.close()
+        _sync_session = None
+
+
+def fetch(url: str) -> FetchResult:
+    """
+    GET a URL through the shared session, revalidating any stored copy.
+
+    Raises:
+        requests.RequestException: On network errors or non-2xx/304 responses
+    """
+    entry = _conditional_cache.get(url) if _conditional_cache else None
+    response = get_session().get(
+        url,
+        headers=conditional_headers(entry),
+        timeout=HttpClientConfig.TIMEOUT_SECONDS,
+    )
+    http_metrics["requests"] += 1
+    if response.status_code == 304 and entry:
+        http_metrics["not_modified"] += 1
+        return _cached_result(entry)
+
+    response.raise_for_status()
+    http_metrics["content_bytes"] += len(response.content)
+    if _conditional_cache:
+        _conditional_cache.put(url, response.headers, response.encoding, response.content)
+    return FetchResult(response.content, response.text, dict(response.headers), False)
+
+
+async def fetch_async(url: str) -> FetchResult:
+    """
+    GET a URL through the shared async client, revalidating any stored copy.
+
+    Raises:
+        httpx.HTTPError: On network errors or non-2xx/304 responses
+    """
+    entry = await asyncio.to_thread(_conditional_cache.get, url) if _conditional_cache else None
+    response = await get_async_client().get(url, headers=conditional_headers(entry))
+    http_metrics["requests"] += 1
+    if response.status_code == 304 and entry:
+        http_metrics["not_modified"] += 1
+        return _cached_result(entry)
+
+    response.raise_for_status()
+    http_metrics["content_bytes"] += len(response.content)
+    if _conditional_cache:
+        await asyncio.to_thread(
+            _conditional_cache.put, url, response.headers, response.encoding, response.content
+        )
+    return FetchResult(response.content, response.text, dict(response.headers), False)
@@ -0,0 +1,449 @@
+"""
+Background job queue for quiz generation.
+Clients submit a job and poll its status instead of holding a connection
+open for the whole scrape and LLM round-trip. The generation_jobs table is
+the queue, so jobs survive restarts and can be processed by the in-process
+worker pool or by separate worker processes (`python job_queue.py`).
+"""
+
+import asyncio
+import logging
+import os
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, desc, or_
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal, GenerationJob, Quiz, init_db
+from llm_quiz_generator import QuizGenerationError
+from models import QuizOptions
+from quiz_pipeline import generate_quiz_for_url
+from quiz_records import load_quiz_data, quiz_data_options
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueConfig:
+    # Workers started inside the API process; set to 0 when running separate workers
+    WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+    # How often idle workers check the table for jobs submitted by other processes
+    POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1.0"))
+    MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    # Retry delay is BACKOFF_BASE * 2^(attempt-1), capped and jittered
+    BACKOFF_BASE_SECONDS = float(os.getenv("JOB_BACKOFF_BASE_SECONDS", "2"))
+    BACKOFF_MAX_SECONDS = float(os.getenv("JOB_BACKOFF_MAX_SECONDS", "60"))
+    # A running job whose lease is not renewed within this is assumed to belong to a dead worker
+    LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+    # How often a worker renews the lease of the job it is running
+    LEASE_RENEW_SECONDS = float(os.getenv("JOB_LEASE_RENEW_SECONDS", str(LEASE_SECONDS / 3)))
+
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+# Counters for the /metrics endpoint
+job_metrics = {"processed": 0, "succeeded": 0, "retried": 0, "failed": 0, "abandoned": 0, "lease_lost": 0}
+
+
+def enqueue_job(
+    db: Session,
+    url: str,
+    force_refresh: bool = False,
+    priority: int = 0,
+    options: Optional[QuizOptions] = None
+) -> GenerationJob:
+    """
+    Add a quiz generation job to the queue.
+
+    Args:
+        db (Session): Database session
+        url (str): Wikipedia article URL
+        force_refresh (bool): Skip the quiz cache
+        priority (int): Higher runs first
+        options (QuizOptions, optional): Quiz options; defaults when omitted
+
+    Returns:
+        GenerationJob: The stored job
+    """
+    job = GenerationJob(
+        url=url,
+        force_refresh=force_refresh,
+        priority=priority,
+        quiz_options=options.model_dump_json() if options else None,
+        status=JobStatus.QUEUED,
+        attempts=0,
+        max_attempts=JobQueueConfig.MAX_ATTEMPTS,
+        next_run_at=datetime.utcnow(),
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    logger.info(f"Queued job {job.id} for {url} (priority {priority})")
+    return job
+
+
+def retry_delay(attempts: int) -> float:
+    """
+    Backoff before the next attempt, with jitter so retries of jobs that
+    failed together (e.g. on an LLM rate limit) do not all fire at once.
+
+    Args:
+        attempts (int): Attempts made so far
+
+    Returns:
+        float: Delay in seconds
+    """
+    delay = min(
+        JobQueueConfig.BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0),
+        JobQueueConfig.BACKOFF_MAX_SECONDS,
+    )
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _abandoned(now: datetime):
+    return and_(GenerationJob.status == JobStatus.RUNNING, GenerationJob.lease_expires_at < now)
+
+
+def _runnable(now: datetime):
+    return or_(
+        and_(GenerationJob.status == JobStatus.QUEUED, GenerationJob.next_run_at <= now),
+        and_(_abandoned(now), GenerationJob.attempts < GenerationJob.max_attempts),
+    )
+
+
+def _fail_abandoned_jobs(db: Session, now: datetime) -> None:
+    """Fail jobs whose worker died on their last attempt instead of starting them again."""
+    failed = db.query(GenerationJob).filter(
+        _abandoned(now),
+        GenerationJob.attempts >= GenerationJob.max_attempts,
+    ).update({
+        GenerationJob.status: JobStatus.FAILED,
+        GenerationJob.error: "Worker stopped responding during the last attempt",
+        GenerationJob.finished_at: now,
+        GenerationJob.lease_expires_at: None,
+    }, synchronize_session=False)
+    db.commit()
+    if failed:
+        job_metrics["abandoned"] += failed
+        job_metrics["failed"] += failed
+        logger.error(f"Failed {failed} abandoned job(s) that had no attempts left")
+
+
+def claim_next_job(worker_id: str) -> Optional[int]:
+    """
+    Atomically take the highest-priority runnable job.
+
+    Candidates are read first and then claimed with a conditional UPDATE,
+    so two workers racing for the same row cannot both win; the loser
+    moves on to the next candidate. A running job whose lease expired is
+    started again only if it has attempts left, and failed otherwise.
+
+    Args:
+        worker_id (str): Identifies the claiming worker
+
+    Returns:
+        Optional[int]: Claimed job ID, or None if nothing is runnable
+    """
+    with SessionLocal() as db:
+        now = datetime.utcnow()
+        _fail_abandoned_jobs(db, now)
+        candidates = db.query(GenerationJob.id).filter(_runnable(now)).order_by(
+            desc(GenerationJob.priority),
+            GenerationJob.next_run_at,
+            GenerationJob.id,
+        ).limit(5).all()
+
+        for (job_id,) in candidates:
+            claimed = db.query(GenerationJob).filter(
+                GenerationJob.id == job_id,
+                _runnable(now),
+            ).update({
+                GenerationJob.status: JobStatus.RUNNING,
+                GenerationJob.attempts: GenerationJob.attempts + 1,
+                GenerationJob.worker_id: worker_id,
+                GenerationJob.started_at: now,
+                GenerationJob.lease_expires_at: now + timedelta(seconds=JobQueueConfig.LEASE_SECONDS),
+            }, synchronize_session=False)
+            db.commit()
+            if claimed:
+                return job_id
+    return None
+
+
+def _load_job(job_id: int) -> Optional[GenerationJob]:
+    with SessionLocal() as db:
+        job = db.get(GenerationJob, job_id)
+        if job:
+            db.expunge(job)
+        return job
+
+
+def _held_by(job_id: int, worker_id: str, attempt: int):
+    """Filter matching a job only while the given attempt still holds its lease."""
+    return and_(
+        GenerationJob.id == job_id,
+        GenerationJob.status == JobStatus.RUNNING,
+        GenerationJob.worker_id == worker_id,
+        GenerationJob.attempts == attempt,
+    )
+
+
+def _renew_lease(job_id: int, worker_id: str, attempt: int) -> bool:
+    """
+    Extend the lease of a running job. Returns False if the job is no longer
+    held by this attempt (e.g. it was reclaimed after a long stall).
+    """
+    with SessionLocal() as db:
+        renewed = db.query(GenerationJob).filter(_held_by(job_id, worker_id, attempt)).update({
+            GenerationJob.lease_expires_at: datetime.utcnow() + timedelta(seconds=JobQueueConfig.LEASE_SECONDS),
+        }, synchronize_session=False)
+        db.commit()
+        return bool(renewed)
+
+
+async def _keep_lease(job_id: int, worker_id: str, attempt: int) -> None:
+    """Renew a job's lease every LEASE_RENEW_SECONDS until cancelled or the lease is lost."""
+    while True:
+        await asyncio.sleep(JobQueueConfig.LEASE_RENEW_SECONDS)
+        try:
+            if not await run_in_threadpool(_renew_lease, job_id, worker_id, attempt):
+                logger.warning(f"Job {job_id} lease lost, attempt {attempt} no longer holds it")
+                return
+        except Exception as e:
+            logger.warning(f"Could not renew lease of job {job_id}: {str(e)}")
+
+
+def _complete_job(job: GenerationJob, quiz_id: int, cache_status: str) -> bool:
+    """
+    Record the success of the attempt `job` was loaded for. Returns False if
+    that attempt lost its lease, leaving the job untouched.
+    """
+    with SessionLocal() as db:
+        completed = db.query(GenerationJob).filter(_held_by(job.id, job.worker_id, job.attempts)).update({
+            GenerationJob.status: JobStatus.SUCCEEDED,
+            GenerationJob.quiz_id: quiz_id,
+            GenerationJob.cache_status: cache_status,
+            GenerationJob.error: None,
+            GenerationJob.finished_at: datetime.utcnow(),
+            GenerationJob.lease_expires_at: None,
+        }, synchronize_session=False)
+        db.commit()
+        return bool(completed)
+
+
+def _fail_job(job: GenerationJob, error: str, retryable: bool) -> Optional[bool]:
+    """
+    Re-queue the job with backoff, or mark it failed, if the attempt `job`
+    was loaded for still holds its lease.
+
+    Returns:
+        Optional[bool]: True if re-queued, False if failed, None if the
+            attempt lost its lease and the job was left untouched
+    """
+    requeue = retryable and job.attempts < job.max_attempts
+    now = datetime.utcnow()
+    if requeue:
+        values = {
+            GenerationJob.status: JobStatus.QUEUED,
+            GenerationJob.next_run_at: now + timedelta(seconds=retry_delay(job.attempts)),
+        }
+    else:
+        values = {GenerationJob.status: JobStatus.FAILED, GenerationJob.finished_at: now}
+    with SessionLocal() as db:
+        updated = db.query(GenerationJob).filter(_held_by(job.id, job.worker_id, job.attempts)).update({
+            **values,
+            GenerationJob.error: error,
+            GenerationJob.lease_expires_at: None,
+        }, synchronize_session=False)
+        db.commit()
+    if not updated:
+        return None
+    return requeue
+
+
+async def run_job(job_id: int) -> None:
+    """
+    Run the generation pipeline for a claimed job and record the outcome.
+    LLM failures are retried with exponential backoff; other errors
+    (invalid URL, missing article) fail the job immediately. The job's
+    lease is renewed while the pipeline runs, so long generations are not
+    reclaimed by another worker.
+
+    Args:
+        job_id (int): Job claimed via `claim_next_job`
+    """
+    job = await run_in_threadpool(_load_job, job_id)
+    if job is None:
+        return
+
+    logger.info(f"Running job {job_id} (attempt {job.attempts}/{job.max_attempts}): {job.url}")
+    job_metrics["processed"] += 1
+    heartbeat = asyncio.create_task(_keep_lease(job_id, job.worker_id, job.attempts))
+    try:
+        options = QuizOptions.model_validate_json(job.quiz_options) if job.quiz_options else None
+        quiz_response, cache_status = await generate_quiz_for_url(job.url, job.force_refresh, options=options)
+    except Exception as e:
+        retryable = isinstance(e, QuizGenerationError)
+        requeued = await run_in_threadpool(_fail_job, job, str(e), retryable)
+        if requeued is None:
+            job_metrics["lease_lost"] += 1
+            logger.warning(f"Job {job_id} attempt {job.attempts} failed after losing its lease: {str(e)}")
+        elif requeued:
+            job_metrics["retried"] += 1
+            logger.warning(f"Job {job_id} failed, will retry: {str(e)}")
+        else:
+            job_metrics["failed"] += 1
+            logger.error(f"Job {job_id} failed: {str(e)}")
+        return
+    finally:
+        heartbeat.cancel()
+
+    if not await run_in_threadpool(_complete_job, job, quiz_response["id"], cache_status):
+        job_metrics["lease_lost"] += 1
+        logger.warning(f"Job {job_id} attempt {job.attempts} finished after losing its lease, result dropped")
+        return
+    job_metrics["succeeded"] += 1
+    logger.info(f"Job {job_id} succeeded: quiz {quiz_response['id']} ({cache_status})")
+
+
+def get_job_response(db: Session, job_id: int) -> Optional[dict]:
+    """
+    Build the /jobs/{id} response body: job status plus the quiz once it is ready.
+
+    Args:
+        db (Session): Database session
+        job_id (int): Job ID
+
+    Returns:
+        Optional[dict]: Job status, or None if the job does not exist
+    """
+    job = db.get(GenerationJob, job_id)
+    if not job:
+        return None
+
+    result = None
+    if job.status == JobStatus.SUCCEEDED and job.quiz_id is not None:
+        quiz = db.get(Quiz, job.quiz_id, options=quiz_data_options())
+        if quiz:
+            result = {"id": quiz.id, "url": job.url, **load_quiz_data(quiz)}
+
+    return {
+        "id": job.id,
+        "url": job.url,
+        "status": job.status,
+        "priority": job.priority,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "quiz_id": job.quiz_id,
+        "cache": job.cache_status,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "next_run_at": job.next_run_at if job.status == JobStatus.QUEUED else None,
+        "result": result,
+    }
+
+
+class JobWorkerPool:
+    """
+    Pool of asyncio workers pulling jobs from the generation_jobs table.
+
+    Usage:
+        pool = JobWorkerPool(size=2)
+        pool.start()
+        ...
+        await pool.stop()
+    """
+
+    def __init__(self, size: Optional[int] = None):
+        self.size = JobQueueConfig.WORKERS if size is None else size
+        self.worker_id = uuid.uuid4().hex
+        self._tasks = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self) -> None:
+        """Start the workers on the running event loop."""
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._tasks = [asyncio.create_task(self._work(index)) for index in range(self.size)]
+        logger.info(f"Started {self.size} job workers")
+
+    async def stop(self) -> None:
+        """Cancel the workers. Jobs they were running are re-queued once their lease expires."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+
+    def notify(self) -> None:
+        """
+        Wake idle workers because a job was just submitted in this process.
+        Safe to call from threadpool endpoints.
+        """
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def run_once(self) -> bool:
+        """
+        Claim and run one job.
+
+        Returns:
+            bool: False if no job was runnable
+        """
+        job_id = await run_in_threadpool(claim_next_job, self.worker_id)
+        if job_id is None:
+            return False
+        await run_job(job_id)
+        return True
+
+    async def _work(self, index: int) -> None:
+        while True:
+            # Cleared before looking, so a job submitted meanwhile is not missed
+            self._wakeup.clear()
+            try:
+                if await self.run_once():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job worker {index} error: {str(e)}", exc_info=True)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), JobQueueConfig.POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+
+# Workers for the API process, started on application startup
+job_workers = JobWorkerPool()
+
+
+async def run_worker(size: int) -> None:
+    """Run a standalone worker process until interrupted."""
+    init_db()
+    pool = JobWorkerPool(size=size)
+    pool.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await pool.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    # Standalone workers default to 4 even if the API process runs none
+    asyncio.run(run_worker(int(os.getenv("JOB_WORKER_PROCESS_SIZE", "4"))))
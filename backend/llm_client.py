@@ -0,0 +1,453 @@
+"""
+Long-lived client for the chat completions API of the configured provider.
+One pooled HTTP client is shared by all LLM calls instead of a new client
+(and TLS handshake) per quiz. Calls are paced by token buckets calibrated
+from the x-ratelimit-* response headers, retried on 429/5xx/network
+errors with jittered exponential backoff, bounded by a per-call deadline,
+and guarded by a circuit breaker so requests fail fast while the provider
+is down.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from article_chunker import estimate_tokens
+from llm_providers import (
+    LLMProvider,
+    LLMProviderConfig,
+    LLMProviderError,
+    LLMProviderTimeout,
+    create_provider,
+    parse_duration,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClientConfig:
+    POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "20"))
+    KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "60"))
+    CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+    # Per attempt, and for the whole call including retries and rate-limit waits
+    TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+    DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "120"))
+    MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+    BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8"))
+    # Consecutive failures (5xx, timeouts, connection errors) that open the circuit,
+    # and how long it stays open before one trial call is let through
+    BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+    BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+
+# Counters for the /metrics endpoint
+llm_metrics = {
+    "requests": 0,
+    "retries": 0,
+    "rate_limited": 0,
+    "timeouts": 0,
+    "failures": 0,
+    "rejected": 0,
+    "circuit_opened": 0,
+    "rate_limit_wait_seconds_total": 0.0,
+}
+
+
+class LLMClientError(Exception):
+    """An LLM call could not be completed."""
+
+
+class LLMUnavailableError(LLMClientError):
+    """The circuit breaker is open: the provider is failing and calls are rejected."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMDeadlineExceeded(LLMClientError):
+    """The call's deadline passed before a response, counting retries and rate-limit waits."""
+
+
+class TokenBucket:
+    """
+    Token bucket whose size and refill rate come from the provider's headers.
+
+    Each response reports the limit, what remains and when the window
+    resets; the bucket refills linearly from `remaining` to `limit` over
+    that time. Until the first response it does not limit anything.
+    """
+
+    def __init__(self):
+        self.capacity: Optional[float] = None
+        self.tokens = 0.0
+        self.rate = 0.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        if self.capacity is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def update(self, limit: float, remaining: float, reset_seconds: Optional[float], now: float) -> None:
+        self._refill(now)
+        self.capacity = limit
+        # Keep reservations made by calls that have not reached the provider yet
+        in_flight = min(self.tokens, 0.0)
+        self.tokens = remaining + in_flight
+        if reset_seconds:
+            self.rate = max(limit - remaining, 0) / reset_seconds or limit / reset_seconds
+        elif self.rate == 0:
+            self.rate = limit
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` tokens are available."""
+        self._refill(now)
+        if self.capacity is None:
+            return 0.0
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float) -> None:
+        """Reserve tokens; the balance may go negative so later callers queue behind."""
+        if self.capacity is not None:
+            self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Request and token buckets for the provider, plus a pause after a 429."""
+
+    def __init__(self):
+        self.requests = TokenBucket()
+        self.tokens = TokenBucket()
+        self.paused_until = 0.0
+
+    def update_from_headers(self, headers) -> None:
+        now = time.monotonic()
+        for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+            try:
+                limit = float(headers[f"x-ratelimit-limit-{kind}"])
+                remaining = float(headers[f"x-ratelimit-remaining-{kind}"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            bucket.update(limit, remaining, parse_duration(headers.get(f"x-ratelimit-reset-{kind}")), now)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every call for `seconds`, e.g. the Retry-After of a 429."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self, tokens: int, deadline: float) -> None:
+        """
+        Wait until a request of about `tokens` tokens fits the limits.
+
+        Raises:
+            LLMDeadlineExceeded: If the wait would end after the deadline
+        """
+        now = time.monotonic()
+        wait = max(
+            self.paused_until - now,
+            self.requests.wait_time(1, now),
+            self.tokens.wait_time(tokens, now),
+            0.0,
+        )
+        if now + wait > deadline:
+            raise LLMDeadlineExceeded(f"Rate limit leaves no room before the deadline (wait {wait:.1f}s)")
+        self.requests.take(1)
+        self.tokens.take(tokens)
+        if wait > 0:
+            llm_metrics["rate_limit_wait_seconds_total"] += wait
+            await asyncio.sleep(wait)
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        for bucket in (self.requests, self.tokens):
+            bucket._refill(now)
+        return {
+            "requests_remaining": self.requests.tokens if self.requests.capacity is not None else None,
+            "tokens_remaining": self.tokens.tokens if self.tokens.capacity is not None else None,
+            "paused_seconds": max(self.paused_until - now, 0.0),
+        }
+
+
+class CircuitBreaker:
+    """
+    Closed: calls go through. After `failure_threshold` consecutive
+    failures it opens and rejects calls for `reset_seconds`, then lets a
+    single trial call through (half-open): success closes it, failure
+    opens it again.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at < self.reset_seconds:
+            return "open"
+        return "half_open"
+
+    def before_call(self) -> None:
+        """
+        Raises:
+            LLMUnavailableError: If the circuit is open, or half-open with the trial call running
+        """
+        state = self.state
+        if state == "closed":
+            return
+        if state == "half_open" and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return
+        llm_metrics["rejected"] += 1
+        retry_after = max(self.opened_at + self.reset_seconds - time.monotonic(), 1.0)
+        raise LLMUnavailableError("LLM provider is unavailable, try again later", retry_after)
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.probe_in_flight or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                llm_metrics["circuit_opened"] += 1
+                logger.warning(f"LLM circuit opened after {self.failures} consecutive failures")
+            self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+
+    def release(self) -> None:
+        """Give up a trial call that never reached the provider."""
+        self.probe_in_flight = False
+
+
+# Shared by all clients, so limits and provider health survive event loop changes
+rate_limiter = RateLimiter()
+circuit_breaker = CircuitBreaker(LLMClientConfig.BREAKER_FAILURE_THRESHOLD, LLMClientConfig.BREAKER_RESET_SECONDS)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(max, base * 2^attempt)]."""
+    ceiling = min(LLMClientConfig.BACKOFF_MAX_SECONDS, LLMClientConfig.BACKOFF_BASE_SECONDS * 2 ** attempt)
+    return random.uniform(0, ceiling)
+
+
+def _request_tokens(request: dict) -> int:
+    """Tokens a request counts against the tokens-per-minute limit: prompt plus completion budget."""
+    prompt = "".join(message.get("content") or "" for message in request.get("messages", []))
+    return estimate_tokens(prompt) + int(request.get("max_tokens") or 0)
+
+
+def _classify(error: LLMProviderError):
+    """(retryable, counts as a provider failure) for a provider error."""
+    if error.status_code is None:
+        return True, True  # Network error or timeout
+    if error.status_code == 429:
+        return True, False
+    return error.status_code >= 500, error.status_code >= 500
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """Pooled HTTP client for provider calls, feeding response headers to the rate limiter."""
+
+    async def on_response(response: httpx.Response) -> None:
+        rate_limiter.update_from_headers(response.headers)
+
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(LLMClientConfig.TIMEOUT_SECONDS, connect=LLMClientConfig.CONNECT_TIMEOUT_SECONDS),
+        limits=httpx.Limits(
+            max_connections=LLMClientConfig.POOL_SIZE,
+            max_keepalive_connections=LLMClientConfig.POOL_SIZE,
+            keepalive_expiry=LLMClientConfig.KEEPALIVE_SECONDS,
+        ),
+        event_hooks={"response": [on_response]},
+    )
+
+
+class LLMClient:
+    """An LLM provider with rate limiting, retries, a deadline per call and the circuit breaker."""
+
+    def __init__(self, provider: LLMProvider, http_client: Optional[httpx.AsyncClient] = None):
+        self.provider = provider
+        self.http_client = http_client
+
+    async def _call(self, operation, request: dict, deadline_seconds: Optional[float]):
+        """
+        Run `operation(request, timeout)` on the provider, retrying transient failures.
+
+        Raises:
+            LLMUnavailableError: If the circuit breaker is open
+            LLMDeadlineExceeded: If no response arrived before the deadline
+            LLMProviderError: If the provider rejected the request or retries ran out
+        """
+        deadline = time.monotonic() + (deadline_seconds or LLMClientConfig.DEADLINE_SECONDS)
+        attempt = 0
+        while True:
+            circuit_breaker.before_call()
+            try:
+                await rate_limiter.acquire(_request_tokens(request), deadline)
+            except BaseException:
+                circuit_breaker.release()
+                raise
+            remaining = deadline - time.monotonic()
+            llm_metrics["requests"] += 1
+            try:
+                return_value = await operation(request, min(LLMClientConfig.TIMEOUT_SECONDS, remaining))
+            except LLMProviderError as e:
+                retryable, provider_failure = _classify(e)
+                if isinstance(e, LLMProviderTimeout):
+                    llm_metrics["timeouts"] += 1
+                if e.status_code == 429:
+                    llm_metrics["rate_limited"] += 1
+                    rate_limiter.pause(e.retry_after or backoff_delay(attempt))
+                if provider_failure:
+                    llm_metrics["failures"] += 1
+                    circuit_breaker.record_failure()
+                else:
+                    circuit_breaker.record_success()
+
+                delay = e.retry_after if e.retry_after is not None else backoff_delay(attempt)
+                if not retryable or attempt >= LLMClientConfig.MAX_RETRIES:
+                    raise
+                if time.monotonic() + delay >= deadline:
+                    raise LLMDeadlineExceeded(f"LLM call did not succeed before its deadline: {str(e)}") from e
+                attempt += 1
+                llm_metrics["retries"] += 1
+                logger.warning(f"LLM call failed ({str(e)}), retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                circuit_breaker.release()
+                raise
+
+            circuit_breaker.record_success()
+            return return_value
+
+    async def complete(self, request: dict, deadline_seconds: Optional[float] = None) -> str:
+        """
+        Text of a chat completion.
+
+        Args:
+            request (dict): Chat completion arguments
+            deadline_seconds (float, optional): Overrides LLM_DEADLINE_SECONDS
+
+        Raises:
+            LLMUnavailableError: If the circuit breaker is open
+            LLMDeadlineExceeded: If no response arrived before the deadline
+            LLMProviderError: If the provider rejected the request or retries ran out
+        """
+        return await self._call(self.provider.complete, request, deadline_seconds)
+
+    async def stream(self, request: dict, deadline_seconds: Optional[float] = None) -> AsyncIterator[str]:
+        """
+        Text deltas of a streamed chat completion.
+
+        Opening the stream is retried like `complete`; once text has been
+        yielded, errors are raised to the caller.
+        """
+        deltas = await self._call(self.provider.open_stream, request, deadline_seconds)
+        try:
+            async for delta in deltas:
+                yield delta
+        except LLMProviderError as e:
+            if _classify(e)[1]:
+                llm_metrics["failures"] += 1
+                circuit_breaker.record_failure()
+            raise
+
+    async def aclose(self) -> None:
+        await self.provider.aclose()
+        if self.http_client is not None:
+            await self.http_client.aclose()
+
+
+_llm_client: Optional[LLMClient] = None
+_llm_client_key = None
+# Close tasks of replaced clients, referenced until they finish
+_closing_tasks = set()
+
+
+def _retire_client(client: LLMClient, loop: asyncio.AbstractEventLoop) -> None:
+    """
+    Close a client that is no longer shared, on the event loop its
+    connections belong to. A client whose loop has already been closed
+    cannot be closed any more and is dropped.
+    """
+    try:
+        running_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        running_loop = None
+    if loop is running_loop:
+        task = loop.create_task(client.aclose())
+        _closing_tasks.add(task)
+        task.add_done_callback(_closing_tasks.discard)
+    elif loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+    else:
+        logger.debug("Dropped an LLM client whose event loop is closed")
+
+
+def get_llm_client() -> LLMClient:
+    """
+    Shared LLM client for the running event loop.
+    Connections are bound to a loop, so a new client is made if the loop
+    (or the provider settings) change, and the previous one is closed.
+
+    Raises:
+        ValueError: If the provider is unknown or misconfigured
+    """
+    global _llm_client, _llm_client_key
+    key = (
+        asyncio.get_running_loop(),
+        LLMProviderConfig.PROVIDER,
+        LLMProviderConfig.BASE_URL,
+        os.getenv("GROQ_API_KEY"),
+        os.getenv("GROQ_BASE_URL"),
+    )
+    if _llm_client is None or _llm_client_key != key:
+        if _llm_client is not None:
+            _retire_client(_llm_client, _llm_client_key[0])
+        http_client = create_http_client()
+        _llm_client = LLMClient(create_provider(http_client), http_client)
+        _llm_client_key = key
+    return _llm_client
+
+
+async def close_llm_client() -> None:
+    """
+    Close pooled connections of the running loop's client. Called on
+    application shutdown, and at the end of short-lived event loops such
+    as the one `asyncio.run` makes.
+    """
+    global _llm_client, _llm_client_key
+    if _llm_client is not None and _llm_client_key[0] is asyncio.get_running_loop():
+        client = _llm_client
+        _llm_client = None
+        _llm_client_key = None
+        await client.aclose()
+
+
+def llm_client_metrics() -> dict:
+    """Counters, circuit breaker state and rate-limit headroom for the /metrics endpoint."""
+    return {
+        **llm_metrics,
+        "provider": LLMProviderConfig.PROVIDER,
+        "circuit_state": circuit_breaker.state,
+        "consecutive_failures": circuit_breaker.failures,
+        **rate_limiter.status(),
+    }
@@ -0,0 +1,406 @@
+"""
+Chat completion backends behind the shared LLM client.
+LLM_PROVIDER selects the Groq SDK ("groq"), any OpenAI-compatible
+/chat/completions endpoint ("openai": vLLM, Ollama, LiteLLM, OpenAI itself)
+or a deterministic local stub ("stub") that answers with valid quiz JSON
+built from the prompt, with configurable latency and error rates, so the
+full app can be load-tested without spending API quota.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+from typing import AsyncIterator, Dict, List, Optional
+
+import groq
+import httpx
+from groq import AsyncGroq
+
+from article_chunker import split_sentences
+
+logger = logging.getLogger(__name__)
+
+
+class LLMProviderConfig:
+    # "groq", "openai" (any OpenAI-compatible endpoint) or "stub"
+    PROVIDER = os.getenv("LLM_PROVIDER", "groq").lower()
+    # Groq: overrides GROQ_BASE_URL; openai: required, e.g. http://localhost:8000/v1
+    BASE_URL = os.getenv("LLM_BASE_URL")
+    # Stub: response time (normal distribution, clipped at 0) and error
+    # probabilities per kind, e.g. "429=0.05,500=0.02,timeout=0.01"
+    STUB_LATENCY_MS = float(os.getenv("LLM_STUB_LATENCY_MS", "800"))
+    STUB_LATENCY_JITTER_MS = float(os.getenv("LLM_STUB_LATENCY_JITTER_MS", "200"))
+    STUB_ERROR_RATES = os.getenv("LLM_STUB_ERROR_RATES", "")
+    STUB_SEED = int(os.getenv("LLM_STUB_SEED", "0"))
+
+
+PROVIDERS = ("groq", "openai", "stub")
+
+# Groq reset durations: "7.66s", "2m59.56s", "1h2m", "120ms"
+DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class LLMProviderError(Exception):
+    """
+    A provider call failed. `status_code` is None for network errors and
+    timeouts; `retry_after` comes from the Retry-After header of a 429/503.
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class LLMProviderTimeout(LLMProviderError):
+    """The provider did not answer within the call's timeout."""
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """
+    Seconds in a rate-limit reset or Retry-After header value.
+
+    Args:
+        value (str, optional): "12", "7.66s", "2m59.56s" or "120ms"
+
+    Returns:
+        Optional[float]: Seconds, or None if the value is missing or malformed
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    parts = DURATION_PATTERN.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * DURATION_UNITS[unit] for number, unit in parts)
+
+
+class LLMProvider:
+    """
+    Interface of a chat completion backend. `request` holds the OpenAI-style
+    chat completion arguments (model, messages, temperature, max_tokens).
+    Failures are raised as LLMProviderError.
+    """
+
+    name = "base"
+
+    async def complete(self, request: dict, timeout: float) -> str:
+        """Text of the completion."""
+        raise NotImplementedError
+
+    async def open_stream(self, request: dict, timeout: float) -> AsyncIterator[str]:
+        """Start a streamed completion; the returned iterator yields text deltas."""
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        pass
+
+
+def _groq_error(error: Exception) -> Optional[LLMProviderError]:
+    if isinstance(error, groq.APITimeoutError):
+        return LLMProviderTimeout(str(error))
+    if isinstance(error, groq.APIStatusError):
+        retry_after = parse_duration(error.response.headers.get("retry-after"))
+        return LLMProviderError(str(error), error.status_code, retry_after)
+    if isinstance(error, (groq.APIConnectionError, httpx.TransportError)):
+        return LLMProviderError(str(error))
+    return None
+
+
+class GroqProvider(LLMProvider):
+    """Groq SDK on the client's pooled HTTP connections; retries are left to the LLM client."""
+
+    name = "groq"
+
+    def __init__(self, http_client: httpx.AsyncClient, api_key: str, base_url: Optional[str] = None):
+        self.sdk = AsyncGroq(api_key=api_key, base_url=base_url, http_client=http_client, max_retries=0)
+
+    async def complete(self, request: dict, timeout: float) -> str:
+        try:
+            response = await self.sdk.chat.completions.create(**request, timeout=timeout)
+        except Exception as e:
+            raise _groq_error(e) or e
+        return response.choices[0].message.content
+
+    async def open_stream(self, request: dict, timeout: float) -> AsyncIterator[str]:
+        try:
+            stream = await self.sdk.chat.completions.create(**request, stream=True, timeout=timeout)
+        except Exception as e:
+            raise _groq_error(e) or e
+
+        async def deltas():
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            except Exception as e:
+                raise _groq_error(e) or e
+        return deltas()
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """POST {base_url}/chat/completions with plain httpx, for servers that speak the OpenAI API."""
+
+    name = "openai"
+
+    def __init__(self, http_client: httpx.AsyncClient, base_url: str, api_key: Optional[str] = None):
+        self.http_client = http_client
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+
+    async def _send(self, body: dict, timeout: float, stream: bool) -> httpx.Response:
+        request = self.http_client.build_request("POST", self.url, json=body, headers=self.headers, timeout=timeout)
+        try:
+            response = await self.http_client.send(request, stream=stream)
+        except httpx.TimeoutException as e:
+            raise LLMProviderTimeout(f"Request timed out: {str(e)}")
+        except httpx.TransportError as e:
+            raise LLMProviderError(f"Connection error: {str(e)}")
+        if response.status_code >= 400:
+            body_text = (await response.aread()).decode("utf-8", errors="replace")
+            await response.aclose()
+            raise LLMProviderError(
+                f"Error code: {response.status_code} - {body_text[:500]}",
+                response.status_code,
+                parse_duration(response.headers.get("retry-after")),
+            )
+        return response
+
+    async def complete(self, request: dict, timeout: float) -> str:
+        response = await self._send(request, timeout, stream=False)
+        try:
+            return response.json()["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise LLMProviderError(f"Malformed completion response: {str(e)}", response.status_code)
+
+    async def open_stream(self, request: dict, timeout: float) -> AsyncIterator[str]:
+        response = await self._send({**request, "stream": True}, timeout, stream=True)
+
+        async def deltas():
+            try:
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    choices = json.loads(data).get("choices") or []
+                    content = choices[0].get("delta", {}).get("content") if choices else None
+                    if content:
+                        yield content
+            except httpx.TransportError as e:
+                raise LLMProviderError(f"Stream interrupted: {str(e)}")
+            finally:
+                await response.aclose()
+        return deltas()
+
+
+def parse_error_rates(spec: str) -> Dict[str, float]:
+    """
+    Parse LLM_STUB_ERROR_RATES.
+
+    Args:
+        spec (str): Comma-separated kind=probability pairs; kinds are HTTP
+            status codes or "timeout"
+
+    Returns:
+        Dict[str, float]: Probability per error kind
+    """
+    rates = {}
+    for part in spec.split(","):
+        if "=" not in part:
+            continue
+        kind, probability = part.split("=", 1)
+        try:
+            rates[kind.strip().lower()] = float(probability)
+        except ValueError:
+            logger.warning(f"Ignoring malformed LLM_STUB_ERROR_RATES entry: {part}")
+    return rates
+
+
+STUB_DIFFICULTIES = ("easy", "medium", "hard")
+STUB_WORD_PATTERN = re.compile(r"[A-Za-z0-9][\w'-]*[\w]")
+# The question count in the user message of quiz, section and top-up prompts
+STUB_COUNT_PATTERN = re.compile(r"^Write (\d+) ", re.MULTILINE)
+STUB_FALLBACK_TERMS = ["history", "science", "language", "culture", "geography", "politics", "economy", "art"]
+
+
+def _prompt_article(prompt: str) -> str:
+    """The article text of a quiz prompt: everything after "CONTENT:", which comes last."""
+    match = re.search(r"CONTENT:\n(.*)", prompt, re.DOTALL)
+    text = match.group(1) if match else prompt
+    return " ".join(line for line in text.splitlines() if not line.startswith("## "))
+
+
+def _stub_terms(sentence: str) -> List[str]:
+    """Names and figures in a sentence (not its first word), the blanks of stub questions."""
+    words = STUB_WORD_PATTERN.findall(sentence)
+    return [word for word in words[1:] if len(word) > 2 and (word[0].isupper() or word[0].isdigit())]
+
+
+def stub_quiz(request: dict, question_count: Optional[int] = None) -> dict:
+    """
+    Deterministic quiz for a chat completion request, built from the
+    article text in its prompt: fill-in-the-blank questions whose answer is
+    a name or figure from a sentence, with other names as distractors.
+    The same prompt always gives the same quiz.
+
+    Args:
+        request (dict): Chat completion arguments
+        question_count (int, optional): Questions to generate (at least 5);
+            defaults to the count the prompt asks for, or 8
+
+    Returns:
+        dict: Data that validates as QuizOutput (title left empty)
+    """
+    prompt = request["messages"][-1]["content"]
+    if question_count is None:
+        count_match = STUB_COUNT_PATTERN.search(prompt)
+        question_count = min(int(count_match.group(1)), 10) if count_match else 8
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+    sentences = [sentence for sentence in split_sentences(_prompt_article(prompt)) if _stub_terms(sentence)]
+    vocabulary = list(dict.fromkeys(term for sentence in sentences for term in _stub_terms(sentence)))
+
+    questions = []
+    for index in range(max(question_count, 5)):
+        if index < len(sentences):
+            sentence = sentences[index]
+            answer = rng.choice(_stub_terms(sentence))
+            question = f"Which term completes the statement: \"{sentence.replace(answer, '_____', 1)}\""
+            explanation = f"The article states: \"{sentence}\""
+        else:
+            answer = f"{STUB_FALLBACK_TERMS[index % len(STUB_FALLBACK_TERMS)]} {index}"
+            question = f"Which topic is placeholder question {index} about?"
+            explanation = "The article text was too short for more questions."
+        pool = [term for term in vocabulary if term != answer] or []
+        distractors = rng.sample(pool, min(3, len(pool)))
+        while len(distractors) < 3:
+            distractors.append(f"{STUB_FALLBACK_TERMS[(index + len(distractors)) % len(STUB_FALLBACK_TERMS)]} {len(distractors)}")
+        options = [answer] + distractors
+        rng.shuffle(options)
+        questions.append({
+            "question": question,
+            "options": options,
+            "answer": answer,
+            "difficulty": STUB_DIFFICULTIES[index % len(STUB_DIFFICULTIES)],
+            "explanation": explanation,
+        })
+
+    first_sentences = " ".join(sentences[:2]) or "Stub summary."
+    return {
+        "title": "",
+        "summary": first_sentences,
+        "key_entities": {"people": vocabulary[:3], "organizations": vocabulary[3:5], "locations": vocabulary[5:7]},
+        "sections": [],
+        "quiz": questions,
+        "related_topics": vocabulary[7:10],
+    }
+
+
+class StubProvider(LLMProvider):
+    """
+    Local stand-in for an LLM: returns `stub_quiz` JSON after a random
+    delay and fails with the configured error rates. Latency and error
+    draws come from a generator seeded with LLM_STUB_SEED, so a load test
+    run is reproducible.
+    """
+
+    name = "stub"
+
+    def __init__(
+        self,
+        latency_ms: Optional[float] = None,
+        jitter_ms: Optional[float] = None,
+        error_rates: Optional[Dict[str, float]] = None,
+        seed: Optional[int] = None
+    ):
+        self.latency_ms = LLMProviderConfig.STUB_LATENCY_MS if latency_ms is None else latency_ms
+        self.jitter_ms = LLMProviderConfig.STUB_LATENCY_JITTER_MS if jitter_ms is None else jitter_ms
+        self.error_rates = parse_error_rates(LLMProviderConfig.STUB_ERROR_RATES) if error_rates is None else error_rates
+        self.rng = random.Random(LLMProviderConfig.STUB_SEED if seed is None else seed)
+
+    def _latency(self) -> float:
+        return max(self.rng.gauss(self.latency_ms, self.jitter_ms), 0.0) / 1000
+
+    def _draw_error(self) -> Optional[str]:
+        draw = self.rng.random()
+        for kind, probability in self.error_rates.items():
+            if draw < probability:
+                return kind
+            draw -= probability
+        return None
+
+    async def _respond(self, latency: float, timeout: float) -> None:
+        error = self._draw_error()
+        if error == "timeout" or latency > timeout:
+            await asyncio.sleep(timeout)
+            raise LLMProviderTimeout("Request timed out (stub)")
+        await asyncio.sleep(latency)
+        if error is not None:
+            status_code = int(error) if error.isdigit() else 500
+            raise LLMProviderError(
+                f"Error code: {status_code} (stub)",
+                status_code,
+                1.0 if status_code == 429 else None,
+            )
+
+    async def complete(self, request: dict, timeout: float) -> str:
+        await self._respond(self._latency(), timeout)
+        text = json.dumps(stub_quiz(request), indent=2)
+        # Like real models, a markdown fence unless JSON mode was requested
+        return text if request.get("response_format") else f"```json\n{text}\n```"
+
+    async def open_stream(self, request: dict, timeout: float) -> AsyncIterator[str]:
+        # Time to first token is a fifth of the latency; the rest is spread over the chunks
+        latency = self._latency()
+        await self._respond(latency / 5, timeout)
+        text = json.dumps(stub_quiz(request), indent=2)
+        chunks = [text[start:start + 64] for start in range(0, len(text), 64)]
+
+        async def deltas():
+            for chunk in chunks:
+                await asyncio.sleep(latency * 4 / 5 / len(chunks))
+                yield chunk
+        return deltas()
+
+
+def create_provider(http_client: httpx.AsyncClient, provider: Optional[str] = None) -> LLMProvider:
+    """
+    Build the configured provider.
+
+    Args:
+        http_client (httpx.AsyncClient): Pooled client for HTTP providers
+        provider (str, optional): Overrides LLM_PROVIDER
+
+    Returns:
+        LLMProvider: The provider
+
+    Raises:
+        ValueError: If the provider is unknown or its settings are missing
+    """
+    name = (provider or LLMProviderConfig.PROVIDER).lower()
+    if name == "groq":
+        return GroqProvider(http_client, get_api_key(), LLMProviderConfig.BASE_URL)
+    if name == "openai":
+        if not LLMProviderConfig.BASE_URL:
+            raise ValueError("LLM_BASE_URL must be set for LLM_PROVIDER=openai")
+        return OpenAICompatibleProvider(http_client, LLMProviderConfig.BASE_URL, os.getenv("LLM_API_KEY"))
+    if name == "stub":
+        return StubProvider()
+    raise ValueError(f"Unknown LLM_PROVIDER '{name}', expected one of {', '.join(PROVIDERS)}")
+
+
+def get_api_key() -> str:
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise ValueError("GROQ_API_KEY not found in environment variables. Please set it in your .env file")
+    return api_key
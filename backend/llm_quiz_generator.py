@@ -2,141 +2,407 @@
 Quiz generation using Groq AI.
 """
 
-import os
+import asyncio
 import json
 import logging
-import re
+import os
+import math
+from typing import AsyncIterator, Optional
 from dotenv import load_dotenv
-from groq import Groq
-from models import QuizOutput, KeyEntities
+from llm_client import LLMUnavailableError, close_llm_client, get_llm_client
+from models import QuizOptions, QuizOutput, KeyEntities
+from quiz_repair import (
+    MIN_QUESTIONS,
+    MAX_QUESTIONS,
+    parse_json_lenient,
+    question_key,
+    repair_metrics,
+    repair_question,
+    repair_quiz_data,
+)
+from quiz_stream_parser import QuizStreamParser
+from llm_response_cache import cached_complete, cached_stream, discard_cached_response
+from prompt_templates import QUIZ_TOPUP, PromptTemplate, quiz_template as compiled_quiz_template
+from quiz_options import OPTIONAL_PARTS, apply_quiz_options, describe_difficulty, omitted_parts
+from structured_output import parse_structured, quiz_output_model, quiz_output_schema, response_format
 
 load_dotenv()
 logger = logging.getLogger(__name__)
 
 class QuizGenerationConfig:
-    MODEL_NAME = "llama-3.3-70b-versatile"
+    # Model name as the LLM provider knows it
+    MODEL_NAME = os.getenv("LLM_MODEL", "llama-3.3-70b-versatile")
     TEMPERATURE = 0.7
+    # Completion budget: tokens per question and per optional part, plus the
+    # title, sections and JSON syntax, with headroom, capped at MAX_TOKENS
+    TOKENS_PER_QUESTION = 160
+    PART_TOKENS = {"summary": 120, "key_entities": 120, "sections": 40, "related_topics": 60}
+    BASE_TOKENS = 100
+    TOKEN_HEADROOM = 1.25
+    MAX_TOKENS = 3072
+    # "json_object" (provider JSON mode), "json_schema" (decoding constrained to
+    # the QuizOutput schema; only some models support it) or "prompt" (format
+    # described in the prompt, as before)
+    OUTPUT_MODE = os.getenv("QUIZ_OUTPUT_MODE", "json_object").lower()
+    # Extra questions asked for when topping up a quiz, in case some are unusable
+    TOPUP_SPARE_QUESTIONS = 2
+    TOPUP_MAX_TOKENS = 1024
+
+
+class QuizGenerationError(ValueError):
+    """The LLM call failed or returned unusable output. Retrying may succeed."""
+
+
+class ProviderUnavailableError(QuizGenerationError):
+    """The LLM provider is failing and calls are rejected until `retry_after` seconds pass."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def generate_quiz(article_content: str, article_title: str, options: Optional[QuizOptions] = None) -> dict:
+    """Generate quiz from article content using AI (blocking wrapper around `generate_quiz_async`)."""
+
+    async def generate_and_close() -> dict:
+        # The loop ends with this call, so its LLM client is not reused
+        try:
+            return await generate_quiz_async(article_content, article_title, options)
+        finally:
+            await close_llm_client()
+
+    return asyncio.run(generate_and_close())
 
-def generate_quiz(article_content: str, article_title: str) -> dict:
-    """Generate quiz from article content using AI."""
-    try:
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            raise ValueError("GROQ_API_KEY not found in environment variables. Please set it in your .env file")
 
-        client = Groq(api_key=api_key)
+async def generate_quiz_async(article_content: str, article_title: str, options: Optional[QuizOptions] = None) -> dict:
+    """
+    Generate a quiz through the shared LLM client, so a slow completion does
+    not block the event loop.
+
+    Args:
+        article_content (str): Article text for the prompt
+        article_title (str): Article title
+        options (QuizOptions, optional): Question count, difficulty mix and
+            optional parts; defaults to QuizOptions()
+    """
+    try:
         logger.info(f"Generating quiz for: {article_title}")
+        request = build_completion_request(article_content, options=options)
+        template = quiz_template(options=options)
+        response_text = await cached_complete(get_llm_client(), template, request)
+        try:
+            return await finalize_quiz_response(response_text, article_content, article_title, options)
+        except ValueError:
+            discard_cached_response(template, request)
+            raise
+
+    except LLMUnavailableError as e:
+        raise ProviderUnavailableError(f"Failed to generate quiz: {str(e)}", e.retry_after)
+    except Exception as e:
+        logger.error(f"Quiz generation failed: {str(e)}")
+        raise QuizGenerationError(f"Failed to generate quiz: {str(e)}")
 
-        prompt_template = (
-            "You are an expert educator specializing in creating educational quizzes from Wikipedia articles.\n\n"
-            "Given the following Wikipedia article content, generate a comprehensive, educational quiz with high-quality questions.\n\n"
-            "ARTICLE CONTENT:\n{article_content}\n\n"
-            "REQUIREMENTS:\n"
-            "1. Generate exactly 7-8 thoughtful, factual questions based on the article.\n"
-            "2. Each question must:\n"
-            "   - Be directly answerable from the provided content\n"
-            "   - Have 4 distinct, plausible options\n"
-            "   - Have one clear correct answer\n"
-            "   - Include a brief explanation (2-3 sentences) grounding the answer in the article\n"
-            "   - Be assigned a difficulty level (easy, medium, or hard)\n"
-            "3. Extract key entities: people, organizations, and locations mentioned in the article.\n"
-            "4. Provide a 2-3 sentence summary of the article.\n"
-            "5. List 3-5 main sections/topics covered in the article.\n"
-            "6. Suggest 3-5 related Wikipedia topics for further reading.\n\n"
-            "IMPORTANT CONSTRAINTS:\n"
-            "- Do NOT hallucinate information not present in the article\n"
-            "- Questions should test comprehension, not just recall\n"
-            "- Vary difficulty levels across questions\n"
-            "- Ensure all options are grammatically consistent with the question\n\n"
-            "CRITICAL ANSWER FORMAT RULES:\n"
-            "- The 'answer' field MUST contain the EXACT text from one of the options\n"
-            "- Do NOT add prefixes like 'A)', 'Option A:', or any other formatting\n"
-            "- Copy the option text EXACTLY as it appears in the options array\n"
-            "- Example: If options are [\"Paris\", \"London\", \"Berlin\", \"Rome\"], answer should be \"Paris\" NOT \"A) Paris\"\n\n"
-            "Return the response as a valid JSON object matching this exact structure:\n"
-            "{\n"
-            "  \"title\": \"string - article title\",\n"
-            "  \"summary\": \"string - 2-3 sentence summary\",\n"
-            "  \"key_entities\": {\n"
-            "    \"people\": [\"list of people mentioned\"],\n"
-            "    \"organizations\": [\"list of organizations\"],\n"
-            "    \"locations\": [\"list of locations\"]\n"
-            "  },\n"
-            "  \"sections\": [\"list of main sections/topics\"],\n"
-            "  \"quiz\": [\n"
-            "    {\n"
-            "      \"question\": \"What is the capital of France?\",\n"
-            "      \"options\": [\"Paris\", \"London\", \"Berlin\", \"Rome\"],\n"
-            "      \"answer\": \"Paris\",\n"
-            "      \"difficulty\": \"easy\",\n"
-            "      \"explanation\": \"Paris is the capital and largest city of France.\"\n"
-            "    }\n"
-            "  ],\n"
-            "  \"related_topics\": [\"topic 1\", \"topic 2\", \"topic 3\"]\n"
-            "}\n\n"
-            "CRITICAL: Return ONLY valid JSON, no markdown formatting, no extra text. The 'answer' field must match EXACTLY one option."
-        )
-        prompt = prompt_template.replace("{article_content}", article_content)
-
-        response = client.chat.completions.create(
-            model=QuizGenerationConfig.MODEL_NAME,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that generates educational quizzes."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=QuizGenerationConfig.TEMPERATURE,
-            max_tokens=2048
-        )
-        response_text = response.choices[0].message.content
-        logger.info(f"LLM response length: {len(response_text)} characters")
-        logger.info(f"Full raw LLM response:\n{response_text}")
-
-        cleaned_response = response_text.strip()
-        if cleaned_response.startswith('```json'):
-            cleaned_response = cleaned_response[7:]  # Remove ```json
-        if cleaned_response.startswith('```'):
-            cleaned_response = cleaned_response[3:]  # Remove ```
-        if cleaned_response.endswith('```'):
-            cleaned_response = cleaned_response[:-3]  # Remove trailing ```
-        cleaned_response = cleaned_response.strip()
+
+async def stream_quiz_async(
+    article_content: str,
+    article_title: str,
+    options: Optional[QuizOptions] = None
+) -> AsyncIterator[dict]:
+    """
+    Streaming variant of `generate_quiz_async`: requests the completion with
+    stream=True and yields each question as soon as it has been generated.
+
+    The last event holds the whole quiz, parsed from the full response text
+    exactly as the non-streaming path does.
+
+    Yields:
+        dict: {"type": "question", "index", "question"} for each validated question,
+              then {"type": "quiz", "quiz_data"}
+
+    Raises:
+        QuizGenerationError: If the LLM call fails or the full response is invalid
+    """
+    parser = QuizStreamParser()
+    index = 0
+    try:
+        logger.info(f"Streaming quiz for: {article_title}")
+        request = build_completion_request(article_content, stream=True, options=options)
+        template = quiz_template(stream=True, options=options)
+        async for delta in cached_stream(get_llm_client(), template, request):
+            for question in parser.feed(delta):
+                yield {"type": "question", "index": index, "question": question}
+                index += 1
 
         try:
-            quiz_data = json.loads(cleaned_response)
-        except json.JSONDecodeError:
-            # Try to extract JSON substring between first { and last }
-            start = cleaned_response.find('{')
-            end = cleaned_response.rfind('}')
-            if start != -1 and end != -1 and end > start:
-                json_str = cleaned_response[start:end+1]
-                try:
-                    quiz_data = json.loads(json_str)
-                except Exception as e2:
-                    logger.error(f"Failed to parse extracted JSON: {e2}")
-                    logger.error(f"Full raw response:\n{response_text}")
-                    raise ValueError("No valid JSON found in LLM response")
-            else:
-                logger.error(f"Could not find JSON in response. Full raw response:\n{response_text}")
+            quiz_data = await finalize_quiz_response(parser.text, article_content, article_title, options)
+        except ValueError:
+            discard_cached_response(template, request)
+            raise
+
+    except LLMUnavailableError as e:
+        raise ProviderUnavailableError(f"Failed to generate quiz: {str(e)}", e.retry_after)
+    except Exception as e:
+        logger.error(f"Quiz generation failed: {str(e)}")
+        raise QuizGenerationError(f"Failed to generate quiz: {str(e)}")
+
+    yield {"type": "quiz", "quiz_data": quiz_data}
+
+
+def quiz_template(stream: bool = False, options: Optional[QuizOptions] = None) -> PromptTemplate:
+    """Prompt template for the configured output mode and the parts the options include."""
+    return compiled_quiz_template(QuizGenerationConfig.OUTPUT_MODE, omitted_parts(options), stream)
+
+
+def completion_max_tokens(options: Optional[QuizOptions] = None) -> int:
+    """
+    max_tokens for a quiz: proportional to the question count and the
+    optional parts included, so small quizzes reserve (and, with the rate
+    limiter, wait for) fewer tokens.
+    """
+    options = options or QuizOptions()
+    omitted = omitted_parts(options)
+    estimate = (
+        QuizGenerationConfig.BASE_TOKENS
+        + options.question_count * QuizGenerationConfig.TOKENS_PER_QUESTION
+        + sum(QuizGenerationConfig.PART_TOKENS[part] for part in OPTIONAL_PARTS if part not in omitted)
+    )
+    return min(math.ceil(estimate * QuizGenerationConfig.TOKEN_HEADROOM), QuizGenerationConfig.MAX_TOKENS)
+
+
+def build_completion_request(article_content: str, stream: bool = False, options: Optional[QuizOptions] = None) -> dict:
+    """
+    Build the chat completion arguments for an article.
+
+    Args:
+        article_content (str): Article text for the prompt
+        stream (bool): For a streamed completion (no response_format)
+        options (QuizOptions, optional): Defaults to QuizOptions()
+
+    Returns:
+        dict: Chat completion arguments
+    """
+    options = options or QuizOptions()
+    messages = quiz_template(stream, options).messages(
+        question_count=options.question_count,
+        difficulty=describe_difficulty(options),
+        article_content=article_content,
+    )
+    request = {
+        "model": QuizGenerationConfig.MODEL_NAME,
+        "messages": messages,
+        "temperature": QuizGenerationConfig.TEMPERATURE,
+        "max_tokens": completion_max_tokens(options)
+    }
+    mode = QuizGenerationConfig.OUTPUT_MODE
+    if mode != "prompt" and not stream:
+        schema = quiz_output_schema(omitted_parts(options), options.question_count) if mode == "json_schema" else None
+        request["response_format"] = response_format(mode, schema)
+    return request
+
+
+def extract_json_object(response_text: str) -> dict:
+    """
+    Pull the JSON object out of an LLM response, with or without a
+    markdown code fence or surrounding text.
+
+    Raises:
+        ValueError: If no JSON object is found
+    """
+    cleaned_response = response_text.strip()
+    if cleaned_response.startswith('```json'):
+        cleaned_response = cleaned_response[7:]  # Remove ```json
+    if cleaned_response.startswith('```'):
+        cleaned_response = cleaned_response[3:]  # Remove ```
+    if cleaned_response.endswith('```'):
+        cleaned_response = cleaned_response[:-3]  # Remove trailing ```
+    cleaned_response = cleaned_response.strip()
+
+    try:
+        data = json.loads(cleaned_response)
+    except json.JSONDecodeError:
+        # Try to extract JSON substring between first { and last }
+        start = cleaned_response.find('{')
+        end = cleaned_response.rfind('}')
+        if start != -1 and end != -1 and end > start:
+            json_str = cleaned_response[start:end+1]
+            try:
+                data = json.loads(json_str)
+            except Exception as e2:
+                logger.error(f"Failed to parse extracted JSON: {e2}")
+                logger.error(f"Full raw response:\n{response_text}")
                 raise ValueError("No valid JSON found in LLM response")
+        else:
+            logger.error(f"Could not find JSON in response. Full raw response:\n{response_text}")
+            raise ValueError("No valid JSON found in LLM response")
+
+    if not isinstance(data, dict):
+        raise ValueError("No valid JSON found in LLM response")
+    return data
+
+
+def parse_quiz_response(response_text: str, article_title: str, model: type = QuizOutput) -> dict:
+    """
+    Parse and validate the raw LLM response into quiz data.
+
+    Args:
+        response_text (str): Raw completion text
+        article_title (str): Used when the title is missing
+        model (type): QuizOutput, or the variant from `quiz_output_model` for the request
+
+    Raises:
+        ValueError: If no valid JSON is found or it fails QuizOutput validation
+    """
+    logger.info(f"LLM response length: {len(response_text)} characters")
+    logger.info(f"Full raw LLM response:\n{response_text}")
+
+    quiz_data = extract_json_object(response_text)
+
+    if not quiz_data.get("title"):
+        quiz_data["title"] = article_title
+
+    try:
+        validated = model(**quiz_data)
+    except Exception as e:
+        logger.error(f"Pydantic validation error: {e}")
+        logger.error(f"Parsed quiz data:\n{json.dumps(quiz_data, indent=2)}")
+        raise ValueError(f"Quiz validation failed: {str(e)}")
+    
+    logger.info(f"Successfully generated quiz with {len(validated.quiz)} questions")
+    if hasattr(validated, 'model_dump'):
+        return validated.model_dump()
+    else:
+        return validated.dict()
 
-        if not quiz_data.get("title"):
-            quiz_data["title"] = article_title
 
+async def finalize_quiz_response(
+    response_text: str,
+    article_content: str,
+    article_title: str,
+    options: Optional[QuizOptions] = None
+) -> dict:
+    """
+    Turn a completion into validated quiz data, repairing it if needed.
+
+    Valid output is used as is. Otherwise the JSON is repaired, answers
+    are matched to their options and unusable questions dropped. Either
+    way, if the quiz has fewer than the requested number of questions,
+    only the missing ones are requested from the LLM.
+
+    Args:
+        response_text (str): Raw completion text
+        article_content (str): Article text the quiz was generated from
+        article_title (str): Article title
+        options (QuizOptions, optional): Extra questions and parts the
+            options leave out are dropped
+
+    Returns:
+        dict: Quiz data validated against QuizOutput
+
+    Raises:
+        ValueError: If the output cannot be repaired or topped up to the
+            requested number of questions
+    """
+    repair_metrics["responses"] += 1
+    # The summary is required unless the options leave it out
+    model = quiz_output_model(omitted_parts(options or QuizOptions()))
+    quiz_data = None
+    if QuizGenerationConfig.OUTPUT_MODE != "prompt":
         try:
-            validated = QuizOutput(**quiz_data)
-        except Exception as e:
-            logger.error(f"Pydantic validation error: {e}")
-            logger.error(f"Parsed quiz data:\n{json.dumps(quiz_data, indent=2)}")
-            raise ValueError(f"Quiz validation failed: {str(e)}")
-        
-        logger.info(f"Successfully generated quiz with {len(validated.quiz)} questions")
-        if hasattr(validated, 'model_dump'):
-            return validated.model_dump()
-        else:
-            return validated.dict()
+            quiz_data = parse_structured(response_text, model, title=article_title).model_dump()
+            repair_metrics["clean"] += 1
+        except ValueError:
+            pass  # Streamed without JSON mode, or the provider ignored it
+    if quiz_data is None:
+        try:
+            quiz_data = parse_quiz_response(response_text, article_title, model)
+            repair_metrics["clean"] += 1
+        except ValueError as e:
+            logger.warning(f"Repairing LLM output for {article_title}: {str(e)}")
+
+    report = None
+    target = (options or QuizOptions()).question_count
+    try:
+        if quiz_data is None:
+            data, json_repaired = parse_json_lenient(response_text)
+            quiz_data, report = repair_quiz_data(data, article_title)
+            repair_metrics["repaired"] += 1
+            repair_metrics["json_repaired"] += json_repaired
+            repair_metrics["answers_fixed"] += report.answers_fixed
+            repair_metrics["questions_dropped"] += report.questions_dropped
 
+        missing = target - len(quiz_data["quiz"])
+        if missing > 0:
+            added = await top_up_questions(article_content, quiz_data["quiz"], missing, target)
+            quiz_data = {**quiz_data, "quiz": quiz_data["quiz"] + added}
+        if len(quiz_data["quiz"]) < target:
+            raise ValueError(f"Only {len(quiz_data['quiz'])} of {target} requested questions are usable")
+        validated = model(**quiz_data)
+    except LLMUnavailableError:
+        raise
     except Exception as e:
-        logger.error(f"Quiz generation failed: {str(e)}")
-        raise ValueError(f"Failed to generate quiz: {str(e)}")
+        repair_metrics["failed"] += 1
+        raise ValueError(f"Quiz validation failed: {str(e)}")
+
+    if report is not None:
+        logger.info(
+            f"Repaired quiz for {article_title}: {report.answers_fixed} answers matched, "
+            f"{report.questions_dropped} questions dropped, {len(validated.quiz)} questions"
+        )
+    return apply_quiz_options(validated.model_dump(), options)
+
+
+async def top_up_questions(article_content: str, existing: list, missing: int, target: int = MIN_QUESTIONS) -> list:
+    """
+    Request `missing` more questions (plus spares) and return the usable,
+    new ones, up to `target` plus spares.
+
+    Raises:
+        LLMUnavailableError: If the circuit breaker is open
+        ValueError: If the response is not JSON
+    """
+    repair_metrics["topups"] += 1
+    count = missing + QuizGenerationConfig.TOPUP_SPARE_QUESTIONS
+    request = build_topup_request(article_content, existing, count)
+    response_text = await cached_complete(get_llm_client(), QUIZ_TOPUP, request)
+    try:
+        data, _ = parse_json_lenient(response_text)
+    except ValueError:
+        discard_cached_response(QUIZ_TOPUP, request)
+        raise
+
+    seen = {question_key(question) for question in existing}
+    added = []
+    for raw in data.get("quiz") if isinstance(data.get("quiz"), list) else []:
+        question, _ = repair_question(raw)
+        if question is None or question_key(question) in seen:
+            continue
+        seen.add(question_key(question))
+        added.append(question)
+        if len(existing) + len(added) >= min(target + QuizGenerationConfig.TOPUP_SPARE_QUESTIONS, MAX_QUESTIONS):
+            break
+    repair_metrics["topup_questions"] += len(added)
+    if len(added) < missing:
+        # Not enough to complete the quiz; do not replay it on a retry
+        discard_cached_response(QUIZ_TOPUP, request)
+    return added
+
+
+def build_topup_request(article_content: str, existing: list, count: int) -> dict:
+    """Chat completion arguments asking for `count` questions other than `existing`."""
+    existing_questions = "\n".join(f"- {question['question']}" for question in existing) or "- (none)"
+    request = {
+        "model": QuizGenerationConfig.MODEL_NAME,
+        "messages": QUIZ_TOPUP.messages(
+            existing_questions=existing_questions,
+            count=count,
+            article_content=article_content,
+        ),
+        "temperature": QuizGenerationConfig.TEMPERATURE,
+        "max_tokens": QuizGenerationConfig.TOPUP_MAX_TOKENS
+    }
+    if QuizGenerationConfig.OUTPUT_MODE != "prompt":
+        request["response_format"] = response_format("json_object")
+    return request
 
 
 def extract_key_entities_from_content(content: str) -> KeyEntities:
@@ -0,0 +1,196 @@
+"""
+Local cache of LLM completions.
+Stores the text of each completion on disk, keyed by prompt template
+version, a hash of the request content, model and temperature, and
+replays it when the same request is made again. Off unless
+LLM_RESPONSE_CACHE_DIR is set; meant for deterministic re-runs of
+benchmarks and evaluations and for replaying recorded responses in tests.
+Callers discard a completion that fails validation, so a retry asks the
+LLM again instead of replaying the bad output.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+from prompt_templates import PromptTemplate
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCacheConfig:
+    # Directory of recorded completions; empty disables the cache
+    DIR = os.getenv("LLM_RESPONSE_CACHE_DIR", "")
+
+
+# Counters for the /metrics endpoint
+response_cache_metrics = {
+    "hits": 0,
+    "misses": 0,
+    "writes": 0,
+    "discarded": 0,
+}
+
+
+def content_hash(request: dict) -> str:
+    """Hash of what the request asks for besides template, model and temperature."""
+    content = {
+        "messages": request["messages"],
+        "max_tokens": request.get("max_tokens"),
+        "response_format": request.get("response_format"),
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def response_cache_key(template: PromptTemplate, request: dict) -> str:
+    """
+    Cache key of a completion request.
+
+    Args:
+        template (PromptTemplate): Template the request's messages come from
+        request (dict): Chat completion arguments
+
+    Returns:
+        str: Hex SHA-256 of (template version, content hash, model, temperature)
+    """
+    parts = [template.key, content_hash(request), request["model"], str(request.get("temperature"))]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Completions as JSON files under `root`, sharded by the first two key characters."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            return json.loads(self._path(key).read_text(encoding="utf-8"))["response"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def discard(self, key: str) -> bool:
+        """Remove an entry; returns whether there was one."""
+        try:
+            self._path(key).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    def put(self, key: str, response_text: str, template: PromptTemplate, request: dict) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        record = {
+            "template": template.key,
+            "model": request["model"],
+            "temperature": request.get("temperature"),
+            "response": response_text,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+                json.dump(record, tmp_file, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+_response_cache: Optional[ResponseCache] = None
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """The configured response cache, or None when it is disabled."""
+    global _response_cache
+    if not ResponseCacheConfig.DIR:
+        return None
+    if _response_cache is None or _response_cache.root != Path(ResponseCacheConfig.DIR):
+        _response_cache = ResponseCache(ResponseCacheConfig.DIR)
+    return _response_cache
+
+
+def _store(cache: ResponseCache, key: str, response_text: str, template: PromptTemplate, request: dict) -> None:
+    try:
+        cache.put(key, response_text, template, request)
+        response_cache_metrics["writes"] += 1
+    except OSError as e:
+        logger.warning(f"Could not write LLM response cache entry {key}: {str(e)}")
+
+
+def discard_cached_response(template: PromptTemplate, request: dict) -> None:
+    """
+    Forget the recorded completion of a request whose output turned out to
+    be unusable, so the next identical request (e.g. a job retry) calls the
+    LLM instead of replaying it.
+
+    Args:
+        template (PromptTemplate): Template the request's messages come from
+        request (dict): Chat completion arguments
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return
+    key = response_cache_key(template, request)
+    try:
+        if cache.discard(key):
+            response_cache_metrics["discarded"] += 1
+    except OSError as e:
+        logger.warning(f"Could not discard LLM response cache entry {key}: {str(e)}")
+
+
+async def cached_complete(client, template: PromptTemplate, request: dict, **kwargs) -> str:
+    """
+    `client.complete(request)`, answered from the response cache when it is enabled.
+
+    Args:
+        client: LLM client
+        template (PromptTemplate): Template the request's messages come from
+        request (dict): Chat completion arguments
+        **kwargs: Passed on to `client.complete`
+
+    Returns:
+        str: Completion text
+    """
+    cache = get_response_cache()
+    if cache is None:
+        return await client.complete(request, **kwargs)
+    key = response_cache_key(template, request)
+    cached = cache.get(key)
+    if cached is not None:
+        response_cache_metrics["hits"] += 1
+        return cached
+    response_cache_metrics["misses"] += 1
+    response_text = await client.complete(request, **kwargs)
+    _store(cache, key, response_text, template, request)
+    return response_text
+
+
+async def cached_stream(client, template: PromptTemplate, request: dict, **kwargs) -> AsyncIterator[str]:
+    """
+    `client.stream(request)`; a cached completion is replayed as a single
+    delta, and a stream that completes is recorded.
+    """
+    cache = get_response_cache()
+    if cache is None:
+        async for delta in client.stream(request, **kwargs):
+            yield delta
+        return
+    key = response_cache_key(template, request)
+    cached = cache.get(key)
+    if cached is not None:
+        response_cache_metrics["hits"] += 1
+        yield cached
+        return
+    response_cache_metrics["misses"] += 1
+    deltas = []
+    async for delta in client.stream(request, **kwargs):
+        deltas.append(delta)
+        yield delta
+    _store(cache, key, "".join(deltas), template, request)
@@ -4,23 +4,57 @@ FastAPI backend for AI Wiki Quiz Generator.
 
 import json
 import logging
-from typing import List
+import math
+from typing import List, Optional
 from datetime import datetime
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
 
-from database import init_db, get_db, Quiz
+from database import init_db, get_db, engine, Quiz, SessionLocal
+from db_engine import engine_metrics
 from models import (
     GenerateQuizRequest,
+    BatchGenerateQuizRequest,
+    GenerateQuizJobRequest,
+    JobStatusResponse,
     QuizHistoryItem,
     QuizDetailResponse,
     ErrorResponse,
+    QuizOptions,
 )
-from scraper import scrape_wikipedia
-from llm_quiz_generator import generate_quiz
+from quiz_pipeline import (
+    BatchConfig,
+    generate_quiz_for_url,
+    generate_quiz_batch,
+    stream_quiz_for_url,
+    generation_flights,
+    streaming_metrics,
+)
+from quiz_map_reduce import map_reduce_metrics
+from llm_response_cache import response_cache_metrics
+from article_cache import article_cache_metrics, get_article_cache
+from quiz_repair import repair_rates
+from history_query import query_history
+from quiz_records import is_pipeline_quiz, load_quiz_data, quiz_data_options, quiz_detail_payload
+from http_caching import (
+    HttpCacheConfig,
+    cached_json_response,
+    immutable_cache_control,
+    not_modified,
+    not_modified_response,
+    quiz_etag,
+    short_cache_control,
+)
+from compression import CompressionMiddleware
+from quiz_stats import get_stats as get_quiz_stats, seed_quiz_stats
+from job_queue import JobQueueConfig, enqueue_job, get_job_response, job_metrics, job_workers
+from http_client import close_http_clients, http_metrics
+from llm_client import close_llm_client, llm_client_metrics
+from llm_quiz_generator import ProviderUnavailableError
+from single_flight import db_lock_metrics
 
 logging.basicConfig(
     level=logging.INFO,
@@ -40,18 +74,35 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Quiz-Cache", "ETag"],
 )
 
+# Compress JSON responses; streaming endpoints are passed through as is
+app.add_middleware(CompressionMiddleware)
+
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup"""
+    """Initialize database and quiz stats counters on startup"""
     try:
         init_db()
+        with SessionLocal() as db:
+            seed_quiz_stats(db)
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize database: {str(e)}")
         raise
+    
+    if JobQueueConfig.WORKERS > 0:
+        job_workers.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background job workers and close pooled outbound HTTP connections"""
+    await job_workers.stop()
+    await close_http_clients()
+    await close_llm_client()
 
 
 @app.get("/", tags=["Health"])
@@ -80,7 +131,7 @@ async def health_check():
 @app.post("/generate_quiz", tags=["Quiz Generation"])
 async def generate_quiz_endpoint(
     request: GenerateQuizRequest,
-    db: Session = Depends(get_db)
+    http_response: Response
 ):
     """
     Generate a quiz from a Wikipedia article URL.
@@ -92,8 +143,22 @@ async def generate_quiz_endpoint(
     4. Store results in database
     5. Return generated quiz
     
+    Repeat requests are served from the quiz cache: within the cache TTL the
+    stored quiz is returned without scraping; after it, the article is
+    scraped again and the LLM is only called if the article text changed.
+    Concurrent requests for the same article share one generation.
+    The `X-Quiz-Cache` response header reports `hit`, `miss` or `coalesced`.
+    
     **Args:**
     - url: Wikipedia article URL (e.g., https://en.wikipedia.org/wiki/Alan_Turing)
+    - force_refresh: Skip the cache and always regenerate (default: false)
+    - question_count: Number of questions, 5-10 (default: 8)
+    - difficulty_mix: Share of each difficulty, e.g. `{"easy": 2, "hard": 1}`
+      (default: the LLM's own mix)
+    - include_summary / include_key_entities / include_sections / include_related_topics:
+      Generate these parts (default: true); skipped parts come back empty
+    
+    Each combination of options is generated and cached separately.
     
     **Returns:**
     - JSON object with quiz data including questions, entities, and related topics
@@ -101,44 +166,25 @@ async def generate_quiz_endpoint(
     **Error Handling:**
     - 400: Invalid URL or content extraction failed
     - 500: LLM processing error or database error
+    - 503: LLM provider is failing; retry after the Retry-After header
     """
     
     try:
         logger.info(f"Received quiz generation request for: {request.url}")
-        
-        # Step 1: Scrape Wikipedia
-        logger.info("Step 1: Scraping Wikipedia...")
-        cleaned_content, article_title, raw_html = scrape_wikipedia(request.url)
-        logger.info(f"Successfully scraped: {article_title}")
-        
-        # Step 2: Generate quiz using LLM
-        logger.info("Step 2: Generating quiz with LLM...")
-        quiz_data = generate_quiz(cleaned_content, article_title)
-        logger.info("Successfully generated quiz")
-        
-        # Step 3: Save to database
-        logger.info("Step 3: Saving to database...")
-        quiz_record = Quiz(
-            url=request.url,
-            title=quiz_data.get("title", article_title),
-            date_generated=datetime.utcnow(),
-            scraped_content=raw_html,  # Bonus: store raw HTML
-            full_quiz_data=json.dumps(quiz_data)  # Serialize quiz data
+        quiz_response, cache_status = await generate_quiz_for_url(
+            request.url, request.force_refresh, options=request.quiz_options()
         )
-        db.add(quiz_record)
-        db.commit()
-        db.refresh(quiz_record)
-        logger.info(f"Quiz saved with ID: {quiz_record.id}")
-        
-        # Return the generated quiz with metadata
-        response = {
-            "id": quiz_record.id,
-            "url": request.url,
-            **quiz_data
-        }
         
-        return response
+        http_response.headers["X-Quiz-Cache"] = cache_status
+        return quiz_response
         
+    except ProviderUnavailableError as e:
+        logger.warning(f"LLM provider unavailable: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))}
+        )
     except ValueError as e:
         logger.warning(f"Validation error: {str(e)}")
         raise HTTPException(
@@ -153,49 +199,270 @@ async def generate_quiz_endpoint(
         )
 
 
+@app.post("/generate_quiz/batch", tags=["Quiz Generation"])
+async def generate_quiz_batch_endpoint(request: BatchGenerateQuizRequest):
+    """
+    Generate quizzes for many Wikipedia articles in one request.
+    
+    Duplicate articles are generated once. Scraping and LLM calls run with
+    separate concurrency limits, and results stream back as NDJSON
+    (`application/x-ndjson`), one line per article as soon as it finishes.
+    A failing article produces an error line and does not fail the batch.
+    The last line is a summary.
+    
+    **Args:**
+    - urls: Wikipedia article URLs
+    - force_refresh: Skip the cache and always regenerate (default: false)
+    - scrape_concurrency / llm_concurrency: Override the default stage limits
+    - question_count, difficulty_mix, include_*: Quiz options for every
+      article, as for `/generate_quiz`
+    
+    **Returns (one JSON object per line):**
+    - `{"index", "url", "status": "ok", "cache", "quiz"}` for each generated quiz
+    - `{"index", "url", "status": "error", "status_code", "error"}` for each failure
+    - `{"summary": {"requested", "unique", "succeeded", "failed"}}` at the end
+    
+    **Error Handling:**
+    - 400: More URLs than BATCH_MAX_URLS
+    """
+    
+    if len(request.urls) > BatchConfig.MAX_URLS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch may contain at most {BatchConfig.MAX_URLS} URLs"
+        )
+    
+    logger.info(f"Received batch quiz generation request for {len(request.urls)} URLs")
+    
+    async def stream_results():
+        counts = {"succeeded": 0, "failed": 0}
+        async for result in generate_quiz_batch(
+            request.urls,
+            request.force_refresh,
+            request.scrape_concurrency,
+            request.llm_concurrency,
+            request.quiz_options()
+        ):
+            counts["succeeded" if result["status"] == "ok" else "failed"] += 1
+            yield json.dumps(result, default=str) + "\n"
+        
+        summary = {
+            "requested": len(request.urls),
+            "unique": counts["succeeded"] + counts["failed"],
+            **counts
+        }
+        logger.info(f"Batch finished: {summary}")
+        yield json.dumps({"summary": summary}) + "\n"
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+@app.get("/generate_quiz/stream", tags=["Quiz Generation"])
+async def stream_quiz_endpoint(
+    url: str,
+    force_refresh: bool = False,
+    question_count: int = 8,
+    difficulty_mix: Optional[str] = None,
+    include_summary: bool = True,
+    include_key_entities: bool = True,
+    include_sections: bool = True,
+    include_related_topics: bool = True
+):
+    """
+    Generate a quiz, streaming each question as soon as the LLM has written it.
+    
+    Responds with Server-Sent Events (`text/event-stream`), usable from a
+    browser `EventSource`:
+    - `question`: `{"index", "question"}` for each validated question
+    - `quiz`: `{"cache", "quiz"}` with the full stored quiz (same body as
+      `/generate_quiz`), sent last
+    - `error`: `{"status_code", "detail"}` if generation fails
+    
+    Cached quizzes are replayed as the same events without calling the LLM.
+    
+    **Args:**
+    - url: Wikipedia article URL
+    - force_refresh: Skip the cache and always regenerate (default: false)
+    - question_count, include_*: Quiz options, as for `/generate_quiz`
+    - difficulty_mix: Share of each difficulty as `difficulty:share` pairs,
+      e.g. `easy:2,hard:1`
+    
+    **Error Handling:**
+    - 422: Invalid quiz options
+    """
+    
+    try:
+        mix = None
+        if difficulty_mix:
+            mix = {}
+            for pair in difficulty_mix.split(","):
+                difficulty, _, share = pair.partition(":")
+                mix[difficulty.strip()] = share.strip()
+        options = QuizOptions(
+            question_count=question_count,
+            difficulty_mix=mix,
+            include_summary=include_summary,
+            include_key_entities=include_key_entities,
+            include_sections=include_sections,
+            include_related_topics=include_related_topics
+        )
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=e.errors(include_url=False, include_context=False)
+        )
+    
+    logger.info(f"Received streaming quiz generation request for: {url}")
+    
+    async def event_stream():
+        try:
+            async for event in stream_quiz_for_url(url, force_refresh, options):
+                event_type = event.pop("type")
+                yield f"event: {event_type}\ndata: {json.dumps(event, default=str)}\n\n"
+        except ProviderUnavailableError as e:
+            logger.warning(f"LLM provider unavailable: {str(e)}")
+            error = {"status_code": status.HTTP_503_SERVICE_UNAVAILABLE, "detail": str(e)}
+            yield f"event: error\ndata: {json.dumps(error)}\n\n"
+        except ValueError as e:
+            logger.warning(f"Validation error: {str(e)}")
+            error = {"status_code": status.HTTP_400_BAD_REQUEST, "detail": str(e)}
+            yield f"event: error\ndata: {json.dumps(error)}\n\n"
+        except Exception as e:
+            logger.error(f"Error streaming quiz: {str(e)}", exc_info=True)
+            error = {
+                "status_code": status.HTTP_500_INTERNAL_SERVER_ERROR,
+                "detail": f"Failed to generate quiz: {str(e)}"
+            }
+            yield f"event: error\ndata: {json.dumps(error)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        # Disable proxy buffering so events reach the client as they are sent
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post(
+    "/jobs",
+    response_model=JobStatusResponse,
+    status_code=status.HTTP_202_ACCEPTED,
+    tags=["Quiz Generation"]
+)
+def submit_quiz_job(request: GenerateQuizJobRequest, db: Session = Depends(get_db)):
+    """
+    Queue a quiz generation and return immediately.
+    
+    The scrape, LLM call and save run on a background worker; poll
+    `GET /jobs/{id}` until `status` is `succeeded` or `failed`. Failed LLM
+    calls are retried with exponential backoff up to JOB_MAX_ATTEMPTS.
+    
+    **Args:**
+    - url: Wikipedia article URL
+    - force_refresh: Skip the cache and always regenerate (default: false)
+    - priority: Higher-priority jobs run first (default: 0)
+    - question_count, difficulty_mix, include_*: Quiz options, as for `/generate_quiz`
+    
+    **Returns:**
+    - The queued job (202 Accepted)
+    """
+    
+    logger.info(f"Received quiz job for: {request.url}")
+    job = enqueue_job(db, request.url, request.force_refresh, request.priority, request.quiz_options())
+    job_workers.notify()
+    return get_job_response(db, job.id)
+
+
+@app.get("/jobs/{job_id}", response_model=JobStatusResponse, tags=["Quiz Generation"])
+def get_quiz_job(job_id: int, db: Session = Depends(get_db)):
+    """
+    Get the status of a queued quiz generation.
+    
+    **Returns:**
+    - Job status, attempt count and last error; `result` holds the quiz
+      (same body as `/generate_quiz`) once the job succeeded
+    
+    **Error Handling:**
+    - 404: Job not found
+    """
+    
+    job_response = get_job_response(db, job_id)
+    if not job_response:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job with ID {job_id} not found"
+        )
+    return job_response
+
+
 @app.get("/history", response_model=List[QuizHistoryItem], tags=["History"])
-async def get_history(
+def get_history(
+    request: Request,
     db: Session = Depends(get_db),
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    after: Optional[str] = None,
+    title_prefix: Optional[str] = None,
+    url_prefix: Optional[str] = None
 ):
     """
-    Get list of all previously generated quizzes.
+    Get list of all previously generated quizzes, newest first.
+    
+    Page through with the `X-Next-Cursor` response header: pass it back as
+    `after` to get the next page. The header is absent on the last page.
+    Cursor pages cost the same at any depth; large `offset` values do not.
+    
+    Responses carry an ETag and may be cached for a short time; send the
+    ETag back in `If-None-Match` to get an empty 304 if the page is unchanged.
     
     **Args:**
     - limit: Maximum number of results (default: 100)
     - offset: Number of results to skip (default: 0)
+    - after: Cursor from the previous page's `X-Next-Cursor` header
+    - title_prefix: Only quizzes whose title starts with this (case-sensitive)
+    - url_prefix: Only quizzes whose URL starts with this (case-sensitive)
     
     **Returns:**
     - List of quiz history items with id, url, title, and date_generated
     
     **Error Handling:**
+    - 400: Invalid cursor
     - 500: Database query error
     """
     
     try:
-        logger.info(f"Fetching history (limit={limit}, offset={offset})")
+        logger.info(f"Fetching history (limit={limit}, offset={offset}, after={after})")
         
-        # Query recent quizzes, ordered by date descending
-        quizzes = db.query(Quiz).order_by(
-            desc(Quiz.date_generated)
-        ).offset(offset).limit(limit).all()
+        # Query only the listed columns, ordered by date descending
+        rows, next_cursor = query_history(db, limit, offset, after, title_prefix, url_prefix)
         
-        logger.info(f"Found {len(quizzes)} quizzes")
+        logger.info(f"Found {len(rows)} quizzes")
         
-        # Convert to response model
+        # Plain rows encoded straight to JSON; the columns are already the
+        # QuizHistoryItem types, so there is nothing to validate
         history_items = [
-            QuizHistoryItem(
-                id=quiz.id,
-                url=quiz.url,
-                title=quiz.title,
-                date_generated=quiz.date_generated
-            )
-            for quiz in quizzes
+            {
+                "id": row.id,
+                "url": row.url,
+                "title": row.title,
+                "date_generated": row.date_generated
+            }
+            for row in rows
         ]
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
         
-        return history_items
+        return cached_json_response(
+            request,
+            history_items,
+            short_cache_control(HttpCacheConfig.HISTORY_MAX_AGE_SECONDS),
+            headers=headers
+        )
         
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error fetching history: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -205,8 +472,9 @@ async def get_history(
 
 
 @app.get("/quiz/{quiz_id}", response_model=QuizDetailResponse, tags=["History"])
-async def get_quiz_detail(
+def get_quiz_detail(
     quiz_id: int,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
@@ -214,8 +482,12 @@ async def get_quiz_detail(
     
     **Process Flow:**
     1. Query database for quiz by ID
-    2. Deserialize JSON quiz data
-    3. Return with all details
+    2. Pipeline-generated quizzes: return the stored JSON as is
+    3. Legacy rows: load questions, entities, sections and related topics,
+       validate and return with all details
+    
+    Quizzes never change once written: responses carry a strong ETag and
+    `Cache-Control: immutable`, and a matching `If-None-Match` gets a 304.
     
     **Args:**
     - quiz_id: The ID of the quiz to retrieve
@@ -231,18 +503,37 @@ async def get_quiz_detail(
     try:
         logger.info(f"Fetching quiz details for ID: {quiz_id}")
         
-        # Query quiz by ID
-        quiz = db.query(Quiz).filter(Quiz.id == quiz_id).first()
+        # Quizzes written by the pipeline were validated before they were
+        # stored: serve their stored JSON with one narrow query and no
+        # re-validation
+        row = db.query(
+            Quiz.id,
+            Quiz.url,
+            Quiz.title,
+            Quiz.date_generated,
+            Quiz.full_quiz_data,
+            Quiz.generation_config,
+            Quiz.content_hash
+        ).filter(Quiz.id == quiz_id).first()
         
-        if not quiz:
+        if not row:
             logger.warning(f"Quiz not found: ID {quiz_id}")
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Quiz with ID {quiz_id} not found"
             )
         
-        # Deserialize quiz data
-        quiz_data = json.loads(quiz.full_quiz_data)
+        etag = quiz_etag(row.id, row.content_hash)
+        if not_modified(request, etag):
+            return not_modified_response(etag, immutable_cache_control())
+        
+        if is_pipeline_quiz(row):
+            logger.info(f"Successfully retrieved quiz {quiz_id}")
+            return cached_json_response(request, quiz_detail_payload(row), immutable_cache_control(), etag)
+        
+        # Legacy rows: load with their child rows and validate
+        quiz = db.query(Quiz).options(*quiz_data_options()).filter(Quiz.id == quiz_id).first()
+        quiz_data = load_quiz_data(quiz)
         
         # Build response
         response = QuizDetailResponse(
@@ -258,7 +549,9 @@ async def get_quiz_detail(
         )
         
         logger.info(f"Successfully retrieved quiz {quiz_id}")
-        return response
+        return cached_json_response(
+            request, response.model_dump(mode="json"), immutable_cache_control(), etag
+        )
         
     except HTTPException:
         raise
@@ -271,7 +564,7 @@ async def get_quiz_detail(
 
 
 @app.get("/health", tags=["Health"])
-async def health_check(db: Session = Depends(get_db)):
+def health_check(db: Session = Depends(get_db)):
     """
     Health check endpoint with database connectivity test.
     
@@ -295,45 +588,28 @@ async def health_check(db: Session = Depends(get_db)):
 
 
 @app.get("/stats", tags=["Statistics"])
-async def get_stats(db: Session = Depends(get_db)):
+def get_stats(request: Request, db: Session = Depends(get_db), days: int = Query(30, ge=1, le=365)):
     """
     Get statistics about generated quizzes.
     
+    Served from counters maintained as quizzes are saved, so the cost does
+    not grow with the number of quizzes. Responses carry an ETag and may be
+    cached for a short time; a matching `If-None-Match` gets a 304.
+    
+    **Args:**
+    - days: Number of recent days in `quizzes_per_day`, 1-365 (default: 30)
+    
     **Returns:**
-    - Total quizzes, total questions, date range, etc.
+    - Total quizzes, total questions, date range, average questions per quiz,
+      difficulty distribution and per-day counts
     """
     
     try:
-        total_quizzes = db.query(Quiz).count()
-        
-        if total_quizzes == 0:
-            return {
-                "total_quizzes": 0,
-                "total_questions": 0,
-                "first_quiz_date": None,
-                "last_quiz_date": None
-            }
-        
-        # Get date range
-        first_quiz = db.query(Quiz).order_by(Quiz.date_generated).first()
-        last_quiz = db.query(Quiz).order_by(desc(Quiz.date_generated)).first()
-        
-        # Calculate total questions
-        total_questions = 0
-        for quiz in db.query(Quiz).all():
-            try:
-                quiz_data = json.loads(quiz.full_quiz_data)
-                total_questions += len(quiz_data.get("quiz", []))
-            except:
-                pass
-        
-        return {
-            "total_quizzes": total_quizzes,
-            "total_questions": total_questions,
-            "first_quiz_date": first_quiz.date_generated if first_quiz else None,
-            "last_quiz_date": last_quiz.date_generated if last_quiz else None,
-            "average_questions_per_quiz": total_questions / total_quizzes if total_quizzes > 0 else 0
-        }
+        return cached_json_response(
+            request,
+            get_quiz_stats(db, days),
+            short_cache_control(HttpCacheConfig.STATS_MAX_AGE_SECONDS)
+        )
         
     except Exception as e:
         logger.error(f"Error fetching stats: {str(e)}")
@@ -343,6 +619,51 @@ async def get_stats(db: Session = Depends(get_db)):
         )
 
 
+@app.get("/metrics", tags=["Statistics"])
+async def get_metrics():
+    """
+    Get in-process performance counters for this worker.
+    
+    **Returns:**
+    - Single-flight counters (leaders, coalesced requests, failures, takeovers) and
+      cross-worker lock counters
+    - Wikipedia fetch counters (requests, 304 revalidations, bytes, cache evictions)
+    - Article cache hits per tier, misses, evictions and memory usage
+    - Background job counters (processed, succeeded, retried, failed, abandoned, lease lost)
+    - LLM client counters (requests, retries, rate limits, timeouts), circuit
+      breaker state and rate-limit headroom
+    - Map-reduce generation runs, section calls, candidates, duplicates dropped and top-ups
+    - Output repair counters and repair, regeneration and failure rates
+    - LLM response cache hits, misses, writes and discarded entries
+    - Streaming generation time-to-first-question
+    - Database connection pool usage, checkouts, wait time and exhaustion
+    """
+    return {
+        "single_flight": {
+            **generation_flights.metrics(),
+            "db_lock": dict(db_lock_metrics),
+        },
+        "scraper_http": dict(http_metrics),
+        "article_cache": {
+            **article_cache_metrics,
+            "memory": get_article_cache().memory_usage() if get_article_cache() else None,
+        },
+        "jobs": dict(job_metrics),
+        "llm": llm_client_metrics(),
+        "map_reduce": dict(map_reduce_metrics),
+        "repair": repair_rates(),
+        "llm_response_cache": dict(response_cache_metrics),
+        "database": engine_metrics(engine),
+        "streaming": {
+            **streaming_metrics,
+            "first_question_seconds_avg": (
+                streaming_metrics["first_question_seconds_total"] / streaming_metrics["first_question_count"]
+                if streaming_metrics["first_question_count"] else None
+            ),
+        },
+    }
+
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     """Custom HTTP exception handler"""
@@ -352,7 +673,8 @@ async def http_exception_handler(request, exc):
             "detail": exc.detail,
             "status_code": exc.status_code,
             "timestamp": datetime.utcnow().isoformat()
-        }
+        },
+        headers=exc.headers
     )
 
 
@@ -0,0 +1,162 @@
+"""
+Data migrations that are too slow to run on application startup.
+Schema changes (new tables/columns) are applied by `init_db`; the commands
+here backfill data for existing rows in batches and can be re-run safely.
+
+Usage:
+    python migrations.py backfill-quiz-data [--batch-size N]
+    python migrations.py rebuild-stats
+    python migrations.py move-scraped-content [--batch-size N]
+"""
+
+import argparse
+import json
+import logging
+
+from content_store import LocalContentStore, ContentStoreConfig, get_content_store
+from database import SessionLocal, Quiz, init_db
+from quiz_records import apply_quiz_data, round_trips
+from quiz_stats import rebuild_quiz_stats
+
+logger = logging.getLogger(__name__)
+
+
+def backfill_quiz_data(batch_size: int = 200) -> dict:
+    """
+    Copy quiz data from the full_quiz_data JSON column into the normalized
+    tables for rows that have not been migrated yet.
+
+    Rows whose JSON would not rebuild byte-for-byte from the normalized
+    tables (legacy payloads with unexpected keys) are left as they are and
+    keep being served from the JSON column.
+
+    Args:
+        batch_size (int): Rows per transaction
+
+    Returns:
+        dict: {"migrated": int, "skipped": int}
+    """
+    migrated = skipped = 0
+    last_id = 0
+    while True:
+        with SessionLocal() as db:
+            batch = db.query(Quiz).filter(
+                Quiz.id > last_id,
+                Quiz.quiz_data_version.is_(None),
+            ).order_by(Quiz.id).limit(batch_size).all()
+            if not batch:
+                break
+
+            for quiz in batch:
+                last_id = quiz.id
+                try:
+                    quiz_data = json.loads(quiz.full_quiz_data)
+                except (TypeError, ValueError):
+                    quiz_data = None
+                if not isinstance(quiz_data, dict) or not round_trips(quiz_data, quiz.title):
+                    logger.warning(f"Quiz {quiz.id} cannot be normalized losslessly, leaving as JSON")
+                    skipped += 1
+                    continue
+                apply_quiz_data(quiz, quiz_data)
+                migrated += 1
+            db.commit()
+        logger.info(f"Backfilled quiz data up to ID {last_id} ({migrated} migrated, {skipped} skipped)")
+
+    return {"migrated": migrated, "skipped": skipped}
+
+
+def move_scraped_content(batch_size: int = 100) -> dict:
+    """
+    Move raw HTML from Quiz.scraped_content into the content store and
+    replace it with a reference.
+
+    The database file only shrinks after the freed pages are reclaimed
+    (VACUUM on SQLite/Postgres, OPTIMIZE TABLE on MySQL).
+
+    Args:
+        batch_size (int): Rows per transaction
+
+    Returns:
+        dict: {"moved", "deduplicated", "bytes_moved", "bytes_stored"}
+    """
+    store = get_content_store() or LocalContentStore(ContentStoreConfig.ROOT, ContentStoreConfig.COMPRESSION)
+    result = {"moved": 0, "deduplicated": 0, "bytes_moved": 0, "bytes_stored": 0}
+    last_id = 0
+    while True:
+        with SessionLocal() as db:
+            batch = db.query(Quiz).filter(
+                Quiz.id > last_id,
+                Quiz.scraped_content.isnot(None),
+                Quiz.scraped_content_ref.is_(None),
+            ).order_by(Quiz.id).limit(batch_size).all()
+            if not batch:
+                break
+
+            for quiz in batch:
+                last_id = quiz.id
+                stored = store.put(quiz.scraped_content.encode("utf-8"))
+                quiz.scraped_content_ref = stored.ref
+                quiz.scraped_content = None
+                result["moved"] += 1
+                result["bytes_moved"] += stored.size
+                if stored.deduplicated:
+                    result["deduplicated"] += 1
+                else:
+                    result["bytes_stored"] += stored.stored_size
+            db.commit()
+        logger.info(f"Moved scraped content up to ID {last_id} ({result['moved']} rows)")
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run data migrations")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    quiz_data = subcommands.add_parser(
+        "backfill-quiz-data",
+        help="Move quiz JSON into the questions/entities/sections/related_topics tables"
+    )
+    quiz_data.add_argument("--batch-size", type=int, default=200)
+
+    subcommands.add_parser(
+        "rebuild-stats",
+        help="Recompute the /stats counters (and missing question counts) from all quizzes"
+    )
+
+    scraped_content = subcommands.add_parser(
+        "move-scraped-content",
+        help="Move raw HTML out of the quizzes table into the content store"
+    )
+    scraped_content.add_argument("--batch-size", type=int, default=100)
+
+    args = parser.parse_args()
+    init_db()
+    if args.command == "backfill-quiz-data":
+        result = backfill_quiz_data(args.batch_size)
+        print(f"Migrated {result['migrated']} quizzes, skipped {result['skipped']}")
+    elif args.command == "rebuild-stats":
+        with SessionLocal() as db:
+            result = rebuild_quiz_stats(db)
+        print(
+            f"Rebuilt stats for {result['quizzes']} quizzes "
+            f"({result['backfilled_question_counts']} question counts filled in)"
+        )
+    elif args.command == "move-scraped-content":
+        result = move_scraped_content(args.batch_size)
+        saved = result["bytes_moved"] - result["bytes_stored"]
+        print(
+            f"Moved HTML of {result['moved']} quizzes ({result['deduplicated']} duplicates): "
+            f"{result['bytes_moved'] / 1e6:.1f} MB out of the database, "
+            f"{result['bytes_stored'] / 1e6:.1f} MB written to the store, "
+            f"{saved / 1e6:.1f} MB saved"
+        )
+        print("Run VACUUM (or OPTIMIZE TABLE on MySQL) to return the freed space to the filesystem")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    main()
@@ -2,8 +2,8 @@
 Pydantic models for data validation.
 """
 
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Dict, Literal, Optional
 from datetime import datetime
 
 
@@ -65,11 +65,89 @@ class QuizDetailResponse(BaseModel):
     related_topics: Optional[List[str]] = None
 
 
-class GenerateQuizRequest(BaseModel):
+class QuizOptions(BaseModel):
+    """
+    What to generate for a quiz: the number of questions, their difficulty
+    mix and which optional parts to include. Quizzes generated with
+    different options are cached separately.
+    """
+    question_count: int = Field(default=8, ge=5, le=10, description="Number of questions")
+    difficulty_mix: Optional[Dict[Literal["easy", "medium", "hard"], float]] = Field(
+        default=None,
+        description="Relative share of each difficulty, e.g. {\"easy\": 2, \"medium\": 1}; "
+                    "difficulties left out are not used. Default: a mix of all three"
+    )
+    include_summary: bool = Field(default=True, description="Generate a summary of the article")
+    include_key_entities: bool = Field(default=True, description="Extract people, organizations and locations")
+    include_sections: bool = Field(default=True, description="List the main sections of the article")
+    include_related_topics: bool = Field(default=True, description="Suggest related Wikipedia topics")
+
+    @field_validator("difficulty_mix")
+    @classmethod
+    def _check_difficulty_mix(cls, mix):
+        if mix is not None and (any(share < 0 for share in mix.values()) or sum(mix.values()) <= 0):
+            raise ValueError("difficulty_mix needs non-negative shares with a positive total")
+        return mix
+
+    def quiz_options(self) -> "QuizOptions":
+        """Just the quiz options of a request that extends this model."""
+        return QuizOptions(**{name: getattr(self, name) for name in QuizOptions.model_fields})
+
+
+class GenerateQuizRequest(QuizOptions):
     """
     Schema for the /generate_quiz POST request.
     """
     url: str = Field(..., description="Wikipedia article URL")
+    force_refresh: bool = Field(
+        default=False,
+        description="Bypass the quiz cache and always scrape and regenerate"
+    )
+
+
+class BatchGenerateQuizRequest(QuizOptions):
+    """
+    Schema for the /generate_quiz/batch POST request.
+    """
+    urls: List[str] = Field(..., min_items=1, description="Wikipedia article URLs")
+    force_refresh: bool = Field(
+        default=False,
+        description="Bypass the quiz cache and always scrape and regenerate"
+    )
+    scrape_concurrency: Optional[int] = Field(
+        default=None, ge=1, description="Maximum concurrent article downloads"
+    )
+    llm_concurrency: Optional[int] = Field(
+        default=None, ge=1, description="Maximum concurrent LLM calls"
+    )
+
+
+class GenerateQuizJobRequest(GenerateQuizRequest):
+    """
+    Schema for the /jobs POST request.
+    """
+    priority: int = Field(default=0, description="Higher-priority jobs run first")
+
+
+class JobStatusResponse(BaseModel):
+    """
+    Schema for background job status (used in /jobs endpoints).
+    `result` holds the same body /generate_quiz returns once the job succeeded.
+    """
+    id: int
+    url: str
+    status: str = Field(..., description="'queued', 'running', 'succeeded' or 'failed'")
+    priority: int
+    attempts: int
+    max_attempts: int
+    quiz_id: Optional[int] = None
+    cache: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    next_run_at: Optional[datetime] = None
+    result: Optional[Dict] = None
 
 
 class ErrorResponse(BaseModel):
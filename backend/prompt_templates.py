@@ -0,0 +1,277 @@
+"""
+Versioned prompt templates for the LLM requests.
+Each template is compiled once (quiz and section templates once per
+combination of output mode and optional parts). The static instructions
+form the system message, identical in every request with the same
+options, and the per-request parts go in the user message with the
+article text last. Requests for different articles then share a long
+common prefix, which providers with prompt caching can reuse. Templates
+also give the response cache and the quiz cache a version to key on.
+"""
+
+import hashlib
+from functools import lru_cache
+from string import Formatter
+from typing import Dict, List, Tuple
+
+from structured_output import quiz_output_schema_text
+
+# Field every user template must end with
+ARTICLE_FIELD = "article_content"
+
+
+class PromptTemplate:
+    """
+    A chat prompt: fixed system instructions plus a user message template
+    whose fields are filled in per request.
+
+    The user template is parsed once into literal text and field names, so
+    rendering is a single join (no repeated str.replace over the article,
+    and braces in the article need no escaping). It must end with the
+    {article_content} field.
+
+    Args:
+        name (str): Template name
+        version (int): Bump when the wording changes in a way that affects
+            output, to document the change; any edit changes `key` anyway
+        instructions (str): Static system message
+        user_template (str): str.format-style template of the user message
+    """
+
+    def __init__(self, name: str, version: int, instructions: str, user_template: str):
+        self.name = name
+        self.version = version
+        self.instructions = instructions
+        self._parts: List[Tuple[str, str]] = []
+        trailing = ""
+        for literal, field, _, _ in Formatter().parse(user_template):
+            if field is None:
+                trailing = literal
+            else:
+                self._parts.append((literal, field))
+        if trailing or not self._parts or self._parts[-1][1] != ARTICLE_FIELD:
+            raise ValueError(f"Prompt template {name} must end with {{{ARTICLE_FIELD}}}")
+        self.fields = tuple(field for _, field in self._parts)
+        digest = hashlib.sha256(f"{instructions}\0{user_template}".encode("utf-8")).hexdigest()
+        self.key = f"{name}-v{version}-{digest[:8]}"
+
+    def render(self, **values) -> str:
+        """The user message with `values` filled in."""
+        return "".join(f"{literal}{values[field]}" for literal, field in self._parts)
+
+    def messages(self, **values) -> List[Dict[str, str]]:
+        """
+        Chat messages for one request.
+
+        Args:
+            **values: A value for every field of the user template
+
+        Returns:
+            List[Dict[str, str]]: System message with the static instructions,
+                then the user message ending with the article
+        """
+        return [
+            {"role": "system", "content": self.instructions},
+            {"role": "user", "content": self.render(**values)},
+        ]
+
+
+# What the quiz asks for in each optional part, for the requirements
+PART_REQUIREMENTS = {
+    "summary": "a 2-3 sentence summary",
+    "key_entities": "the people, organizations and locations mentioned",
+    "sections": "3-5 main sections",
+    "related_topics": "3-5 related Wikipedia topics",
+}
+
+# Per-request settings, ahead of the article
+QUIZ_USER_TEMPLATE = (
+    "Write {question_count} questions. Difficulty: {difficulty}.\n\n"
+    "ARTICLE CONTENT:\n{article_content}"
+)
+
+
+def _extras(omit: Tuple[str, ...]) -> str:
+    """The optional parts the quiz asks for, as a list in a sentence; empty if none."""
+    parts = [requirement for part, requirement in PART_REQUIREMENTS.items() if part not in omit]
+    if len(parts) < 2:
+        return "".join(parts)
+    return ", ".join(parts[:-1]) + " and " + parts[-1]
+
+
+def _json_requirements(omit: Tuple[str, ...]) -> str:
+    extras = _extras(omit)
+    return (
+        "You are an expert educator creating quizzes from Wikipedia articles. "
+        "The user message gives the number of questions, their difficulty and the article content.\n\n"
+        "REQUIREMENTS:\n"
+        "1. Write exactly that many factual questions answerable from the article that test comprehension.\n"
+        "2. Each has 4 distinct, plausible options; 'answer' is the exact text of one option; the explanation\n"
+        "   (2-3 sentences) grounds the answer in the article.\n"
+        + (f"3. Also give {extras}. Use only information in the article.\n" if extras else "")
+        + "\n"
+    )
+
+
+def _prose_instructions(omit: Tuple[str, ...]) -> str:
+    steps = [
+        "Generate exactly the number of thoughtful, factual questions the user message asks for.",
+        "Each question must:\n"
+        "   - Be directly answerable from the provided content\n"
+        "   - Have 4 distinct, plausible options\n"
+        "   - Have one clear correct answer\n"
+        "   - Include a brief explanation (2-3 sentences) grounding the answer in the article\n"
+        "   - Be assigned the difficulty level (easy, medium, or hard) the user message asks for",
+    ]
+    if "key_entities" not in omit:
+        steps.append("Extract key entities: people, organizations, and locations mentioned in the article.")
+    if "summary" not in omit:
+        steps.append("Provide a 2-3 sentence summary of the article.")
+    if "sections" not in omit:
+        steps.append("List 3-5 main sections/topics covered in the article.")
+    if "related_topics" not in omit:
+        steps.append("Suggest 3-5 related Wikipedia topics for further reading.")
+
+    structure = ["  \"title\": \"string - article title\",\n"]
+    if "summary" not in omit:
+        structure.append("  \"summary\": \"string - 2-3 sentence summary\",\n")
+    if "key_entities" not in omit:
+        structure.append(
+            "  \"key_entities\": {\n"
+            "    \"people\": [\"list of people mentioned\"],\n"
+            "    \"organizations\": [\"list of organizations\"],\n"
+            "    \"locations\": [\"list of locations\"]\n"
+            "  },\n"
+        )
+    if "sections" not in omit:
+        structure.append("  \"sections\": [\"list of main sections/topics\"],\n")
+    structure.append(
+        "  \"quiz\": [\n"
+        "    {\n"
+        "      \"question\": \"What is the capital of France?\",\n"
+        "      \"options\": [\"Paris\", \"London\", \"Berlin\", \"Rome\"],\n"
+        "      \"answer\": \"Paris\",\n"
+        "      \"difficulty\": \"easy\",\n"
+        "      \"explanation\": \"Paris is the capital and largest city of France.\"\n"
+        "    }\n"
+        "  ]"
+    )
+    if "related_topics" not in omit:
+        structure.append(",\n  \"related_topics\": [\"topic 1\", \"topic 2\", \"topic 3\"]")
+
+    return (
+        "You are an expert educator specializing in creating educational quizzes from Wikipedia articles.\n\n"
+        "Given the Wikipedia article content in the user message, generate a comprehensive, educational quiz "
+        "with high-quality questions.\n\n"
+        "REQUIREMENTS:\n"
+        + "".join(f"{number}. {step}\n" for number, step in enumerate(steps, start=1))
+        + "\n"
+        "IMPORTANT CONSTRAINTS:\n"
+        "- Do NOT hallucinate information not present in the article\n"
+        "- Questions should test comprehension, not just recall\n"
+        "- Ensure all options are grammatically consistent with the question\n\n"
+        "CRITICAL ANSWER FORMAT RULES:\n"
+        "- The 'answer' field MUST contain the EXACT text from one of the options\n"
+        "- Do NOT add prefixes like 'A)', 'Option A:', or any other formatting\n"
+        "- Copy the option text EXACTLY as it appears in the options array\n"
+        "- Example: If options are [\"Paris\", \"London\", \"Berlin\", \"Rome\"], answer should be \"Paris\" NOT \"A) Paris\"\n\n"
+        "Return the response as a valid JSON object matching this exact structure:\n"
+        "{\n" + "".join(structure) + "\n}\n\n"
+        "CRITICAL: Return ONLY valid JSON, no markdown formatting, no extra text. The 'answer' field must match EXACTLY one option."
+    )
+
+
+@lru_cache(maxsize=None)
+def quiz_template(output_mode: str, omit: Tuple[str, ...] = (), stream: bool = False) -> PromptTemplate:
+    """
+    Quiz prompt for an output mode (QUIZ_OUTPUT_MODE) and the optional
+    parts left out. Compiled once per combination.
+
+    In the JSON output modes the prompt only states the task; the format
+    comes from response_format (and, in json_object mode, a compact JSON
+    Schema in the instructions). Streamed requests carry the schema in the
+    prompt instead, as providers may not stream in JSON mode.
+    """
+    if output_mode == "prompt":
+        return PromptTemplate("quiz-prose", 2, _prose_instructions(omit), QUIZ_USER_TEMPLATE)
+    if output_mode == "json_object" or stream:
+        instructions = (
+            _json_requirements(omit)
+            + f"Respond with a JSON object matching this JSON Schema:\n{quiz_output_schema_text(omit)}"
+        )
+        return PromptTemplate("quiz-json", 2, instructions, QUIZ_USER_TEMPLATE)
+    # json_schema: the schema travels in response_format
+    return PromptTemplate("quiz-json-schema", 2, _json_requirements(omit) + "Respond in JSON.", QUIZ_USER_TEMPLATE)
+
+
+# Extra questions for a quiz that lost some in repair
+QUIZ_TOPUP = PromptTemplate(
+    "quiz-topup",
+    1,
+    "You are an expert educator writing quiz questions about a Wikipedia article. "
+    "The user message holds the questions already written and the article content.\n\n"
+    "REQUIREMENTS:\n"
+    "1. Write the requested number of new factual multiple-choice questions answerable from the article.\n"
+    "   Do not repeat the questions already written.\n"
+    "2. Each question has 4 distinct options, one correct answer, a brief explanation and a difficulty\n"
+    "   (easy, medium or hard).\n"
+    "3. The 'answer' field MUST be the EXACT text of one of the options, without prefixes like 'A)'.\n\n"
+    "Return ONLY a valid JSON object, no markdown, with this structure:\n"
+    "{\"quiz\": [{\"question\": \"...\", \"options\": [\"...\", \"...\", \"...\", \"...\"], "
+    "\"answer\": \"...\", \"difficulty\": \"easy\", \"explanation\": \"...\"}]}",
+    "QUESTIONS ALREADY WRITTEN (do not repeat them):\n{existing_questions}\n\n"
+    "Write {count} new factual multiple-choice questions.\n\n"
+    "ARTICLE CONTENT:\n{article_content}",
+)
+
+
+@lru_cache(maxsize=None)
+def section_template(omit: Tuple[str, ...] = ()) -> PromptTemplate:
+    """Map step of map-reduce generation: candidate questions about one group of sections."""
+    extras = {
+        "summary": "Summarize the section in one sentence.",
+        "key_entities": "List the people, organizations and locations it mentions.",
+        "related_topics": "Suggest 1-2 related Wikipedia topics.",
+    }
+    wanted = " ".join(extra for part, extra in extras.items() if part not in omit)
+    structure = {
+        "summary": "  \"summary\": \"one sentence\",\n",
+        "key_entities": "  \"key_entities\": {\"people\": [], \"organizations\": [], \"locations\": []},\n",
+        "related_topics": "  \"related_topics\": [\"topic\"],\n",
+    }
+    instructions = (
+        "You are an expert educator writing quiz questions about part of a Wikipedia article. "
+        "The user message names the article and section and holds the section content.\n\n"
+        "REQUIREMENTS:\n"
+        "1. Write the requested number of factual multiple-choice questions answerable from the section content only.\n"
+        "2. Each question has 4 distinct, plausible options, one correct answer, a 1-2 sentence explanation,\n"
+        "   and a difficulty (easy, medium or hard). Use a mix of difficulties.\n"
+        "3. The 'answer' field MUST be the EXACT text of one of the options, without prefixes like 'A)'.\n"
+        + (f"4. {wanted}\n" if wanted else "")
+        + "\nReturn ONLY a valid JSON object, no markdown, with this structure:\n"
+        "{\n"
+        + "".join(line for part, line in structure.items() if part not in omit)
+        + "  \"quiz\": [{\"question\": \"...\", \"options\": [\"...\", \"...\", \"...\", \"...\"], "
+        "\"answer\": \"...\", \"difficulty\": \"easy\", \"explanation\": \"...\"}]\n"
+        "}"
+    )
+    return PromptTemplate(
+        "section-questions",
+        2,
+        instructions,
+        "ARTICLE: {article_title}\n"
+        "SECTION: {section}\n"
+        "Write {question_count} factual multiple-choice questions about this section.\n\n"
+        "SECTION CONTENT:\n{article_content}",
+    )
+
+
+def templates_version(output_mode: str, omit: Tuple[str, ...] = ()) -> str:
+    """Keys of the templates used to generate a quiz, for fingerprints of generated output."""
+    templates = (
+        quiz_template(output_mode, omit),
+        quiz_template(output_mode, omit, stream=True),
+        QUIZ_TOPUP,
+        section_template(omit),
+    )
+    return ",".join(template.key for template in templates)
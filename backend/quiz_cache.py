@@ -0,0 +1,224 @@
+"""
+Content-addressed quiz cache.
+Lets repeat requests for the same article reuse a stored quiz instead of
+scraping Wikipedia and calling the LLM again.
+"""
+
+import hashlib
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Optional
+from urllib.parse import quote, unquote, urlsplit
+
+from sqlalchemy import desc
+from sqlalchemy.orm import Session
+
+from article_chunker import ChunkerConfig
+from database import Quiz
+from llm_providers import LLMProviderConfig
+from llm_quiz_generator import QuizGenerationConfig
+from models import QuizOptions
+from prompt_templates import templates_version
+from quiz_map_reduce import MapReduceConfig
+from quiz_options import omitted_parts, options_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+class QuizCacheConfig:
+    ENABLED = os.getenv("QUIZ_CACHE_ENABLED", "true").lower() not in ("0", "false", "no")
+    # How long a stored quiz is served without re-checking the live article.
+    # Once expired, the article is scraped again and the quiz is only reused
+    # if the cleaned text (i.e. the article revision) is unchanged.
+    TTL_SECONDS = int(os.getenv("QUIZ_CACHE_TTL_SECONDS", "86400"))
+
+
+def normalize_article_url(url: str) -> str:
+    """
+    Canonicalize a Wikipedia article URL so equivalent URLs share a cache entry.
+
+    Drops query strings and fragments, lower-cases the host, decodes
+    percent-escapes, and applies MediaWiki title rules (spaces become
+    underscores, first letter is upper-cased).
+
+    Args:
+        url (str): Wikipedia article URL
+
+    Returns:
+        str: Normalized URL
+    """
+    parts = urlsplit(url.strip())
+    path = unquote(parts.path)
+    prefix = "/wiki/"
+    if path.startswith(prefix):
+        title = path[len(prefix):].replace(" ", "_").strip("_")
+        if title:
+            title = title[0].upper() + title[1:]
+        path = prefix + title
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}{quote(path, safe='/_()-.,:~!$&*+;=@')}"
+
+
+def hash_content(content: str) -> str:
+    """
+    Hash cleaned article text. Any edit to the article changes the hash.
+
+    Args:
+        content (str): Cleaned article text
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def generation_fingerprint(options: Optional[QuizOptions] = None) -> str:
+    """
+    Fingerprint of everything besides the article that shapes the generated quiz.
+
+    Covers the LLM provider, model name, temperature and token budget, the
+    prompt template versions and output mode, the article chunking settings
+    that decide the prompt content, the generation mode (single completion
+    or map-reduce) and the request's quiz options.
+
+    Args:
+        options (QuizOptions, optional): Request options, defaults to QuizOptions()
+
+    Returns:
+        str: Hex digest
+    """
+    config = "|".join([
+        LLMProviderConfig.PROVIDER,
+        QuizGenerationConfig.MODEL_NAME,
+        str(QuizGenerationConfig.TEMPERATURE),
+        str(QuizGenerationConfig.MAX_TOKENS),
+        templates_version(QuizGenerationConfig.OUTPUT_MODE, omitted_parts(options)),
+        QuizGenerationConfig.OUTPUT_MODE,
+        f"chunker-{ChunkerConfig.VERSION}",
+        str(ChunkerConfig.TOKEN_BUDGET),
+        str(ChunkerConfig.CHARS_PER_TOKEN),
+        f"mode-{MapReduceConfig.MODE}",
+        options_fingerprint(options),
+    ])
+    if MapReduceConfig.MODE != "single":
+        config += "|" + "|".join([
+            f"map-reduce-{MapReduceConfig.VERSION}",
+            str(MapReduceConfig.MIN_ARTICLE_TOKENS),
+            str(MapReduceConfig.SECTION_TOKENS),
+            str(MapReduceConfig.MAX_SECTIONS),
+            str(MapReduceConfig.MAP_MAX_TOKENS),
+        ])
+    return hashlib.sha256(config.encode("utf-8")).hexdigest()[:16]
+
+
+def build_cache_key(normalized_url: str, content_hash: str, fingerprint: Optional[str] = None) -> str:
+    """
+    Build the content-addressed cache key for a quiz.
+
+    Args:
+        normalized_url (str): Output of `normalize_article_url`
+        content_hash (str): Output of `hash_content`
+        fingerprint (str, optional): Generation fingerprint, defaults to the current config
+            with default quiz options
+
+    Returns:
+        str: Hex SHA-256 cache key
+    """
+    fingerprint = fingerprint or generation_fingerprint()
+    raw_key = f"{normalized_url}\n{content_hash}\n{fingerprint}"
+    return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+
+def generation_key(normalized_url: str, options: Optional[QuizOptions] = None) -> str:
+    """
+    Key identifying "generate a quiz for this article with the current config",
+    known before scraping. Used to coalesce concurrent identical requests.
+
+    Args:
+        normalized_url (str): Output of `normalize_article_url`
+        options (QuizOptions, optional): Request options
+
+    Returns:
+        str: Hex SHA-256 key
+    """
+    raw_key = f"{normalized_url}\n{generation_fingerprint(options)}"
+    return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+
+def find_fresh_quiz(db: Session, normalized_url: str, options: Optional[QuizOptions] = None) -> Optional[Quiz]:
+    """
+    Find a quiz for this article that was validated within the TTL.
+    A hit means the article does not need to be scraped at all.
+
+    Args:
+        db (Session): Database session
+        normalized_url (str): Output of `normalize_article_url`
+        options (QuizOptions, optional): Request options
+
+    Returns:
+        Optional[Quiz]: Most recently validated matching quiz, if any
+    """
+    if not QuizCacheConfig.ENABLED or QuizCacheConfig.TTL_SECONDS <= 0:
+        return None
+
+    cutoff = datetime.utcnow() - timedelta(seconds=QuizCacheConfig.TTL_SECONDS)
+    return db.query(Quiz).filter(
+        Quiz.normalized_url == normalized_url,
+        Quiz.generation_config == generation_fingerprint(options),
+        Quiz.last_validated_at >= cutoff,
+    ).order_by(desc(Quiz.last_validated_at)).first()
+
+
+def find_latest_quiz(db: Session, normalized_url: str, options: Optional[QuizOptions] = None) -> Optional[Quiz]:
+    """
+    Find the newest quiz for this article and generation config, regardless of age.
+    Used to revalidate by revision ID once the TTL has expired.
+
+    Args:
+        db (Session): Database session
+        normalized_url (str): Output of `normalize_article_url`
+        options (QuizOptions, optional): Request options
+
+    Returns:
+        Optional[Quiz]: Most recent matching quiz, if any
+    """
+    if not QuizCacheConfig.ENABLED:
+        return None
+
+    return db.query(Quiz).filter(
+        Quiz.normalized_url == normalized_url,
+        Quiz.generation_config == generation_fingerprint(options),
+    ).order_by(desc(Quiz.date_generated)).first()
+
+
+def find_quiz_by_key(db: Session, cache_key: str) -> Optional[Quiz]:
+    """
+    Find a quiz generated from exactly this article text and generation config.
+    A hit means the LLM call can be skipped.
+
+    Args:
+        db (Session): Database session
+        cache_key (str): Output of `build_cache_key`
+
+    Returns:
+        Optional[Quiz]: Matching quiz, if any
+    """
+    if not QuizCacheConfig.ENABLED:
+        return None
+
+    return db.query(Quiz).filter(
+        Quiz.cache_key == cache_key
+    ).order_by(desc(Quiz.date_generated)).first()
+
+
+def mark_validated(db: Session, quiz: Quiz) -> None:
+    """
+    Record that a cached quiz still matches the live article, restarting its TTL.
+
+    Args:
+        db (Session): Database session
+        quiz (Quiz): Cached quiz row
+    """
+    quiz.last_validated_at = datetime.utcnow()
+    db.commit()
+    logger.info(f"Revalidated cached quiz {quiz.id} for {quiz.normalized_url}")
@@ -0,0 +1,432 @@
+"""
+Map-reduce quiz generation for long articles.
+The map step asks the LLM for a few candidate questions per section (or
+group of short sections), with bounded concurrency, so wall-clock time
+follows the slowest section instead of the article length. The reduce step
+runs locally: it drops duplicate questions, balances difficulty across
+sections and assembles a quiz that satisfies QuizOutput. If the sections
+yield fewer questions than requested, the missing ones are asked for in
+one top-up call, as in single-call generation.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import re
+import time
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from pydantic import ValidationError
+
+from article_chunker import (
+    ArticleChunk,
+    build_article_context,
+    estimate_tokens,
+    fit_to_budget,
+    render_chunks,
+    split_sections,
+)
+from llm_client import LLMClient, LLMUnavailableError, get_llm_client
+from llm_quiz_generator import (
+    ProviderUnavailableError,
+    QuizGenerationConfig,
+    QuizGenerationError,
+    top_up_questions,
+)
+from llm_response_cache import cached_complete, discard_cached_response
+from models import QuizOptions, QuizOutput
+from prompt_templates import section_template
+from quiz_options import apply_quiz_options, difficulty_counts, omitted_parts
+from quiz_repair import DIFFICULTIES, parse_json_lenient, repair_question
+from structured_output import response_format
+
+logger = logging.getLogger(__name__)
+
+
+class MapReduceConfig:
+    # "single" (one completion), "map_reduce" (always) or "auto" (map-reduce
+    # for articles longer than MIN_ARTICLE_TOKENS)
+    MODE = os.getenv("QUIZ_GENERATION_MODE", "auto").lower()
+    MIN_ARTICLE_TOKENS = int(os.getenv("MAP_REDUCE_MIN_ARTICLE_TOKENS", "6000"))
+    # Article text per map call, and the most map calls per article
+    SECTION_TOKENS = int(os.getenv("MAP_REDUCE_SECTION_TOKENS", "1500"))
+    MAX_SECTIONS = int(os.getenv("MAP_REDUCE_MAX_SECTIONS", "8"))
+    # Concurrent map calls per article
+    CONCURRENCY = int(os.getenv("MAP_REDUCE_CONCURRENCY", "4"))
+    # Cap on the per-call budget, which follows the questions asked for
+    MAP_MAX_TOKENS = int(os.getenv("MAP_REDUCE_MAP_MAX_TOKENS", "1024"))
+    # Bump when the map prompt or the reduce step changes
+    VERSION = "1"
+
+
+# Questions sharing this much of their wording (Jaccard similarity of word sets) are duplicates
+DUPLICATE_SIMILARITY = 0.7
+
+WORD_PATTERN = re.compile(r"\w+")
+
+# Counters for the /metrics endpoint
+map_reduce_metrics = {
+    "runs": 0,
+    "map_calls": 0,
+    "map_failures": 0,
+    "candidates": 0,
+    "duplicates_dropped": 0,
+    "topups": 0,
+    "topup_questions": 0,
+    "seconds_total": 0.0,
+}
+
+
+class SectionResult(NamedTuple):
+    heading: str
+    summary: str
+    key_entities: dict
+    related_topics: List[str]
+    questions: List[dict]
+
+
+def use_map_reduce(article_content: str) -> bool:
+    """Whether an article (cleaned text) is generated with map-reduce under the configured mode."""
+    if MapReduceConfig.MODE == "map_reduce":
+        return True
+    if MapReduceConfig.MODE == "auto":
+        return estimate_tokens(article_content) > MapReduceConfig.MIN_ARTICLE_TOKENS
+    return False
+
+
+def plan_sections(article_content: str, headings: Sequence[str]) -> List[List[ArticleChunk]]:
+    """
+    Group an article's sections into at most about MAX_SECTIONS map calls.
+
+    Adjacent short sections share a call; each group is condensed to
+    SECTION_TOKENS.
+
+    Args:
+        article_content (str): Cleaned article text
+        headings (Sequence[str]): Section headings in document order
+
+    Returns:
+        List[List[ArticleChunk]]: Chunks for each map call, in article order
+    """
+    chunks = split_sections(article_content, headings)
+    total = sum(chunk.tokens for chunk in chunks)
+    group_tokens = max(MapReduceConfig.SECTION_TOKENS, math.ceil(total / max(MapReduceConfig.MAX_SECTIONS, 1)))
+
+    groups, current, size = [], [], 0
+    for chunk in chunks:
+        if current and size + chunk.tokens > group_tokens:
+            groups.append(current)
+            current, size = [], 0
+        current.append(chunk)
+        size += chunk.tokens
+    if current:
+        groups.append(current)
+    return [fit_to_budget(group, MapReduceConfig.SECTION_TOKENS) for group in groups]
+
+
+def _group_heading(group: Sequence[ArticleChunk]) -> str:
+    return "; ".join(chunk.heading or "Introduction" for chunk in group)
+
+
+def build_map_request(
+    article_title: str,
+    group: Sequence[ArticleChunk],
+    question_count: int,
+    omit: Tuple[str, ...] = ()
+) -> dict:
+    """
+    Chat completion arguments asking for candidate questions about one group
+    of sections, without the optional parts in `omit`.
+    """
+    budget = QuizGenerationConfig.BASE_TOKENS + question_count * QuizGenerationConfig.TOKENS_PER_QUESTION + sum(
+        tokens for part, tokens in QuizGenerationConfig.PART_TOKENS.items() if part not in omit
+    )
+    request = {
+        "model": QuizGenerationConfig.MODEL_NAME,
+        "messages": section_template(omit).messages(
+            article_title=article_title,
+            section=_group_heading(group),
+            question_count=question_count,
+            article_content=render_chunks(group),
+        ),
+        "temperature": QuizGenerationConfig.TEMPERATURE,
+        "max_tokens": min(math.ceil(budget * QuizGenerationConfig.TOKEN_HEADROOM), MapReduceConfig.MAP_MAX_TOKENS)
+    }
+    if QuizGenerationConfig.OUTPUT_MODE != "prompt":
+        request["response_format"] = response_format("json_object")
+    return request
+
+
+def parse_section_response(response_text: str, heading: str) -> SectionResult:
+    """
+    Parse a map response, repairing its JSON and answers, and keep the
+    questions that validate.
+
+    Raises:
+        ValueError: If the response holds no recoverable JSON object
+    """
+    data, _ = parse_json_lenient(response_text)
+    questions = []
+    for raw in data.get("quiz") if isinstance(data.get("quiz"), list) else []:
+        question, _ = repair_question(raw)
+        if question is None:
+            logger.warning(f"Skipping invalid candidate question for '{heading}'")
+            continue
+        questions.append(question)
+    entities = data.get("key_entities") if isinstance(data.get("key_entities"), dict) else {}
+    return SectionResult(
+        heading=heading,
+        summary=str(data.get("summary") or "").strip(),
+        key_entities=entities,
+        related_topics=[str(topic) for topic in data.get("related_topics") or []],
+        questions=questions,
+    )
+
+
+async def _map_section(
+    client: LLMClient,
+    semaphore: asyncio.Semaphore,
+    article_title: str,
+    group: Sequence[ArticleChunk],
+    question_count: int,
+    omit: Tuple[str, ...]
+) -> Optional[SectionResult]:
+    heading = _group_heading(group)
+    async with semaphore:
+        map_reduce_metrics["map_calls"] += 1
+        try:
+            request = build_map_request(article_title, group, question_count, omit)
+            response_text = await cached_complete(client, section_template(omit), request)
+            try:
+                return parse_section_response(response_text, heading)
+            except ValueError:
+                discard_cached_response(section_template(omit), request)
+                raise
+        except LLMUnavailableError:
+            raise
+        except Exception as e:
+            map_reduce_metrics["map_failures"] += 1
+            logger.warning(f"Map call for '{heading}' of {article_title} failed: {str(e)}")
+            return None
+
+
+def _words(text: str) -> set:
+    return set(WORD_PATTERN.findall(text.lower()))
+
+
+def _is_duplicate(question: dict, kept: Sequence[dict]) -> bool:
+    words = _words(question["question"])
+    answer = question["answer"].strip().lower()
+    for other in kept:
+        other_words = _words(other["question"])
+        similarity = len(words & other_words) / max(len(words | other_words), 1)
+        if similarity >= DUPLICATE_SIMILARITY:
+            return True
+        # Same fact asked twice: same correct answer and mostly the same options
+        if answer == other["answer"].strip().lower() and \
+                len({o.lower() for o in question["options"]} & {o.lower() for o in other["options"]}) >= 3:
+            return True
+    return False
+
+
+def select_questions(
+    candidates: Sequence[Sequence[dict]],
+    target: int,
+    wanted: Optional[Dict[str, int]] = None
+) -> List[dict]:
+    """
+    Pick the final questions from per-section candidates.
+
+    Drops near-duplicates, then takes sections in turn (so every section is
+    represented before any gets a second question), each time choosing the
+    section's candidate whose difficulty is furthest below its wanted count
+    (an even split by default). The result is in article order.
+
+    Args:
+        candidates (Sequence[Sequence[dict]]): Validated questions per section, in article order
+        target (int): Number of questions wanted
+        wanted (Dict[str, int], optional): Questions wanted per difficulty
+
+    Returns:
+        List[dict]: Up to `target` questions
+    """
+    unique: List[List[tuple]] = []
+    kept: List[dict] = []
+    for section_index, questions in enumerate(candidates):
+        section = []
+        for position, question in enumerate(questions):
+            if _is_duplicate(question, kept):
+                map_reduce_metrics["duplicates_dropped"] += 1
+                continue
+            kept.append(question)
+            section.append((section_index, position, question))
+        unique.append(section)
+
+    target = min(target, sum(len(section) for section in unique))
+    picked: List[tuple] = []
+    counts = {difficulty: 0 for difficulty in DIFFICULTIES}
+    while len(picked) < target:
+        for section in unique:
+            if not section or len(picked) >= target:
+                continue
+            # Difficulty furthest below its share of what has been picked so far
+            choice = min(
+                section,
+                key=lambda item: (counts[item[2]["difficulty"]] - (wanted or {}).get(item[2]["difficulty"], 0), item[1])
+            )
+            section.remove(choice)
+            counts[choice[2]["difficulty"]] += 1
+            picked.append(choice)
+    picked.sort(key=lambda item: (item[0], item[1]))
+    return [question for _, _, question in picked]
+
+
+def _merge_unique(values, limit: int) -> List[str]:
+    merged, seen = [], set()
+    for value in values:
+        value = str(value).strip()
+        if value and value.lower() not in seen:
+            seen.add(value.lower())
+            merged.append(value)
+    return merged[:limit]
+
+
+def reduce_quiz(
+    article_title: str,
+    results: Sequence[SectionResult],
+    sections: Sequence[str],
+    options: Optional[QuizOptions] = None,
+    questions: Optional[List[dict]] = None
+) -> dict:
+    """
+    Assemble the final quiz from the map results.
+
+    Args:
+        article_title (str): Article title
+        results (Sequence[SectionResult]): Successful map results, in article order
+        sections (Sequence[str]): Article section headings
+        options (QuizOptions, optional): Question count, difficulty mix and parts to include
+        questions (List[dict], optional): Questions already selected (and topped up);
+            selected from `results` when omitted
+
+    Returns:
+        dict: Quiz data validated against QuizOutput
+
+    Raises:
+        QuizGenerationError: If fewer usable questions than requested were generated
+    """
+    options = options or QuizOptions()
+    if questions is None:
+        questions = select_questions(
+            [result.questions for result in results], options.question_count, difficulty_counts(options)
+        )
+    if len(questions) < options.question_count:
+        raise QuizGenerationError(
+            f"Map-reduce produced only {len(questions)} of {options.question_count} "
+            f"requested questions for {article_title}"
+        )
+
+    summaries = [result.summary for result in results if result.summary]
+    quiz_data = {
+        "title": article_title,
+        "summary": " ".join(summaries[:3]) or article_title,
+        "key_entities": {
+            kind: _merge_unique(
+                (name for result in results for name in result.key_entities.get(kind) or []), 10
+            )
+            for kind in ("people", "organizations", "locations")
+        },
+        "sections": list(sections[:10]),
+        "quiz": questions,
+        "related_topics": _merge_unique(
+            (topic for result in results for topic in result.related_topics), 5
+        ),
+    }
+    try:
+        return apply_quiz_options(QuizOutput(**quiz_data).model_dump(), options)
+    except ValidationError as e:
+        raise QuizGenerationError(f"Quiz validation failed: {str(e)}")
+
+
+async def _top_up(
+    article_content: str,
+    headings: Sequence[str],
+    questions: List[dict],
+    missing: int,
+    options: QuizOptions
+) -> List[dict]:
+    """Questions to make up for a shortfall, from one call over the condensed article."""
+    map_reduce_metrics["topups"] += 1
+    try:
+        added = await top_up_questions(
+            build_article_context(article_content, headings), questions, missing, options.question_count
+        )
+    except LLMUnavailableError as e:
+        raise ProviderUnavailableError(f"Failed to generate quiz: {str(e)}", e.retry_after)
+    except Exception as e:
+        logger.warning(f"Map-reduce top-up failed: {str(e)}")
+        return []
+    added = added[:missing]
+    map_reduce_metrics["topup_questions"] += len(added)
+    return added
+
+
+async def generate_quiz_map_reduce(
+    article_content: str,
+    headings: Sequence[str],
+    article_title: str,
+    options: Optional[QuizOptions] = None
+) -> dict:
+    """
+    Generate a quiz for a long article with one LLM call per section group.
+
+    Args:
+        article_content (str): Cleaned article text
+        headings (Sequence[str]): Section headings in document order
+        article_title (str): Article title
+        options (QuizOptions, optional): Defaults to QuizOptions()
+
+    Returns:
+        dict: Quiz data in the same shape as `generate_quiz_async`
+
+    Raises:
+        QuizGenerationError: If the sections and the top-up together produced
+            fewer usable questions than requested
+    """
+    started = time.perf_counter()
+    groups = plan_sections(article_content, headings)
+    if not groups:
+        raise QuizGenerationError(f"No article content to generate a quiz for {article_title}")
+    options = options or QuizOptions()
+    # Over-generate so the reduce step has duplicates and difficulties to choose from
+    per_section = min(5, max(2, math.ceil(options.question_count * 1.5 / len(groups))))
+    logger.info(f"Map-reduce generation for {article_title}: {len(groups)} sections, {per_section} questions each")
+
+    map_reduce_metrics["runs"] += 1
+    semaphore = asyncio.Semaphore(max(MapReduceConfig.CONCURRENCY, 1))
+    try:
+        client = get_llm_client()
+        results = await asyncio.gather(*[
+            _map_section(client, semaphore, article_title, group, per_section, omitted_parts(options))
+            for group in groups
+        ])
+    except LLMUnavailableError as e:
+        raise ProviderUnavailableError(f"Failed to generate quiz: {str(e)}", e.retry_after)
+    except ValueError as e:
+        raise QuizGenerationError(f"Failed to generate quiz: {str(e)}")
+
+    results = [result for result in results if result is not None]
+    map_reduce_metrics["candidates"] += sum(len(result.questions) for result in results)
+    try:
+        questions = select_questions(
+            [result.questions for result in results], options.question_count, difficulty_counts(options)
+        )
+        missing = options.question_count - len(questions)
+        if missing > 0 and questions:
+            logger.info(f"Map-reduce for {article_title} is {missing} questions short, topping up")
+            questions = questions + await _top_up(article_content, headings, questions, missing, options)
+        sections = [chunk.heading for group in groups for chunk in group if chunk.heading]
+        return reduce_quiz(article_title, results, sections, options, questions)
+    finally:
+        map_reduce_metrics["seconds_total"] += time.perf_counter() - started
@@ -0,0 +1,87 @@
+"""
+Per-request quiz options (GenerateQuizRequest.question_count,
+difficulty_mix, include_*): what they mean for the prompt, the generated
+quiz and the cache key.
+"""
+
+import math
+from typing import Dict, Optional, Tuple
+
+from models import QuizOptions
+from quiz_repair import DIFFICULTIES
+
+# Parts of QuizOutput a request may leave out, with the option that includes each
+OPTIONAL_PARTS = {
+    "summary": "include_summary",
+    "key_entities": "include_key_entities",
+    "sections": "include_sections",
+    "related_topics": "include_related_topics",
+}
+
+DEFAULT_OPTIONS = QuizOptions()
+
+
+def omitted_parts(options: Optional[QuizOptions]) -> Tuple[str, ...]:
+    """QuizOutput fields the options leave out, in a stable order."""
+    options = options or DEFAULT_OPTIONS
+    return tuple(part for part, flag in OPTIONAL_PARTS.items() if not getattr(options, flag))
+
+
+def difficulty_counts(options: Optional[QuizOptions]) -> Optional[Dict[str, int]]:
+    """
+    Number of questions of each difficulty for the options' difficulty mix.
+
+    Shares are scaled to the question count and rounded by largest
+    remainder, so the counts always add up to `question_count`.
+
+    Returns:
+        Optional[Dict[str, int]]: Count per difficulty, or None when no mix was asked for
+    """
+    options = options or DEFAULT_OPTIONS
+    if not options.difficulty_mix:
+        return None
+    total = sum(options.difficulty_mix.values())
+    exact = {
+        difficulty: options.difficulty_mix.get(difficulty, 0) * options.question_count / total
+        for difficulty in DIFFICULTIES
+    }
+    counts = {difficulty: math.floor(share) for difficulty, share in exact.items()}
+    by_remainder = sorted(DIFFICULTIES, key=lambda difficulty: counts[difficulty] - exact[difficulty])
+    for difficulty in by_remainder[:options.question_count - sum(counts.values())]:
+        counts[difficulty] += 1
+    return counts
+
+
+def describe_difficulty(options: Optional[QuizOptions]) -> str:
+    """Difficulty instruction for the prompt, e.g. "2 easy, 3 medium and 0 hard"."""
+    counts = difficulty_counts(options)
+    if counts is None:
+        return "a mix of easy, medium and hard"
+    parts = [f"{count} {difficulty}" for difficulty, count in counts.items()]
+    return ", ".join(parts[:-1]) + " and " + parts[-1]
+
+
+def options_fingerprint(options: Optional[QuizOptions]) -> str:
+    """The options in a canonical form, for generation fingerprints."""
+    options = options or DEFAULT_OPTIONS
+    counts = difficulty_counts(options)
+    mix = ",".join(f"{difficulty}={count}" for difficulty, count in counts.items()) if counts else "mixed"
+    return f"questions-{options.question_count}|difficulty-{mix}|omit-{','.join(omitted_parts(options))}"
+
+
+def apply_quiz_options(quiz_data: dict, options: Optional[QuizOptions]) -> dict:
+    """
+    Trim generated quiz data to the options: at most `question_count`
+    questions, and the omitted parts empty even if the LLM wrote them.
+    """
+    options = options or DEFAULT_OPTIONS
+    quiz_data = {**quiz_data, "quiz": quiz_data["quiz"][:options.question_count]}
+    empty = {
+        "summary": "",
+        "key_entities": {"people": [], "organizations": [], "locations": []},
+        "sections": [],
+        "related_topics": [],
+    }
+    for part in omitted_parts(options):
+        quiz_data[part] = empty[part]
+    return quiz_data
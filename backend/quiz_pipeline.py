@@ -0,0 +1,460 @@
+"""
+Quiz generation pipeline: cache lookup, scrape, LLM generation and persistence.
+Shared by the single-article, batch, streaming and background-job entry points.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from article_chunker import build_article_context
+from content_store import get_content_store
+from database import SessionLocal, Quiz
+from scraper import ScrapedArticle, scrape_article_async, fetch_revision_id_async
+from llm_quiz_generator import ProviderUnavailableError, generate_quiz_async, stream_quiz_async
+from models import QuizOptions
+from quiz_cache import (
+    normalize_article_url,
+    hash_content,
+    generation_fingerprint,
+    generation_key,
+    build_cache_key,
+    find_fresh_quiz,
+    find_latest_quiz,
+    find_quiz_by_key,
+    mark_validated,
+)
+from quiz_map_reduce import generate_quiz_map_reduce, use_map_reduce
+from quiz_records import apply_quiz_data, load_quiz_data
+from quiz_stats import record_quiz
+from single_flight import SingleFlight, db_generation_lock
+
+logger = logging.getLogger(__name__)
+
+# Coalesces concurrent generations for the same article
+generation_flights = SingleFlight()
+
+# Time-to-first-question of streamed generations, for the /metrics endpoint
+streaming_metrics = {
+    "streams": 0,
+    "first_question_count": 0,
+    "first_question_seconds_total": 0.0,
+    "first_question_seconds_max": 0.0,
+}
+
+
+async def generate_quiz_for_url(
+    url: str,
+    force_refresh: bool = False,
+    scrape_limiter=None,
+    llm_limiter=None,
+    options: Optional[QuizOptions] = None
+) -> Tuple[dict, str]:
+    """
+    Generate (or reuse) the quiz for an article, coalescing with any
+    identical generation already in flight.
+    
+    Args:
+        url (str): Wikipedia article URL
+        force_refresh (bool): Skip the quiz cache
+        scrape_limiter: Optional async context manager (e.g. a semaphore) held while scraping
+        llm_limiter: Optional async context manager held while calling the LLM
+        options (QuizOptions, optional): Question count, difficulty mix and
+            optional parts; quizzes are cached per options
+    
+    Returns:
+        Tuple[dict, str]: (response body, "hit", "miss" or "coalesced")
+    
+    Raises:
+        ValueError: Invalid URL, extraction or LLM output
+    """
+    normalized_url = normalize_article_url(url)
+    flight_key = f"{generation_key(normalized_url, options)}:{int(force_refresh)}"
+    
+    (quiz_response, cache_status), shared = await generation_flights.do(
+        flight_key,
+        lambda: run_generation_pipeline(url, normalized_url, force_refresh, scrape_limiter, llm_limiter, options)
+    )
+    
+    # Followers may have asked with a different spelling of the same URL
+    return {**quiz_response, "url": url}, "coalesced" if shared else cache_status
+
+
+async def run_generation_pipeline(
+    url: str,
+    normalized_url: str,
+    force_refresh: bool,
+    scrape_limiter=None,
+    llm_limiter=None,
+    options: Optional[QuizOptions] = None
+) -> Tuple[dict, str]:
+    """
+    Cache lookup, scrape, LLM generation and persistence for one article.
+    Network I/O is awaited and database work runs in the thread pool, so
+    the event loop stays free for other requests while this is in flight.
+    
+    Returns:
+        Tuple[dict, str]: (response body, "hit" or "miss")
+    """
+    async with db_generation_lock(generation_key(normalized_url, options)):
+        if not force_refresh:
+            cached_response = await _find_cached_response(normalized_url, url, options)
+            if cached_response:
+                return cached_response, "hit"
+        
+        # Step 1: Scrape Wikipedia
+        article = await _scrape(url, scrape_limiter)
+        
+        # Reuse a quiz generated from identical article text and config
+        content_hash = hash_content(article.cleaned_content)
+        cache_key = build_cache_key(normalized_url, content_hash, generation_fingerprint(options))
+        if not force_refresh:
+            cached_response = await run_in_threadpool(_find_response_by_key, cache_key, url)
+            if cached_response:
+                logger.info(f"Cache hit (content) for {normalized_url}: quiz {cached_response['id']}")
+                return cached_response, "hit"
+        
+        # Step 2: Generate quiz using LLM
+        logger.info("Step 2: Generating quiz with LLM...")
+        async with llm_limiter or nullcontext():
+            quiz_data = await _generate(article, options)
+        logger.info("Successfully generated quiz")
+        
+        # Step 3: Save to database
+        response = await _store_quiz(url, normalized_url, article, content_hash, cache_key, quiz_data, options)
+        return response, "miss"
+
+
+async def stream_quiz_for_url(
+    url: str,
+    force_refresh: bool = False,
+    options: Optional[QuizOptions] = None
+) -> AsyncIterator[dict]:
+    """
+    Generate (or reuse) the quiz for an article, yielding questions as the
+    LLM produces them.
+    
+    Uses the same cache lookups and cross-worker lock as `generate_quiz_for_url`
+    and stores exactly the quiz the non-streaming path would. It does not
+    join in-process single-flight groups, since a follower would have no
+    tokens to stream until the leader finished. Articles generated with
+    map-reduce are not streamed: their questions are sent once the reduce
+    step has selected them.
+    
+    Args:
+        url (str): Wikipedia article URL
+        force_refresh (bool): Skip the quiz cache
+        options (QuizOptions, optional): Question count, difficulty mix and optional parts
+    
+    Yields:
+        dict: {"type": "question", "index", "question"} per question, then
+              {"type": "quiz", "cache": "hit" or "miss", "quiz": response body}
+    
+    Raises:
+        ValueError: Invalid URL, extraction or LLM output
+    """
+    normalized_url = normalize_article_url(url)
+    started = time.perf_counter()
+    
+    async with db_generation_lock(generation_key(normalized_url, options)):
+        cached_response = None
+        if not force_refresh:
+            cached_response = await _find_cached_response(normalized_url, url, options)
+        
+        if not cached_response:
+            article = await _scrape(url)
+            content_hash = hash_content(article.cleaned_content)
+            cache_key = build_cache_key(normalized_url, content_hash, generation_fingerprint(options))
+            if not force_refresh:
+                cached_response = await run_in_threadpool(_find_response_by_key, cache_key, url)
+        
+        if cached_response:
+            for index, question in enumerate(cached_response.get("quiz", [])):
+                yield {"type": "question", "index": index, "question": question}
+            yield {"type": "quiz", "cache": "hit", "quiz": cached_response}
+            return
+        
+        if use_map_reduce(article.cleaned_content):
+            # Same generation as the non-streaming path; nothing to stream until the reduce step
+            logger.info("Step 2: Generating quiz with map-reduce...")
+            quiz_data = await _generate(article, options)
+            for index, question in enumerate(quiz_data["quiz"]):
+                yield {"type": "question", "index": index, "question": question}
+        else:
+            logger.info("Step 2: Streaming quiz from LLM...")
+            streaming_metrics["streams"] += 1
+            quiz_data = None
+            async for event in stream_quiz_async(article_prompt_content(article), article.title, options):
+                if event["type"] == "quiz":
+                    quiz_data = event["quiz_data"]
+                    continue
+                if event["index"] == 0:
+                    _record_first_question(time.perf_counter() - started)
+                yield event
+        logger.info("Successfully generated quiz")
+        
+        response = await _store_quiz(url, normalized_url, article, content_hash, cache_key, quiz_data, options)
+        yield {"type": "quiz", "cache": "miss", "quiz": response}
+
+
+def _record_first_question(seconds: float) -> None:
+    streaming_metrics["first_question_count"] += 1
+    streaming_metrics["first_question_seconds_total"] += seconds
+    streaming_metrics["first_question_seconds_max"] = max(
+        streaming_metrics["first_question_seconds_max"], seconds
+    )
+    logger.info(f"First streamed question after {seconds:.2f}s")
+
+
+async def _find_cached_response(
+    normalized_url: str,
+    url: str,
+    options: Optional[QuizOptions] = None
+) -> Optional[dict]:
+    """Cache lookups that do not need the article text."""
+    # Serve a recently validated quiz without touching Wikipedia
+    cached_response = await run_in_threadpool(_find_fresh_response, normalized_url, url, options)
+    if cached_response:
+        logger.info(f"Cache hit (fresh) for {normalized_url}: quiz {cached_response['id']}")
+        return cached_response
+    
+    # Expired: if the article's revision is unchanged, reuse without downloading it
+    cached_response = await _find_response_by_revision(normalized_url, url, options)
+    if cached_response:
+        logger.info(f"Cache hit (revision) for {normalized_url}: quiz {cached_response['id']}")
+    return cached_response
+
+
+async def _scrape(url: str, scrape_limiter=None) -> ScrapedArticle:
+    logger.info("Step 1: Scraping Wikipedia...")
+    async with scrape_limiter or nullcontext():
+        article = await scrape_article_async(url)
+    logger.info(f"Successfully scraped: {article.title}")
+    return article
+
+
+async def _store_quiz(
+    url: str,
+    normalized_url: str,
+    article: ScrapedArticle,
+    content_hash: str,
+    cache_key: str,
+    quiz_data: dict,
+    options: Optional[QuizOptions] = None
+) -> dict:
+    """Save a newly generated quiz and build the response body."""
+    logger.info("Step 3: Saving to database...")
+    scraped_content, scraped_content_ref = article.raw_content, None
+    store = get_content_store()
+    if store is not None and scraped_content:
+        stored = await run_in_threadpool(store.put, scraped_content.encode("utf-8"))
+        scraped_content, scraped_content_ref = None, stored.ref
+    
+    quiz_record = Quiz(
+        url=url,
+        title=quiz_data.get("title", article.title),
+        date_generated=datetime.utcnow(),
+        scraped_content=scraped_content,  # Bonus: raw HTML, unless in the content store
+        scraped_content_ref=scraped_content_ref,
+        normalized_url=normalized_url,
+        content_hash=content_hash,
+        generation_config=generation_fingerprint(options),
+        cache_key=cache_key,
+        last_validated_at=datetime.utcnow(),
+        revision_id=article.revision_id
+    )
+    apply_quiz_data(quiz_record, quiz_data)  # Also renders full_quiz_data from the rows
+    quiz_id = await run_in_threadpool(_save_quiz, quiz_record)
+    logger.info(f"Quiz saved with ID: {quiz_id}")
+    
+    # Return the generated quiz with metadata
+    return {
+        "id": quiz_id,
+        "url": url,
+        **quiz_data
+    }
+
+
+def _find_fresh_response(normalized_url: str, url: str, options: Optional[QuizOptions]) -> Optional[dict]:
+    with SessionLocal() as db:
+        cached_quiz = find_fresh_quiz(db, normalized_url, options)
+        return _cached_quiz_response(cached_quiz, url) if cached_quiz else None
+
+
+async def _find_response_by_revision(normalized_url: str, url: str, options: Optional[QuizOptions]) -> Optional[dict]:
+    latest = await run_in_threadpool(_find_latest_revision, normalized_url, options)
+    if not latest:
+        return None
+    quiz_id, stored_revision = latest
+    current_revision = await fetch_revision_id_async(url)
+    if current_revision is None or current_revision != stored_revision:
+        return None
+    return await run_in_threadpool(_revalidate_response, quiz_id, url)
+
+
+def _find_latest_revision(normalized_url: str, options: Optional[QuizOptions]) -> Optional[Tuple[int, int]]:
+    with SessionLocal() as db:
+        latest_quiz = find_latest_quiz(db, normalized_url, options)
+        if not latest_quiz or latest_quiz.revision_id is None:
+            return None
+        return latest_quiz.id, latest_quiz.revision_id
+
+
+def _revalidate_response(quiz_id: int, url: str) -> Optional[dict]:
+    with SessionLocal() as db:
+        cached_quiz = db.get(Quiz, quiz_id)
+        if not cached_quiz:
+            return None
+        mark_validated(db, cached_quiz)
+        return _cached_quiz_response(cached_quiz, url)
+
+
+def _find_response_by_key(cache_key: str, url: str) -> Optional[dict]:
+    with SessionLocal() as db:
+        cached_quiz = find_quiz_by_key(db, cache_key)
+        if not cached_quiz:
+            return None
+        mark_validated(db, cached_quiz)
+        return _cached_quiz_response(cached_quiz, url)
+
+
+def _save_quiz(quiz_record: Quiz) -> int:
+    with SessionLocal() as db:
+        db.add(quiz_record)
+        record_quiz(db, quiz_record)
+        db.commit()
+        return quiz_record.id
+
+
+async def _generate(article: ScrapedArticle, options: Optional[QuizOptions] = None) -> dict:
+    """One completion for the whole article, or map-reduce over its sections if it is long."""
+    if use_map_reduce(article.cleaned_content):
+        return await generate_quiz_map_reduce(article.cleaned_content, article.sections, article.title, options)
+    return await generate_quiz_async(article_prompt_content(article), article.title, options)
+
+
+def article_prompt_content(article: ScrapedArticle) -> str:
+    """
+    Article text sent to the LLM: every section, condensed to the token budget.
+
+    Args:
+        article (ScrapedArticle): Scraped article
+
+    Returns:
+        str: Prompt content for the quiz generator
+    """
+    return build_article_context(article.cleaned_content, article.sections)
+
+
+def _cached_quiz_response(quiz: Quiz, url: str) -> dict:
+    """Build the /generate_quiz response body from a stored quiz row."""
+    return {
+        "id": quiz.id,
+        "url": url,
+        **load_quiz_data(quiz)
+    }
+
+
+class BatchConfig:
+    MAX_URLS = int(os.getenv("BATCH_MAX_URLS", "2000"))
+    # Default concurrent scrapes / LLM calls per batch; requests may ask for
+    # fewer or more, up to the MAX_* ceilings
+    SCRAPE_CONCURRENCY = int(os.getenv("BATCH_SCRAPE_CONCURRENCY", "8"))
+    LLM_CONCURRENCY = int(os.getenv("BATCH_LLM_CONCURRENCY", "4"))
+    MAX_SCRAPE_CONCURRENCY = int(os.getenv("BATCH_MAX_SCRAPE_CONCURRENCY", "32"))
+    MAX_LLM_CONCURRENCY = int(os.getenv("BATCH_MAX_LLM_CONCURRENCY", "16"))
+
+
+def dedupe_urls(urls: List[str]) -> List[Tuple[int, str]]:
+    """
+    Drop URLs that normalize to an article already in the list, keeping the first spelling.
+
+    Args:
+        urls (List[str]): Requested article URLs
+
+    Returns:
+        List[Tuple[int, str]]: (position in `urls`, URL) for each unique article
+    """
+    seen = set()
+    unique = []
+    for index, url in enumerate(urls):
+        normalized_url = normalize_article_url(url)
+        if normalized_url not in seen:
+            seen.add(normalized_url)
+            unique.append((index, url))
+    return unique
+
+
+async def generate_quiz_batch(
+    urls: List[str],
+    force_refresh: bool = False,
+    scrape_concurrency: Optional[int] = None,
+    llm_concurrency: Optional[int] = None,
+    options: Optional[QuizOptions] = None
+) -> AsyncIterator[dict]:
+    """
+    Generate quizzes for many articles, yielding each result as soon as it finishes.
+
+    Scraping and LLM generation are bounded by separate semaphores, so slow
+    LLM calls do not hold back scraping of the next articles. Items in
+    progress, including their cache lookups and revision checks, are
+    bounded by the sum of the two limits, so a large batch does not fire
+    every lookup at once. A failed item is reported in its result and
+    does not stop the rest of the batch.
+
+    Args:
+        urls (List[str]): Article URLs; duplicates are dropped and `index` in
+            each result is the position of the first occurrence
+        force_refresh (bool): Skip the quiz cache
+        scrape_concurrency (int, optional): Concurrent scrapes
+        llm_concurrency (int, optional): Concurrent LLM calls
+        options (QuizOptions, optional): Quiz options for every article
+
+    Yields:
+        dict: {"index", "url", "status": "ok", "cache", "quiz"} or
+              {"index", "url", "status": "error", "status_code", "error"}
+    """
+    scrape_limit = min(scrape_concurrency or BatchConfig.SCRAPE_CONCURRENCY, BatchConfig.MAX_SCRAPE_CONCURRENCY)
+    llm_limit = min(llm_concurrency or BatchConfig.LLM_CONCURRENCY, BatchConfig.MAX_LLM_CONCURRENCY)
+    scrape_limiter = asyncio.Semaphore(scrape_limit)
+    llm_limiter = asyncio.Semaphore(llm_limit)
+    # Enough items in progress to keep both stages busy, no more
+    item_limiter = asyncio.Semaphore(scrape_limit + llm_limit)
+
+    async def run_item(index: int, url: str) -> dict:
+        try:
+            async with item_limiter:
+                quiz_response, cache_status = await generate_quiz_for_url(
+                    url, force_refresh, scrape_limiter, llm_limiter, options
+                )
+            return {"index": index, "url": url, "status": "ok", "cache": cache_status, "quiz": quiz_response}
+        except ProviderUnavailableError as e:
+            logger.warning(f"Batch item rejected for {url}: {str(e)}")
+            return {"index": index, "url": url, "status": "error", "status_code": 503, "error": str(e)}
+        except ValueError as e:
+            logger.warning(f"Batch item failed for {url}: {str(e)}")
+            return {"index": index, "url": url, "status": "error", "status_code": 400, "error": str(e)}
+        except Exception as e:
+            logger.error(f"Batch item failed for {url}: {str(e)}", exc_info=True)
+            return {
+                "index": index,
+                "url": url,
+                "status": "error",
+                "status_code": 500,
+                "error": f"Failed to generate quiz: {str(e)}",
+            }
+
+    tasks = [asyncio.create_task(run_item(index, url)) for index, url in dedupe_urls(urls)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        # Client went away or the consumer stopped early
+        for task in tasks:
+            task.cancel()
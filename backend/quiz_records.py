@@ -0,0 +1,184 @@
+"""
+Conversion between generated quiz data and the normalized quiz tables.
+Quiz data is stored as rows in questions, entities, sections and
+related_topics, and rebuilt into the exact dict the API has always
+returned (the same keys, in the same order, as the full_quiz_data JSON).
+
+The rows are the source of truth. For normalized quizzes, full_quiz_data
+is a serving copy rendered from them by `apply_quiz_data`, so the
+/quiz/{id} fast path can return it without loading the child rows; it is
+never written any other way.
+"""
+
+import json
+from typing import List
+
+from sqlalchemy.orm import selectinload
+
+from database import Quiz, Question, Entity, Section, RelatedTopic
+from fast_json import loads
+
+# Bump if the normalized layout changes in a way that needs another backfill
+QUIZ_DATA_VERSION = 1
+
+ENTITY_KINDS = ("people", "organizations", "locations")
+
+
+def apply_quiz_data(quiz: Quiz, quiz_data: dict) -> None:
+    """
+    Store quiz data in the normalized columns and child rows of a quiz,
+    and render full_quiz_data from those rows.
+
+    Args:
+        quiz (Quiz): Quiz row (new or existing) with its title set
+        quiz_data (dict): Validated quiz data as returned by the generator
+    """
+    quiz.summary = quiz_data.get("summary")
+    quiz.question_count = len(quiz_data.get("quiz", []))
+    quiz.questions = [
+        Question(
+            position=position,
+            question=question["question"],
+            options=json.dumps(question["options"]),
+            answer=question["answer"],
+            difficulty=question["difficulty"],
+            explanation=question["explanation"],
+        )
+        for position, question in enumerate(quiz_data.get("quiz", []))
+    ]
+    key_entities = quiz_data.get("key_entities") or {}
+    quiz.entities = [
+        Entity(kind=kind, position=position, name=name)
+        for kind in ENTITY_KINDS
+        for position, name in enumerate(key_entities.get(kind, []))
+    ]
+    quiz.sections = [
+        Section(position=position, name=name)
+        for position, name in enumerate(quiz_data.get("sections", []))
+    ]
+    quiz.related_topics = [
+        RelatedTopic(position=position, name=name)
+        for position, name in enumerate(quiz_data.get("related_topics", []))
+    ]
+    quiz.quiz_data_version = QUIZ_DATA_VERSION
+    # Serving copy for quiz_detail_payload, derived from the rows just built
+    quiz.full_quiz_data = json.dumps(quiz_data_from_rows(quiz))
+
+
+def quiz_data_from_rows(quiz: Quiz) -> dict:
+    """
+    Rebuild the quiz data dict from the normalized rows.
+
+    Args:
+        quiz (Quiz): Quiz row with quiz_data_version set
+
+    Returns:
+        dict: Same structure and key order as the generator output
+    """
+    key_entities = {kind: [] for kind in ENTITY_KINDS}
+    for entity in quiz.entities:
+        key_entities[entity.kind].append(entity.name)
+
+    return {
+        "title": quiz.title,
+        "summary": quiz.summary,
+        "key_entities": key_entities,
+        "sections": [section.name for section in quiz.sections],
+        "quiz": [
+            {
+                "question": question.question,
+                "options": json.loads(question.options),
+                "answer": question.answer,
+                "difficulty": question.difficulty,
+                "explanation": question.explanation,
+            }
+            for question in quiz.questions
+        ],
+        "related_topics": [topic.name for topic in quiz.related_topics],
+    }
+
+
+def load_quiz_data(quiz: Quiz) -> dict:
+    """
+    Quiz data for a row, from the normalized tables or, for rows not yet
+    backfilled, from the legacy JSON column.
+
+    Args:
+        quiz (Quiz): Quiz row
+
+    Returns:
+        dict: Quiz data (title, summary, key_entities, sections, quiz, related_topics)
+    """
+    if quiz.quiz_data_version == QUIZ_DATA_VERSION:
+        return quiz_data_from_rows(quiz)
+    return json.loads(quiz.full_quiz_data)
+
+
+def is_pipeline_quiz(quiz) -> bool:
+    """
+    Whether a row was written by the generation pipeline, whose output is
+    validated before it is stored, so it can be served without validating
+    it again. Legacy rows predate the generation fingerprint.
+
+    Args:
+        quiz: Quiz row, or a row tuple with a generation_config column
+    """
+    return quiz.generation_config is not None
+
+
+def quiz_detail_payload(quiz) -> dict:
+    """
+    The /quiz/{id} response body of a pipeline quiz as plain data, in
+    QuizDetailResponse field order, straight from the stored JSON.
+
+    Args:
+        quiz: Quiz row, or a row tuple with id, url, title, date_generated
+            and full_quiz_data, for which `is_pipeline_quiz` is True
+
+    Returns:
+        dict: Ready to encode with `fast_json.dumps`
+    """
+    quiz_data = loads(quiz.full_quiz_data)
+    return {
+        "id": quiz.id,
+        "url": quiz.url,
+        "title": quiz.title,
+        "date_generated": quiz.date_generated,
+        "summary": quiz_data.get("summary"),
+        "key_entities": quiz_data.get("key_entities"),
+        "sections": quiz_data.get("sections"),
+        "quiz": quiz_data.get("quiz", []),
+        "related_topics": quiz_data.get("related_topics"),
+    }
+
+
+def quiz_data_options() -> List:
+    """Loader options that fetch a quiz's child rows in a few batched queries."""
+    return [
+        selectinload(Quiz.questions),
+        selectinload(Quiz.entities),
+        selectinload(Quiz.sections),
+        selectinload(Quiz.related_topics),
+    ]
+
+
+def round_trips(quiz_data: dict, title: str) -> bool:
+    """
+    Whether storing quiz data in the normalized tables reproduces it exactly.
+    False for legacy payloads with extra or missing keys, which then stay
+    in the JSON column.
+
+    Args:
+        quiz_data (dict): Quiz data as stored in full_quiz_data
+        title (str): Quiz.title of the row
+
+    Returns:
+        bool: True if the rows would rebuild an identical payload
+    """
+    try:
+        probe = Quiz(title=title)
+        apply_quiz_data(probe, quiz_data)
+        rebuilt = quiz_data_from_rows(probe)
+    except (KeyError, TypeError, AttributeError):
+        return False
+    return json.dumps(rebuilt) == json.dumps(quiz_data)
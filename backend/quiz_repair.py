@@ -0,0 +1,313 @@
+"""
+Repair of almost-valid LLM quiz output.
+Recovers JSON with trailing commas or a truncated tail, matches answers
+that differ from their option only in formatting ("A) Paris", "paris.",
+"B"), and drops questions that cannot be saved instead of rejecting the
+whole quiz, so a small defect costs a short top-up request for the
+missing questions rather than a full regeneration.
+"""
+
+import difflib
+import json
+import logging
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+from pydantic import ValidationError
+
+from models import QuizQuestion
+
+logger = logging.getLogger(__name__)
+
+
+DIFFICULTIES = ("easy", "medium", "hard")
+MIN_QUESTIONS, MAX_QUESTIONS = 5, 10
+# Similarity (difflib ratio) above which an answer is taken to mean an option
+ANSWER_MATCH_CUTOFF = 0.85
+# Truncation points tried, from the end of the text, before giving up
+MAX_TRUNCATION_ATTEMPTS = 64
+
+# "A) Paris", "(b) Paris", "C. Paris", "Option D: Paris"
+OPTION_PREFIX_PATTERN = re.compile(r"^\s*(?:option\s+)?\(?([A-Da-d])\s*[).:\-]\s+", re.IGNORECASE)
+# An answer given as just the letter: "B", "b)", "Option C"
+ANSWER_LETTER_PATTERN = re.compile(r"^\s*(?:option\s+)?\(?([A-Da-d])\)?[.:]?\s*$", re.IGNORECASE)
+
+# Counters for the /metrics endpoint
+repair_metrics = {
+    "responses": 0,
+    "clean": 0,
+    "repaired": 0,
+    "json_repaired": 0,
+    "answers_fixed": 0,
+    "questions_dropped": 0,
+    "topups": 0,
+    "topup_questions": 0,
+    "failed": 0,
+}
+
+
+class RepairReport(NamedTuple):
+    answers_fixed: int
+    questions_dropped: int
+
+
+def _strip_fences(text: str) -> str:
+    text = text.strip()
+    if text.startswith("```"):
+        text = text[3:]
+        if text.lower().startswith("json"):
+            text = text[4:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip()
+
+
+def _strip_trailing_commas(text: str) -> str:
+    """Remove commas directly before a closing bracket, outside strings."""
+    result = []
+    in_string = escaped = False
+    for index, character in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif character == "\\":
+                escaped = True
+            elif character == '"':
+                in_string = False
+        elif character == '"':
+            in_string = True
+        elif character == ",":
+            following = text[index + 1:].lstrip()[:1]
+            if following in ("]", "}"):
+                continue
+        result.append(character)
+    return "".join(result)
+
+
+def _close_truncated(text: str) -> Optional[dict]:
+    """
+    Parse JSON that was cut off mid-way by dropping the incomplete tail
+    and closing the containers left open.
+
+    Cut points are the ends of complete values: just before a "," or just
+    after a closing bracket. The latest one that parses wins.
+    """
+    closers = {"{": "}", "[": "]"}
+    stack: List[str] = []
+    cut_points: List[Tuple[int, Tuple[str, ...]]] = []
+    in_string = escaped = False
+    for index, character in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif character == "\\":
+                escaped = True
+            elif character == '"':
+                in_string = False
+        elif character == '"':
+            in_string = True
+        elif character in closers:
+            stack.append(character)
+        elif character in "}]":
+            if stack:
+                stack.pop()
+            cut_points.append((index + 1, tuple(stack)))
+        elif character == ",":
+            cut_points.append((index, tuple(stack)))
+
+    for end, open_containers in reversed(cut_points[-MAX_TRUNCATION_ATTEMPTS:]):
+        if not open_containers:
+            continue
+        candidate = text[:end] + "".join(closers[opener] for opener in reversed(open_containers))
+        try:
+            data = json.loads(candidate)
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            return data
+    return None
+
+
+def parse_json_lenient(response_text: str) -> Tuple[dict, bool]:
+    """
+    Parse the JSON object in an LLM response, repairing it if needed.
+
+    Args:
+        response_text (str): Raw completion text
+
+    Returns:
+        Tuple[dict, bool]: The object, and whether it had to be repaired
+
+    Raises:
+        ValueError: If no JSON object can be recovered
+    """
+    text = _strip_fences(response_text)
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("No valid JSON found in LLM response")
+    text = text[start:]
+    end = text.rfind("}")
+    if end != -1:
+        try:
+            data = json.loads(text[:end + 1])
+            if isinstance(data, dict):
+                return data, False
+        except ValueError:
+            pass
+
+    text = _strip_trailing_commas(text)
+    if end != -1:
+        try:
+            data = json.loads(text[:text.rfind("}") + 1])
+            if isinstance(data, dict):
+                return data, True
+        except ValueError:
+            pass
+    data = _close_truncated(text)
+    if data is None:
+        raise ValueError("No valid JSON found in LLM response")
+    return data, True
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join(str(text).lower().split()).strip(" .")
+
+
+def _strip_option_prefixes(options: List[str]) -> List[str]:
+    """Drop "A) " style prefixes when every option carries its own letter in order."""
+    letters = [OPTION_PREFIX_PATTERN.match(option) for option in options]
+    if all(letters) and [match.group(1).upper() for match in letters] == list("ABCD"[:len(options)]):
+        return [option[match.end():].strip() for option, match in zip(options, letters)]
+    return options
+
+
+def match_answer(answer: str, options: List[str]) -> Optional[str]:
+    """
+    The option an answer refers to.
+
+    Args:
+        answer (str): Answer as generated
+        options (List[str]): The question's options
+
+    Returns:
+        Optional[str]: The matching option text, or None if no option matches closely enough
+    """
+    if answer in options:
+        return answer
+    by_text = {_normalize_text(option): option for option in options}
+    for candidate in (answer, OPTION_PREFIX_PATTERN.sub("", answer, count=1)):
+        if _normalize_text(candidate) in by_text:
+            return by_text[_normalize_text(candidate)]
+
+    letter = ANSWER_LETTER_PATTERN.match(answer)
+    if letter and len(options) == 4:
+        return options["ABCD".index(letter.group(1).upper())]
+
+    close = difflib.get_close_matches(
+        _normalize_text(OPTION_PREFIX_PATTERN.sub("", answer, count=1)),
+        list(by_text),
+        n=2,
+        cutoff=ANSWER_MATCH_CUTOFF,
+    )
+    # Two options both close to the answer: too ambiguous to guess
+    if len(close) == 1:
+        return by_text[close[0]]
+    return None
+
+
+def repair_question(raw) -> Tuple[Optional[dict], bool]:
+    """
+    Validate one generated question, fixing what can be fixed.
+
+    Returns:
+        Tuple[Optional[dict], bool]: The QuizQuestion data (None if it
+            cannot be saved), and whether its answer had to be matched
+    """
+    if not isinstance(raw, dict):
+        return None, False
+    options = raw.get("options")
+    if not isinstance(options, list):
+        return None, False
+    options = _strip_option_prefixes([str(option).strip() for option in options if str(option).strip()])
+    # Duplicate options make the question ambiguous; more than 4 cannot be trimmed safely
+    if len(options) != 4 or len({_normalize_text(option) for option in options}) != 4:
+        return None, False
+
+    answer = str(raw.get("answer") or "").strip()
+    matched = match_answer(answer, options)
+    if matched is None:
+        return None, False
+
+    difficulty = str(raw.get("difficulty") or "").strip().lower()
+    question = {
+        "question": str(raw.get("question") or "").strip(),
+        "options": options,
+        "answer": matched,
+        "difficulty": difficulty if difficulty in DIFFICULTIES else "medium",
+        "explanation": str(raw.get("explanation") or "").strip(),
+    }
+    if not question["question"]:
+        return None, False
+    try:
+        return QuizQuestion(**question).model_dump(), matched != answer
+    except ValidationError:
+        return None, False
+
+
+def repair_quiz_data(data: dict, article_title: str) -> Tuple[dict, RepairReport]:
+    """
+    Repair the fields of a parsed quiz so that it can validate as QuizOutput,
+    apart from possibly having too few questions.
+
+    Unusable questions are dropped, near-duplicate questions removed and
+    the list capped at 10.
+
+    Args:
+        data (dict): Parsed LLM output
+        article_title (str): Used when the title is missing
+
+    Returns:
+        Tuple[dict, RepairReport]: Repaired quiz data and what was changed
+    """
+    questions, seen = [], set()
+    answers_fixed = dropped = 0
+    raw_questions = data.get("quiz") if isinstance(data.get("quiz"), list) else []
+    for raw in raw_questions:
+        question, fixed = repair_question(raw)
+        if question is None or question_key(question) in seen:
+            dropped += 1
+            continue
+        seen.add(question_key(question))
+        answers_fixed += fixed
+        questions.append(question)
+    dropped += max(len(questions) - MAX_QUESTIONS, 0)
+
+    entities = data.get("key_entities") if isinstance(data.get("key_entities"), dict) else {}
+    repaired = {
+        "title": str(data.get("title") or article_title),
+        "summary": str(data.get("summary") or ""),
+        "key_entities": {
+            kind: [str(name) for name in entities.get(kind) or [] if isinstance(name, (str, int, float))]
+            for kind in ("people", "organizations", "locations")
+        },
+        "sections": [str(section) for section in data.get("sections") or [] if isinstance(section, str)],
+        "quiz": questions[:MAX_QUESTIONS],
+        "related_topics": [str(topic) for topic in data.get("related_topics") or [] if isinstance(topic, str)],
+    }
+    return repaired, RepairReport(answers_fixed, dropped)
+
+
+def question_key(question: dict) -> str:
+    """Normalized question text, for spotting the same question generated twice."""
+    return _normalize_text(question["question"])
+
+
+def repair_rates() -> dict:
+    """Repair counters plus the share of responses that needed repair or a top-up request."""
+    responses = repair_metrics["responses"]
+    return {
+        **repair_metrics,
+        "repair_rate": repair_metrics["repaired"] / responses if responses else None,
+        "regeneration_rate": repair_metrics["topups"] / responses if responses else None,
+        "failure_rate": repair_metrics["failed"] / responses if responses else None,
+    }
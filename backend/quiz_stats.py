@@ -0,0 +1,258 @@
+"""
+Quiz statistics served from the quiz_stats counters table.
+Counters are bumped in the same transaction that inserts a quiz, so /stats
+reads a handful of pre-aggregated rows instead of scanning every quiz.
+`rebuild_quiz_stats` recomputes them from scratch; `seed_quiz_stats` runs
+it once on startup when an upgraded database has quizzes but no counters.
+"""
+
+import json
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import case, func, or_
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from database import Quiz, Question, QuizStatsCounter
+
+logger = logging.getLogger(__name__)
+
+SCOPE_TOTAL = "total"
+SCOPE_DAY = "day"
+SCOPE_DIFFICULTY = "difficulty"
+
+
+def record_quiz(db: Session, quiz: Quiz) -> None:
+    """
+    Add a new quiz to the counters. Call before committing the insert.
+
+    Args:
+        db (Session): Session the quiz is being inserted in
+        quiz (Quiz): New quiz with date_generated, question_count and questions set
+    """
+    generated_at = quiz.date_generated or datetime.utcnow()
+    question_count = quiz.question_count or 0
+    _increment(db, SCOPE_TOTAL, "", 1, question_count, generated_at)
+    _increment(db, SCOPE_DAY, generated_at.date().isoformat(), 1, question_count, generated_at)
+    for difficulty, count in Counter(question.difficulty for question in quiz.questions).items():
+        _increment(db, SCOPE_DIFFICULTY, difficulty, 0, count, generated_at)
+
+
+def _increment(db: Session, scope: str, bucket: str, quizzes: int, questions: int, generated_at: datetime) -> None:
+    """Atomically add to one counter row, creating it if needed."""
+    values = {
+        "scope": scope,
+        "bucket": bucket,
+        "quizzes": quizzes,
+        "questions": questions,
+        "first_generated": generated_at,
+        "last_generated": generated_at,
+    }
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        statement = mysql_insert(QuizStatsCounter).values(**values)
+        new = statement.inserted
+    elif dialect in ("sqlite", "postgresql"):
+        insert = sqlite_insert if dialect == "sqlite" else postgresql_insert
+        statement = insert(QuizStatsCounter).values(**values)
+        new = statement.excluded
+    else:
+        _increment_portable(db, values)
+        return
+
+    table = QuizStatsCounter
+    updates = {
+        "quizzes": table.quizzes + new.quizzes,
+        "questions": table.questions + new.questions,
+        "first_generated": case(
+            (or_(table.first_generated.is_(None), table.first_generated > new.first_generated), new.first_generated),
+            else_=table.first_generated,
+        ),
+        "last_generated": case(
+            (or_(table.last_generated.is_(None), table.last_generated < new.last_generated), new.last_generated),
+            else_=table.last_generated,
+        ),
+    }
+    if dialect == "mysql":
+        statement = statement.on_duplicate_key_update(**updates)
+    else:
+        statement = statement.on_conflict_do_update(index_elements=["scope", "bucket"], set_=updates)
+    db.execute(statement)
+
+
+def _increment_portable(db: Session, values: dict) -> None:
+    """Read-modify-write fallback for databases without an upsert statement."""
+    counter = db.get(QuizStatsCounter, (values["scope"], values["bucket"]))
+    if counter is None:
+        db.add(QuizStatsCounter(**values))
+        return
+    counter.quizzes += values["quizzes"]
+    counter.questions += values["questions"]
+    if counter.first_generated is None or counter.first_generated > values["first_generated"]:
+        counter.first_generated = values["first_generated"]
+    if counter.last_generated is None or counter.last_generated < values["last_generated"]:
+        counter.last_generated = values["last_generated"]
+
+
+def get_stats(db: Session, days: int = 30) -> dict:
+    """
+    Build the /stats response from the counters in a single query.
+
+    Args:
+        db (Session): Database session
+        days (int): How many recent days to include in quizzes_per_day
+
+    Returns:
+        dict: Totals, date range, average, difficulty distribution and per-day counts
+    """
+    cutoff = (datetime.utcnow().date() - timedelta(days=max(days, 1) - 1)).isoformat()
+    counters = db.query(QuizStatsCounter).filter(
+        or_(QuizStatsCounter.scope != SCOPE_DAY, QuizStatsCounter.bucket >= cutoff)
+    ).all()
+
+    total: Optional[QuizStatsCounter] = None
+    difficulty_distribution: Dict[str, int] = {}
+    quizzes_per_day = []
+    for counter in counters:
+        if counter.scope == SCOPE_TOTAL:
+            total = counter
+        elif counter.scope == SCOPE_DIFFICULTY:
+            difficulty_distribution[counter.bucket] = counter.questions
+        elif counter.scope == SCOPE_DAY:
+            quizzes_per_day.append({
+                "date": counter.bucket,
+                "quizzes": counter.quizzes,
+                "questions": counter.questions,
+            })
+    quizzes_per_day.sort(key=lambda day: day["date"])
+
+    if total is None or total.quizzes == 0:
+        return {
+            "total_quizzes": 0,
+            "total_questions": 0,
+            "first_quiz_date": None,
+            "last_quiz_date": None,
+            "difficulty_distribution": {},
+            "quizzes_per_day": [],
+        }
+
+    return {
+        "total_quizzes": total.quizzes,
+        "total_questions": total.questions,
+        "first_quiz_date": total.first_generated,
+        "last_quiz_date": total.last_generated,
+        "average_questions_per_quiz": total.questions / total.quizzes,
+        "difficulty_distribution": dict(sorted(difficulty_distribution.items())),
+        "quizzes_per_day": quizzes_per_day,
+    }
+
+
+def seed_quiz_stats(db: Session) -> bool:
+    """
+    Build the counters if they have never been built but quizzes exist,
+    as on a database created before the quiz_stats table. Called on startup.
+
+    Args:
+        db (Session): Database session
+
+    Returns:
+        bool: True if the counters were rebuilt
+    """
+    if db.get(QuizStatsCounter, (SCOPE_TOTAL, "")) is not None:
+        return False
+    if db.query(Quiz.id).first() is None:
+        return False
+    logger.info("Quiz stats counters missing, rebuilding them from the quizzes table")
+    rebuild_quiz_stats(db)
+    return True
+
+
+def rebuild_quiz_stats(db: Session, batch_size: int = 500) -> dict:
+    """
+    Recompute every counter from the quizzes table.
+
+    Fills in question_count for rows stored before it existed (parsing
+    their JSON once), then aggregates with SQL. Difficulty counts come
+    from the questions table, plus the JSON of rows not yet moved to the
+    normalized tables.
+
+    The old counters are deleted before aggregating, in the same
+    transaction as the new ones are written, so on SQLite quizzes inserted
+    meanwhile wait for the rebuild and are counted once. Other databases
+    only lock the existing counter rows: run the rebuild when no quizzes
+    are being generated (the startup seeding runs before the job workers).
+
+    Args:
+        db (Session): Database session
+        batch_size (int): Rows loaded at a time when reading legacy JSON
+
+    Returns:
+        dict: {"quizzes": int, "backfilled_question_counts": int}
+    """
+    legacy_difficulties: Counter = Counter()
+    backfilled = 0
+    last_id = 0
+    while True:
+        batch = db.query(Quiz).filter(
+            Quiz.id > last_id,
+            or_(Quiz.question_count.is_(None), Quiz.quiz_data_version.is_(None)),
+        ).order_by(Quiz.id).limit(batch_size).all()
+        if not batch:
+            break
+        for quiz in batch:
+            last_id = quiz.id
+            try:
+                questions = json.loads(quiz.full_quiz_data).get("quiz", [])
+            except (TypeError, ValueError, AttributeError):
+                questions = []
+            if quiz.question_count is None:
+                quiz.question_count = len(questions)
+                backfilled += 1
+            if quiz.quiz_data_version is None:
+                legacy_difficulties.update(
+                    question.get("difficulty") for question in questions
+                    if isinstance(question, dict) and question.get("difficulty")
+                )
+        db.commit()
+
+    # Taken first, so concurrent record_quiz calls block until the new counters commit
+    db.query(QuizStatsCounter).delete()
+
+    question_total = func.coalesce(func.sum(Quiz.question_count), 0)
+    counters = []
+    quizzes, questions, first_generated, last_generated = db.query(
+        func.count(Quiz.id), question_total, func.min(Quiz.date_generated), func.max(Quiz.date_generated)
+    ).one()
+    counters.append(QuizStatsCounter(
+        scope=SCOPE_TOTAL, bucket="", quizzes=quizzes, questions=questions,
+        first_generated=first_generated, last_generated=last_generated,
+    ))
+
+    day = func.date(Quiz.date_generated)
+    for bucket, day_quizzes, day_questions, day_first, day_last in db.query(
+        day, func.count(Quiz.id), question_total, func.min(Quiz.date_generated), func.max(Quiz.date_generated)
+    ).filter(Quiz.date_generated.isnot(None)).group_by(day):
+        counters.append(QuizStatsCounter(
+            scope=SCOPE_DAY, bucket=str(bucket)[:10], quizzes=day_quizzes, questions=day_questions,
+            first_generated=day_first, last_generated=day_last,
+        ))
+
+    difficulties = Counter(dict(
+        db.query(Question.difficulty, func.count(Question.id)).group_by(Question.difficulty).all()
+    ))
+    difficulties.update(legacy_difficulties)
+    for difficulty, count in difficulties.items():
+        counters.append(QuizStatsCounter(
+            scope=SCOPE_DIFFICULTY, bucket=difficulty, quizzes=0, questions=count,
+            first_generated=first_generated, last_generated=last_generated,
+        ))
+
+    db.add_all(counters)
+    db.commit()
+    logger.info(f"Rebuilt quiz stats: {quizzes} quizzes, {questions} questions")
+    return {"quizzes": quizzes, "backfilled_question_counts": backfilled}
@@ -0,0 +1,119 @@
+"""
+Incremental parsing of a streamed quiz completion.
+Scans LLM output as it arrives and hands back each object of the top-level
+"quiz" array as soon as its closing brace is seen, so questions can be shown
+before the rest of the JSON has been generated.
+"""
+
+import json
+import logging
+from typing import List, Optional
+
+from models import QuizQuestion
+
+logger = logging.getLogger(__name__)
+
+
+class QuizStreamParser:
+    """
+    Finds complete question objects in a partial JSON document.
+
+    Only tracks what is needed to locate them: string/escape state, the
+    stack of open containers and the key each top-level value belongs to.
+    Text before the first "{" (e.g. a ```json fence) is ignored.
+
+    Usage:
+        parser = QuizStreamParser()
+        for chunk in chunks:
+            for question in parser.feed(chunk):
+                ...
+        full_text = parser.text
+    """
+
+    def __init__(self, array_key: str = "quiz"):
+        self.array_key = array_key
+        self._text = ""
+        self._pos = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        # Open containers: "{" or "[" per level
+        self._stack: List[str] = []
+        # Last complete string at the top-level object, and the key it became
+        self._last_string: Optional[str] = None
+        self._top_level_key: Optional[str] = None
+        self._in_quiz_array = False
+        self._object_start: Optional[int] = None
+        self.questions_seen = 0
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return self._text
+
+    def feed(self, chunk: str) -> List[dict]:
+        """
+        Consume more of the completion.
+
+        Args:
+            chunk (str): Next piece of streamed text
+
+        Returns:
+            List[dict]: Questions completed by this chunk that validate as QuizQuestion
+        """
+        self._text += chunk
+        text = self._text
+        questions = []
+
+        for index in range(self._pos, len(text)):
+            char = text[index]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_string = text[self._string_start:index + 1]
+                continue
+
+            if not self._stack and char != "{":
+                continue
+            if char == '"':
+                self._in_string = True
+                self._string_start = index
+            elif char == ":" and len(self._stack) == 1 and self._last_string is not None:
+                try:
+                    self._top_level_key = json.loads(self._last_string)
+                except ValueError:
+                    self._top_level_key = None
+                self._last_string = None
+            elif char in "{[":
+                if char == "{" and self._in_quiz_array and len(self._stack) == 2:
+                    self._object_start = index
+                if char == "[" and len(self._stack) == 1 and self._top_level_key == self.array_key:
+                    self._in_quiz_array = True
+                self._stack.append(char)
+            elif char in "}]":
+                self._stack.pop()
+                if char == "}" and self._object_start is not None and len(self._stack) == 2:
+                    question = self._validate(text[self._object_start:index + 1])
+                    self._object_start = None
+                    if question is not None:
+                        questions.append(question)
+                elif char == "]" and len(self._stack) == 1:
+                    self._in_quiz_array = False
+
+        self._pos = len(text)
+        return questions
+
+    def _validate(self, raw_object: str) -> Optional[dict]:
+        self.questions_seen += 1
+        try:
+            question = QuizQuestion(**json.loads(raw_object))
+        except Exception as e:
+            # Left for the final parse of the full response to report
+            logger.warning(f"Skipping streamed question that failed validation: {e}")
+            return None
+        return question.model_dump()
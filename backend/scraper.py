@@ -1,19 +1,59 @@
 """
 Wikipedia scraper using BeautifulSoup.
 Fetches and cleans Wikipedia article content for LLM processing.
+Parsed articles are kept in the article cache by revision, so a revision
+is only parsed once (and in "api" mode only downloaded once).
 """
 
+import asyncio
+import json
+import os
+import re
+import httpx
 import requests
 from bs4 import BeautifulSoup
-from typing import Tuple, Optional
+from typing import NamedTuple, Tuple, Optional
+from urllib.parse import unquote, urlencode, urlsplit
 import logging
 
+from article_cache import article_cache_key, get_article_cache
+from article_chunker import split_sentences
+from html_extractor import extract_article_with_sections
+from http_client import fetch, fetch_async
+
 logger = logging.getLogger(__name__)
 
-# Headers to mimic a browser request
-HEADERS = {
-    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-}
+
+class ScraperConfig:
+    # "streaming" (single-pass html_extractor) or "bs4" (BeautifulSoup DOM)
+    EXTRACTOR = os.getenv("SCRAPER_EXTRACTOR", "streaming").lower()
+    # "html" scrapes the rendered page; "api" fetches plain text and the
+    # revision ID from the MediaWiki Action API (far fewer bytes, no skin HTML)
+    FETCH_MODE = os.getenv("SCRAPER_FETCH_MODE", "html").lower()
+    API_URL = os.getenv("WIKIPEDIA_API_URL", "https://en.wikipedia.org/w/api.php")
+
+
+ARTICLE_URL_PREFIX = "https://en.wikipedia.org/wiki/"
+
+# Revision of the rendered page, embedded in the inline mw.config script
+REVISION_ID_PATTERN = re.compile(r'"wgRevisionId"\s*:\s*(\d+)')
+
+# Canonical page name (after redirects), from the same script, as a JSON string
+PAGE_NAME_PATTERN = re.compile(r'"wgPageName"\s*:\s*("(?:[^"\\]|\\.)*")')
+
+# Plain-text extracts mark section headings as "== Heading =="
+EXTRACT_HEADING_PATTERN = re.compile(r"^\s*(=+)\s*(.*?)\s*\1\s*$", re.MULTILINE)
+
+# Trailing sections that carry no article prose
+NON_PROSE_SECTIONS = {"See also", "References", "External links", "Notes", "Further reading", "Bibliography", "Sources"}
+
+
+class ScrapedArticle(NamedTuple):
+    cleaned_content: str
+    title: str
+    raw_content: str  # Rendered HTML in "html" mode, plain-text extract in "api" mode
+    revision_id: Optional[int] = None
+    sections: Tuple[str, ...] = ()  # Section headings in document order
 
 
 def scrape_wikipedia(url: str) -> Tuple[str, str, str]:
@@ -30,33 +70,88 @@ def scrape_wikipedia(url: str) -> Tuple[str, str, str]:
         ValueError: If URL is not valid or content cannot be fetched
         requests.RequestException: If network error occurs
     """
+    return scrape_article(url)[:3]
+
+
+async def scrape_wikipedia_async(url: str) -> Tuple[str, str, str]:
+    """
+    Async variant of `scrape_wikipedia` for use inside the event loop.
     
-    # Validate URL
-    if not url.startswith("https://en.wikipedia.org/wiki/"):
-        raise ValueError("Please provide a valid Wikipedia URL (https://en.wikipedia.org/wiki/...)")
+    Returns:
+        Tuple[str, str, str]: (cleaned_text, title, raw_html)
+    """
+    return (await scrape_article_async(url))[:3]
+
+
+def scrape_article(url: str) -> ScrapedArticle:
+    """
+    Fetch and clean an article using the configured fetch mode.
+    
+    Args:
+        url (str): Wikipedia article URL (e.g., https://en.wikipedia.org/wiki/Alan_Turing)
+    
+    Returns:
+        ScrapedArticle: Cleaned text, title, raw content and revision ID
+    
+    Raises:
+        ValueError: If URL is not valid or content cannot be fetched
+    """
+    
+    validate_wikipedia_url(url)
+    fetch_url, parse = _fetch_plan(url)
     
     try:
-        # Fetch the page
-        response = requests.get(url, headers=HEADERS, timeout=10)
-        response.raise_for_status()
-        
-        # Parse HTML
-        soup = BeautifulSoup(response.content, "html.parser")
-        raw_html = response.text
-        
-        # Extract title
-        title = extract_title(soup)
+        if ScraperConfig.FETCH_MODE == "api" and get_article_cache() is not None:
+            cached = _cached_article_by_revision(fetch_revision(url))
+            if cached:
+                return cached
         
-        # Extract cleaned content
-        cleaned_content = extract_content(soup)
+        # Fetch the page (pooled connection, revalidated against the local copy)
+        response = fetch(fetch_url)
+        return _parse_cached(parse, url, response.content, response.text)
         
-        if not cleaned_content.strip():
-            raise ValueError("Could not extract article content from the URL")
+    except requests.RequestException as e:
+        logger.error(f"Network error while scraping {url}: {str(e)}")
+        raise ValueError(f"Unable to fetch the URL: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error scraping {url}: {str(e)}")
+        raise ValueError(f"Error processing Wikipedia article: {str(e)}")
+
+
+async def scrape_article_async(url: str) -> ScrapedArticle:
+    """
+    Async variant of `scrape_article` for use inside the event loop.
+    Fetches with the shared httpx client and parses in a worker thread, so
+    neither the download nor the CPU-bound HTML parsing blocks other requests.
+    
+    A revision already in the article cache is not parsed again; in "api"
+    mode its revision ID is looked up first and the extract is not
+    downloaded at all.
+    
+    Args:
+        url (str): Wikipedia article URL (e.g., https://en.wikipedia.org/wiki/Alan_Turing)
+    
+    Returns:
+        ScrapedArticle: Cleaned text, title, raw content and revision ID
+    
+    Raises:
+        ValueError: If URL is not valid or content cannot be fetched
+    """
+    
+    validate_wikipedia_url(url)
+    fetch_url, parse = _fetch_plan(url)
+    
+    try:
+        if ScraperConfig.FETCH_MODE == "api" and get_article_cache() is not None:
+            revision = await fetch_revision_async(url)
+            cached = await asyncio.to_thread(_cached_article_by_revision, revision)
+            if cached:
+                return cached
         
-        logger.info(f"Successfully scraped: {title} from {url}")
-        return cleaned_content, title, raw_html
+        response = await fetch_async(fetch_url)
+        return await asyncio.to_thread(_parse_cached, parse, url, response.content, response.text)
         
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         logger.error(f"Network error while scraping {url}: {str(e)}")
         raise ValueError(f"Unable to fetch the URL: {str(e)}")
     except Exception as e:
@@ -64,6 +159,299 @@ def scrape_wikipedia(url: str) -> Tuple[str, str, str]:
         raise ValueError(f"Error processing Wikipedia article: {str(e)}")
 
 
+async def fetch_revision_id_async(url: str) -> Optional[int]:
+    """
+    Look up the current revision ID of an article without downloading it.
+    Only available in "api" fetch mode.
+    
+    Args:
+        url (str): Wikipedia article URL
+    
+    Returns:
+        Optional[int]: Latest revision ID, or None if unavailable
+    """
+    revision = await fetch_revision_async(url)
+    return revision[1] if revision else None
+
+
+async def fetch_revision_async(url: str) -> Optional[Tuple[str, int]]:
+    """
+    Look up the canonical title and current revision ID of an article
+    without downloading it. Only available in "api" fetch mode.
+    
+    Args:
+        url (str): Wikipedia article URL
+    
+    Returns:
+        Optional[Tuple[str, int]]: (title, revision ID), or None if unavailable
+    """
+    if ScraperConfig.FETCH_MODE != "api":
+        return None
+    
+    try:
+        response = await fetch_async(_revision_url(url))
+        return _parse_revision(response.text)
+    except (httpx.HTTPError, ValueError, KeyError, IndexError) as e:
+        logger.warning(f"Could not look up revision for {url}: {str(e)}")
+        return None
+
+
+def fetch_revision(url: str) -> Optional[Tuple[str, int]]:
+    """Blocking variant of `fetch_revision_async`."""
+    if ScraperConfig.FETCH_MODE != "api":
+        return None
+    
+    try:
+        return _parse_revision(fetch(_revision_url(url)).text)
+    except (requests.RequestException, ValueError, KeyError, IndexError) as e:
+        logger.warning(f"Could not look up revision for {url}: {str(e)}")
+        return None
+
+
+def _revision_url(url: str) -> str:
+    params = {
+        "action": "query",
+        "format": "json",
+        "formatversion": "2",
+        "prop": "revisions",
+        "rvprop": "ids",
+        "redirects": "1",
+        "titles": title_from_url(url),
+    }
+    return f"{ScraperConfig.API_URL}?{urlencode(params)}"
+
+
+def _parse_revision(response_text: str) -> Optional[Tuple[str, int]]:
+    page = _first_page(json.loads(response_text))
+    if not page or not page.get("revisions"):
+        return None
+    return page["title"], page["revisions"][0]["revid"]
+
+
+def validate_wikipedia_url(url: str) -> None:
+    """
+    Reject anything that is not an English Wikipedia article URL.
+    
+    Raises:
+        ValueError: If URL is not valid
+    """
+    if not url.startswith(ARTICLE_URL_PREFIX):
+        raise ValueError("Please provide a valid Wikipedia URL (https://en.wikipedia.org/wiki/...)")
+
+
+def title_from_url(url: str) -> str:
+    """
+    Article title as used by the MediaWiki API, e.g. "Alan Turing".
+    
+    Args:
+        url (str): Wikipedia article URL
+    
+    Returns:
+        str: Page title
+    """
+    path = urlsplit(url).path
+    return unquote(path[len("/wiki/"):]).replace("_", " ")
+
+
+def _fetch_plan(url: str):
+    """URL to download and the parser for its body, depending on the fetch mode."""
+    if ScraperConfig.FETCH_MODE == "api":
+        params = {
+            "action": "query",
+            "format": "json",
+            "formatversion": "2",
+            "prop": "extracts|revisions",
+            "explaintext": "1",
+            "rvprop": "ids",
+            "redirects": "1",
+            "titles": title_from_url(url),
+        }
+        return f"{ScraperConfig.API_URL}?{urlencode(params)}", parse_api_response
+    return url, parse_article
+
+
+def _cache_variant() -> str:
+    """How articles are fetched and parsed, as part of the article cache key."""
+    if ScraperConfig.FETCH_MODE == "api":
+        return "api"
+    return f"html:{ScraperConfig.EXTRACTOR}"
+
+
+def _cached_article(page_title: Optional[str], revision_id: Optional[int], raw_content: str = "") -> Optional[ScrapedArticle]:
+    """
+    A revision from the article cache.
+    
+    Args:
+        page_title (str, optional): Canonical page title
+        revision_id (int, optional): Revision ID
+        raw_content (str): Raw content to return with the article, if the
+            cache entry does not hold it (it does in "api" mode only)
+    
+    Returns:
+        Optional[ScrapedArticle]: The article, or None if it is not cached
+    """
+    cache = get_article_cache()
+    if cache is None or page_title is None or revision_id is None:
+        return None
+    entry = cache.get(article_cache_key(_cache_variant(), page_title, revision_id))
+    if entry is None:
+        return None
+    logger.info(f"Article cache hit: {entry['title']} (revision {revision_id})")
+    return ScrapedArticle(
+        entry["cleaned_content"],
+        entry["title"],
+        entry.get("raw_content", raw_content),
+        revision_id,
+        tuple(entry["sections"]),
+    )
+
+
+def _cached_article_by_revision(revision: Optional[Tuple[str, int]]) -> Optional[ScrapedArticle]:
+    return _cached_article(*revision) if revision else None
+
+
+def _parse_cached(parse, url: str, content: bytes, response_text: str) -> ScrapedArticle:
+    """
+    Run `parse` on a downloaded page unless its revision is in the article
+    cache, and cache what it returns.
+    """
+    cache = get_article_cache()
+    if cache is None:
+        return parse(url, content, response_text)
+    
+    page_title = None
+    if parse is parse_article:
+        # Title and revision are in the page head; no need to parse the body
+        page_name_match = PAGE_NAME_PATTERN.search(response_text)
+        revision_match = REVISION_ID_PATTERN.search(response_text)
+        if page_name_match and revision_match:
+            page_title = json.loads(page_name_match.group(1))
+            cached = _cached_article(page_title, int(revision_match.group(1)), response_text)
+            if cached:
+                return cached
+    
+    article = parse(url, content, response_text)
+    page_title = page_title or (article.title if parse is parse_api_response else None)
+    if page_title is not None and article.revision_id is not None:
+        entry = {
+            "title": article.title,
+            "cleaned_content": article.cleaned_content,
+            "sections": list(article.sections),
+        }
+        if ScraperConfig.FETCH_MODE == "api":
+            # The extract is what was downloaded; keep it so a hit needs no download
+            entry["raw_content"] = article.raw_content
+        cache.put(article_cache_key(_cache_variant(), page_title, article.revision_id), entry)
+    return article
+
+
+def parse_article(url: str, content: bytes, raw_html: str) -> ScrapedArticle:
+    """
+    Parse a downloaded Wikipedia page into cleaned text and title.
+    
+    Args:
+        url (str): Article URL (for logging)
+        content (bytes): Response body
+        raw_html (str): Decoded response body
+    
+    Returns:
+        ScrapedArticle: Cleaned text, title, raw HTML and revision ID
+    
+    Raises:
+        ValueError: If no article content could be extracted
+    """
+    if ScraperConfig.EXTRACTOR == "streaming":
+        # Single pass over the HTML, no DOM
+        title, text, sections = extract_article_with_sections(raw_html)
+        cleaned_content = clean_article_text(text)
+    else:
+        # Parse HTML
+        soup = BeautifulSoup(content, "html.parser")
+        
+        # Extract title
+        title = extract_title(soup)
+        
+        # Extract cleaned content
+        cleaned_content = extract_content(soup)
+        sections = extract_sections(soup)
+    
+    if not cleaned_content.strip():
+        raise ValueError("Could not extract article content from the URL")
+    
+    revision_match = REVISION_ID_PATTERN.search(raw_html)
+    revision_id = int(revision_match.group(1)) if revision_match else None
+    
+    logger.info(f"Successfully scraped: {title} from {url}")
+    return ScrapedArticle(cleaned_content, title, raw_html, revision_id, tuple(sections))
+
+
+def parse_api_response(url: str, content: bytes, response_text: str) -> ScrapedArticle:
+    """
+    Parse a MediaWiki `prop=extracts|revisions` response into cleaned text.
+    
+    Args:
+        url (str): Article URL (for logging)
+        content (bytes): Response body
+        response_text (str): Decoded response body (JSON)
+    
+    Returns:
+        ScrapedArticle: Cleaned text, title, plain-text extract and revision ID
+    
+    Raises:
+        ValueError: If the page does not exist or has no text
+    """
+    page = _first_page(json.loads(response_text))
+    if not page or page.get("missing") or page.get("invalid"):
+        raise ValueError("Could not find a Wikipedia article at the URL")
+    
+    extract = page.get("extract") or ""
+    prose, sections = _extract_prose(extract)
+    cleaned_content = clean_article_text(prose)
+    if not cleaned_content.strip():
+        raise ValueError("Could not extract article content from the URL")
+    
+    revisions = page.get("revisions") or []
+    revision_id = revisions[0].get("revid") if revisions else None
+    title = page.get("title", "Unknown Title")
+    
+    logger.info(f"Successfully fetched via API: {title} (revision {revision_id}) from {url}")
+    return ScrapedArticle(cleaned_content, title, extract, revision_id, tuple(sections))
+
+
+def _first_page(data: dict) -> Optional[dict]:
+    pages = data.get("query", {}).get("pages", [])
+    if isinstance(pages, dict):  # formatversion=1
+        pages = list(pages.values())
+    return pages[0] if pages else None
+
+
+def _extract_prose(extract: str) -> Tuple[str, list]:
+    """
+    Turn a plain-text extract into prose: keep section headings as plain
+    text (like the rendered page) and drop trailing reference sections.
+    Also returns the kept headings, like `extract_sections` does for HTML.
+    """
+    parts = []
+    sections = []
+    position = 0
+    skipping = False
+    for match in EXTRACT_HEADING_PATTERN.finditer(extract):
+        if not skipping:
+            parts.append(extract[position:match.start()])
+        heading = match.group(2)
+        level = len(match.group(1))
+        # A top-level heading starts or ends skipping; subsections inherit it
+        skipping = (level == 2 and heading in NON_PROSE_SECTIONS) or (skipping and level > 2)
+        if not skipping:
+            parts.append(f"\n{heading}\n")
+            if level <= 3 and len(sections) < 15:
+                sections.append(heading)
+        position = match.end()
+    if not skipping:
+        parts.append(extract[position:])
+    return "".join(parts), sections
+
+
 def extract_title(soup: BeautifulSoup) -> str:
     """
     Extract article title from Wikipedia page.
@@ -138,32 +526,40 @@ def extract_content(soup: BeautifulSoup) -> str:
     # Extract text
     text = content.get_text(separator=" ", strip=True)
     
+    return clean_article_text(text)
+
+
+def clean_article_text(text: str) -> str:
+    """
+    Collapse whitespace and drop boilerplate sentences from extracted text.
+    Shared by both extraction backends. The text is not truncated: the
+    prompt is fitted to its token budget by `article_chunker`.
+    
+    Args:
+        text (str): Article text as extracted from the HTML
+    
+    Returns:
+        str: Cleaned article text
+    """
+    
     # Clean up excessive whitespace
     text = " ".join(text.split())
     
-    # Remove common Wikipedia boilerplate patterns
-    lines = text.split(".")
-    cleaned_lines = []
+    # Remove common Wikipedia boilerplate sentences (split so that decimals
+    # and abbreviations like "e.g." stay intact)
+    cleaned_sentences = []
     
-    for line in lines:
-        line = line.strip()
-        # Skip very short lines and common boilerplate
-        if len(line) > 10 and not any(skip in line.lower() for skip in [
+    for sentence in split_sentences(text):
+        # Skip very short fragments and common boilerplate
+        if len(sentence) > 10 and not any(skip in sentence.lower() for skip in [
             "citation needed",
             "edit this box",
             "expand this article",
             "this article needs",
         ]):
-            cleaned_lines.append(line)
-    
-    result = ". ".join(cleaned_lines)
-    
-    # Limit to first ~4000 characters for LLM processing
-    # (most APIs have token limits, and we want efficiency)
-    if len(result) > 8000:
-        result = result[:8000] + "..."
+            cleaned_sentences.append(sentence)
     
-    return result
+    return " ".join(cleaned_sentences)
 
 
 def extract_sections(soup: BeautifulSoup) -> list:
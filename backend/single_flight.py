@@ -0,0 +1,188 @@
+"""
+Single-flight coalescing of identical concurrent quiz generations.
+The first caller for a key does the work; concurrent callers with the same
+key wait for and share its result instead of scraping and calling the LLM again.
+If the first caller is cancelled (e.g. its client disconnected), one of the
+waiting callers takes over the work instead of failing with it.
+"""
+
+import asyncio
+import logging
+import os
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+
+from database import SessionLocal, GenerationLock
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlightConfig:
+    # Also coordinate across worker processes through the generation_locks table
+    DB_LOCK_ENABLED = os.getenv("SINGLE_FLIGHT_DB_LOCK", "false").lower() in ("1", "true", "yes")
+    # A lock older than this is assumed to belong to a crashed worker
+    DB_LOCK_TTL_SECONDS = int(os.getenv("SINGLE_FLIGHT_DB_LOCK_TTL_SECONDS", "120"))
+    DB_LOCK_POLL_SECONDS = float(os.getenv("SINGLE_FLIGHT_DB_LOCK_POLL_SECONDS", "0.25"))
+
+
+class _LeaderCancelled(Exception):
+    """Set on the shared future when the leader is cancelled, so a follower takes over."""
+
+
+class SingleFlight:
+    """
+    In-process single-flight group keyed by string.
+
+    Usage:
+        result, shared = await group.do(key, lambda: do_work())
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.failures = 0
+        self.takeovers = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run `fn` once per key among concurrent callers.
+
+        Args:
+            key (str): Identifies equivalent work
+            fn (Callable): Coroutine function doing the work; only called by the leader
+
+        Returns:
+            Tuple[Any, bool]: (result, shared) where shared is True for coalesced callers
+
+        Raises:
+            Exception: Whatever `fn` raised, re-raised in every waiting caller.
+                Cancellation of the leader is only raised in the leader's task;
+                the first waiting caller to resume runs `fn` itself instead.
+        """
+        coalesced = False
+        while key in self._inflight:
+            future = self._inflight[key]
+            if not coalesced:
+                coalesced = True
+                self.coalesced += 1
+                logger.info(f"Coalescing request onto in-flight generation: {key}")
+            try:
+                # Shield so a cancelled follower does not cancel the leader's result
+                return await asyncio.shield(future), True
+            except _LeaderCancelled:
+                # The first follower back finds no entry and becomes the leader
+                continue
+        if coalesced:
+            self.takeovers += 1
+            logger.info(f"Taking over generation from a cancelled request: {key}")
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        self.leaders += 1
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        except BaseException as e:
+            self.failures += 1
+            future.set_exception(e)
+            # Mark retrieved so an exception nobody waited on is not logged
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            del self._inflight[key]
+
+    def metrics(self) -> dict:
+        """Counters for the /metrics endpoint"""
+        return {
+            "in_flight": len(self._inflight),
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+            "takeovers": self.takeovers,
+        }
+
+
+# Counters for the cross-worker lock, reported next to SingleFlight.metrics()
+db_lock_metrics = {"acquired": 0, "waits": 0, "stale_takeovers": 0}
+
+
+@asynccontextmanager
+async def db_generation_lock(key: str):
+    """
+    Cross-worker lock on a generation key, backed by the generation_locks table.
+
+    Waits (polling, without blocking the event loop) while another worker
+    holds the key. Callers should re-check the quiz cache after acquiring,
+    since the previous holder has usually just stored the quiz. A no-op
+    unless SINGLE_FLIGHT_DB_LOCK is set.
+
+    Args:
+        key (str): Generation key
+    """
+    if not SingleFlightConfig.DB_LOCK_ENABLED:
+        yield
+        return
+
+    owner = uuid.uuid4().hex
+    waited = False
+    while not await run_in_threadpool(_try_acquire_db_lock, key, owner):
+        if not waited:
+            waited = True
+            db_lock_metrics["waits"] += 1
+            logger.info(f"Waiting for another worker to finish generation: {key}")
+        await asyncio.sleep(SingleFlightConfig.DB_LOCK_POLL_SECONDS)
+
+    try:
+        yield
+    finally:
+        await run_in_threadpool(_release_db_lock, key, owner)
+
+
+def _try_acquire_db_lock(key: str, owner: str) -> bool:
+    """Insert the lock row, taking over an expired one. Returns False if held."""
+    with SessionLocal() as db:
+        now = datetime.utcnow()
+        db.add(GenerationLock(
+            key=key,
+            owner=owner,
+            expires_at=now + timedelta(seconds=SingleFlightConfig.DB_LOCK_TTL_SECONDS),
+        ))
+        try:
+            db.commit()
+            db_lock_metrics["acquired"] += 1
+            return True
+        except IntegrityError:
+            db.rollback()
+
+        # Take over locks left behind by a crashed worker
+        stale = db.query(GenerationLock).filter(
+            GenerationLock.key == key,
+            GenerationLock.expires_at < now,
+        ).delete()
+        db.commit()
+        if stale:
+            db_lock_metrics["stale_takeovers"] += 1
+            logger.warning(f"Removed stale generation lock: {key}")
+            return _try_acquire_db_lock(key, owner)
+        return False
+
+
+def _release_db_lock(key: str, owner: str) -> None:
+    with SessionLocal() as db:
+        db.query(GenerationLock).filter(
+            GenerationLock.key == key,
+            GenerationLock.owner == owner,
+        ).delete()
+        db.commit()
@@ -0,0 +1,160 @@
+"""
+Schema-constrained LLM output for quiz generation.
+Derives a JSON Schema from the QuizOutput model and builds the
+`response_format` for the provider's JSON mode ("json_object") or schema
+mode ("json_schema"), so the prompt no longer has to describe the format
+in prose and the response can be validated straight into QuizOutput.
+"""
+
+import copy
+import json
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from pydantic import BaseModel, create_model
+
+from models import QuizOutput
+
+# "prompt": format described in the prompt (no response_format);
+# "json_object": provider JSON mode plus the schema in the prompt;
+# "json_schema": the schema itself constrains decoding
+OUTPUT_MODES = ("prompt", "json_object", "json_schema")
+
+# Not expressible in the pydantic model without breaking stored quizzes
+EXTRA_CONSTRAINTS = {
+    ("QuizQuestion", "difficulty"): {"enum": ["easy", "medium", "hard"]},
+}
+
+
+def _inline(schema: dict, definitions: dict, model_name: str, dropped: tuple) -> dict:
+    """Resolve $ref/allOf, drop the `dropped` keywords, and close objects to extra keys."""
+    if "$ref" in schema:
+        name = schema["$ref"].rsplit("/", 1)[-1]
+        return _inline(definitions[name], definitions, name, dropped)
+    if "allOf" in schema and len(schema["allOf"]) == 1:
+        merged = {**schema["allOf"][0], **{key: value for key, value in schema.items() if key != "allOf"}}
+        return _inline(merged, definitions, model_name, dropped)
+
+    result = {key: value for key, value in schema.items() if key not in dropped and key != "$defs"}
+    if result.get("type") == "object" and "properties" in result:
+        result["properties"] = {
+            name: {
+                **_inline(property_schema, definitions, model_name, dropped),
+                **EXTRA_CONSTRAINTS.get((model_name, name), {}),
+            }
+            for name, property_schema in result["properties"].items()
+        }
+        result["required"] = list(result["properties"])
+        result["additionalProperties"] = False
+    if "items" in result:
+        result["items"] = _inline(result["items"], definitions, model_name, dropped)
+    return result
+
+
+def json_schema_for(model: type, descriptions: bool = True) -> dict:
+    """
+    Self-contained JSON Schema of a pydantic model, as providers accept it
+    for constrained decoding: no $ref, every property required and no
+    additional properties.
+
+    Args:
+        model (type): Pydantic model class
+        descriptions (bool): Keep the field descriptions
+
+    Returns:
+        dict: JSON Schema
+    """
+    schema = model.model_json_schema()
+    dropped = ("title", "default") if descriptions else ("title", "default", "description")
+    return _inline(schema, schema.get("$defs", {}), model.__name__, dropped)
+
+
+@lru_cache(maxsize=None)
+def _compact_schema(model: type) -> dict:
+    return json_schema_for(model, descriptions=False)
+
+
+@lru_cache(maxsize=None)
+def quiz_output_model(omit: Tuple[str, ...] = ()) -> type:
+    """
+    QuizOutput as generated for a request: fields in `omit` are not asked
+    for, so the summary (the one required optional part) may be missing.
+
+    Args:
+        omit (Tuple[str, ...]): Optional fields left out of the request
+
+    Returns:
+        type: QuizOutput, or a subclass with summary defaulting to ""
+    """
+    if "summary" not in omit:
+        return QuizOutput
+    return create_model("QuizOutput", __base__=QuizOutput, summary=(str, ""))
+
+
+def quiz_output_schema(omit: Tuple[str, ...] = (), question_count: Optional[int] = None) -> dict:
+    """
+    The QuizOutput schema without descriptions, for the prompt and
+    response_format.
+
+    Args:
+        omit (Tuple[str, ...]): Optional fields to leave out, so they are not generated
+        question_count (int, optional): Exact number of questions to require
+
+    Returns:
+        dict: JSON Schema
+    """
+    schema = copy.deepcopy(_compact_schema(QuizOutput))
+    for name in omit:
+        schema["properties"].pop(name, None)
+    schema["required"] = [name for name in schema["required"] if name in schema["properties"]]
+    if question_count is not None:
+        schema["properties"]["quiz"].update(minItems=question_count, maxItems=question_count)
+    return schema
+
+
+@lru_cache(maxsize=None)
+def quiz_output_schema_text(omit: Tuple[str, ...] = ()) -> str:
+    """
+    The QuizOutput schema as compact JSON, for prompts in json_object mode.
+    Descriptions are left out: the prompt's requirements already say what
+    each field holds.
+    """
+    return json.dumps(quiz_output_schema(omit), separators=(",", ":"))
+
+
+def response_format(mode: str, schema: Optional[dict] = None, name: str = "quiz") -> Optional[dict]:
+    """
+    The `response_format` request argument for an output mode.
+
+    Args:
+        mode (str): One of OUTPUT_MODES
+        schema (dict, optional): JSON Schema the output must match in
+            json_schema mode; defaults to `quiz_output_schema()`
+        name (str): Schema name reported to the provider
+
+    Returns:
+        Optional[dict]: The argument, or None in prompt mode
+    """
+    if mode == "json_object":
+        return {"type": "json_object"}
+    if mode == "json_schema":
+        return {"type": "json_schema", "json_schema": {"name": name, "schema": schema or quiz_output_schema()}}
+    return None
+
+
+def parse_structured(response_text: str, model: type, **defaults) -> BaseModel:
+    """
+    Validate a JSON-mode response straight into a model, without fence
+    stripping or substring search.
+
+    Args:
+        response_text (str): Raw completion text
+        model (type): Pydantic model class
+        **defaults: Values for fields the response left empty (e.g. title)
+
+    Raises:
+        pydantic.ValidationError: If the text is not JSON valid for the model
+    """
+    parsed = model.model_validate_json(response_text)
+    missing = {key: value for key, value in defaults.items() if not getattr(parsed, key, None)}
+    return parsed.model_copy(update=missing) if missing else parsed
@@ -1,5 +1,6 @@
 import pytest
 import sys
+import json
 from pathlib import Path
 import os
 
@@ -21,9 +22,31 @@ def initialize_test_db():
     init_db()
     yield
     # Cleanup after tests
-    db_file = Path(backend_dir) / "test_quiz.db"
-    if db_file.exists():
-        db_file.unlink()
+    for suffix in ("", "-wal", "-shm"):
+        db_file = Path(backend_dir) / f"test_quiz.db{suffix}"
+        if db_file.exists():
+            db_file.unlink()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def content_store_root(tmp_path_factory):
+    """Keep scraped HTML blobs written during tests out of the working tree"""
+    import content_store
+    root = tmp_path_factory.mktemp("content_store")
+    content_store.ContentStoreConfig.ROOT = str(root)
+    content_store._content_store = None
+    yield root
+    content_store._content_store = None
+
+
+@pytest.fixture(autouse=True)
+def article_cache_dir(tmp_path, monkeypatch):
+    """Start every test with an empty article cache, on disk under its tmp dir"""
+    import article_cache
+    root = tmp_path / "article_cache"
+    monkeypatch.setattr(article_cache.ArticleCacheConfig, "DIR", str(root))
+    monkeypatch.setattr(article_cache, "_article_cache", None)
+    return root
 
 
 @pytest.fixture
@@ -34,4 +57,278 @@ def client():
 
 @pytest.fixture
 def sample_fixture():
-    return "sample data"
\ No newline at end of file
+    return "sample data"
+
+
+@pytest.fixture
+def sample_quiz_data():
+    """Validated quiz payload as returned by generate_quiz"""
+    sample_file = Path(backend_dir).parent / "sample_data" / "sample_output_python.json"
+    data = json.loads(sample_file.read_text())
+    return {
+        key: data[key]
+        for key in ["title", "summary", "key_entities", "sections", "quiz", "related_topics"]
+    }
+
+
+@pytest.fixture
+def mediawiki_server(monkeypatch):
+    """
+    Local stand-in for the MediaWiki Action API serving recorded responses
+    from tests/fixtures/mediawiki/<Title>.json. Switches the scraper to API mode.
+    """
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlsplit
+
+    import http_client
+    from scraper import ScraperConfig
+
+    fixtures_dir = Path(__file__).parent / "fixtures" / "mediawiki"
+    requests_seen = []
+
+    class MediaWikiHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            params = {key: values[0] for key, values in parse_qs(urlsplit(self.path).query).items()}
+            requests_seen.append(params)
+            title = params.get("titles", "")
+            fixture = fixtures_dir / f"{title.replace(' ', '_')}.json"
+            if fixture.exists():
+                data = json.loads(fixture.read_text(encoding="utf-8"))
+                if "extracts" not in params.get("prop", ""):
+                    for page in data["query"]["pages"]:
+                        page.pop("extract", None)
+            else:
+                data = {"batchcomplete": True, "query": {"pages": [{"ns": 0, "title": title, "missing": True}]}}
+
+            body = json.dumps(data).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), MediaWikiHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setattr(ScraperConfig, "FETCH_MODE", "api")
+    monkeypatch.setattr(ScraperConfig, "API_URL", f"http://127.0.0.1:{server.server_address[1]}/w/api.php")
+    monkeypatch.setattr(http_client, "_conditional_cache", None)
+    yield requests_seen
+    server.shutdown()
+    server.server_close()
+
+
+class MockLLMServer:
+    """
+    State of the `mock_llm_server` fixture: requests received, the most
+    requests in flight at once, and the per-request delay in seconds.
+    `errors` holds (status, headers) responses to send before answering
+    normally; `headers` are added to every response.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.delay = 0.0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fail_sections = set()
+        self.errors = []
+        self.headers = {}
+        self.base_url = None
+
+
+def _mock_section_quiz(section, count):
+    """Map-step response for one section: `count` questions plus one shared by every section."""
+    import random
+    words = [
+        "engine", "punched", "cards", "mill", "store", "loom", "tables", "difference", "notes", "bernoulli",
+        "numbers", "funding", "parliament", "gears", "brass", "columns", "printer", "lovelace", "menabrea",
+        "turing", "complete", "memory", "carriage", "anticipating", "conditional", "branching", "loops",
+    ]
+    difficulties = ["easy", "medium", "hard"]
+    questions = [
+        {
+            "question": "What does the text say about {}?".format(
+                " ".join(random.Random(f"{section}-{number}").sample(words, 4))
+            ),
+            "options": [f"{section} fact {number}", f"{section} myth {number}", f"Unrelated {number}", f"None {number}"],
+            "answer": f"{section} fact {number}",
+            "difficulty": difficulties[(number + sum(map(ord, section))) % 3],
+            "explanation": f"The {section} section states fact {number}."
+        }
+        for number in range(1, count)
+    ]
+    questions.append({
+        "question": "What is the subject of this article?",
+        "options": ["The article subject", "A novel", "A city", "A river"],
+        "answer": "The article subject",
+        "difficulty": "easy",
+        "explanation": "Every section is about the article subject."
+    })
+    return {
+        "summary": f"Summary of {section}.",
+        "key_entities": {"people": [f"Person from {section}"], "organizations": [], "locations": ["Earth"]},
+        "related_topics": [f"{section} topic", "Shared topic"],
+        "quiz": questions,
+    }
+
+
+@pytest.fixture
+def mock_llm_server(monkeypatch):
+    """
+    Local OpenAI-compatible chat completions endpoint (any path), used
+    through the Groq SDK by default. Answers map-reduce section prompts
+    with questions about the prompt's "SECTION:" line, after
+    `server.delay` seconds; streams server-sent events for stream=True.
+    """
+    import re
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    from llm_providers import LLMProviderConfig
+
+    state = MockLLMServer()
+    lock = threading.Lock()
+
+    class ChatCompletionsHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            prompt = request["messages"][-1]["content"]
+            section_match = re.search(r"^SECTION: (.+)$", prompt, re.MULTILINE)
+            count_match = re.search(r"Write (\d+) factual", prompt)
+            section = section_match.group(1) if section_match else "Article"
+            count = int(count_match.group(1)) if count_match else 5
+            with lock:
+                state.requests.append(request)
+                state.in_flight += 1
+                state.max_in_flight = max(state.max_in_flight, state.in_flight)
+                error = state.errors.pop(0) if state.errors else None
+            try:
+                time.sleep(state.delay)
+            finally:
+                with lock:
+                    state.in_flight -= 1
+
+            headers = dict(state.headers)
+            if error:
+                status, data = error[0], {"error": {"message": "Mock error"}}
+                headers.update(error[1])
+            elif section in state.fail_sections:
+                status, data = 400, {"error": {"message": "Bad request"}}
+            elif request.get("stream"):
+                content = json.dumps(_mock_section_quiz(section, count))
+                events = [
+                    {"choices": [{"index": 0, "delta": {"content": content[start:start + 32]}}]}
+                    for start in range(0, len(content), 32)
+                ]
+                body = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Content-Length", str(len(body.encode("utf-8"))))
+                self.end_headers()
+                self.wfile.write(body.encode("utf-8"))
+                return
+            else:
+                content = json.dumps(_mock_section_quiz(section, count))
+                status, data = 200, {
+                    "id": "chatcmpl-test",
+                    "object": "chat.completion",
+                    "created": 0,
+                    "model": request["model"],
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop"
+                    }],
+                    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+                }
+            body = json.dumps(data).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ChatCompletionsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    state.base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    monkeypatch.setenv("GROQ_BASE_URL", state.base_url)
+    monkeypatch.setattr(LLMProviderConfig, "PROVIDER", "groq")
+    monkeypatch.setattr(LLMProviderConfig, "BASE_URL", None)
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+class FakeGroq:
+    """
+    Stand-in for the Groq SDK clients. Returns `response_text` as a normal
+    completion, or split into `chunk_size` pieces when called with stream=True.
+    """
+
+    def __init__(self, response_text, chunk_size=16):
+        from types import SimpleNamespace
+        self.response_text = response_text
+        self.chunk_size = chunk_size
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _chunks(self):
+        from types import SimpleNamespace
+        for start in range(0, len(self.response_text), self.chunk_size):
+            piece = self.response_text[start:start + self.chunk_size]
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+    def _create(self, **kwargs):
+        from types import SimpleNamespace
+        self.requests.append(kwargs)
+        if kwargs.get("stream"):
+            return self._chunks()
+        message = SimpleNamespace(content=self.response_text)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@pytest.fixture
+def fake_groq(monkeypatch, sample_quiz_data):
+    """Patch the shared LLM client's Groq SDK client to replay the sample quiz"""
+    import llm_client
+    import llm_providers
+    fake = FakeGroq("```json\n" + json.dumps(sample_quiz_data, indent=2) + "\n```")
+
+    class AsyncClient:
+        def __init__(self, **kwargs):
+            self.chat = self
+
+        @property
+        def completions(self):
+            return self
+
+        async def create(self, **kwargs):
+            result = fake._create(**kwargs)
+            if not kwargs.get("stream"):
+                return result
+
+            async def stream():
+                for chunk in result:
+                    yield chunk
+            return stream()
+
+    monkeypatch.setenv("GROQ_API_KEY", "test-key")
+    monkeypatch.setattr(llm_providers.LLMProviderConfig, "PROVIDER", "groq")
+    monkeypatch.setattr(llm_providers, "AsyncGroq", AsyncClient)
+    monkeypatch.setattr(llm_client, "_llm_client", None)
+    return fake
@@ -0,0 +1,43 @@
+import os
+
+from article_cache import ArticleCache, article_cache_key
+
+
+def _entry(text):
+    return {"title": "T", "cleaned_content": text, "sections": ["History"]}
+
+
+def test_memory_tier_evicts_least_recently_used_by_size():
+    cache = ArticleCache(memory_max_bytes=250)
+    for revision in (1, 2):
+        cache.put(article_cache_key("api", "T", revision), _entry("x" * 100))
+    cache.get(article_cache_key("api", "T", 1))
+    cache.put(article_cache_key("api", "T", 3), _entry("x" * 100))
+
+    assert cache.get(article_cache_key("api", "T", 2)) is None
+    assert cache.get(article_cache_key("api", "T", 1)) is not None
+    assert cache.memory_usage() == {"entries": 2, "bytes": 2 * 108}
+
+    # Larger than the whole tier: not kept in memory
+    cache.put(article_cache_key("api", "T", 4), _entry("x" * 1000))
+    assert cache.get(article_cache_key("api", "T", 4)) is None
+
+
+def test_disk_tier_is_shared_and_bounded(tmp_path):
+    root = tmp_path / "articles"
+    writer = ArticleCache(0, str(root), disk_max_bytes=10_000)
+    reader = ArticleCache(1024, str(root), disk_max_bytes=10_000)
+    key = article_cache_key("html:streaming", "Alan_Turing", 7)
+
+    writer.put(key, _entry("Turing was a mathematician."))
+    assert reader.get(article_cache_key("html:streaming", "Alan Turing", 7)) == _entry("Turing was a mathematician.")
+    assert reader.get(article_cache_key("html:streaming", "Alan Turing", 8)) is None
+
+    # Entries of ~3 KB compressed: the oldest files go once the tier passes 10 KB
+    for revision in range(10, 15):
+        writer.put(article_cache_key("api", "T", revision), _entry(os.urandom(3000).hex()))
+        os.utime(writer._path(article_cache_key("api", "T", revision)), (revision, revision))
+    files = list(root.glob("*/*.json.gz"))
+    assert sum(path.stat().st_size for path in files) <= 10_000
+    assert reader.get(article_cache_key("api", "T", 14)) is not None
+    assert reader.get(article_cache_key("api", "T", 10)) is None
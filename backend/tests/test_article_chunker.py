@@ -0,0 +1,84 @@
+from pathlib import Path
+
+from article_chunker import (
+    build_article_context,
+    estimate_tokens,
+    fit_to_budget,
+    split_sections,
+    split_sentences,
+)
+from scraper import clean_article_text, parse_api_response
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def _long_article(sections=12, sentences=40):
+    headings = [f"Section {n}" for n in range(sections)]
+    parts = ["Intro sentence about the Analytical Engine built in 1837 by Charles Babbage."]
+    for n, heading in enumerate(headings):
+        parts.append(heading)
+        parts.extend(
+            f"Fact {m} of section {n} names Ada Lovelace and the year {1800 + m}."
+            for m in range(sentences)
+        )
+    return " ".join(parts), headings
+
+
+def test_split_sentences_keeps_decimals_abbreviations_and_initials():
+    text = 'Dr. J. R. R. Tolkien was born in 1892. Pi is about 3.14, e.g. in the U.S. Army. He said "Yes." Then he left!'
+    assert split_sentences(text) == [
+        "Dr. J. R. R. Tolkien was born in 1892.",
+        "Pi is about 3.14, e.g. in the U.S. Army.",
+        'He said "Yes."',
+        "Then he left!",
+    ]
+
+
+def test_clean_article_text_no_longer_mangles_numbers_or_truncates():
+    text = "The value 3.14 is pi. [citation needed] claims follow. " + "A long sentence about computing. " * 400
+    cleaned = clean_article_text(text)
+    assert cleaned.startswith("The value 3.14 is pi.")
+    assert "citation needed" not in cleaned
+    assert len(cleaned) > 8000
+
+
+def test_split_sections_on_api_extract():
+    raw = (FIXTURES / "mediawiki" / "Alan_Turing.json").read_text(encoding="utf-8")
+    article = parse_api_response("https://en.wikipedia.org/wiki/Alan_Turing", raw.encode("utf-8"), raw)
+    chunks = split_sections(article.cleaned_content, article.sections)
+    assert [chunk.heading for chunk in chunks] == ["", "Early life and education: Family", "School", "Cryptanalysis"]
+    assert chunks[0].text.startswith("Alan Mathison Turing")
+    assert chunks[3].text.startswith("During the Second World War")
+
+
+def test_heading_words_inside_prose_are_not_boundaries():
+    text = "The history of the engine is long. History The engine was designed in 1834."
+    chunks = split_sections(text, ["History"])
+    assert chunks[0].text == "The history of the engine is long."
+    assert chunks[1].heading == "History"
+
+
+def test_short_articles_are_sent_whole():
+    text, headings = _long_article(sections=2, sentences=2)
+    chunks = split_sections(text, headings)
+    assert fit_to_budget(chunks, 2000) == chunks
+
+
+def test_long_articles_fit_the_budget_and_cover_every_section():
+    text, headings = _long_article()
+    assert estimate_tokens(text) > 5000
+    context = build_article_context(text, headings, token_budget=1500)
+    assert estimate_tokens(context) <= 1500
+    for heading in headings:
+        assert f"## {heading}\n" in context
+    # Lead sentences are kept, sentences are never cut in the middle
+    assert "Intro sentence about the Analytical Engine" in context
+    assert all(line.endswith(".") for line in context.splitlines() if line and not line.startswith("## "))
+
+
+def test_prompt_content_feeds_the_generation_fingerprint(monkeypatch):
+    from article_chunker import ChunkerConfig
+    from quiz_cache import generation_fingerprint
+    before = generation_fingerprint()
+    monkeypatch.setattr(ChunkerConfig, "TOKEN_BUDGET", ChunkerConfig.TOKEN_BUDGET + 1)
+    assert generation_fingerprint() != before
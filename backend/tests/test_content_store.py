@@ -0,0 +1,41 @@
+import gzip
+
+import pytest
+
+from content_store import LocalContentStore, ZSTD_AVAILABLE
+
+
+def test_put_get_round_trip_and_dedupe(tmp_path):
+    store = LocalContentStore(str(tmp_path), compression="zstd")
+    html = ("<html><body>" + "<p>Alan Turing was a mathematician.</p>" * 500 + "</body></html>").encode("utf-8")
+
+    first = store.put(html)
+    assert first.ref.startswith("sha256:")
+    assert not first.deduplicated
+    assert first.stored_size < first.size / 10
+    assert store.get(first.ref) == html
+
+    second = store.put(html)
+    assert second.ref == first.ref
+    assert second.deduplicated
+    assert len(list(tmp_path.rglob("*.*"))) == 1
+
+    suffix = ".zst" if ZSTD_AVAILABLE else ".gz"
+    assert next(tmp_path.rglob("*.*")).suffix == suffix
+
+
+def test_reads_blobs_written_with_other_compression(tmp_path):
+    """A store switched to zstd still reads gzip blobs written earlier"""
+    gzip_store = LocalContentStore(str(tmp_path), compression="gzip")
+    ref = gzip_store.put(b"<html>old</html>").ref
+    assert gzip.decompress(next(tmp_path.rglob("*.gz")).read_bytes()) == b"<html>old</html>"
+
+    assert LocalContentStore(str(tmp_path), compression="zstd").get(ref) == b"<html>old</html>"
+
+
+def test_get_unknown_ref(tmp_path):
+    store = LocalContentStore(str(tmp_path))
+    with pytest.raises(KeyError):
+        store.get("sha256:" + "0" * 64)
+    with pytest.raises(KeyError):
+        store.get("not-a-ref")
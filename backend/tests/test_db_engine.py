@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+from sqlalchemy import exc, text
+
+from db_engine import create_db_engine, engine_metrics
+
+
+def test_sqlite_pragmas_applied(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/pragmas.db")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+        assert conn.execute(text("PRAGMA foreign_keys")).scalar() == 1
+    engine.dispose()
+
+
+def test_pool_metrics_count_checkouts_and_exhaustion(tmp_path):
+    engine = create_db_engine(f"sqlite:///{tmp_path}/pool.db", pool_size=1, max_overflow=0, pool_timeout=0.2)
+    holder = engine.connect()
+
+    # A second checkout while the only connection is held waits, then times out
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+
+    metrics = engine_metrics(engine)
+    assert metrics["exhausted"] == 1
+    assert metrics["timeouts"] == 1
+    assert metrics["checked_out"] == 1
+    assert metrics["wait_seconds_max"] >= 0.2
+
+    # Released while another thread waits: the waiter gets it
+    result = {}
+
+    def wait_for_connection():
+        with engine.connect() as conn:
+            result["value"] = conn.execute(text("SELECT 1")).scalar()
+
+    waiter = threading.Thread(target=wait_for_connection)
+    engine.pool._timeout = 5
+    waiter.start()
+    holder.close()
+    waiter.join(5)
+    assert result["value"] == 1
+
+    metrics = engine_metrics(engine)
+    assert metrics["checkouts"] == 3
+    assert metrics["connects"] == 1
+    assert metrics["checked_out"] == 0
+    engine.dispose()
+
+
+def test_metrics_endpoint_reports_database_pool():
+    from fastapi.testclient import TestClient
+    from main import app
+    client = TestClient(app)
+    client.get("/history")
+    database = client.get("/metrics").json()["database"]
+    assert database["dialect"] == "sqlite"
+    assert database["checkouts"] >= 1
+    assert "wait_seconds_total" in database
@@ -0,0 +1,93 @@
+import random
+from pathlib import Path
+
+import pytest
+from bs4 import BeautifulSoup
+
+from html_extractor import extract_article, extract_article_with_sections
+from scraper import clean_article_text, extract_content, extract_sections, extract_title
+
+FIXTURE = Path(__file__).parent / "fixtures" / "wikipedia_article.html"
+
+
+def _bs4_extract(html):
+    soup = BeautifulSoup(html.encode("utf-8"), "html.parser")
+    return extract_title(soup), extract_content(soup)
+
+
+def _streaming_extract(html):
+    title, text = extract_article(html)
+    return title, clean_article_text(text)
+
+
+def test_streaming_matches_bs4_on_article_fixture():
+    """The single-pass extractor produces the same title and text as BeautifulSoup"""
+    html = FIXTURE.read_text(encoding="utf-8")
+    title, content = _streaming_extract(html)
+    assert (title, content) == _bs4_extract(html)
+    assert title == "Alan Turing"
+    assert "Turing machine" in content
+    assert "Hodges" not in content  # reflist
+    assert "Maida Vale, London" not in content  # infobox table
+    assert "[1]" not in content  # reference markers
+    assert "Template text" not in content
+
+
+@pytest.mark.parametrize("html", [
+    "",
+    "<p>No body or content div at all, just a paragraph of text.</p>",
+    "<html><head><meta property='og:title' content='From meta'></head><body><p>Body fallback text here.</p></body></html>",
+    "<body><div id='mw-content-text'><table><tr><td><div id='mw-content-text'>Nested duplicate</div></td></tr></table>Outer text is long enough.</div></body>",
+    "<table><tr><td><div id='mw-content-text'><p>Content inside a table is kept when the table is outside.</p></div></td></tr></table>",
+    "<body><h1 class='firstHeading'>Title <rt>ruby</rt><b>Bold</b></h1><div id='mw-content-text'><p>One<br/>two<br>three<br/>four paragraphs of text.</p></div></body>",
+    "<div id='mw-content-text' class='navbox'><p>The content div itself is never dropped, only descendants.</p></div>",
+    "<div id='mw-content-text'><div class='reflist'><p>dropped<div>still dropped</div></p></div><p>Kept after the reflist closed.</div>",
+])
+def test_streaming_matches_bs4_on_edge_cases(html):
+    assert _streaming_extract(html) == _bs4_extract(html)
+
+
+@pytest.mark.parametrize("html", [
+    None,
+    "<h2>Only <b>bold</b> heading</h2><h3>Sub<span class='mw-editsection'>[<a>edit</a>]</span></h3><h2>Contents</h2>",
+    "<h2>Unclosed heading",
+    "".join(f"<h{2 + n % 2}>Heading {n}</h{2 + n % 2}>" for n in range(20)),
+])
+def test_streaming_sections_match_extract_sections(html):
+    html = FIXTURE.read_text(encoding="utf-8") if html is None else html
+    soup = BeautifulSoup(html.encode("utf-8"), "html.parser")
+    assert extract_article_with_sections(html)[2] == extract_sections(soup)
+
+
+def test_streaming_matches_bs4_on_random_markup():
+    """Differential test over randomly nested, partly malformed markup"""
+    rng = random.Random(1234)
+    open_tags = [
+        "<div>", "<div class='reflist'>", "<div class='navbox extra'>", "<div class='infobox'>",
+        "<div class='toc'>", "<div class='mw-editsection'>", "<span class='mw-editsection'>",
+        "<span>", "<sup class='reference'>", "<sup>", "<table>", "<tr>", "<td>", "<p>", "<b>",
+        "<noscript>", "<rt>", "<template>", "<ul>", "<li>", "<h1 class='firstHeading'>",
+        "<div id='mw-content-text'>", "<body>",
+    ]
+    close_tags = ["</div>", "</span>", "</sup>", "</table>", "</p>", "</b>", "</li>", "</br>", "</body>", "</h1>"]
+    other = [
+        "<br>", "<br/>", "<img src='x'>", "<hr/>", "<!-- comment -->", "&amp;", "&#150;", "&#8211;",
+        "&nbsp;", "&bogus;", "<script>var x = '<p>no</p>';</script>", "<style>p{}</style>",
+        "<![CDATA[cdata text]]>", "   ", "\n",
+    ]
+    words = ["Alpha beta gamma delta", "epsilon. Zeta", "citation needed here", "Eta theta iota kappa lambda", "3.14 is pi"]
+
+    for _ in range(300):
+        pieces = []
+        for _ in range(rng.randint(5, 60)):
+            bucket = rng.random()
+            if bucket < 0.35:
+                pieces.append(rng.choice(open_tags))
+            elif bucket < 0.55:
+                pieces.append(rng.choice(close_tags))
+            elif bucket < 0.7:
+                pieces.append(rng.choice(other))
+            else:
+                pieces.append(rng.choice(words))
+        html = "".join(pieces)
+        assert _streaming_extract(html) == _bs4_extract(html), html
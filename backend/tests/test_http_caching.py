@@ -0,0 +1,77 @@
+import asyncio
+import gzip
+
+from compression import BROTLI_AVAILABLE, CompressionMiddleware, choose_encoding
+from http_caching import etag_matches, matching_validator, quiz_etag
+
+
+def test_etag_matches_weak_lists_and_compressed_variants():
+    etag = quiz_etag(7, "ab" * 32)
+    assert etag == '"quiz-7-abababababababab"'
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", W/{etag}', etag)
+    assert etag_matches(f'{etag[:-1]}-gzip"', etag)
+    assert matching_validator(f'"other", {etag[:-1]}-gzip"', etag) == f'{etag[:-1]}-gzip"'
+    assert etag_matches("*", etag)
+    assert not etag_matches('"quiz-8-abababababababab"', etag)
+    assert not etag_matches(None, etag)
+    assert quiz_etag(7, None) is None
+
+
+def test_choose_encoding():
+    best = "br" if BROTLI_AVAILABLE else "gzip"
+    assert choose_encoding("gzip, deflate, br") == best
+    assert choose_encoding("gzip;q=1.0, br;q=0.5") == "gzip"
+    assert choose_encoding("br;q=0, gzip") == "gzip"
+    assert choose_encoding("*") == best
+    assert choose_encoding("identity") is None
+    assert choose_encoding("") is None
+
+
+def _call(app, accept_encoding):
+    messages = []
+    scope = {"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(CompressionMiddleware(app, minimum_size=100)(scope, receive, send))
+    return dict(messages[0]["headers"]), b"".join(m.get("body", b"") for m in messages[1:])
+
+
+def _app(content_type, chunks):
+    async def app(scope, receive, send):
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", content_type), (b"etag", b'"abc"')],
+        })
+        for index, chunk in enumerate(chunks):
+            await send({"type": "http.response.body", "body": chunk, "more_body": index < len(chunks) - 1})
+    return app
+
+
+def test_compresses_buffered_json():
+    body = b'{"items": [' + b'"question", ' * 200 + b'"end"]}'
+    headers, sent = _call(_app(b"application/json", [body]), "gzip")
+    assert headers[b"content-encoding"] == b"gzip"
+    assert headers[b"vary"] == b"Accept-Encoding"
+    assert headers[b"etag"] == b'"abc-gzip"'
+    assert int(headers[b"content-length"]) == len(sent)
+    assert gzip.decompress(sent) == body
+
+
+def test_leaves_small_and_streaming_responses_alone():
+    headers, sent = _call(_app(b"application/json", [b"{}"]), "gzip")
+    assert b"content-encoding" not in headers and sent == b"{}"
+
+    chunks = [b"event: question\ndata: {}\n\n" * 20] * 3
+    headers, sent = _call(_app(b"text/event-stream", chunks), "gzip")
+    assert b"content-encoding" not in headers
+    assert sent == b"".join(chunks)
+
+    headers, sent = _call(_app(b"application/json", chunks), "gzip")
+    assert b"content-encoding" not in headers
@@ -0,0 +1,117 @@
+import asyncio
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import http_client
+from http_client import ConditionalCache, fetch, fetch_async, http_metrics
+
+ARTICLE = b"<html><body><div id='mw-content-text'><p>Article body</p></div></body></html>"
+ETAG = '"rev-1"'
+
+
+class ArticleHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    client_ports = []
+
+    def do_GET(self):
+        self.client_ports.append(self.client_address[1])
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(ARTICLE)))
+        self.end_headers()
+        self.wfile.write(ARTICLE)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def article_server(tmp_path, monkeypatch):
+    monkeypatch.setattr(http_client, "_conditional_cache", ConditionalCache(str(tmp_path)))
+    ArticleHandler.client_ports = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ArticleHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/wiki/Article"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_revalidates_with_etag(article_server):
+    """An unchanged page is served from the local store after a 304"""
+    not_modified_before = http_metrics["not_modified"]
+
+    first = fetch(article_server)
+    second = fetch(article_server)
+
+    assert first.content == ARTICLE and not first.not_modified
+    assert second.content == ARTICLE and second.not_modified
+    assert second.text == ARTICLE.decode()
+    assert http_metrics["not_modified"] == not_modified_before + 1
+
+
+def test_fetch_async_reuses_pooled_connection(article_server):
+    """Sequential async fetches share one keep-alive connection"""
+    async def fetch_three_times():
+        results = [await fetch_async(article_server) for _ in range(3)]
+        await http_client.close_http_clients()
+        return results
+
+    results = asyncio.run(fetch_three_times())
+
+    assert [result.not_modified for result in results] == [False, True, True]
+    assert all(result.content == ARTICLE for result in results)
+    assert len(set(ArticleHandler.client_ports)) == 1
+
+
+def test_conditional_cache_is_bounded(tmp_path):
+    """Least recently used pages are removed once the store passes its size"""
+    cache = ConditionalCache(str(tmp_path), max_bytes=10_000)
+    headers = {"ETag": ETAG, "Content-Type": "text/html"}
+    urls = [f"https://en.wikipedia.org/wiki/Page_{index}" for index in range(5)]
+    for index, url in enumerate(urls):
+        # ~3 KB compressed per entry
+        cache.put(url, headers, "utf-8", os.urandom(3000).hex().encode())
+        for path in cache._paths(url):
+            os.utime(path, (index, index))
+
+    assert sum(path.stat().st_size for path in tmp_path.glob("*/*")) <= 10_000
+    assert cache.get(urls[-1]) is not None
+    assert cache.get(urls[0]) is None
+    # Entries are removed whole, never leaving a body without its metadata
+    assert len(list(tmp_path.glob("*/*.json"))) == len(list(tmp_path.glob("*/*.body.gz")))
+
+
+def test_client_of_a_previous_loop_is_closed():
+    """A new event loop gets a new client and the old one is closed on its own loop"""
+    async def current_client():
+        return http_client.get_async_client()
+
+    old_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=old_loop.run_forever)
+    thread.start()
+    try:
+        first = asyncio.run_coroutine_threadsafe(current_client(), old_loop).result()
+
+        async def replace():
+            second = http_client.get_async_client()
+            await http_client.close_http_clients()
+            return second
+
+        assert asyncio.run(replace()) is not first
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), old_loop).result()
+        assert first.is_closed
+    finally:
+        old_loop.call_soon_threadsafe(old_loop.stop)
+        thread.join()
+        old_loop.close()
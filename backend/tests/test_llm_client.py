@@ -0,0 +1,196 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import llm_client
+from llm_client import (
+    CircuitBreaker,
+    LLMClientConfig,
+    LLMDeadlineExceeded,
+    LLMUnavailableError,
+    RateLimiter,
+    TokenBucket,
+    get_llm_client,
+)
+from llm_providers import LLMProviderError, parse_duration
+
+
+@pytest.fixture
+def fresh_llm_state(monkeypatch):
+    """Fresh rate limiter and circuit breaker, fast backoff"""
+    monkeypatch.setattr(llm_client, "rate_limiter", RateLimiter())
+    monkeypatch.setattr(llm_client, "circuit_breaker", CircuitBreaker(3, 30))
+    monkeypatch.setattr(LLMClientConfig, "BACKOFF_BASE_SECONDS", 0.01)
+    monkeypatch.setattr(llm_client, "_llm_client", None)
+
+
+def _request(content="Write a quiz."):
+    return {"model": "test-model", "messages": [{"role": "user", "content": content}], "max_tokens": 100}
+
+
+def test_parse_duration_handles_groq_reset_formats():
+    assert parse_duration("12") == 12
+    assert parse_duration("7.66s") == pytest.approx(7.66)
+    assert parse_duration("2m59.56s") == pytest.approx(179.56)
+    assert parse_duration("120ms") == pytest.approx(0.12)
+    assert parse_duration("") is None
+    assert parse_duration("soon") is None
+
+
+def test_token_bucket_refills_from_header_calibration():
+    bucket = TokenBucket()
+    assert bucket.wait_time(10_000, 0) == 0  # Unknown limits do not block
+    bucket.update(limit=6000, remaining=100, reset_seconds=59, now=0)
+    assert bucket.wait_time(50, 0) == 0
+    bucket.take(50)
+    # 5900 tokens refill over 59s: 100 tokens per second
+    assert bucket.wait_time(250, 0) == pytest.approx(2.0)
+    assert bucket.wait_time(250, 2.0) == 0
+
+
+def test_rate_limiter_reads_headers_and_rejects_waits_past_deadline():
+    limiter = RateLimiter()
+    limiter.update_from_headers({
+        "x-ratelimit-limit-requests": "1000",
+        "x-ratelimit-remaining-requests": "999",
+        "x-ratelimit-reset-requests": "1m26.4s",
+        "x-ratelimit-limit-tokens": "6000",
+        "x-ratelimit-remaining-tokens": "0",
+        "x-ratelimit-reset-tokens": "60s",
+    })
+    assert limiter.status()["requests_remaining"] == pytest.approx(999, abs=1)
+    with pytest.raises(LLMDeadlineExceeded):
+        asyncio.run(limiter.acquire(3000, deadline=time.monotonic() + 1))
+
+
+def test_circuit_breaker_opens_fails_fast_and_recovers(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(LLMUnavailableError) as error:
+        breaker.before_call()
+    assert 1 <= error.value.retry_after <= 30
+
+    # After the reset time a single trial call goes through
+    breaker.opened_at -= 30
+    assert breaker.state == "half_open"
+    breaker.before_call()
+    with pytest.raises(LLMUnavailableError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_retries_server_errors_and_rate_limits(mock_llm_server, fresh_llm_state):
+    mock_llm_server.errors = [(503, {}), (429, {"retry-after": "0"})]
+    mock_llm_server.headers = {
+        "x-ratelimit-limit-tokens": "6000",
+        "x-ratelimit-remaining-tokens": "5000",
+        "x-ratelimit-reset-tokens": "10s",
+    }
+    before = dict(llm_client.llm_metrics)
+
+    async def run():
+        return await get_llm_client().complete(_request())
+
+    text = asyncio.run(run())
+    assert '"quiz"' in text
+    assert len(mock_llm_server.requests) == 3
+    assert llm_client.llm_metrics["retries"] - before["retries"] == 2
+    assert llm_client.llm_metrics["rate_limited"] - before["rate_limited"] == 1
+    assert llm_client.rate_limiter.tokens.capacity == 6000
+    assert llm_client.circuit_breaker.state == "closed"
+
+
+def test_client_errors_are_not_retried(mock_llm_server, fresh_llm_state):
+    mock_llm_server.errors = [(400, {})]
+
+    async def run():
+        return await get_llm_client().complete(_request())
+
+    with pytest.raises(LLMProviderError) as error:
+        asyncio.run(run())
+    assert error.value.status_code == 400
+    assert len(mock_llm_server.requests) == 1
+
+
+def test_open_circuit_rejects_calls_without_contacting_provider(mock_llm_server, fresh_llm_state, monkeypatch):
+    monkeypatch.setattr(LLMClientConfig, "MAX_RETRIES", 0)
+    mock_llm_server.errors = [(500, {})] * 3
+
+    async def run():
+        client = get_llm_client()
+        for _ in range(3):
+            with pytest.raises(LLMProviderError):
+                await client.complete(_request())
+        started = time.perf_counter()
+        with pytest.raises(LLMUnavailableError):
+            await client.complete(_request())
+        return time.perf_counter() - started
+
+    assert asyncio.run(run()) < 0.05
+    assert len(mock_llm_server.requests) == 3
+
+
+def test_deadline_bounds_slow_calls(mock_llm_server, fresh_llm_state):
+    mock_llm_server.delay = 1.0
+
+    async def run():
+        return await get_llm_client().complete(_request(), deadline_seconds=0.2)
+
+    started = time.perf_counter()
+    with pytest.raises((LLMDeadlineExceeded, LLMProviderError)):
+        asyncio.run(run())
+    assert time.perf_counter() - started < 0.9
+
+
+def test_client_is_shared_within_an_event_loop(mock_llm_server, fresh_llm_state):
+    async def run():
+        return get_llm_client(), get_llm_client()
+
+    first, second = asyncio.run(run())
+    assert first is second
+
+
+def test_client_of_a_previous_loop_is_closed(mock_llm_server, fresh_llm_state, monkeypatch):
+    closed = []
+    original_aclose = llm_client.LLMClient.aclose
+
+    async def recording_aclose(self):
+        closed.append(self)
+        await original_aclose(self)
+
+    monkeypatch.setattr(llm_client.LLMClient, "aclose", recording_aclose)
+
+    async def run():
+        client = get_llm_client()
+        await client.complete(_request())
+        return client
+
+    # A loop that stays open (like a worker thread's) gets its old client closed on it
+    old_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=old_loop.run_forever)
+    thread.start()
+    try:
+        first = asyncio.run_coroutine_threadsafe(run(), old_loop).result()
+        second = asyncio.run(run())
+        assert second is not first
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.1), old_loop).result()
+        assert closed == [first]
+        assert first.http_client.is_closed
+    finally:
+        old_loop.call_soon_threadsafe(old_loop.stop)
+        thread.join()
+        old_loop.close()
+
+
+def test_blocking_generate_quiz_closes_its_client(mock_llm_server, fresh_llm_state):
+    from llm_quiz_generator import generate_quiz
+    from models import QuizOptions
+
+    generate_quiz("Alan Turing was a mathematician.", "Alan Turing", QuizOptions(question_count=5))
+    assert llm_client._llm_client is None
@@ -0,0 +1,118 @@
+import asyncio
+import json
+
+import pytest
+
+import llm_client
+import llm_providers
+from llm_client import LLMClient
+from llm_providers import (
+    LLMProviderConfig,
+    LLMProviderError,
+    LLMProviderTimeout,
+    OpenAICompatibleProvider,
+    StubProvider,
+    create_provider,
+    parse_error_rates,
+    stub_quiz,
+)
+from llm_quiz_generator import build_completion_request, generate_quiz_async, stream_quiz_async
+from models import QuizOptions, QuizOutput
+
+ARTICLE = (
+    "Alan Turing was born in Maida Vale, London, in 1912. He studied at King's College, Cambridge. "
+    "During the Second World War he worked at Bletchley Park. The Turing machine was described in 1936. "
+    "Turing proposed the Turing test in 1950. He died in Wilmslow in 1954. "
+    "The Royal Society elected him a Fellow in 1951."
+)
+
+
+@pytest.fixture
+def stub_provider(monkeypatch):
+    """Select the stub provider with no latency or errors"""
+    monkeypatch.setattr(LLMProviderConfig, "PROVIDER", "stub")
+    monkeypatch.setattr(LLMProviderConfig, "STUB_LATENCY_MS", 0)
+    monkeypatch.setattr(LLMProviderConfig, "STUB_LATENCY_JITTER_MS", 0)
+    monkeypatch.setattr(LLMProviderConfig, "STUB_ERROR_RATES", "")
+    monkeypatch.setattr(llm_client, "_llm_client", None)
+
+
+def test_stub_quiz_is_valid_deterministic_and_grounded_in_the_prompt():
+    request = build_completion_request(ARTICLE)
+    quiz = stub_quiz(request)
+    QuizOutput(**{**quiz, "title": "Alan Turing"})
+    assert quiz == stub_quiz(request)
+    for question in quiz["quiz"]:
+        assert question["answer"] in question["options"]
+        assert len(set(question["options"])) == 4
+    assert "_____" in quiz["quiz"][0]["question"]
+    assert stub_quiz(build_completion_request("Short.")) != quiz
+    QuizOutput(**{**stub_quiz(build_completion_request("Short.")), "title": "Short"})
+
+
+def test_parse_error_rates():
+    assert parse_error_rates("429=0.05, 500=0.02,timeout=0.01,bad") == {"429": 0.05, "500": 0.02, "timeout": 0.01}
+
+
+def test_stub_provider_injects_configured_errors():
+    request = build_completion_request(ARTICLE)
+    with pytest.raises(LLMProviderError) as error:
+        asyncio.run(StubProvider(0, 0, {"429": 1.0}).complete(request, timeout=1))
+    assert error.value.status_code == 429 and error.value.retry_after == 1.0
+    with pytest.raises(LLMProviderTimeout):
+        asyncio.run(StubProvider(0, 0, {"timeout": 1.0}).complete(request, timeout=0.01))
+    assert json.loads(asyncio.run(StubProvider(0, 0, {}).complete(request, timeout=1)))["quiz"]
+
+
+def test_generation_runs_offline_with_stub_provider(stub_provider):
+    quiz = asyncio.run(generate_quiz_async(ARTICLE, "Alan Turing"))
+    assert quiz["title"] == "Alan Turing"
+    assert 5 <= len(quiz["quiz"]) <= 10
+
+    async def stream():
+        return [event async for event in stream_quiz_async(ARTICLE, "Alan Turing")]
+
+    events = asyncio.run(stream())
+    assert events[-1]["type"] == "quiz"
+    assert events[-1]["quiz_data"] == quiz
+    assert [event["index"] for event in events[:-1]] == list(range(len(quiz["quiz"])))
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_stub_provider_writes_the_requested_question_count(stub_provider, stream):
+    options = QuizOptions(question_count=10)
+    if stream:
+        async def generate():
+            return [event async for event in stream_quiz_async(ARTICLE, "Alan Turing", options)][-1]["quiz_data"]
+    else:
+        async def generate():
+            return await generate_quiz_async(ARTICLE, "Alan Turing", options)
+    assert len(asyncio.run(generate())["quiz"]) == 10
+    assert len(stub_quiz(build_completion_request(ARTICLE, options=QuizOptions(question_count=5)))["quiz"]) == 5
+
+
+def test_openai_compatible_provider(mock_llm_server):
+    async def run():
+        http_client = llm_client.create_http_client()
+        client = LLMClient(OpenAICompatibleProvider(http_client, mock_llm_server.base_url + "/v1"), http_client)
+        request = {"model": "local", "messages": [{"role": "user", "content": "SECTION: History\nWrite 3 factual"}]}
+        try:
+            text = await client.complete(request)
+            streamed = "".join([delta async for delta in client.stream(request)])
+        finally:
+            await client.aclose()
+        return text, streamed
+
+    text, streamed = asyncio.run(run())
+    assert json.loads(text) == json.loads(streamed)
+    assert json.loads(text)["summary"] == "Summary of History."
+    assert mock_llm_server.requests[-1]["stream"] is True
+
+
+def test_create_provider_rejects_unknown_and_incomplete_settings(monkeypatch):
+    with pytest.raises(ValueError):
+        create_provider(None, "bard")
+    monkeypatch.setattr(LLMProviderConfig, "BASE_URL", None)
+    with pytest.raises(ValueError):
+        create_provider(None, "openai")
+    assert isinstance(create_provider(None, "stub"), llm_providers.StubProvider)
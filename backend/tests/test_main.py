@@ -1,6 +1,7 @@
 import pytest
 from fastapi.testclient import TestClient
 from main import app
+from scraper import ScrapedArticle
 
 # Use the client from conftest
 @pytest.fixture
@@ -45,4 +46,875 @@ def test_stats(client):
     assert response.status_code == 200
     stats = response.json()
     assert "total_quizzes" in stats
-    assert "total_questions" in stats
\ No newline at end of file
+    assert "total_questions" in stats
+
+class PipelineStub:
+    """Stand-in for scrape_wikipedia/generate_quiz that counts calls"""
+
+    def __init__(self, quiz_data, content="Python is a programming language. " * 20):
+        self.quiz_data = quiz_data
+        self.content = content
+        self.scrape_calls = 0
+        self.generate_calls = 0
+
+    async def scrape(self, url):
+        self.scrape_calls += 1
+        return ScrapedArticle(self.content, self.quiz_data["title"], "<html></html>")
+
+    async def generate(self, content, title, options=None):
+        self.generate_calls += 1
+        return dict(self.quiz_data)
+
+
+@pytest.fixture
+def pipeline(monkeypatch, sample_quiz_data):
+    import quiz_pipeline
+    stub = PipelineStub(sample_quiz_data)
+    monkeypatch.setattr(quiz_pipeline, "scrape_article_async", stub.scrape)
+    monkeypatch.setattr(quiz_pipeline, "generate_quiz_async", stub.generate)
+    return stub
+
+
+def test_generate_quiz_cache_hit_skips_scrape_and_llm(client, pipeline):
+    """Second request for an equivalent URL is served from the cache"""
+    first = client.post("/generate_quiz", json={"url": "https://en.wikipedia.org/wiki/Cache_test"})
+    assert first.status_code == 200
+    assert first.headers["X-Quiz-Cache"] == "miss"
+
+    second = client.post("/generate_quiz", json={"url": "https://en.wikipedia.org/wiki/cache test#History"})
+    assert second.status_code == 200
+    assert second.headers["X-Quiz-Cache"] == "hit"
+    assert second.json()["id"] == first.json()["id"]
+    assert second.json()["quiz"] == first.json()["quiz"]
+    assert pipeline.scrape_calls == 1
+    assert pipeline.generate_calls == 1
+
+
+def test_stored_quiz_json_is_rendered_from_rows(client, pipeline):
+    """full_quiz_data of a generated quiz is the serving copy of its normalized rows"""
+    import json
+    from database import SessionLocal, Quiz
+    from quiz_records import quiz_data_from_rows
+
+    response = client.post("/generate_quiz", json={"url": "https://en.wikipedia.org/wiki/Rows_test"})
+    with SessionLocal() as db:
+        quiz = db.get(Quiz, response.json()["id"])
+        assert quiz.quiz_data_version is not None
+        assert json.loads(quiz.full_quiz_data) == quiz_data_from_rows(quiz)
+    assert client.get(f"/quiz/{quiz.id}").json()["quiz"] == response.json()["quiz"]
+
+
+def test_generate_quiz_force_refresh(client, pipeline):
+    """force_refresh bypasses the cache"""
+    url = "https://en.wikipedia.org/wiki/Force_refresh_test"
+    first = client.post("/generate_quiz", json={"url": url})
+    second = client.post("/generate_quiz", json={"url": url, "force_refresh": True})
+    assert second.headers["X-Quiz-Cache"] == "miss"
+    assert second.json()["id"] != first.json()["id"]
+    assert pipeline.generate_calls == 2
+
+
+def test_generate_quiz_expired_ttl_revalidates_content(client, pipeline, monkeypatch):
+    """After the TTL the article is re-scraped but the LLM only runs if it changed"""
+    from quiz_cache import QuizCacheConfig
+    monkeypatch.setattr(QuizCacheConfig, "TTL_SECONDS", 0)
+    url = "https://en.wikipedia.org/wiki/Revalidation_test"
+
+    first = client.post("/generate_quiz", json={"url": url})
+    unchanged = client.post("/generate_quiz", json={"url": url})
+    assert unchanged.headers["X-Quiz-Cache"] == "hit"
+    assert unchanged.json()["id"] == first.json()["id"]
+    assert (pipeline.scrape_calls, pipeline.generate_calls) == (2, 1)
+
+    pipeline.content += " A new revision added this sentence."
+    edited = client.post("/generate_quiz", json={"url": url})
+    assert edited.headers["X-Quiz-Cache"] == "miss"
+    assert edited.json()["id"] != first.json()["id"]
+    assert (pipeline.scrape_calls, pipeline.generate_calls) == (3, 2)
+
+
+def _post_concurrently(payloads):
+    """Send several /generate_quiz requests at once against the ASGI app"""
+    import asyncio
+    import httpx
+
+    async def send_all():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+            return await asyncio.gather(*[
+                async_client.post("/generate_quiz", json=payload) for payload in payloads
+            ])
+
+    return asyncio.run(send_all())
+
+
+def test_generate_quiz_coalesces_concurrent_requests(client, pipeline, monkeypatch):
+    """Concurrent identical requests share a single scrape and LLM call"""
+    import asyncio
+    original_scrape = pipeline.scrape
+
+    async def slow_scrape(url):
+        await asyncio.sleep(0.2)
+        return await original_scrape(url)
+
+    import quiz_pipeline
+    monkeypatch.setattr(quiz_pipeline, "scrape_article_async", slow_scrape)
+    coalesced_before = client.get("/metrics").json()["single_flight"]["coalesced"]
+
+    url = "https://en.wikipedia.org/wiki/Single_flight_test"
+    responses = _post_concurrently([{"url": url}] * 5)
+
+    assert all(response.status_code == 200 for response in responses)
+    assert len({response.json()["id"] for response in responses}) == 1
+    assert sorted(response.headers["X-Quiz-Cache"] for response in responses) == ["coalesced"] * 4 + ["miss"]
+    assert (pipeline.scrape_calls, pipeline.generate_calls) == (1, 1)
+    assert client.get("/metrics").json()["single_flight"]["coalesced"] == coalesced_before + 4
+
+
+def test_single_flight_follower_takes_over_from_cancelled_leader():
+    """Cancelling the leader does not cancel the callers waiting on it"""
+    import asyncio
+    from single_flight import SingleFlight
+
+    group = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(len(calls))
+        await asyncio.sleep(0.1)
+        return f"result {len(calls)}"
+
+    async def run():
+        leader = asyncio.create_task(group.do("key", work))
+        await asyncio.sleep(0.01)
+        followers = [asyncio.create_task(group.do("key", work)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        results = await asyncio.gather(*followers)
+        return leader, results
+
+    leader, results = asyncio.run(run())
+    assert leader.cancelled()
+    assert len(calls) == 2
+    assert sorted(shared for _, shared in results) == [False, True, True]
+    assert {result for result, _ in results} == {"result 2"}
+    assert group.metrics()["takeovers"] == 1
+    assert group.metrics()["in_flight"] == 0
+
+
+def test_db_generation_lock_serializes_workers(monkeypatch):
+    """The database-backed lock makes a second holder wait for the first"""
+    import asyncio
+    from single_flight import SingleFlightConfig, db_generation_lock, db_lock_metrics
+    monkeypatch.setattr(SingleFlightConfig, "DB_LOCK_ENABLED", True)
+    monkeypatch.setattr(SingleFlightConfig, "DB_LOCK_POLL_SECONDS", 0.01)
+
+    events = []
+
+    async def hold(name):
+        async with db_generation_lock("lock-test"):
+            events.append(f"{name}-start")
+            await asyncio.sleep(0.1)
+            events.append(f"{name}-end")
+
+    async def run_both():
+        first = asyncio.create_task(hold("first"))
+        await asyncio.sleep(0.03)
+        await hold("second")
+        await first
+
+    waits_before = db_lock_metrics["waits"]
+    asyncio.run(run_both())
+
+    assert events == ["first-start", "first-end", "second-start", "second-end"]
+    assert db_lock_metrics["waits"] == waits_before + 1
+
+
+def test_history_latency_flat_while_generations_in_flight(pipeline, monkeypatch):
+    """Slow generations do not stall other endpoints on the same worker"""
+    import asyncio
+    import time
+    import httpx
+    import quiz_pipeline
+
+    generation_seconds = 0.5
+    original_generate = pipeline.generate
+
+    async def slow_generate(content, title, options=None):
+        await asyncio.sleep(generation_seconds)
+        return await original_generate(content, title, options)
+
+    monkeypatch.setattr(quiz_pipeline, "generate_quiz_async", slow_generate)
+
+    async def timed_get(async_client, path):
+        started = time.perf_counter()
+        response = await async_client.get(path)
+        assert response.status_code == 200
+        return time.perf_counter() - started
+
+    async def measure():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+            idle = [await timed_get(async_client, "/history") for _ in range(3)]
+
+            generations = [
+                asyncio.create_task(async_client.post(
+                    "/generate_quiz",
+                    json={"url": f"https://en.wikipedia.org/wiki/Concurrency_test_{i}"}
+                ))
+                for i in range(8)
+            ]
+            await asyncio.sleep(0.05)
+            busy = []
+            for _ in range(5):
+                busy.append(await timed_get(async_client, "/history"))
+                await asyncio.sleep(0.02)
+            in_flight = sum(not task.done() for task in generations)
+
+            results = await asyncio.gather(*generations)
+            return idle, busy, in_flight, results
+
+    idle, busy, in_flight, results = asyncio.run(measure())
+
+    assert in_flight == 8
+    assert all(response.status_code == 200 for response in results)
+    assert max(busy) < generation_seconds / 2
+    assert max(busy) < max(idle) + 0.2
+
+
+def test_generate_quiz_revalidates_by_revision_id(client, pipeline, mediawiki_server, monkeypatch):
+    """After the TTL, an unchanged revision is confirmed without downloading the article"""
+    import quiz_pipeline
+    from quiz_cache import QuizCacheConfig
+    from scraper import scrape_article_async
+    monkeypatch.setattr(quiz_pipeline, "scrape_article_async", scrape_article_async)
+    monkeypatch.setattr(QuizCacheConfig, "TTL_SECONDS", 0)
+    url = "https://en.wikipedia.org/wiki/Alan_Turing"
+
+    first = client.post("/generate_quiz", json={"url": url, "force_refresh": True})
+    second = client.post("/generate_quiz", json={"url": url})
+
+    assert second.headers["X-Quiz-Cache"] == "hit"
+    assert second.json()["id"] == first.json()["id"]
+    assert pipeline.generate_calls == 1
+    extract_requests = [params for params in mediawiki_server if "extracts" in params["prop"]]
+    assert len(extract_requests) == 1
+
+
+def _read_ndjson(response):
+    import json
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_generate_quiz_batch_streams_results(client, pipeline, monkeypatch):
+    """Duplicates are generated once and a failing article does not fail the batch"""
+    original_scrape = pipeline.scrape
+
+    async def scrape(url):
+        if url.endswith("Missing_article"):
+            raise ValueError("Article not found")
+        return await original_scrape(url)
+
+    monkeypatch.setattr("quiz_pipeline.scrape_article_async", scrape)
+    urls = [
+        "https://en.wikipedia.org/wiki/Batch_one",
+        "https://en.wikipedia.org/wiki/Batch_two",
+        "https://en.wikipedia.org/wiki/batch one",
+        "https://en.wikipedia.org/wiki/Missing_article",
+    ]
+    response = client.post("/generate_quiz/batch", json={"urls": urls})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    *items, summary = _read_ndjson(response)
+    assert summary == {"summary": {"requested": 4, "unique": 3, "succeeded": 2, "failed": 1}}
+    by_index = {item["index"]: item for item in items}
+    assert set(by_index) == {0, 1, 3}
+    assert by_index[0]["status"] == "ok"
+    assert by_index[0]["quiz"]["quiz"]
+    assert by_index[3] == {
+        "index": 3,
+        "url": urls[3],
+        "status": "error",
+        "status_code": 400,
+        "error": "Article not found",
+    }
+    assert pipeline.generate_calls == 2
+
+
+def test_generate_quiz_batch_respects_concurrency_limits(client, pipeline, monkeypatch):
+    """No more than the requested number of scrapes / LLM calls run at once"""
+    import asyncio
+    peaks = {"lookup": [0, 0], "scrape": [0, 0], "generate": [0, 0]}
+
+    def tracked(stage, fn):
+        async def wrapper(*args):
+            counter = peaks[stage]
+            counter[0] += 1
+            counter[1] = max(counter[1], counter[0])
+            await asyncio.sleep(0.01)
+            try:
+                return await fn(*args)
+            finally:
+                counter[0] -= 1
+        return wrapper
+
+    monkeypatch.setattr("quiz_pipeline.scrape_article_async", tracked("scrape", pipeline.scrape))
+    monkeypatch.setattr("quiz_pipeline.generate_quiz_async", tracked("generate", pipeline.generate))
+    import quiz_pipeline
+    monkeypatch.setattr(
+        "quiz_pipeline._find_cached_response", tracked("lookup", quiz_pipeline._find_cached_response)
+    )
+    urls = [f"https://en.wikipedia.org/wiki/Concurrency_{i}" for i in range(12)]
+    response = client.post(
+        "/generate_quiz/batch",
+        json={"urls": urls, "scrape_concurrency": 3, "llm_concurrency": 2}
+    )
+    assert response.status_code == 200
+    assert _read_ndjson(response)[-1]["summary"]["succeeded"] == 12
+    assert peaks["scrape"][1] == 3
+    assert peaks["generate"][1] == 2
+    # Cache lookups (and their revision requests) are bounded too, not fired for every URL at once
+    assert peaks["lookup"][1] <= 5
+
+
+def test_generate_quiz_batch_too_many_urls(client, monkeypatch):
+    from quiz_pipeline import BatchConfig
+    monkeypatch.setattr(BatchConfig, "MAX_URLS", 2)
+    urls = [f"https://en.wikipedia.org/wiki/Limit_{i}" for i in range(3)]
+    response = client.post("/generate_quiz/batch", json={"urls": urls})
+    assert response.status_code == 400
+
+
+def test_job_queue_runs_by_priority_and_returns_result(client, pipeline):
+    """Jobs are returned immediately and processed highest priority first"""
+    import asyncio
+    from job_queue import JobWorkerPool
+
+    low = client.post("/jobs", json={"url": "https://en.wikipedia.org/wiki/Job_low"})
+    high = client.post("/jobs", json={"url": "https://en.wikipedia.org/wiki/Job_high", "priority": 10})
+    assert low.status_code == 202
+    assert low.json()["status"] == "queued"
+    assert pipeline.scrape_calls == 0
+
+    pool = JobWorkerPool(size=1)
+    assert asyncio.run(pool.run_once())
+    assert client.get(f"/jobs/{high.json()['id']}").json()["status"] == "succeeded"
+    assert client.get(f"/jobs/{low.json()['id']}").json()["status"] == "queued"
+
+    assert asyncio.run(pool.run_once())
+    job = client.get(f"/jobs/{low.json()['id']}").json()
+    assert job["status"] == "succeeded"
+    assert job["attempts"] == 1
+    assert job["cache"] == "miss"
+    assert job["result"]["id"] == job["quiz_id"]
+    assert job["result"]["quiz"] == pipeline.quiz_data["quiz"]
+    assert not asyncio.run(pool.run_once())
+
+
+def test_job_queue_retries_failed_llm_calls(client, pipeline, monkeypatch):
+    """LLM failures are retried with backoff; other errors fail immediately"""
+    import asyncio
+    from job_queue import JobQueueConfig, JobWorkerPool
+    from llm_quiz_generator import QuizGenerationError
+    monkeypatch.setattr(JobQueueConfig, "BACKOFF_BASE_SECONDS", 0)
+    failures = {"left": 1}
+    original_generate = pipeline.generate
+
+    async def flaky_generate(content, title, options=None):
+        if failures["left"]:
+            failures["left"] -= 1
+            raise QuizGenerationError("Failed to generate quiz: rate limited")
+        return await original_generate(content, title, options)
+
+    monkeypatch.setattr("quiz_pipeline.generate_quiz_async", flaky_generate)
+    job_id = client.post("/jobs", json={"url": "https://en.wikipedia.org/wiki/Job_retry"}).json()["id"]
+    pool = JobWorkerPool(size=1)
+
+    asyncio.run(pool.run_once())
+    job = client.get(f"/jobs/{job_id}").json()
+    assert (job["status"], job["attempts"]) == ("queued", 1)
+    assert "rate limited" in job["error"]
+    assert job["next_run_at"] is not None
+
+    asyncio.run(pool.run_once())
+    job = client.get(f"/jobs/{job_id}").json()
+    assert (job["status"], job["attempts"], job["error"]) == ("succeeded", 2, None)
+
+    async def missing_article(url):
+        raise ValueError("Article not found")
+
+    monkeypatch.setattr("quiz_pipeline.scrape_article_async", missing_article)
+    job_id = client.post("/jobs", json={"url": "https://en.wikipedia.org/wiki/Job_missing"}).json()["id"]
+    asyncio.run(pool.run_once())
+    job = client.get(f"/jobs/{job_id}").json()
+    assert (job["status"], job["attempts"], job["error"]) == ("failed", 1, "Article not found")
+
+
+def test_job_workers_process_submitted_jobs(pipeline, monkeypatch):
+    """Started workers pick up jobs submitted while they are idle"""
+    import asyncio
+    import httpx
+    from job_queue import JobQueueConfig, JobWorkerPool
+    monkeypatch.setattr(JobQueueConfig, "POLL_SECONDS", 0.05)
+
+    async def submit_and_wait():
+        pool = JobWorkerPool(size=2)
+        pool.start()
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+                submitted = await asyncio.gather(*[
+                    async_client.post("/jobs", json={"url": f"https://en.wikipedia.org/wiki/Worker_{i}"})
+                    for i in range(3)
+                ])
+                for _ in range(200):
+                    statuses = [
+                        (await async_client.get(f"/jobs/{response.json()['id']}")).json()["status"]
+                        for response in submitted
+                    ]
+                    if all(job_status == "succeeded" for job_status in statuses):
+                        return statuses
+                    await asyncio.sleep(0.02)
+                return statuses
+        finally:
+            await pool.stop()
+
+    assert asyncio.run(submit_and_wait()) == ["succeeded"] * 3
+    assert pipeline.generate_calls == 3
+
+
+def test_running_job_keeps_its_lease(client, pipeline, monkeypatch):
+    """A generation longer than the lease is not picked up by a second worker"""
+    import asyncio
+    from job_queue import JobQueueConfig, JobWorkerPool
+    monkeypatch.setattr(JobQueueConfig, "LEASE_SECONDS", 1)
+    monkeypatch.setattr(JobQueueConfig, "LEASE_RENEW_SECONDS", 0.1)
+    original_generate = pipeline.generate
+
+    async def slow_generate(content, title, options=None):
+        await asyncio.sleep(1.5)
+        return await original_generate(content, title, options)
+
+    monkeypatch.setattr("quiz_pipeline.generate_quiz_async", slow_generate)
+    job_id = client.post("/jobs", json={"url": "https://en.wikipedia.org/wiki/Job_long"}).json()["id"]
+
+    async def run_with_second_worker():
+        first = asyncio.create_task(JobWorkerPool(size=1).run_once())
+        await asyncio.sleep(1.2)
+        stolen = await JobWorkerPool(size=1).run_once()
+        await first
+        return stolen
+
+    assert not asyncio.run(run_with_second_worker())
+    job = client.get(f"/jobs/{job_id}").json()
+    assert (job["status"], job["attempts"]) == ("succeeded", 1)
+    assert pipeline.generate_calls == 1
+
+
+@pytest.mark.parametrize("outcome", ["success", "failure"])
+def test_stale_attempt_does_not_overwrite_reclaimed_job(client, pipeline, monkeypatch, outcome):
+    """An attempt that lost its lease leaves the new attempt's job row alone"""
+    import asyncio
+    from database import SessionLocal, GenerationJob
+    from job_queue import JobWorkerPool, job_metrics
+    from llm_quiz_generator import QuizGenerationError
+    original_generate = pipeline.generate
+
+    async def reclaimed_generate(content, title, options=None):
+        # Another worker reclaims the job while this attempt is still running
+        with SessionLocal() as db:
+            job = db.get(GenerationJob, job_id)
+            job.attempts += 1
+            job.worker_id = "other-worker"
+            db.commit()
+        if outcome == "failure":
+            raise QuizGenerationError("Failed to generate quiz: rate limited")
+        return await original_generate(content, title, options)
+
+    monkeypatch.setattr("quiz_pipeline.generate_quiz_async", reclaimed_generate)
+    job_id = client.post("/jobs", json={"url": f"https://en.wikipedia.org/wiki/Job_stale_{outcome}"}).json()["id"]
+    lost_before = job_metrics["lease_lost"]
+
+    assert asyncio.run(JobWorkerPool(size=1).run_once())
+    job = client.get(f"/jobs/{job_id}").json()
+    assert (job["status"], job["attempts"], job["quiz_id"], job["error"]) == ("running", 2, None, None)
+    assert job_metrics["lease_lost"] == lost_before + 1
+
+
+def test_abandoned_job_is_retried_until_attempts_run_out(client, pipeline):
+    """An expired lease re-queues the job only while it has attempts left"""
+    import asyncio
+    from datetime import datetime, timedelta
+    from database import SessionLocal, GenerationJob
+    from job_queue import JobWorkerPool
+
+    def abandon(job_id, attempts):
+        with SessionLocal() as db:
+            job = db.get(GenerationJob, job_id)
+            job.status = "running"
+            job.attempts = attempts
+            job.lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+            db.commit()
+
+    pool = JobWorkerPool(size=1)
+    retried = client.post("/jobs", json={"url": "https://en.wikipedia.org/wiki/Job_abandoned"}).json()["id"]
+    abandon(retried, 1)
+    assert asyncio.run(pool.run_once())
+    job = client.get(f"/jobs/{retried}").json()
+    assert (job["status"], job["attempts"]) == ("succeeded", 2)
+
+    exhausted = client.post("/jobs", json={"url": "https://en.wikipedia.org/wiki/Job_exhausted"}).json()["id"]
+    abandon(exhausted, 3)
+    assert not asyncio.run(pool.run_once())
+    job = client.get(f"/jobs/{exhausted}").json()
+    assert (job["status"], job["attempts"]) == ("failed", 3)
+    assert "last attempt" in job["error"]
+
+
+def test_get_job_not_found(client):
+    assert client.get("/jobs/999999").status_code == 404
+
+
+def _read_sse(response):
+    import json
+    events = []
+    for block in response.text.split("\n\n"):
+        if not block.strip():
+            continue
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_stream_quiz_emits_questions_and_stores_same_quiz(client, pipeline, fake_groq, monkeypatch):
+    """Streamed generation sends each question, then stores what /generate_quiz would"""
+    import llm_quiz_generator
+    from database import SessionLocal, Quiz
+    monkeypatch.setattr("quiz_pipeline.generate_quiz_async", llm_quiz_generator.generate_quiz_async)
+    url = "https://en.wikipedia.org/wiki/Streaming_test"
+
+    response = client.get("/generate_quiz/stream", params={"url": url})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _read_sse(response)
+
+    questions = [data for event, data in events if event == "question"]
+    assert [data["index"] for data in questions] == list(range(len(pipeline.quiz_data["quiz"])))
+    assert [data["question"] for data in questions] == pipeline.quiz_data["quiz"]
+    assert fake_groq.requests[-1]["stream"] is True
+
+    event, final = events[-1]
+    assert event == "quiz"
+    assert final["cache"] == "miss"
+
+    regular = client.post("/generate_quiz", json={"url": url, "force_refresh": True})
+    assert regular.status_code == 200
+    with SessionLocal() as db:
+        streamed_quiz = db.get(Quiz, final["quiz"]["id"])
+        regular_quiz = db.get(Quiz, regular.json()["id"])
+        assert streamed_quiz.full_quiz_data == regular_quiz.full_quiz_data
+        assert streamed_quiz.cache_key == regular_quiz.cache_key
+    assert final["quiz"] == {**regular.json(), "id": final["quiz"]["id"]}
+
+    cached = _read_sse(client.get("/generate_quiz/stream", params={"url": url}))
+    assert cached[-1][0] == "quiz"
+    assert cached[-1][1]["cache"] == "hit"
+    assert len([event for event, _ in cached if event == "question"]) == len(questions)
+
+
+def test_stream_quiz_uses_map_reduce_like_generate_quiz(client, pipeline, monkeypatch):
+    """Map-reduce articles are not streamed as one completion; the stored quiz matches /generate_quiz"""
+    import quiz_pipeline
+    map_reduced = []
+
+    async def fake_map_reduce(content, sections, title, options=None):
+        map_reduced.append(title)
+        return dict(pipeline.quiz_data)
+
+    async def no_stream(*args, **kwargs):
+        raise AssertionError("map-reduce articles must not be streamed as one completion")
+        yield
+
+    monkeypatch.setattr(quiz_pipeline, "use_map_reduce", lambda content: True)
+    monkeypatch.setattr(quiz_pipeline, "generate_quiz_map_reduce", fake_map_reduce)
+    monkeypatch.setattr(quiz_pipeline, "stream_quiz_async", no_stream)
+    url = "https://en.wikipedia.org/wiki/Streaming_map_reduce_test"
+
+    events = _read_sse(client.get("/generate_quiz/stream", params={"url": url}))
+    assert [data["question"] for event, data in events if event == "question"] == pipeline.quiz_data["quiz"]
+    assert events[-1][0] == "quiz" and events[-1][1]["cache"] == "miss"
+
+    regular = client.post("/generate_quiz", json={"url": url})
+    assert regular.headers["X-Quiz-Cache"] == "hit"
+    assert regular.json()["id"] == events[-1][1]["quiz"]["id"]
+    assert map_reduced == [pipeline.quiz_data["title"]]
+
+
+def test_stream_quiz_reports_errors_as_events(client, pipeline, monkeypatch):
+    async def missing_article(url):
+        raise ValueError("Article not found")
+
+    monkeypatch.setattr("quiz_pipeline.scrape_article_async", missing_article)
+    events = _read_sse(client.get(
+        "/generate_quiz/stream",
+        params={"url": "https://en.wikipedia.org/wiki/Stream_missing"}
+    ))
+    assert events == [("error", {"status_code": 400, "detail": "Article not found"})]
+
+
+def test_generated_quiz_is_stored_normalized_and_served_unchanged(client, pipeline):
+    """Cache hits rebuilt from the normalized tables match the original response byte for byte"""
+    from database import SessionLocal, Quiz
+    url = "https://en.wikipedia.org/wiki/Normalized_test"
+    first = client.post("/generate_quiz", json={"url": url})
+    second = client.post("/generate_quiz", json={"url": url})
+    assert second.headers["X-Quiz-Cache"] == "hit"
+    assert second.content == first.content
+
+    with SessionLocal() as db:
+        quiz = db.get(Quiz, first.json()["id"])
+        assert quiz.quiz_data_version is not None
+        assert len(quiz.questions) == len(pipeline.quiz_data["quiz"])
+        assert [topic.name for topic in quiz.related_topics] == pipeline.quiz_data["related_topics"]
+
+
+def test_stats_days_is_validated(client):
+    assert client.get("/stats?days=0").status_code == 422
+    assert client.get("/stats?days=366").status_code == 422
+    assert client.get("/stats?days=7").status_code == 200
+
+
+def test_stats_counters_track_new_quizzes(client, pipeline):
+    """/stats counters are bumped on insert and agree with a full rebuild"""
+    from collections import Counter
+    from database import SessionLocal
+    from quiz_stats import rebuild_quiz_stats
+    with SessionLocal() as db:
+        rebuild_quiz_stats(db)
+    before = client.get("/stats").json()
+
+    for name in ("Stats_one", "Stats_two"):
+        assert client.post("/generate_quiz", json={"url": f"https://en.wikipedia.org/wiki/{name}"}).status_code == 200
+    after = client.get("/stats").json()
+
+    per_quiz = len(pipeline.quiz_data["quiz"])
+    assert after["total_quizzes"] == before["total_quizzes"] + 2
+    assert after["total_questions"] == before["total_questions"] + 2 * per_quiz
+    difficulties = Counter(question["difficulty"] for question in pipeline.quiz_data["quiz"])
+    for difficulty, count in difficulties.items():
+        assert after["difficulty_distribution"][difficulty] == (
+            before["difficulty_distribution"].get(difficulty, 0) + 2 * count
+        )
+    assert after["quizzes_per_day"][-1]["quizzes"] >= 2
+    assert after["last_quiz_date"] >= before["last_quiz_date"]
+
+    with SessionLocal() as db:
+        rebuild_quiz_stats(db)
+    assert client.get("/stats").json() == after
+
+
+def test_history_cursor_pagination(client):
+    """Cursor pages cover the same rows as one big page, ties broken by id"""
+    from datetime import datetime
+    from database import SessionLocal, Quiz
+    same_time = datetime(2030, 1, 1, 12, 0, 0)
+    with SessionLocal() as db:
+        for index in range(5):
+            db.add(Quiz(
+                url=f"https://en.wikipedia.org/wiki/Cursor_{index}",
+                title=f"Cursor {index}",
+                date_generated=same_time,
+                full_quiz_data="{}",
+            ))
+        db.commit()
+
+    expected = [item["id"] for item in client.get("/history", params={"limit": 1000}).json()]
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"after": cursor} if cursor else {})}
+        response = client.get("/history", params=params)
+        assert response.status_code == 200
+        seen.extend(item["id"] for item in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == expected
+    assert len(set(seen)) == len(seen)
+
+    assert client.get("/history", params={"after": "not-a-cursor"}).status_code == 400
+
+
+def test_history_prefix_filters_and_projection(client):
+    """Prefix filters match by range and the query never loads the large columns"""
+    from sqlalchemy import event
+    from database import SessionLocal, Quiz, engine
+    with SessionLocal() as db:
+        for title in ("Prefix alpha", "Prefix beta", "Prefiy other"):
+            db.add(Quiz(
+                url=f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}",
+                title=title,
+                scraped_content="<html>" + "x" * 1000 + "</html>",
+                full_quiz_data="{}",
+            ))
+        db.commit()
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        by_title = client.get("/history", params={"title_prefix": "Prefix "}).json()
+        by_url = client.get("/history", params={"url_prefix": "https://en.wikipedia.org/wiki/Prefix_b"}).json()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+    assert sorted(item["title"] for item in by_title) == ["Prefix alpha", "Prefix beta"]
+    assert [item["title"] for item in by_url] == ["Prefix beta"]
+    history_queries = [statement for statement in statements if "FROM quizzes" in statement]
+    assert history_queries
+    assert not any("scraped_content" in statement or "full_quiz_data" in statement for statement in history_queries)
+
+
+def test_generated_quiz_html_goes_to_content_store(client, pipeline):
+    from content_store import load_scraped_content
+    from database import SessionLocal, Quiz
+    response = client.post("/generate_quiz", json={"url": "https://en.wikipedia.org/wiki/Blob_store_test"})
+    with SessionLocal() as db:
+        quiz = db.get(Quiz, response.json()["id"])
+        assert quiz.scraped_content is None
+        assert quiz.scraped_content_ref.startswith("sha256:")
+        assert load_scraped_content(quiz) == "<html></html>"
+
+
+def test_quiz_detail_fast_path_matches_validated_response(client, pipeline):
+    """Pipeline quizzes skip validation but serialize exactly like QuizDetailResponse"""
+    import json
+    from database import SessionLocal, Quiz
+    from models import QuizDetailResponse
+    from quiz_records import is_pipeline_quiz, load_quiz_data
+    generated = client.post("/generate_quiz", json={"url": "https://en.wikipedia.org/wiki/Fast_path_test"})
+    response = client.get(f"/quiz/{generated.json()['id']}")
+    assert response.status_code == 200
+
+    with SessionLocal() as db:
+        quiz = db.get(Quiz, generated.json()["id"])
+        assert is_pipeline_quiz(quiz)
+        quiz_data = load_quiz_data(quiz)
+        validated = QuizDetailResponse(
+            id=quiz.id, url=quiz.url, title=quiz.title, date_generated=quiz.date_generated,
+            **{key: quiz_data[key] for key in ("summary", "key_entities", "sections", "quiz", "related_topics")}
+        )
+    expected = json.dumps(validated.model_dump(mode="json"), ensure_ascii=False, separators=(",", ":"))
+    assert response.content == expected.encode("utf-8")
+
+
+def test_quiz_detail_legacy_row_is_validated(client):
+    """Rows not written by the pipeline still go through QuizDetailResponse"""
+    import json
+    from database import SessionLocal, Quiz
+    with SessionLocal() as db:
+        quiz = Quiz(
+            url="https://en.wikipedia.org/wiki/Legacy_detail",
+            title="Legacy detail",
+            full_quiz_data=json.dumps({"summary": "Old row", "key_entities": {"people": ["Ada"]}}),
+        )
+        db.add(quiz)
+        db.commit()
+        quiz_id = quiz.id
+
+    body = client.get(f"/quiz/{quiz_id}").json()
+    assert body["key_entities"] == {"people": ["Ada"], "organizations": [], "locations": []}
+    assert body["quiz"] == []
+
+
+def test_quiz_detail_etag_and_not_modified(client, pipeline):
+    generated = client.post("/generate_quiz", json={"url": "https://en.wikipedia.org/wiki/Etag_test"})
+    path = f"/quiz/{generated.json()['id']}"
+
+    response = client.get(path, headers={"Accept-Encoding": "identity"})
+    etag = response.headers["ETag"]
+    assert etag.startswith(f'"quiz-{generated.json()["id"]}-')
+    assert "immutable" in response.headers["Cache-Control"]
+
+    revalidated = client.get(path, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["ETag"] == etag
+
+    # The ETag of a compressed response also revalidates
+    compressed = client.get(path, headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.json() == response.json()
+    revalidated = client.get(path, headers={"If-None-Match": compressed.headers["ETag"], "Accept-Encoding": "gzip"})
+    assert revalidated.status_code == 304
+    # The 304 carries the same validator as the 200 it revalidates
+    assert revalidated.headers["ETag"] == compressed.headers["ETag"] == f'{etag[:-1]}-gzip"'
+
+
+def test_history_and_stats_short_ttl_and_not_modified(client):
+    for path in ("/history", "/stats"):
+        response = client.get(path)
+        assert response.headers["Cache-Control"].startswith("public, max-age=")
+        assert "immutable" not in response.headers["Cache-Control"]
+        assert client.get(path, headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+        assert client.get(path, headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_generate_quiz_returns_503_while_llm_provider_is_down(client, pipeline, monkeypatch):
+    """An open circuit breaker fails the request fast with Retry-After"""
+    import llm_quiz_generator
+
+    async def unavailable(content, title, options=None):
+        raise llm_quiz_generator.ProviderUnavailableError("LLM provider is unavailable", 12.5)
+
+    monkeypatch.setattr("quiz_pipeline.generate_quiz_async", unavailable)
+    response = client.post(
+        "/generate_quiz",
+        json={"url": "https://en.wikipedia.org/wiki/Circuit_test", "force_refresh": True}
+    )
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "13"
+
+
+def test_generate_quiz_options_are_cached_separately(client, pipeline):
+    """Each combination of quiz options is generated and cached on its own"""
+    url = "https://en.wikipedia.org/wiki/Options_test"
+    default = client.post("/generate_quiz", json={"url": url})
+    warmup = client.post("/generate_quiz", json={"url": url, "question_count": 5, "include_summary": False})
+    assert warmup.headers["X-Quiz-Cache"] == "miss"
+    assert warmup.json()["id"] != default.json()["id"]
+
+    again = client.post("/generate_quiz", json={"url": url, "include_summary": False, "question_count": 5})
+    assert again.headers["X-Quiz-Cache"] == "hit"
+    assert again.json()["id"] == warmup.json()["id"]
+    assert pipeline.generate_calls == 2
+
+    assert client.post("/generate_quiz", json={"url": url, "question_count": 3}).status_code == 422
+    response = client.get("/generate_quiz/stream", params={"url": url, "difficulty_mix": "easy:0"})
+    assert response.status_code == 422
+
+
+def test_history_prefix_filter_uses_pattern_indexes_on_postgresql():
+    """PostgreSQL gets LIKE plus text_pattern_ops indexes; other databases a range"""
+    from types import SimpleNamespace
+    from sqlalchemy import inspect
+    from sqlalchemy.dialects import postgresql
+    from sqlalchemy.schema import CreateIndex
+    from database import Quiz, engine
+    from history_query import _starts_with
+
+    def fake_session(dialect):
+        return SimpleNamespace(get_bind=lambda: SimpleNamespace(dialect=SimpleNamespace(name=dialect)))
+
+    pattern = _starts_with(fake_session("postgresql"), Quiz.title, "50%_off")
+    sql = str(pattern.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    assert "LIKE '50/%%/_off' || '%%' ESCAPE '/'" in sql
+    assert ">=" in str(_starts_with(fake_session("sqlite"), Quiz.title, "Ada"))
+
+    indexes = {index.name: index for index in Quiz.__table__.indexes}
+    ddl = str(CreateIndex(indexes["ix_quizzes_title_pattern"]).compile(dialect=postgresql.dialect()))
+    assert "title text_pattern_ops" in ddl
+    assert "ix_quizzes_title_pattern" not in {index["name"] for index in inspect(engine).get_indexes("quizzes")}
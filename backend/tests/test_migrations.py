@@ -0,0 +1,126 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from database import SessionLocal, Quiz, Question, Entity
+from main import app
+from migrations import backfill_quiz_data
+
+
+def _insert_legacy_quiz(quiz_data, url="https://en.wikipedia.org/wiki/Legacy"):
+    """A row as written before the normalized tables existed"""
+    with SessionLocal() as db:
+        quiz = Quiz(url=url, title=quiz_data["title"], full_quiz_data=json.dumps(quiz_data))
+        db.add(quiz)
+        db.commit()
+        return quiz.id
+
+
+def test_backfill_quiz_data_keeps_responses_identical(sample_quiz_data):
+    client = TestClient(app)
+    quiz_id = _insert_legacy_quiz(sample_quiz_data)
+    before = client.get(f"/quiz/{quiz_id}")
+    assert before.status_code == 200
+
+    result = backfill_quiz_data(batch_size=2)
+    assert result["migrated"] >= 1
+
+    with SessionLocal() as db:
+        quiz = db.get(Quiz, quiz_id)
+        assert quiz.quiz_data_version is not None
+        assert quiz.summary == sample_quiz_data["summary"]
+        questions = db.query(Question).filter(Question.quiz_id == quiz_id).order_by(Question.position).all()
+        assert [question.question for question in questions] == [
+            question["question"] for question in sample_quiz_data["quiz"]
+        ]
+        people = db.query(Entity.name).filter(
+            Entity.quiz_id == quiz_id, Entity.kind == "people"
+        ).order_by(Entity.position).all()
+        assert [name for (name,) in people] == sample_quiz_data["key_entities"]["people"]
+
+    after = client.get(f"/quiz/{quiz_id}")
+    assert after.content == before.content
+
+    # Re-running finds nothing left to do for this row
+    assert backfill_quiz_data()["migrated"] == 0
+
+
+def test_backfill_leaves_non_round_tripping_rows_as_json(sample_quiz_data):
+    legacy_data = {**sample_quiz_data, "difficulty_breakdown": {"easy": 3}}
+    quiz_id = _insert_legacy_quiz(legacy_data, url="https://en.wikipedia.org/wiki/Odd_legacy")
+
+    result = backfill_quiz_data()
+    assert result["skipped"] >= 1
+    with SessionLocal() as db:
+        assert db.get(Quiz, quiz_id).quiz_data_version is None
+
+    response = TestClient(app).get(f"/quiz/{quiz_id}")
+    assert response.status_code == 200
+    assert response.json()["quiz"] == sample_quiz_data["quiz"]
+
+
+def test_rebuild_stats_counts_legacy_rows(sample_quiz_data):
+    from database import QuizStatsCounter
+    from quiz_stats import rebuild_quiz_stats
+    client = TestClient(app)
+    with SessionLocal() as db:
+        rebuild_quiz_stats(db)
+    before = client.get("/stats").json()
+
+    quiz_id = _insert_legacy_quiz(sample_quiz_data, url="https://en.wikipedia.org/wiki/Stats_legacy")
+    with SessionLocal() as db:
+        result = rebuild_quiz_stats(db)
+        assert result["backfilled_question_counts"] >= 1
+        assert db.get(Quiz, quiz_id).question_count == len(sample_quiz_data["quiz"])
+        assert db.query(QuizStatsCounter).filter(QuizStatsCounter.scope == "total").count() == 1
+
+    after = client.get("/stats").json()
+    assert after["total_quizzes"] == before["total_quizzes"] + 1
+    assert after["total_questions"] == before["total_questions"] + len(sample_quiz_data["quiz"])
+    assert sum(after["difficulty_distribution"].values()) == after["total_questions"]
+
+
+def test_move_scraped_content_into_store(sample_quiz_data):
+    from content_store import load_scraped_content
+    from migrations import move_scraped_content
+    html = "<html><body>" + "<p>Legacy page</p>" * 200 + "</body></html>"
+    quiz_ids = []
+    with SessionLocal() as db:
+        for index in range(2):
+            quiz = Quiz(
+                url=f"https://en.wikipedia.org/wiki/Blob_{index}",
+                title=sample_quiz_data["title"],
+                scraped_content=html,
+                full_quiz_data=json.dumps(sample_quiz_data),
+            )
+            db.add(quiz)
+            db.commit()
+            quiz_ids.append(quiz.id)
+
+    result = move_scraped_content(batch_size=1)
+    assert result["moved"] >= 2
+    assert result["deduplicated"] >= 1
+    assert result["bytes_stored"] < result["bytes_moved"]
+
+    with SessionLocal() as db:
+        quizzes = [db.get(Quiz, quiz_id) for quiz_id in quiz_ids]
+        assert all(quiz.scraped_content is None for quiz in quizzes)
+        assert quizzes[0].scraped_content_ref == quizzes[1].scraped_content_ref
+        assert load_scraped_content(quizzes[0]) == html
+
+    assert move_scraped_content()["moved"] == 0
+
+
+def test_startup_seeds_stats_of_an_upgraded_database(sample_quiz_data):
+    from database import QuizStatsCounter
+    _insert_legacy_quiz(sample_quiz_data, url="https://en.wikipedia.org/wiki/Stats_upgrade")
+    # A database from before the quiz_stats table: quizzes but no counters
+    with SessionLocal() as db:
+        db.query(QuizStatsCounter).delete()
+        db.commit()
+        quizzes = db.query(Quiz).count()
+
+    with TestClient(app) as client:
+        stats = client.get("/stats").json()
+    assert stats["total_quizzes"] == quizzes
+    assert sum(stats["difficulty_distribution"].values()) == stats["total_questions"] > 0
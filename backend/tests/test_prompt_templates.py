@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import pytest
+
+import llm_quiz_generator
+from llm_quiz_generator import build_completion_request, generate_quiz_async, stream_quiz_async
+from llm_response_cache import ResponseCacheConfig, response_cache_key, response_cache_metrics
+from prompt_templates import PromptTemplate, quiz_template
+
+
+class RecordingClient:
+    """LLM client stand-in returning the same completion for every request"""
+
+    def __init__(self, response_text):
+        self.response_text = response_text
+        self.requests = []
+
+    async def complete(self, request, deadline_seconds=None):
+        self.requests.append(request)
+        return self.response_text
+
+    async def stream(self, request, deadline_seconds=None):
+        self.requests.append(request)
+        for start in range(0, len(self.response_text), 50):
+            yield self.response_text[start:start + 50]
+
+
+def test_template_keeps_instructions_in_a_stable_prefix_and_the_article_last():
+    first = build_completion_request("First article about {braces}.")
+    second = build_completion_request("Second article.")
+    assert first["messages"][0] == second["messages"][0]
+    assert first["messages"][0]["role"] == "system"
+    assert first["messages"][-1]["content"].endswith("First article about {braces}.")
+
+    template = PromptTemplate("test", 1, "Instructions.", "Count: {count}\n{article_content}")
+    assert template.fields == ("count", "article_content")
+    assert template.render(count=3, article_content="Text") == "Count: 3\nText"
+    assert PromptTemplate("test", 1, "Changed.", "Count: {count}\n{article_content}").key != template.key
+    with pytest.raises(ValueError):
+        PromptTemplate("test", 1, "Instructions.", "{article_content}\nCount: {count}")
+
+
+def test_response_cache_replays_completions(monkeypatch, tmp_path, sample_quiz_data):
+    monkeypatch.setattr(ResponseCacheConfig, "DIR", str(tmp_path))
+    client = RecordingClient(json.dumps(sample_quiz_data))
+    monkeypatch.setattr(llm_quiz_generator, "get_llm_client", lambda: client)
+    hits = response_cache_metrics["hits"]
+
+    first = asyncio.run(generate_quiz_async("Article text.", "Python"))
+    second = asyncio.run(generate_quiz_async("Article text.", "Python"))
+    assert first == second
+    assert len(client.requests) == 1
+    assert response_cache_metrics["hits"] == hits + 1
+
+    asyncio.run(generate_quiz_async("Other article text.", "Python"))
+    assert len(client.requests) == 2
+
+    async def stream_events():
+        return [event async for event in stream_quiz_async("Article text.", "Python")]
+
+    streamed = asyncio.run(stream_events())
+    replayed = asyncio.run(stream_events())
+    assert len(client.requests) == 3
+    assert streamed == replayed
+    assert replayed[-1]["quiz_data"] == first
+
+
+def test_response_cache_does_not_replay_invalid_completions(monkeypatch, tmp_path, sample_quiz_data):
+    monkeypatch.setattr(ResponseCacheConfig, "DIR", str(tmp_path))
+    client = RecordingClient("Sorry, I cannot write that quiz.")
+    monkeypatch.setattr(llm_quiz_generator, "get_llm_client", lambda: client)
+
+    with pytest.raises(llm_quiz_generator.QuizGenerationError):
+        asyncio.run(generate_quiz_async("Article text.", "Python"))
+    assert response_cache_metrics["discarded"] >= 1
+
+    # A retry reaches the LLM, and its valid completion is the one kept
+    client.response_text = json.dumps(sample_quiz_data)
+    first = asyncio.run(generate_quiz_async("Article text.", "Python"))
+    assert asyncio.run(generate_quiz_async("Article text.", "Python")) == first
+    assert len([request for request in client.requests if request["messages"][-1]["content"].endswith("Article text.")]) == 2
+
+
+def test_response_cache_key_covers_model_and_temperature():
+    request = build_completion_request("Article text.")
+    template = quiz_template("json_object")
+    key = response_cache_key(template, request)
+    assert response_cache_key(template, dict(request)) == key
+    assert response_cache_key(template, {**request, "temperature": 0.0}) != key
+    assert response_cache_key(template, {**request, "model": "other-model"}) != key
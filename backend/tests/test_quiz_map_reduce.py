@@ -0,0 +1,148 @@
+import asyncio
+import time
+
+import pytest
+
+import quiz_map_reduce
+from llm_quiz_generator import QuizGenerationError
+from models import QuizOptions, QuizOutput
+from quiz_map_reduce import (
+    MapReduceConfig,
+    generate_quiz_map_reduce,
+    plan_sections,
+    select_questions,
+    use_map_reduce,
+)
+
+
+def _long_article(sections=6, sentences=120):
+    headings = [f"Section {n}" for n in range(sections)]
+    parts = ["Intro sentence about the Analytical Engine built in 1837 by Charles Babbage."]
+    for n, heading in enumerate(headings):
+        parts.append(heading)
+        parts.extend(
+            f"Fact {m} of section {n} names Ada Lovelace and the year {1800 + m}."
+            for m in range(sentences)
+        )
+    return " ".join(parts), headings
+
+
+def _question(text, answer, difficulty="easy"):
+    return {
+        "question": text,
+        "options": [answer, f"{answer} 2", f"{answer} 3", f"{answer} 4"],
+        "answer": answer,
+        "difficulty": difficulty,
+        "explanation": "Because.",
+    }
+
+
+def test_use_map_reduce_follows_mode_and_article_length(monkeypatch):
+    long_text, _ = _long_article()
+    monkeypatch.setattr(MapReduceConfig, "MODE", "auto")
+    assert use_map_reduce(long_text)
+    assert not use_map_reduce("A short article.")
+    monkeypatch.setattr(MapReduceConfig, "MODE", "single")
+    assert not use_map_reduce(long_text)
+    monkeypatch.setattr(MapReduceConfig, "MODE", "map_reduce")
+    assert use_map_reduce("A short article.")
+
+
+def test_plan_sections_caps_calls_and_fits_section_budget(monkeypatch):
+    monkeypatch.setattr(MapReduceConfig, "MAX_SECTIONS", 4)
+    text, headings = _long_article(sections=12)
+    groups = plan_sections(text, headings)
+    assert len(groups) <= 5
+    for group in groups:
+        assert sum(chunk.tokens for chunk in group) <= MapReduceConfig.SECTION_TOKENS
+    covered = [chunk.heading for group in groups for chunk in group if chunk.heading]
+    assert covered == headings
+
+
+def test_select_questions_drops_duplicates_and_balances_sections_and_difficulty():
+    candidates = [
+        [_question("Who built the engine?", "Babbage", "easy"),
+         _question("Who wrote the notes?", "Lovelace", "easy"),
+         _question("When was it designed?", "1837", "hard")],
+        [_question("Who built the engine first?", "Babbage", "easy"),  # Same fact as above
+         _question("Which city hosted it?", "London", "medium")],
+        [_question("What did it compute?", "Tables", "medium")],
+    ]
+    picked = select_questions(candidates, 4)
+    answers = [question["answer"] for question in picked]
+    assert answers.count("Babbage") == 1
+    assert {"London", "Tables"} <= set(answers)
+    assert len({question["difficulty"] for question in picked}) == 3
+
+
+def test_map_reduce_against_mock_llm_server(mock_llm_server):
+    text, headings = _long_article()
+    quiz = asyncio.run(generate_quiz_map_reduce(text, headings, "Analytical Engine"))
+
+    QuizOutput(**quiz)
+    assert 5 <= len(quiz["quiz"]) <= 10
+    assert len(mock_llm_server.requests) == len(plan_sections(text, headings))
+    questions = [question["question"] for question in quiz["quiz"]]
+    assert questions.count("What is the subject of this article?") <= 1
+    assert len({question["difficulty"] for question in quiz["quiz"]}) == 3
+    # Every section is represented before any section gets a second question
+    assert len({question["answer"].split(" fact")[0] for question in quiz["quiz"]}) >= 5
+    assert quiz["sections"] == headings
+    assert "Person from Section 0" in quiz["key_entities"]["people"]
+
+
+def test_map_calls_run_concurrently_within_the_limit(mock_llm_server, monkeypatch):
+    text, headings = _long_article()
+    sections = len(plan_sections(text, headings))
+    mock_llm_server.delay = 0.3
+
+    monkeypatch.setattr(MapReduceConfig, "CONCURRENCY", sections)
+    started = time.perf_counter()
+    asyncio.run(generate_quiz_map_reduce(text, headings, "Analytical Engine"))
+    parallel = time.perf_counter() - started
+    # Wall-clock time is about one (the slowest) section, not the sum over sections
+    assert parallel < mock_llm_server.delay * sections / 2
+    assert mock_llm_server.max_in_flight == sections
+
+    mock_llm_server.max_in_flight = 0
+    monkeypatch.setattr(MapReduceConfig, "CONCURRENCY", 2)
+    asyncio.run(generate_quiz_map_reduce(text, headings, "Analytical Engine"))
+    assert mock_llm_server.max_in_flight == 2
+
+
+def test_failed_sections_are_skipped_until_too_few_questions(mock_llm_server):
+    text, headings = _long_article()
+    failures = quiz_map_reduce.map_reduce_metrics["map_failures"]
+    mock_llm_server.fail_sections = {"Section 1"}
+    quiz = asyncio.run(generate_quiz_map_reduce(text, headings, "Analytical Engine"))
+    assert 5 <= len(quiz["quiz"]) <= 10
+    assert quiz_map_reduce.map_reduce_metrics["map_failures"] > failures
+
+    mock_llm_server.fail_sections = {
+        group_heading for group_heading in (
+            quiz_map_reduce._group_heading(group) for group in plan_sections(text, headings)
+        )
+    }
+    with pytest.raises(QuizGenerationError):
+        asyncio.run(generate_quiz_map_reduce(text, headings, "Analytical Engine"))
+
+
+def test_shortfall_from_sections_is_topped_up(mock_llm_server):
+    text, headings = _long_article()
+    groups = plan_sections(text, headings)
+    # Only three sections answer: fewer candidates than the 10 questions asked for
+    mock_llm_server.fail_sections = {quiz_map_reduce._group_heading(group) for group in groups[3:]}
+    options = QuizOptions(question_count=10)
+    topups = quiz_map_reduce.map_reduce_metrics["topups"]
+
+    quiz = asyncio.run(generate_quiz_map_reduce(text, headings, "Analytical Engine", options))
+    assert len(quiz["quiz"]) == 10
+    assert quiz_map_reduce.map_reduce_metrics["topups"] == topups + 1
+    topup_prompt = mock_llm_server.requests[-1]["messages"][-1]["content"]
+    assert "QUESTIONS ALREADY WRITTEN" in topup_prompt
+    assert any(question["answer"].startswith("Article fact") for question in quiz["quiz"])
+
+    # Still short after the top-up: the quiz is not returned short
+    mock_llm_server.fail_sections.add("Article")
+    with pytest.raises(QuizGenerationError, match="of 10 requested"):
+        asyncio.run(generate_quiz_map_reduce(text, headings, "Analytical Engine", options))
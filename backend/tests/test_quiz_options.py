@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import pytest
+from pydantic import ValidationError
+
+import llm_quiz_generator
+from llm_quiz_generator import QuizGenerationConfig, build_completion_request, generate_quiz_async
+from models import QuizOptions
+from prompt_templates import quiz_template
+from quiz_options import describe_difficulty, difficulty_counts, options_fingerprint
+
+
+class FixedClient:
+    """LLM client stand-in returning the same completion for every request"""
+
+    def __init__(self, response_text):
+        self.response_text = response_text
+        self.requests = []
+
+    async def complete(self, request, deadline_seconds=None):
+        self.requests.append(request)
+        return self.response_text
+
+
+def test_difficulty_mix_is_scaled_to_the_question_count():
+    options = QuizOptions(question_count=7, difficulty_mix={"easy": 1, "medium": 1, "hard": 1})
+    counts = difficulty_counts(options)
+    assert sum(counts.values()) == 7
+    assert sorted(counts.values()) == [2, 2, 3]
+    assert describe_difficulty(QuizOptions(question_count=5, difficulty_mix={"hard": 1})) == "0 easy, 0 medium and 5 hard"
+    assert difficulty_counts(QuizOptions()) is None
+    assert options_fingerprint(QuizOptions()) != options_fingerprint(QuizOptions(question_count=5))
+
+    with pytest.raises(ValidationError):
+        QuizOptions(question_count=11)
+    with pytest.raises(ValidationError):
+        QuizOptions(difficulty_mix={"easy": 0})
+    with pytest.raises(ValidationError):
+        QuizOptions(difficulty_mix={"trivial": 1})
+
+
+@pytest.mark.parametrize("mode", ["prompt", "json_object", "json_schema"])
+def test_small_quiz_without_extras_asks_for_less(monkeypatch, mode):
+    monkeypatch.setattr(QuizGenerationConfig, "OUTPUT_MODE", mode)
+    warmup = QuizOptions(
+        question_count=5,
+        include_summary=False,
+        include_key_entities=False,
+        include_sections=False,
+        include_related_topics=False,
+    )
+    full = build_completion_request("Article text.")
+    small = build_completion_request("Article text.", options=warmup)
+
+    assert small["max_tokens"] < full["max_tokens"] <= QuizGenerationConfig.MAX_TOKENS
+    prompt = json.dumps(small["messages"]) + json.dumps(small.get("response_format"))
+    for part in ("summary", "key_entities", "sections", "related_topics"):
+        assert part in json.dumps(full["messages"]) + json.dumps(full.get("response_format"))
+        assert part not in prompt
+    assert "Write 5 questions" in small["messages"][-1]["content"]
+    assert "Also give" not in prompt and "  and " not in prompt
+
+    # Count and difficulty are per request; the instructions only change with the parts
+    other_count = build_completion_request("Other text.", options=warmup.model_copy(update={"question_count": 9}))
+    assert other_count["messages"][0] == small["messages"][0]
+
+
+def test_generated_quiz_follows_the_options(monkeypatch, sample_quiz_data):
+    client = FixedClient(json.dumps(sample_quiz_data))
+    monkeypatch.setattr(llm_quiz_generator, "get_llm_client", lambda: client)
+    options = QuizOptions(question_count=5, include_summary=False, include_related_topics=False)
+
+    quiz_data = asyncio.run(generate_quiz_async("Article text.", "Python", options))
+    assert len(quiz_data["quiz"]) == 5
+    assert quiz_data["summary"] == ""
+    assert quiz_data["related_topics"] == []
+    assert quiz_data["key_entities"] == sample_quiz_data["key_entities"]
+
+
+def test_prompt_lists_only_the_parts_asked_for():
+    only_topics = quiz_template("json_object", ("summary", "key_entities", "sections")).instructions
+    assert "3. Also give 3-5 related Wikipedia topics. Use only" in only_topics
+    two = quiz_template("json_object", ("summary", "key_entities")).instructions
+    assert "3. Also give 3-5 main sections and 3-5 related Wikipedia topics." in two
+    nothing = quiz_template("json_object", ("summary", "key_entities", "sections", "related_topics")).instructions
+    assert "3." not in nothing.split("Respond with")[0]
+
+
+@pytest.mark.parametrize("mode", ["prompt", "json_object"])
+def test_summary_is_required_unless_left_out(monkeypatch, mode, sample_quiz_data):
+    from llm_quiz_generator import finalize_quiz_response
+    from quiz_repair import repair_metrics
+    monkeypatch.setattr(QuizGenerationConfig, "OUTPUT_MODE", mode)
+    without_summary = {key: value for key, value in sample_quiz_data.items() if key != "summary"}
+    text = json.dumps(without_summary)
+    count = len(sample_quiz_data["quiz"])
+
+    before = dict(repair_metrics)
+    asyncio.run(finalize_quiz_response(text, "", "Python", QuizOptions(question_count=count)))
+    assert (repair_metrics["clean"], repair_metrics["repaired"]) == (before["clean"], before["repaired"] + 1)
+
+    before = dict(repair_metrics)
+    options = QuizOptions(question_count=count, include_summary=False)
+    quiz_data = asyncio.run(finalize_quiz_response(text, "", "Python", options))
+    assert quiz_data["summary"] == ""
+    assert (repair_metrics["clean"], repair_metrics["repaired"]) == (before["clean"] + 1, before["repaired"])
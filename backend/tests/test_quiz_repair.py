@@ -0,0 +1,152 @@
+import asyncio
+import json
+
+import pytest
+
+import llm_quiz_generator
+from llm_quiz_generator import finalize_quiz_response
+from models import QuizOptions
+from quiz_repair import match_answer, parse_json_lenient, repair_metrics, repair_question, repair_quiz_data
+
+
+class ScriptedClient:
+    """LLM client stand-in returning queued completions"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    async def complete(self, request, deadline_seconds=None):
+        self.requests.append(request)
+        return self.responses.pop(0)
+
+
+def _question(n, answer=None):
+    options = [f"Option {n}{letter}" for letter in "ABCD"]
+    return {
+        "question": f"Question number {n}?",
+        "options": options,
+        "answer": answer or options[0],
+        "difficulty": "easy",
+        "explanation": "Because.",
+    }
+
+
+def test_parse_json_lenient_fixes_trailing_commas_and_truncation(sample_quiz_data):
+    text = json.dumps(sample_quiz_data, indent=2)
+    assert parse_json_lenient("```json\n" + text + "\n```") == (sample_quiz_data, False)
+
+    with_commas = text.replace('"\n    }', '",\n    }').replace("]\n}", "],\n}")
+    assert parse_json_lenient(with_commas) == (sample_quiz_data, True)
+
+    # Cut off in the middle of the third question
+    second_end = text.index("}", text.index(sample_quiz_data["quiz"][1]["explanation"]))
+    truncated = text[:second_end + 60]
+    data, repaired = parse_json_lenient(truncated)
+    assert repaired
+    assert data["quiz"] == sample_quiz_data["quiz"][:2]
+    assert data["summary"] == sample_quiz_data["summary"]
+
+    with pytest.raises(ValueError):
+        parse_json_lenient("Sorry, I cannot help with that.")
+
+
+@pytest.mark.parametrize("answer, expected", [
+    ("Paris", "Paris"),
+    ("A) Paris", "Paris"),
+    ("paris.", "Paris"),
+    ("Option C", "Berlin"),
+    ("b", "London"),
+    ("Pariss", "Paris"),
+    ("Madrid", None),
+])
+def test_match_answer(answer, expected):
+    assert match_answer(answer, ["Paris", "London", "Berlin", "Rome"]) == expected
+
+
+def test_repair_question_strips_option_letters_and_rejects_broken_questions():
+    question, fixed = repair_question({
+        "question": "Capital of France?",
+        "options": ["A) Paris", "B) London", "C) Berlin", "D) Rome"],
+        "answer": "A) Paris",
+        "difficulty": "Easy",
+        "explanation": "It is.",
+    })
+    assert question["options"] == ["Paris", "London", "Berlin", "Rome"]
+    assert question["answer"] == "Paris" and question["difficulty"] == "easy"
+    assert fixed
+
+    assert repair_question({**_question(1), "options": ["a", "b", "c"]}) == (None, False)
+    assert repair_question({**_question(1), "options": ["a", "b", "c", "A"]}) == (None, False)
+    assert repair_question({**_question(1), "answer": "Something else"}) == (None, False)
+
+
+def test_repair_quiz_data_drops_invalid_and_duplicate_questions():
+    data = {
+        "summary": "S",
+        "quiz": [_question(n) for n in range(12)] + [_question(1), {"question": "broken"}],
+        "key_entities": "not a dict",
+    }
+    quiz_data, report = repair_quiz_data(data, "Title")
+    assert quiz_data["title"] == "Title"
+    assert len(quiz_data["quiz"]) == 10
+    assert report.questions_dropped == 4
+    assert quiz_data["key_entities"] == {"people": [], "organizations": [], "locations": []}
+
+
+def test_valid_output_is_not_repaired(monkeypatch, sample_quiz_data):
+    client = ScriptedClient([])
+    monkeypatch.setattr(llm_quiz_generator, "get_llm_client", lambda: client)
+    clean = repair_metrics["clean"]
+    quiz = asyncio.run(finalize_quiz_response(json.dumps(sample_quiz_data), "Article", "Python"))
+    assert quiz["quiz"] == sample_quiz_data["quiz"]
+    assert repair_metrics["clean"] == clean + 1
+    assert client.requests == []
+
+
+def test_missing_questions_are_topped_up_without_regenerating(monkeypatch):
+    # Four good questions, one whose answer matches no option
+    broken = {"title": "T", "summary": "S", "quiz": [_question(n) for n in range(4)] + [_question(4, "Nope")]}
+    topup = {"quiz": [_question(2), _question(7, "Option 7b"), _question(8)]}
+    client = ScriptedClient([json.dumps(topup)])
+    monkeypatch.setattr(llm_quiz_generator, "get_llm_client", lambda: client)
+    before = dict(repair_metrics)
+
+    options = QuizOptions(question_count=5)
+    quiz = asyncio.run(finalize_quiz_response(json.dumps(broken)[:-1] + ",}", "Article text", "T", options))
+
+    assert [question["question"] for question in quiz["quiz"]] == [
+        f"Question number {n}?" for n in (0, 1, 2, 3, 7)
+    ]
+    assert quiz["quiz"][4]["answer"] == "Option 7B"
+    assert len(client.requests) == 1
+    prompt = client.requests[0]["messages"][-1]["content"]
+    assert "Write 3 new factual" in prompt and "- Question number 3?" in prompt
+    assert repair_metrics["topups"] == before["topups"] + 1
+    assert repair_metrics["json_repaired"] == before["json_repaired"] + 1
+    assert repair_metrics["questions_dropped"] == before["questions_dropped"] + 1
+
+
+def test_unrepairable_output_raises(monkeypatch):
+    client = ScriptedClient(['{"quiz": []}'])
+    monkeypatch.setattr(llm_quiz_generator, "get_llm_client", lambda: client)
+    failed = repair_metrics["failed"]
+    with pytest.raises(ValueError):
+        asyncio.run(finalize_quiz_response('{"title": "T", "quiz": [', "Article", "T"))
+    assert repair_metrics["failed"] == failed + 1
+
+
+def test_clean_quiz_short_of_the_requested_count_is_topped_up(monkeypatch):
+    clean = {"title": "T", "summary": "S", "quiz": [_question(n) for n in range(5)]}
+    client = ScriptedClient([json.dumps({"quiz": [_question(n) for n in range(5, 9)]})])
+    monkeypatch.setattr(llm_quiz_generator, "get_llm_client", lambda: client)
+
+    quiz = asyncio.run(finalize_quiz_response(json.dumps(clean), "Article text", "T", QuizOptions(question_count=7)))
+    assert [question["question"] for question in quiz["quiz"]] == [f"Question number {n}?" for n in range(7)]
+    assert "Write 4 new factual" in client.requests[0]["messages"][-1]["content"]
+
+    # Nothing usable comes back: the quiz does not silently stay short
+    client = ScriptedClient(['{"quiz": []}'])
+    monkeypatch.setattr(llm_quiz_generator, "get_llm_client", lambda: client)
+    with pytest.raises(ValueError):
+        asyncio.run(finalize_quiz_response(json.dumps(clean), "Article text", "T", QuizOptions(question_count=7)))
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from quiz_stream_parser import QuizStreamParser
+
+
+def _feed_in_chunks(text, chunk_size):
+    parser = QuizStreamParser()
+    emitted = []
+    for start in range(0, len(text), chunk_size):
+        for question in parser.feed(text[start:start + chunk_size]):
+            emitted.append((question, start + chunk_size))
+    return parser, emitted
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 100000])
+def test_emits_each_question_once_complete(sample_quiz_data, chunk_size):
+    """Questions come out in order, each as soon as its closing brace arrives"""
+    text = "```json\n" + json.dumps(sample_quiz_data, indent=2) + "\n```"
+    parser, emitted = _feed_in_chunks(text, chunk_size)
+
+    assert [question for question, _ in emitted] == sample_quiz_data["quiz"]
+    assert parser.text == text
+    if chunk_size == 1:
+        # The first question is available long before the completion ends
+        first_question_end = text.index("}", text.index('"quiz"')) + 1
+        assert emitted[0][1] == first_question_end
+        assert emitted[0][1] < len(text) / 2
+
+
+def test_ignores_braces_and_quotes_inside_strings():
+    question = {
+        "question": 'Which "quiz": [ {literal} ] key is a trap?\\',
+        "options": ["{", "}", "[", "]"],
+        "answer": "{",
+        "difficulty": "easy",
+        "explanation": "Brackets inside strings are text: \"}\" and \\ too.",
+    }
+    document = {
+        "title": "quiz",
+        "summary": "A summary with a fake \"quiz\": [{}] in it.",
+        "sections": ["quiz"],
+        "quiz": [question, question],
+        "related_topics": [],
+    }
+    _, emitted = _feed_in_chunks(json.dumps(document), 3)
+    assert [question for question, _ in emitted] == [question, question]
+
+
+def test_skips_questions_that_fail_validation():
+    valid = {
+        "question": "Q?",
+        "options": ["a", "b", "c", "d"],
+        "answer": "a",
+        "difficulty": "easy",
+        "explanation": "Because.",
+    }
+    invalid = {"question": "Only two options?", "options": ["a", "b"]}
+    parser, emitted = _feed_in_chunks(json.dumps({"quiz": [invalid, valid]}), 5)
+    assert [question for question, _ in emitted] == [valid]
+    assert parser.questions_seen == 2
+
+
+def test_nested_arrays_outside_quiz_are_not_questions():
+    text = json.dumps({"key_entities": {"quiz": [{"question": "nested"}]}, "sections": [{"a": 1}]})
+    _, emitted = _feed_in_chunks(text, 4)
+    assert emitted == []
@@ -0,0 +1,88 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+import article_cache
+import scraper
+from http_client import FetchResult
+from scraper import fetch_revision_id_async, scrape_article, scrape_article_async, title_from_url
+
+TURING_URL = "https://en.wikipedia.org/wiki/Alan_Turing"
+
+
+def test_title_from_url():
+    assert title_from_url("https://en.wikipedia.org/wiki/Python_(programming_language)") == "Python (programming language)"
+    assert title_from_url("https://en.wikipedia.org/wiki/Caf%C3%A9") == "Café"
+
+
+def test_api_mode_fetches_plain_text_and_revision(mediawiki_server):
+    """API mode returns article prose and the revision ID without skin HTML"""
+    article = asyncio.run(scrape_article_async(TURING_URL))
+
+    assert article.title == "Alan Turing"
+    assert article.revision_id == 1249123456
+    assert "Turing machine" in article.cleaned_content
+    assert "Early life and education" in article.cleaned_content
+    assert "==" not in article.cleaned_content
+    assert "Hodges" not in article.cleaned_content
+    assert "List of things named after" not in article.cleaned_content
+    assert mediawiki_server[-1]["prop"] == "extracts|revisions"
+    assert mediawiki_server[-1]["titles"] == "Alan Turing"
+
+
+def test_api_mode_sync_scrape_matches_async(mediawiki_server):
+    assert scrape_article(TURING_URL) == asyncio.run(scrape_article_async(TURING_URL))
+
+
+def test_api_mode_missing_page(mediawiki_server):
+    with pytest.raises(ValueError):
+        asyncio.run(scrape_article_async("https://en.wikipedia.org/wiki/No_such_article_here"))
+
+
+def test_fetch_revision_id_only_requests_ids(mediawiki_server):
+    assert asyncio.run(fetch_revision_id_async(TURING_URL)) == 1249123456
+    assert mediawiki_server[-1]["prop"] == "revisions"
+
+
+def test_api_mode_downloads_each_revision_once(mediawiki_server):
+    """A cached revision costs only the revision lookup, in every worker sharing the cache directory"""
+    first = asyncio.run(scrape_article_async(TURING_URL))
+    assert scrape_article(TURING_URL) == first
+    assert [request["prop"] for request in mediawiki_server] == ["revisions", "extracts|revisions", "revisions"]
+
+    # Another worker: empty memory tier, same directory
+    article_cache._article_cache = None
+    assert asyncio.run(scrape_article_async(TURING_URL)) == first
+    assert mediawiki_server[-1]["prop"] == "revisions"
+    assert article_cache.article_cache_metrics["disk_hits"] >= 1
+
+
+def test_html_mode_parses_each_revision_once(monkeypatch):
+    html = (Path(__file__).parent / "fixtures" / "wikipedia_article.html").read_text(encoding="utf-8")
+    html = html.replace('"wgRevisionId"', '"wgPageName":"Fixture_article","wgRevisionId"')
+    page = {"html": html}
+
+    async def fake_fetch(url):
+        return FetchResult(page["html"].encode("utf-8"), page["html"], {}, False)
+
+    parses = []
+
+    def counting_parse(*args):
+        parses.append(args[0])
+        return original_parse(*args)
+
+    original_parse = scraper.parse_article
+    monkeypatch.setattr(scraper, "fetch_async", fake_fetch)
+    monkeypatch.setattr(scraper, "_fetch_plan", lambda url: (url, counting_parse))
+    monkeypatch.setattr(scraper, "parse_article", counting_parse)
+
+    first = asyncio.run(scrape_article_async("https://en.wikipedia.org/wiki/Fixture_article"))
+    again = asyncio.run(scrape_article_async("https://en.wikipedia.org/wiki/Fixture article"))
+    assert again == first
+    assert len(parses) == 1
+
+    page["html"] = html.replace("1234567890", "1234567891")
+    edited = asyncio.run(scrape_article_async("https://en.wikipedia.org/wiki/Fixture_article"))
+    assert edited.revision_id == 1234567891
+    assert len(parses) == 2
@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+import pytest
+from pydantic import ValidationError
+
+import llm_quiz_generator
+from article_chunker import estimate_tokens
+from llm_providers import StubProvider
+from llm_quiz_generator import QuizGenerationConfig, build_completion_request, finalize_quiz_response
+from models import QuizOutput
+from quiz_repair import repair_metrics
+from structured_output import (
+    json_schema_for,
+    parse_structured,
+    quiz_output_schema,
+    quiz_output_schema_text,
+    response_format,
+)
+
+ARTICLE = "Ada Lovelace worked with Charles Babbage in London. " * 40
+
+
+def _prompt_text(request):
+    return "".join(message["content"] for message in request["messages"])
+
+
+def test_schema_is_self_contained_and_closed():
+    schema = json_schema_for(QuizOutput)
+    text = json.dumps(schema)
+    assert "$ref" not in text and "$defs" not in text and "allOf" not in text
+    assert schema["additionalProperties"] is False
+    question = schema["properties"]["quiz"]["items"]
+    assert question["additionalProperties"] is False
+    assert question["properties"]["difficulty"]["enum"] == ["easy", "medium", "hard"]
+    assert set(question["required"]) == {"question", "options", "answer", "difficulty", "explanation"}
+    assert '"description"' not in quiz_output_schema_text()
+
+
+def test_response_format_per_mode():
+    assert response_format("prompt") is None
+    assert response_format("json_object") == {"type": "json_object"}
+    schema_format = response_format("json_schema")
+    assert schema_format["type"] == "json_schema"
+    assert schema_format["json_schema"]["schema"] == json_schema_for(QuizOutput, descriptions=False)
+
+
+@pytest.mark.parametrize("mode", ["json_object", "json_schema"])
+def test_structured_prompt_is_shorter_than_prose_prompt(monkeypatch, mode):
+    monkeypatch.setattr(QuizGenerationConfig, "OUTPUT_MODE", "prompt")
+    prose = build_completion_request(ARTICLE)
+    monkeypatch.setattr(QuizGenerationConfig, "OUTPUT_MODE", mode)
+    structured = build_completion_request(ARTICLE)
+    streamed = build_completion_request(ARTICLE, stream=True)
+
+    assert "response_format" not in prose
+    schema = quiz_output_schema(question_count=8) if mode == "json_schema" else None
+    assert structured["response_format"] == response_format(mode, schema)
+    assert "response_format" not in streamed
+    assert quiz_output_schema_text() in streamed["messages"][0]["content"]
+    assert estimate_tokens(_prompt_text(structured)) < estimate_tokens(_prompt_text(prose))
+
+
+def test_parse_structured_validates_and_fills_defaults(sample_quiz_data):
+    text = json.dumps({**sample_quiz_data, "title": ""})
+    assert parse_structured(text, QuizOutput, title="Python").title == "Python"
+    with pytest.raises(ValidationError):
+        parse_structured("```json\n" + text + "\n```", QuizOutput)
+
+
+def test_json_mode_output_is_parsed_directly(monkeypatch):
+    monkeypatch.setattr(QuizGenerationConfig, "OUTPUT_MODE", "json_object")
+    monkeypatch.setattr(llm_quiz_generator, "parse_quiz_response", None)  # must not be reached
+    request = build_completion_request(ARTICLE)
+    text = asyncio.run(StubProvider(0, 0, {}).complete(request, timeout=1))
+    assert text.startswith("{")
+    clean = repair_metrics["clean"]
+    quiz = asyncio.run(finalize_quiz_response(text, ARTICLE, "Ada Lovelace"))
+    assert quiz["title"] == "Ada Lovelace"
+    assert repair_metrics["clean"] == clean + 1